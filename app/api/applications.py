@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 from typing import List, Optional
 from datetime import datetime
 
@@ -8,6 +8,8 @@ from app.models.user import User
 from app.models.opportunity import Opportunity
 from app.models.application import Application, ApplicationEvent
 from app.models.swipe import UserSwipe
+from app.services.opportunity_cards import card_loader, opportunity_card
+from app.services.user_counters import application_stats, get_user_counters
 from app.schemas.application import (
     ApplicationCreate,
     ApplicationUpdate,
@@ -114,7 +116,9 @@ def list_my_applications(
     db: Session = Depends(get_db)
 ):
     """List user's applications with optional status filter."""
-    query = db.query(Application).filter(Application.user_id == current_user.id)
+    query = db.query(Application).options(
+        card_loader(Application.opportunity)
+    ).filter(Application.user_id == current_user.id)
 
     if status:
         query = query.filter(Application.status == status.value)
@@ -131,14 +135,7 @@ def list_my_applications(
             "created_at": app.created_at,
             "updated_at": app.updated_at,
             "submitted_at": app.submitted_at,
-            "opportunity": {
-                "id": app.opportunity.id,
-                "title": app.opportunity.title,
-                "company_name": app.opportunity.company_name,
-                "company_logo_url": app.opportunity.company_logo_url,
-                "city": app.opportunity.city,
-                "country": app.opportunity.country,
-            }
+            "opportunity": opportunity_card(app.opportunity),
         })
 
     return result
@@ -150,18 +147,7 @@ def get_application_stats(
     db: Session = Depends(get_db)
 ):
     """Get application statistics for the current user."""
-    base_query = db.query(Application).filter(Application.user_id == current_user.id)
-
-    return {
-        "total": base_query.count(),
-        "pending": base_query.filter(Application.status == "pending").count(),
-        "submitted": base_query.filter(Application.status == "submitted").count(),
-        "viewed": base_query.filter(Application.status == "viewed").count(),
-        "interview": base_query.filter(Application.status == "interview").count(),
-        "offer": base_query.filter(Application.status == "offer").count(),
-        "rejected": base_query.filter(Application.status == "rejected").count(),
-        "withdrawn": base_query.filter(Application.status == "withdrawn").count(),
-    }
+    return application_stats(get_user_counters(db, current_user.id))
 
 
 @router.get("/{application_id}", response_model=ApplicationDetail)
@@ -171,7 +157,10 @@ def get_application(
     db: Session = Depends(get_db)
 ):
     """Get single application with full timeline."""
-    application = db.query(Application).filter(
+    application = db.query(Application).options(
+        card_loader(Application.opportunity),
+        selectinload(Application.events),
+    ).filter(
         Application.id == application_id,
         Application.user_id == current_user.id
     ).first()
@@ -190,14 +179,7 @@ def get_application(
         "created_at": application.created_at,
         "updated_at": application.updated_at,
         "submitted_at": application.submitted_at,
-        "opportunity": {
-            "id": application.opportunity.id,
-            "title": application.opportunity.title,
-            "company_name": application.opportunity.company_name,
-            "company_logo_url": application.opportunity.company_logo_url,
-            "city": application.opportunity.city,
-            "country": application.opportunity.country,
-        },
+        "opportunity": opportunity_card(application.opportunity),
         "events": [
             {
                 "id": e.id,
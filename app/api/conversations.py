@@ -1,11 +1,12 @@
 from typing import Optional, List
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 
 from app.security import get_db, get_current_user
 from app.models.user import User
 from app.models.conversation import Conversation, ConversationEvent
 from app.schemas.conversation import ConversationOut, ConversationDetailOut, ConversationEventOut
+from app.services.opportunity_cards import card_loader
 
 router = APIRouter(prefix="/conversations", tags=["conversations"])
 
@@ -17,7 +18,9 @@ def list_conversations(
     db: Session = Depends(get_db),
 ):
     """List all conversations for the current user."""
-    q = db.query(Conversation).filter(Conversation.user_id == current_user.id)
+    q = db.query(Conversation).options(
+        card_loader(Conversation.opportunity)
+    ).filter(Conversation.user_id == current_user.id)
 
     if conv_type:
         q = q.filter(Conversation.type == conv_type)
@@ -34,6 +37,7 @@ def get_conversation(
     """Get a single conversation with its events."""
     conv = (
         db.query(Conversation)
+        .options(card_loader(Conversation.opportunity), selectinload(Conversation.events))
         .filter(Conversation.id == conversation_id, Conversation.user_id == current_user.id)
         .first()
     )
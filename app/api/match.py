@@ -1,96 +1,119 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
-from typing import Optional, List
+from sqlalchemy import or_
+from sqlalchemy.orm import Session, load_only
+from typing import Optional, List, Tuple
 import logging
 
+import numpy as np
+
 from app.database import SessionLocal
 from app.models.user import User
 from app.models.opportunity import Opportunity
 from app.models.swipe import UserSwipe
 from app.models.preferences import UserPreferences
-from app.security import get_db, get_current_user
-from app.services.matching import get_matching_service, MatchResult
+from app.schemas.match import ExplainBatchRequest
+from app.security import get_db, get_current_user, require_admin
+from app.services.matching import (
+    MatchResult,
+    get_matching_service,
+    opportunity_to_dict,
+    preferences_to_dict,
+    user_to_dict,
+)
+from app.services.embedding_store import (
+    load_opportunity_embeddings,
+    backfill_missing_embeddings,
+    get_cached_user_embedding,
+    opportunity_similarities,
+)
+from app.services.ann_index import get_opportunity_index, ANN_CANDIDATE_POOL
+from app.services.batch_matching import FEED_PRECOMPUTED_CANDIDATES, precomputed_candidates
+from app.services.catalog import CATALOG_COLUMNS, OPPORTUNITY_CATALOG, get_opportunity_catalog, scoring_record
+from app.services.preference_filters import must_have_clauses
+from app.services.opportunity_features import normalize
+from app.services.feature_matrix import LEVEL_ORDER
+from app.services.reverse_matching import get_user_pool
+from app.services.feed_snapshot import (
+    catalog_version,
+    decode_cursor,
+    encode_cursor,
+    feed_version,
+    get_feed_snapshots,
+)
+from app.services.swiped_sets import SwipedBitmap, get_swiped_sets, not_swiped_clause
+from app.services.skill_vocabulary import TemporaryIds, bitset_from_ids, get_skill_vocabulary
 
 router = APIRouter(prefix="/match", tags=["match"])
 logger = logging.getLogger(__name__)
 
 
-def calculate_match_score(user_skills: set, opp_skills: set) -> float:
-    """Calculate Jaccard similarity score between user skills and opportunity requirements."""
+def calculate_match_score(user_skills: int, opp_skills: int) -> float:
+    """Calculate Jaccard similarity between user and opportunity skill bitsets."""
     if not opp_skills:
         return 1.0  # No requirements = perfect match
 
-    overlap = user_skills & opp_skills
-    union = user_skills | opp_skills
-
-    return round(len(overlap) / max(len(union), 1), 3)
+    overlap = (user_skills & opp_skills).bit_count()
+    union = (user_skills | opp_skills).bit_count()
 
+    return round(overlap / max(union, 1), 3)
 
-def user_to_dict(user: User) -> dict:
-    """Convert User model to dictionary for matching service."""
-    return {
-        "id": user.id,
-        "name": user.name,
-        "headline": user.headline,
-        "bio": user.bio,
-        "skills": user.skills or [],
-        "work_experiences": user.work_experiences or [],
-        "education_entries": user.education_entries or [],
-        "projects": user.projects or [],
-        "interests": user.interests or [],
-        "goals": user.goals,
-    }
 
+class SkillBitsets:
+    """
+    Canonical skill bitsets for one user and the opportunities scored
+    against them. Uses the ids stored on each opportunity, falling back to
+    its skill names for rows written before ids existed.
+    """
 
-def preferences_to_dict(prefs: Optional[UserPreferences]) -> dict:
-    """Convert UserPreferences model to dictionary."""
-    if not prefs:
+    def __init__(self, db: Session, user_skills: Optional[List[str]]):
+        self.vocabulary = get_skill_vocabulary(db)
+        self.temporary = TemporaryIds(self.vocabulary.next_id)
+        self.user_skill_bits = [
+            (skill, self._bits([skill])) for skill in dict.fromkeys(user_skills or [])
+        ]
+        self.user = 0
+        for _, bit in self.user_skill_bits:
+            self.user |= bit
+
+    def _bits(self, names) -> int:
+        bits = 0
+        for name in names or []:
+            skill_id = self.vocabulary.id_or_temporary(name, self.temporary)
+            if skill_id is not None:
+                bits |= 1 << skill_id
+        return bits
+
+    def required(self, opp: Opportunity) -> int:
+        if opp.required_skill_ids is not None:
+            return bitset_from_ids(opp.required_skill_ids)
+        return self._bits(opp.required_skills)
+
+    def matched_skills(self, opp_bits: int) -> List[str]:
+        """The user's skills (as they wrote them) present in `opp_bits`."""
+        return sorted(skill for skill, bit in self.user_skill_bits if bit & opp_bits)
+
+
+# Columns shown on feed cards. Only the returned page is read with them;
+# candidates are ranked from narrower projections.
+CARD_COLUMNS = (
+    Opportunity.id, Opportunity.title, Opportunity.description,
+    Opportunity.company_name, Opportunity.company, Opportunity.company_logo_url, Opportunity.company_size,
+    Opportunity.location, Opportunity.city, Opportunity.country, Opportunity.is_remote,
+    Opportunity.category, Opportunity.opportunity_type, Opportunity.work_arrangement,
+    Opportunity.experience_level, Opportunity.education_requirement,
+    Opportunity.salary_min, Opportunity.salary_max, Opportunity.salary_currency, Opportunity.salary_period,
+    Opportunity.is_salary_visible, Opportunity.required_skills, Opportunity.preferred_skills,
+    Opportunity.benefits, Opportunity.eligibility_criteria, Opportunity.application_deadline,
+    Opportunity.url, Opportunity.source,
+)
+
+
+def load_cards(db: Session, ids: List[int]) -> dict:
+    """Opportunity rows (card columns only) by id."""
+    if not ids:
         return {}
-    return {
-        "desired_job_titles": prefs.desired_job_titles or [],
-        "preferred_locations": prefs.preferred_locations or [],
-        "willing_to_relocate": prefs.willing_to_relocate,
-        "salary_min": prefs.salary_min,
-        "salary_max": prefs.salary_max,
-        "salary_currency": prefs.salary_currency,
-        "job_levels": prefs.job_levels or [],
-        "work_arrangements": prefs.work_arrangements or [],
-        "opportunity_types": prefs.opportunity_types or [],
-        "preferred_industries": prefs.preferred_industries or [],
-        "company_sizes": prefs.company_sizes or [],
-    }
-
-
-def opportunity_to_dict(opp: Opportunity) -> dict:
-    """Convert Opportunity model to dictionary."""
-    return {
-        "id": opp.id,
-        "title": opp.title,
-        "description": opp.description,
-        "company_name": opp.company_name,
-        "company": opp.company,
-        "company_logo_url": opp.company_logo_url,
-        "company_size": opp.company_size,
-        "location": opp.location,
-        "city": opp.city,
-        "country": opp.country,
-        "is_remote": opp.is_remote,
-        "salary_min": opp.salary_min,
-        "salary_max": opp.salary_max,
-        "salary_currency": opp.salary_currency,
-        "is_salary_visible": opp.is_salary_visible,
-        "job_type": opp.job_type,
-        "opportunity_type": opp.opportunity_type,
-        "work_arrangement": opp.work_arrangement,
-        "experience_level": opp.experience_level,
-        "education_requirement": opp.education_requirement,
-        "required_skills": opp.required_skills or [],
-        "preferred_skills": opp.preferred_skills or [],
-        "category": opp.category,
-        "url": opp.url,
-        "application_url": opp.application_url,
-        "source": opp.source,
-    }
+    rows = db.query(Opportunity).options(load_only(*CARD_COLUMNS)).filter(Opportunity.id.in_(ids)).all()
+    return {opp.id: opp for opp in rows}
 
 
 def _check_screening(user: User):
@@ -115,34 +138,43 @@ def get_opportunity_feed(
     """
     _check_screening(current_user)
 
-    # Get IDs of already-swiped opportunities
-    swiped_ids = db.query(UserSwipe.opportunity_id).filter(
-        UserSwipe.user_id == current_user.id
-    ).all()
-    swiped_ids = [s[0] for s in swiped_ids]
+    swiped = get_swiped_sets().get(db, current_user.id)
 
-    # Query opportunities excluding swiped ones
-    query = db.query(Opportunity).filter(
+    # Query opportunities excluding swiped ones (anti-join); only the
+    # columns needed to score them
+    query = db.query(
+        Opportunity.id, Opportunity.required_skill_ids, Opportunity.required_skills
+    ).filter(
         Opportunity.is_active == True
     )
 
-    if swiped_ids:
-        query = query.filter(Opportunity.id.not_in(swiped_ids))
+    if swiped:
+        query = query.filter(not_swiped_clause(current_user.id))
 
     if opportunity_type:
-        query = query.filter(Opportunity.opportunity_type == opportunity_type)
+        query = query.filter(Opportunity.opportunity_type_norm == normalize(opportunity_type))
 
-    opportunities = query.all()
+    candidates = query.order_by(Opportunity.id).all()
 
     # Score and rank based on user skills
-    user_skills = set(current_user.skills or [])
+    skills = SkillBitsets(db, current_user.skills)
 
-    scored = []
-    for opp in opportunities:
-        opp_skills = set(opp.required_skills or [])
-        score = calculate_match_score(user_skills, opp_skills)
-        overlap = user_skills & opp_skills
+    ranked = []
+    for row in candidates:
+        opp_skills = skills.required(row)
+        ranked.append((calculate_match_score(skills.user, opp_skills), row.id, opp_skills))
+
+    # Sort by score (best matches first)
+    ranked.sort(key=lambda x: x[0], reverse=True)
 
+    page = ranked[:limit]
+    cards = load_cards(db, [opp_id for _, opp_id, _ in page])
+
+    scored = []
+    for score, opp_id, opp_skills in page:
+        opp = cards.get(opp_id)
+        if not opp:
+            continue
         scored.append({
             "opportunity": {
                 "id": opp.id,
@@ -174,21 +206,18 @@ def get_opportunity_feed(
                 "source": opp.source,
             },
             "score": score,
-            "matched_skills": sorted(overlap),
+            "matched_skills": skills.matched_skills(opp_skills),
         })
 
-    # Sort by score (best matches first)
-    scored.sort(key=lambda x: x["score"], reverse=True)
-
     return {
         "user": {
             "id": current_user.id,
             "name": current_user.name,
             "skills": current_user.skills
         },
-        "feed": scored[:limit],
-        "total_available": len(scored),
-        "already_swiped": len(swiped_ids)
+        "feed": scored,
+        "total_available": len(ranked),
+        "already_swiped": len(swiped)
     }
 
 
@@ -213,13 +242,12 @@ def match_user(
 
     opportunities = db.query(Opportunity).filter(Opportunity.is_active == True).all()
 
-    user_skills = set(user.skills or [])
+    skills = SkillBitsets(db, user.skills)
 
     scored = []
     for opp in opportunities:
-        opp_skills = set(opp.required_skills or [])
-        overlap = user_skills & opp_skills
-        score = calculate_match_score(user_skills, opp_skills)
+        opp_skills = skills.required(opp)
+        score = calculate_match_score(skills.user, opp_skills)
 
         scored.append({
             "opportunity_id": opp.id,
@@ -228,7 +256,7 @@ def match_user(
             "company_name": opp.company_name,
             "required_skills": opp.required_skills,
             "score": score,
-            "matched_skills": sorted(overlap),
+            "matched_skills": skills.matched_skills(opp_skills),
         })
 
     scored.sort(key=lambda x: x["score"], reverse=True)
@@ -243,11 +271,185 @@ def match_user(
 # AI-POWERED MATCHING ENDPOINTS
 # ==============================================================================
 
+def _rank_ai_feed(
+    db: Session,
+    user_data: dict,
+    user_preferences: Optional[dict],
+    swiped: SwipedBitmap,
+    opportunity_type: Optional[str],
+    depth: int
+) -> Tuple[List[MatchResult], int]:
+    """
+    Rank the feed-eligible catalog for one user.
+
+    Returns:
+        (top `depth` match results, number of opportunities available)
+    """
+    if OPPORTUNITY_CATALOG:
+        return _rank_catalog_feed(db, user_data, user_preferences, swiped, opportunity_type, depth)
+
+    # Query opportunities excluding swiped ones
+    query = db.query(Opportunity).filter(
+        Opportunity.is_active == True,
+        Opportunity.is_stale == False
+    )
+
+    if swiped:
+        query = query.filter(not_swiped_clause(user_data["id"]))
+
+    if opportunity_type:
+        query = query.filter(Opportunity.opportunity_type_norm == normalize(opportunity_type))
+
+    # Must-have preferences are excluded in SQL, before anything is loaded
+    must_haves = must_have_clauses(user_preferences)
+    if must_haves:
+        query = query.filter(*must_haves)
+
+    # For large catalogs, only score the nearest semantic candidates
+    user_embedding = None
+    total_available = None
+    opp_dicts = None
+    stored_ids, computed_at = precomputed_candidates(db, user_data["id"]) if FEED_PRECOMPUTED_CANDIDATES else ([], None)
+    if stored_ids:
+        # Candidates from the offline batch job (see batch_matching) and
+        # everything written since it ran
+        total_available = query.count()
+        stored = query.filter(or_(Opportunity.id.in_(stored_ids), Opportunity.updated_at > computed_at))
+        opp_dicts = [scoring_record(row, text_hash=False) for row in stored.with_entities(*CATALOG_COLUMNS).all()]
+        # Paged past the stored candidates: rank live rather than end the feed
+        if len(opp_dicts) < min(depth, total_available):
+            opp_dicts = None
+    if opp_dicts is None:
+        try:
+            user_embedding = get_cached_user_embedding(db, user_data)
+            index = get_opportunity_index(db)
+            backfill_missing_embeddings(db)
+            pool = max(ANN_CANDIDATE_POOL, depth)
+            if len(index) > pool:
+                allowed_ids = None
+                if opportunity_type or must_haves:
+                    allowed_ids = {row[0] for row in query.with_entities(Opportunity.id).all()}
+                candidate_ids, _ = index.search(
+                    user_embedding,
+                    k=pool,
+                    exclude=swiped,
+                    allowed=allowed_ids
+                )
+                total_available = query.count()
+                # A pool shorter than `depth` would end the feed early (see
+                # FeedSnapshotCache.put); score every eligible row instead
+                if len(candidate_ids) >= min(depth, total_available):
+                    query = query.filter(Opportunity.id.in_(candidate_ids))
+        except Exception as e:
+            logger.error(f"ANN candidate retrieval failed, scoring full catalog: {e}")
+
+        # Scoring columns only (as in the catalog); cards are read for the final page
+        opp_dicts = [scoring_record(row, text_hash=False) for row in query.with_entities(*CATALOG_COLUMNS).all()]
+    if not opp_dicts:
+        return [], 0
+
+    # Stored skill ids must resolve against an up-to-date vocabulary
+    get_skill_vocabulary(db)
+    if user_embedding is None:
+        user_embedding = get_cached_user_embedding(db, user_data)
+    matching_service = get_matching_service()
+    match_results = matching_service.match_opportunities_batch(
+        user_data=user_data,
+        user_preferences=user_preferences,
+        opportunities=opp_dicts,
+        # Only evaluated for the semantic shortlist in two-stage mode
+        similarity_fn=lambda opps: opportunity_similarities(db, user_embedding, opps),
+        top_k=depth
+    )
+    return match_results, total_available if total_available is not None else len(opp_dicts)
+
+
+def _rank_catalog_feed(
+    db: Session,
+    user_data: dict,
+    user_preferences: Optional[dict],
+    swiped: SwipedBitmap,
+    opportunity_type: Optional[str],
+    depth: int
+) -> Tuple[List[MatchResult], int]:
+    """
+    `_rank_ai_feed` over the in-memory opportunity catalog: filters are
+    boolean masks and no opportunity rows are loaded from the database.
+    """
+    catalog = get_opportunity_catalog(db)
+    eligible = catalog.eligible(opportunity_type, user_preferences)
+    filtered = not eligible.all()
+    if swiped:
+        eligible &= ~swiped.contains(catalog.ids)
+    rows = np.flatnonzero(eligible)
+    total_available = len(rows)
+    if not total_available:
+        return [], 0
+
+    # For large catalogs, only score the nearest semantic candidates
+    user_embedding = None
+    candidates = None
+    stored_ids, computed_at = precomputed_candidates(db, user_data["id"]) if FEED_PRECOMPUTED_CANDIDATES else ([], None)
+    if stored_ids:
+        # Candidates from the offline batch job (see batch_matching) and
+        # everything written since it ran
+        candidates = np.union1d(
+            np.intersect1d(rows, catalog.rows_for(stored_ids), assume_unique=True),
+            rows[catalog.updated_at[rows] > np.datetime64(computed_at)],
+        )
+        # Paged past the stored candidates: rank live rather than end the feed
+        if len(candidates) < min(depth, total_available):
+            candidates = None
+    if candidates is not None:
+        rows = candidates
+    else:
+        try:
+            user_embedding = get_cached_user_embedding(db, user_data)
+            index = get_opportunity_index(db)
+            backfill_missing_embeddings(db)
+            pool = max(ANN_CANDIDATE_POOL, depth)
+            if len(index) > pool:
+                candidate_ids, _ = index.search(
+                    user_embedding,
+                    k=pool,
+                    exclude=swiped,
+                    allowed=set(catalog.ids[rows].tolist()) if filtered else None
+                )
+                candidates = np.intersect1d(rows, catalog.rows_for(candidate_ids), assume_unique=True)
+                # A pool shorter than `depth` would end the feed early (see
+                # FeedSnapshotCache.put); score every eligible row instead
+                if len(candidates) >= min(depth, total_available):
+                    rows = candidates
+        except Exception as e:
+            logger.error(f"ANN candidate retrieval failed, scoring full catalog: {e}")
+
+    opp_dicts, features = catalog.take(rows)
+    if not opp_dicts:
+        return [], 0
+
+    # Stored skill ids must resolve against an up-to-date vocabulary
+    get_skill_vocabulary(db)
+    if user_embedding is None:
+        user_embedding = get_cached_user_embedding(db, user_data)
+    matching_service = get_matching_service()
+    match_results = matching_service.match_opportunities_batch(
+        user_data=user_data,
+        user_preferences=user_preferences,
+        opportunities=opp_dicts,
+        features=features,
+        # Only evaluated for the semantic shortlist in two-stage mode
+        similarity_fn=lambda opps: opportunity_similarities(db, user_embedding, opps),
+        top_k=depth
+    )
+    return match_results, total_available
+
+
 @router.get("/ai/feed")
 def get_ai_powered_feed(
     limit: int = Query(10, ge=1, le=50, description="Number of opportunities to return"),
     opportunity_type: Optional[str] = Query(None, description="Filter by type: job, internship, scholarship, grant"),
     use_preferences: bool = Query(True, description="Apply user preferences to scoring"),
+    cursor: Optional[str] = Query(None, description="`next_cursor` from the previous page"),
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -263,34 +465,90 @@ def get_ai_powered_feed(
     - 20% Preferences match (location, salary, work arrangement)
     - 10% Experience level alignment
 
+    The ranking is kept as a per-user snapshot and reused until the
+    user's profile, preferences or the catalog change (see
+    `app.services.feed_snapshot`). Pass `next_cursor` back as `cursor` to
+    get the next page; a stale cursor returns the first page of a fresh
+    ranking.
+
     **Returns:**
     - Ranked list of opportunities with match scores
     - Breakdown of why each opportunity matched
     - User's matched skills for each opportunity
+    - `next_cursor` for the following page (null at the end of the feed)
     """
     _check_screening(current_user)
 
-    # Get IDs of already-swiped opportunities
-    swiped_ids = db.query(UserSwipe.opportunity_id).filter(
-        UserSwipe.user_id == current_user.id
-    ).all()
-    swiped_ids = [s[0] for s in swiped_ids]
-
-    # Query opportunities excluding swiped ones
-    query = db.query(Opportunity).filter(
-        Opportunity.is_active == True,
-        Opportunity.is_stale == False
-    )
-
-    if swiped_ids:
-        query = query.filter(Opportunity.id.not_in(swiped_ids))
+    # Reloaded when swipes were recorded through another worker
+    swiped = get_swiped_sets().get(db, current_user.id)
 
-    if opportunity_type:
-        query = query.filter(Opportunity.opportunity_type == opportunity_type)
+    user_data = user_to_dict(current_user)
 
-    opportunities = query.all()
+    # Get user preferences if enabled
+    user_preferences = None
+    if use_preferences:
+        prefs = db.query(UserPreferences).filter(
+            UserPreferences.user_id == current_user.id
+        ).first()
+        user_preferences = preferences_to_dict(prefs)
 
-    if not opportunities:
+    snapshots = get_feed_snapshots()
+    version = feed_version(
+        user_data,
+        user_preferences,
+        catalog_version(db),
+        opportunity_type=opportunity_type,
+        use_preferences=use_preferences,
+    )
+    snapshot = snapshots.get(current_user.id, version)
+
+    position, after_id = 0, None
+    if cursor:
+        decoded = decode_cursor(cursor)
+        if snapshot is not None and decoded and decoded[0] == snapshot.snapshot_id:
+            _, position, after_id = decoded
+        else:
+            logger.info(f"Stale feed cursor for user {current_user.id}, serving a fresh ranking")
+
+    match_results = []
+    served = []
+    depth = max(snapshots.depth, limit)
+    if snapshot is not None:
+        match_results, next_position = snapshot.page(limit, position, exclude=swiped)
+        if len(match_results) < limit and not snapshot.exhausted:
+            # Paged (or swiped) past the stored head: rank deeper
+            depth += len(snapshot.results)
+            served = snapshot.results
+            snapshot = None
+
+    if snapshot is None:
+        try:
+            ranked, total_available = _rank_ai_feed(
+                db, user_data, user_preferences, swiped, opportunity_type, depth
+            )
+        except Exception as e:
+            logger.error(f"AI matching failed: {e}")
+            # Fallback to basic scoring
+            return get_opportunity_feed(
+                limit=limit,
+                opportunity_type=opportunity_type,
+                current_user=current_user,
+                db=db
+            )
+        if served:
+            # A deeper candidate pool can reorder the head; keep the order already paged through
+            held = {result.opportunity_id for result in served}
+            ranked = served + [result for result in ranked if result.opportunity_id not in held]
+        snapshot = snapshots.put(current_user.id, version, ranked, total_available, depth=depth)
+        if after_id is not None:
+            position = snapshot.position_after(after_id, position)
+        match_results, next_position = snapshot.page(limit, position, exclude=swiped)
+
+    next_cursor = None
+    if match_results and (next_position < len(snapshot.results) or not snapshot.exhausted):
+        next_cursor = encode_cursor(snapshot.snapshot_id, next_position, match_results[-1].opportunity_id)
+
+    if not snapshot.total_available:
         return {
             "user": {
                 "id": current_user.id,
@@ -298,45 +556,16 @@ def get_ai_powered_feed(
             },
             "feed": [],
             "total_available": 0,
-            "already_swiped": len(swiped_ids),
+            "already_swiped": len(swiped),
+            "next_cursor": None,
             "matching_method": "ai"
         }
 
-    # Get user preferences if enabled
-    user_preferences = None
-    if use_preferences:
-        prefs = db.query(UserPreferences).filter(
-            UserPreferences.user_id == current_user.id
-        ).first()
-        user_preferences = preferences_to_dict(prefs)
-
-    # Convert models to dicts
-    user_data = user_to_dict(current_user)
-    opp_dicts = [opportunity_to_dict(opp) for opp in opportunities]
-
-    # Run AI matching
-    try:
-        matching_service = get_matching_service()
-        match_results = matching_service.match_opportunities_batch(
-            user_data=user_data,
-            user_preferences=user_preferences,
-            opportunities=opp_dicts
-        )
-    except Exception as e:
-        logger.error(f"AI matching failed: {e}")
-        # Fallback to basic scoring
-        return get_opportunity_feed(
-            limit=limit,
-            opportunity_type=opportunity_type,
-            current_user=current_user,
-            db=db
-        )
-
     # Build response
     feed = []
-    opp_by_id = {opp.id: opp for opp in opportunities}
+    opp_by_id = load_cards(db, [result.opportunity_id for result in match_results])
 
-    for result in match_results[:limit]:
+    for result in match_results:
         opp = opp_by_id.get(result.opportunity_id)
         if not opp:
             continue
@@ -383,8 +612,9 @@ def get_ai_powered_feed(
             "skills": current_user.skills
         },
         "feed": feed,
-        "total_available": len(match_results),
-        "already_swiped": len(swiped_ids),
+        "total_available": snapshot.remaining,
+        "already_swiped": len(swiped),
+        "next_cursor": next_cursor,
         "matching_method": "ai"
     }
 
@@ -415,11 +645,15 @@ def get_opportunity_match_score(
     ).first()
 
     # Run matching
+    user_data = user_to_dict(current_user)
+    opp_dict = opportunity_to_dict(opportunity)
     matching_service = get_matching_service()
     result = matching_service.match_opportunity(
-        user_data=user_to_dict(current_user),
+        user_data=user_data,
         user_preferences=preferences_to_dict(prefs),
-        opportunity=opportunity_to_dict(opportunity)
+        opportunity=opp_dict,
+        user_embedding=get_cached_user_embedding(db, user_data),
+        opportunity_embedding=load_opportunity_embeddings(db, [opp_dict])[0]
     )
 
     return {
@@ -444,6 +678,44 @@ def get_opportunity_match_score(
     }
 
 
+def _explain(result: MatchResult) -> dict:
+    """Human-readable explanation ("Why this match?") of one match result."""
+    explanations = []
+
+    # Semantic match explanation
+    if result.semantic_score >= 0.8:
+        explanations.append("Your profile is highly relevant to this role")
+    elif result.semantic_score >= 0.6:
+        explanations.append("Your background aligns well with this position")
+    elif result.semantic_score >= 0.4:
+        explanations.append("Some aspects of your profile match this role")
+
+    # Skills explanation
+    if result.matched_skills:
+        skills_str = ", ".join(result.matched_skills[:5])
+        explanations.append(f"Your skills match: {skills_str}")
+    elif result.skills_score >= 0.8:
+        explanations.append("You have most of the required skills")
+
+    # Add other match reasons
+    for reason in result.match_reasons:
+        if reason not in explanations:
+            explanations.append(reason)
+
+    # Experience level
+    if result.experience_score >= 0.8:
+        explanations.append("Experience level is a good fit")
+    elif result.experience_score < 0.5:
+        explanations.append("Experience level may be a stretch")
+
+    return {
+        "opportunity_id": result.opportunity_id,
+        "match_percentage": int(result.overall_score * 100),
+        "explanations": explanations[:6],
+        "summary": f"{int(result.overall_score * 100)}% match based on your profile, skills, and preferences"
+    }
+
+
 @router.post("/ai/explain")
 def explain_match(
     opportunity_id: int,
@@ -469,45 +741,152 @@ def explain_match(
     ).first()
 
     # Run matching
+    user_data = user_to_dict(current_user)
+    opp_dict = opportunity_to_dict(opportunity)
     matching_service = get_matching_service()
     result = matching_service.match_opportunity(
-        user_data=user_to_dict(current_user),
+        user_data=user_data,
         user_preferences=preferences_to_dict(prefs),
-        opportunity=opportunity_to_dict(opportunity)
+        opportunity=opp_dict,
+        user_embedding=get_cached_user_embedding(db, user_data),
+        opportunity_embedding=load_opportunity_embeddings(db, [opp_dict])[0]
     )
 
-    # Build explanation
+    return _explain(result)
+
+
+@router.post("/ai/explain/batch")
+def explain_matches(
+    payload: ExplainBatchRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Explanations and score breakdowns for up to 50 opportunities at once.
+
+    Same output per opportunity as `/ai/explain` plus its `scores`, in
+    request order. The user context, user vector and preferences are built
+    once, stored opportunity vectors are reused and all cards are scored in
+    one vectorized pass. Unknown ids are listed in `missing`.
+    """
+    opportunity_ids = list(dict.fromkeys(payload.opportunity_ids))
+    opportunities = db.query(Opportunity).filter(Opportunity.id.in_(opportunity_ids)).all()
+    found = {opp.id for opp in opportunities}
+
+    prefs = db.query(UserPreferences).filter(
+        UserPreferences.user_id == current_user.id
+    ).first()
+
+    results = {}
+    if opportunities:
+        user_data = user_to_dict(current_user)
+        opp_dicts = [opportunity_to_dict(opp) for opp in opportunities]
+        # Stored skill ids must resolve against an up-to-date vocabulary
+        get_skill_vocabulary(db)
+        user_embedding = get_cached_user_embedding(db, user_data)
+        matching_service = get_matching_service()
+        ranked = matching_service.match_opportunities_batch(
+            user_data=user_data,
+            user_preferences=preferences_to_dict(prefs),
+            opportunities=opp_dicts,
+            semantic_similarities=opportunity_similarities(db, user_embedding, opp_dicts),
+            # Every requested card needs its full score
+            semantic_budget=0
+        )
+        results = {result.opportunity_id: result for result in ranked}
+
     explanations = []
+    for opportunity_id in opportunity_ids:
+        result = results.get(opportunity_id)
+        if result is None:
+            continue
+        explanation = _explain(result)
+        explanation["scores"] = {
+            "overall": result.overall_score,
+            "semantic": result.semantic_score,
+            "skills": result.skills_score,
+            "preferences": result.preferences_score,
+            "experience": result.experience_score,
+        }
+        explanations.append(explanation)
 
-    # Semantic match explanation
-    if result.semantic_score >= 0.8:
-        explanations.append("Your profile is highly relevant to this role")
-    elif result.semantic_score >= 0.6:
-        explanations.append("Your background aligns well with this position")
-    elif result.semantic_score >= 0.4:
-        explanations.append("Some aspects of your profile match this role")
+    return {
+        "explanations": explanations,
+        "missing": [i for i in opportunity_ids if i not in found],
+    }
 
-    # Skills explanation
-    if result.matched_skills:
-        skills_str = ", ".join(result.matched_skills[:5])
-        explanations.append(f"Your skills match: {skills_str}")
-    elif result.skills_score >= 0.8:
-        explanations.append("You have most of the required skills")
 
-    # Add other match reasons
-    for reason in result.match_reasons:
-        if reason not in explanations:
-            explanations.append(reason)
+@router.get("/ai/opportunity/{opportunity_id}/candidates")
+def rank_candidates(
+    opportunity_id: int,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    min_score: float = Query(0.0, ge=0, le=1, description="Minimum overall match score"),
+    skills: Optional[List[str]] = Query(None, description="Only users listing all of these skills"),
+    experience_level: Optional[str] = Query(
+        None, description="Estimated level: entry, mid, senior or executive"
+    ),
+    applicants_only: bool = Query(False, description="Only users who liked this opportunity"),
+    current_user: User = Depends(require_admin),
+    db: Session = Depends(get_db)
+):
+    """
+    Rank screened users for an opportunity (recruiter view).
 
-    # Experience level
-    if result.experience_score >= 0.8:
-        explanations.append("Experience level is a good fit")
-    elif result.experience_score < 0.5:
-        explanations.append("Experience level may be a stretch")
+    Scores are the same as the user-facing match scores. All users are
+    scored in one vectorized pass over the process-wide user pool (see
+    `app.services.reverse_matching`), then filtered and paged.
+    """
+    opportunity = db.query(Opportunity).filter(
+        Opportunity.id == opportunity_id
+    ).first()
+
+    if not opportunity:
+        raise HTTPException(status_code=404, detail="Opportunity not found")
+
+    if experience_level and experience_level.lower() not in LEVEL_ORDER:
+        raise HTTPException(
+            status_code=400,
+            detail=f"experience_level must be one of: {', '.join(LEVEL_ORDER)}"
+        )
+
+    pool = get_user_pool(db)
+    opp_dict = opportunity_to_dict(opportunity)
+    scores = pool.score(opp_dict, load_opportunity_embeddings(db, [opp_dict])[0], get_matching_service())
+
+    mask = scores.overall >= min_score
+    if skills:
+        mask &= pool.has_skills(skills)
+    if experience_level:
+        mask &= pool.level_index == LEVEL_ORDER.index(experience_level.lower())
+    if applicants_only:
+        liked = db.query(UserSwipe.user_id).filter(
+            UserSwipe.opportunity_id == opportunity_id,
+            UserSwipe.action == "like"
+        ).all()
+        mask &= np.isin(pool.ids, [row[0] for row in liked])
+
+    rows, total = pool.rank(scores, mask, skip, limit)
 
     return {
         "opportunity_id": opportunity_id,
-        "match_percentage": int(result.overall_score * 100),
-        "explanations": explanations[:6],
-        "summary": f"{int(result.overall_score * 100)}% match based on your profile, skills, and preferences"
+        "opportunity_title": opportunity.title,
+        "candidates": [
+            {
+                "user_id": int(pool.ids[row]),
+                "name": pool.names[row],
+                "scores": {
+                    "overall": float(scores.overall[row]),
+                    "semantic": round(float(scores.semantic[row]), 3),
+                    "skills": float(scores.skills[row]),
+                    "preferences": float(scores.preferences[row]),
+                    "experience": float(scores.experience[row]),
+                },
+                "matched_skills": pool.matched_skills(row, scores),
+            }
+            for row in rows.tolist()
+        ],
+        "total": total,
+        "skip": skip,
+        "limit": limit,
     }
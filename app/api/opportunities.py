@@ -7,12 +7,15 @@ import csv
 import io
 import logging
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, UploadFile, File
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, desc
+from sqlalchemy import and_
 
 from app.database import SessionLocal
 from app.models.opportunity import Opportunity
+from app.services.embedding_store import refresh_embeddings_in_background
+from app.services.ann_index import index_remove
+from app.services.opportunity_listing import listing_page, swipe_feed
 from app.schemas.opportunity import (
     OpportunityResponse,
     OpportunityListResponse,
@@ -29,7 +32,6 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/opportunities", tags=["opportunities"])
 
-
 def get_db():
     db = SessionLocal()
     try:
@@ -38,6 +40,16 @@ def get_db():
         db.close()
 
 
+def queue_embedding_refresh(background_tasks: Optional[BackgroundTasks], opportunities: List[Opportunity]) -> None:
+    """
+    Embed written rows after the response is sent. Without a task queue
+    (direct calls) they are left to the lazy backfill on the next AI feed.
+    """
+    ids = [opp.id for opp in opportunities if opp.id is not None]
+    if background_tasks is not None and ids:
+        background_tasks.add_task(refresh_embeddings_in_background, ids)
+
+
 @router.get("", response_model=OpportunityListResponse)
 def list_opportunities(
     # Pagination
@@ -45,7 +57,7 @@ def list_opportunities(
     per_page: int = Query(20, ge=1, le=100, description="Items per page"),
     
     # Filters
-    search: Optional[str] = Query(None, description="Search in title and description"),
+    search: Optional[str] = Query(None, description="Search in title, description, company and skills"),
     source: Optional[str] = Query(None, description="Filter by source (jooble, adzuna, etc)"),
     location: Optional[str] = Query(None, description="Filter by location"),
     job_type: Optional[str] = Query(None, description="Filter by job type"),
@@ -64,7 +76,7 @@ def list_opportunities(
     This is the main endpoint for your swipe feed.
     
     **Filters:**
-    - `search`: Search in job title and description
+    - `search`: Search in job title, description, company and skills
     - `source`: Filter by source (jooble, adzuna, recruiter)
     - `location`: Filter by location (partial match)
     - `job_type`: fulltime, parttime, internship, contract
@@ -72,61 +84,19 @@ def list_opportunities(
     - `include_stale`: Include potentially outdated jobs (default: false)
     - `min_salary` / `max_salary`: Salary range filter
     """
-    query = db.query(Opportunity)
-    
-    # Exclude stale by default
-    if not include_stale:
-        query = query.filter(Opportunity.is_stale == False)
-    
-    # Apply filters
-    if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            or_(
-                Opportunity.title.ilike(search_term),
-                Opportunity.description.ilike(search_term),
-                (Opportunity.company_name.ilike(search_term) if hasattr(Opportunity, "company_name") else Opportunity.company.ilike(search_term)),
-                (Opportunity.company.ilike(search_term) if hasattr(Opportunity, "company") else Opportunity.company_name.ilike(search_term)),
-            )
-        )
-    
-    if source:
-        query = query.filter(Opportunity.source == source)
-    
-    if location:
-        query = query.filter(Opportunity.location.ilike(f"%{location}%"))
-    
-    if job_type:
-        query = query.filter(Opportunity.job_type == job_type)
-    
-    if remote is not None:
-        query = query.filter(Opportunity.is_remote == remote)
-    
-    if min_salary is not None:
-        query = query.filter(
-            or_(
-                Opportunity.salary_min >= min_salary,
-                Opportunity.salary_max >= min_salary
-            )
-        )
-    
-    if max_salary is not None:
-        query = query.filter(
-            or_(
-                Opportunity.salary_max <= max_salary,
-                Opportunity.salary_min <= max_salary
-            )
-        )
-    
-    # Get total count
-    total = query.count()
-    
-    # Order by most recent first
-    query = query.order_by(desc(Opportunity.created_at))
-    
-    # Paginate
-    offset = (page - 1) * per_page
-    opportunities = query.offset(offset).limit(per_page).all()
+    total, opportunities = listing_page(
+        db,
+        page=page,
+        per_page=per_page,
+        search=search,
+        source=source,
+        location=location,
+        job_type=job_type,
+        remote=remote,
+        include_stale=include_stale,
+        min_salary=min_salary,
+        max_salary=max_salary,
+    )
     
     return OpportunityListResponse(
         total=total,
@@ -158,33 +128,22 @@ def get_swipe_feed(
     1. Fetch initial batch: `GET /feed?limit=20`
     2. After swiping, fetch more: `GET /feed?limit=20&exclude_ids=1,2,3,4,5`
     """
-    query = db.query(Opportunity).filter(Opportunity.is_stale == False)
-    
     # Exclude already-seen jobs
+    ids_to_exclude = []
     if exclude_ids:
         try:
             ids_to_exclude = [int(id.strip()) for id in exclude_ids.split(",")]
-            query = query.filter(~Opportunity.id.in_(ids_to_exclude))
         except ValueError:
             pass  # Ignore invalid IDs
     
-    # Apply preferences (simple filtering for MVP)
-    if preferred_locations:
-        locations = [loc.strip() for loc in preferred_locations.split(",")]
-        location_filters = [Opportunity.location.ilike(f"%{loc}%") for loc in locations]
-        query = query.filter(or_(*location_filters))
-    
-    if preferred_job_types:
-        job_types = [jt.strip() for jt in preferred_job_types.split(",")]
-        query = query.filter(Opportunity.job_type.in_(job_types))
-    
-    if remote_preferred is True:
-        query = query.filter(Opportunity.is_remote == True)
-    
-    # Order by freshness and randomize a bit for variety
-    query = query.order_by(desc(Opportunity.refreshed_at))
-    
-    opportunities = query.limit(limit).all()
+    opportunities = swipe_feed(
+        db,
+        limit=limit,
+        exclude_ids=ids_to_exclude,
+        locations=[loc.strip() for loc in preferred_locations.split(",")] if preferred_locations else [],
+        job_types=[jt.strip() for jt in preferred_job_types.split(",")] if preferred_job_types else [],
+        remote_preferred=remote_preferred,
+    )
     
     return [OpportunityResponse.model_validate(o) for o in opportunities]
 
@@ -208,7 +167,8 @@ def get_opportunity(
 @router.post("", response_model=OpportunityResponse)
 def create_opportunity(
     opportunity: OpportunityCreate,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    background_tasks: BackgroundTasks = None,
 ):
     """
     Create a new opportunity manually.
@@ -234,6 +194,7 @@ def create_opportunity(
     db.add(db_opportunity)
     db.commit()
     db.refresh(db_opportunity)
+    queue_embedding_refresh(background_tasks, [db_opportunity])
     
     return OpportunityResponse.model_validate(db_opportunity)
 
@@ -242,7 +203,8 @@ def create_opportunity(
 def update_opportunity(
     opportunity_id: int,
     updates: OpportunityUpdate,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    background_tasks: BackgroundTasks = None,
 ):
     """
     Update an existing opportunity.
@@ -259,6 +221,7 @@ def update_opportunity(
     
     db.commit()
     db.refresh(opportunity)
+    queue_embedding_refresh(background_tasks, [opportunity])
     
     return OpportunityResponse.model_validate(opportunity)
 
@@ -278,6 +241,7 @@ def delete_opportunity(
 
     db.delete(opportunity)
     db.commit()
+    index_remove([opportunity_id])
 
     return {"status": "deleted", "id": opportunity_id}
 
@@ -323,7 +287,8 @@ def _validate_opportunity(item: BulkImportItem, index: int) -> List[str]:
 @router.post("/bulk", response_model=BulkImportResponse)
 def bulk_import_opportunities(
     request: BulkImportRequest,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    background_tasks: BackgroundTasks = None,
 ):
     """
     Bulk import opportunities from JSON.
@@ -363,6 +328,7 @@ def bulk_import_opportunities(
     inserted = 0
     skipped = 0
     all_errors: List[str] = []
+    created: List[Opportunity] = []
 
     for i, item in enumerate(request.opportunities):
         # Validate
@@ -406,6 +372,7 @@ def bulk_import_opportunities(
                 external_id=item.external_id,
             )
             db.add(db_opportunity)
+            created.append(db_opportunity)
             inserted += 1
         except Exception as e:
             all_errors.append(f"Item {i}: database error - {str(e)}")
@@ -418,6 +385,9 @@ def bulk_import_opportunities(
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Database commit failed: {str(e)}")
 
+    # Embed new rows after the response so the AI feed never has to encode them per request
+    queue_embedding_refresh(background_tasks, created)
+
     status = "success" if not all_errors else "partial" if inserted > 0 else "failed"
 
     return BulkImportResponse(
@@ -430,10 +400,11 @@ def bulk_import_opportunities(
 
 
 @router.post("/bulk/csv", response_model=BulkImportResponse)
-async def bulk_import_csv(
+def bulk_import_csv(
     file: UploadFile = File(..., description="CSV file with job data"),
     skip_duplicates: bool = Query(True, description="Skip items with duplicate external_id"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    background_tasks: BackgroundTasks = None,
 ):
     """
     Bulk import opportunities from CSV file.
@@ -457,7 +428,8 @@ async def bulk_import_csv(
 
     # Read file content
     try:
-        contents = await file.read()
+        # Plain def: the import runs in the threadpool, off the event loop
+        contents = file.file.read()
         decoded = contents.decode('utf-8')
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Could not read file: {str(e)}")
@@ -538,7 +510,7 @@ async def bulk_import_csv(
         skip_duplicates=skip_duplicates
     )
 
-    result = bulk_import_opportunities(bulk_request, db)
+    result = bulk_import_opportunities(bulk_request, db, background_tasks)
 
     # Add parse errors to result
     result.errors = parse_errors + result.errors
@@ -20,6 +20,7 @@ from app.schemas.document import (
     ApplyParsedDataRequest
 )
 from app.services.document_parser import DocumentParser
+from app.services.embedding_store import invalidate_user_embedding
 from app.config import RESUME_DIR, TRANSCRIPT_DIR
 
 router = APIRouter(prefix="/files", tags=["parsing"])
@@ -322,6 +323,9 @@ def apply_parsed_data(
             if request.action == "overwrite" or not current_user.portfolio_url:
                 current_user.portfolio_url = parsed_data['portfolio_url']
         
+        # Profile text changed: the cached matching vector is now outdated
+        invalidate_user_embedding(db, current_user.id)
+        
         db.commit()
         db.refresh(current_user)
         
@@ -29,6 +29,10 @@ def preferences_to_response(prefs: UserPreferences) -> dict:
         "opportunity_types": prefs.opportunity_types or [],
         "preferred_industries": prefs.preferred_industries or [],
         "company_sizes": prefs.company_sizes or [],
+        "must_have_opportunity_types": bool(prefs.must_have_opportunity_types),
+        "must_have_work_arrangements": bool(prefs.must_have_work_arrangements),
+        "must_have_salary": bool(prefs.must_have_salary),
+        "must_have_countries": bool(prefs.must_have_countries),
     }
 
 
@@ -58,6 +62,10 @@ def get_my_preferences(
             "opportunity_types": [],
             "preferred_industries": [],
             "company_sizes": [],
+            "must_have_opportunity_types": False,
+            "must_have_work_arrangements": False,
+            "must_have_salary": False,
+            "must_have_countries": False,
         }
 
     return preferences_to_response(prefs)
@@ -1,7 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import func
 from typing import List, Optional, Tuple
 from datetime import datetime, date, timedelta
 
@@ -14,6 +13,11 @@ from app.schemas.swipe import (
     SwipeLimitsResponse, SwipeWithOpportunity
 )
 from app.services.application_generator import generate_preview_data
+from app.services.feed_snapshot import get_feed_snapshots
+from app.services.opportunity_cards import SWIPE_CARD_COLUMNS, card_loader, opportunity_card
+from app.services.swipe_history import swipe_history
+from app.services.swiped_sets import get_swiped_sets
+from app.services.user_counters import get_user_counters, swipe_stats, swipes_used_today
 from app.api.conversations import create_conversation_for_application
 from app.models.application import Application
 
@@ -25,15 +29,9 @@ def check_daily_swipe_limit(user: User, db: Session) -> Tuple[bool, int, int]:
     Check if user has reached daily swipe limit.
     Returns: (can_swipe, used_today, limit)
     """
-    today = date.today()
     limit = user.daily_swipe_limit or 50
-    
-    # Count swipes today
-    used_today = db.query(func.count(UserSwipe.id)).filter(
-        UserSwipe.user_id == user.id,
-        UserSwipe.swipe_date == today
-    ).scalar() or 0
-    
+    used_today = swipes_used_today(get_user_counters(db, user.id))
+
     can_swipe = used_today < limit
     return can_swipe, used_today, limit
 
@@ -111,6 +109,10 @@ def record_swipe(
         db.rollback()
         raise HTTPException(status_code=400, detail="Swipe already recorded")
 
+    # Swiped cards leave the cached AI feed without a re-rank
+    get_feed_snapshots().discard(current_user.id, payload.opportunity_id)
+    get_swiped_sets().add(current_user.id, payload.opportunity_id, swipe.id)
+
     return swipe
 
 
@@ -123,12 +125,7 @@ def get_my_swipes(
     db: Session = Depends(get_db)
 ):
     """Get user's swipe history, optionally filtered by action."""
-    query = db.query(UserSwipe).filter(UserSwipe.user_id == current_user.id)
-
-    if action:
-        query = query.filter(UserSwipe.action == action.value)
-
-    return query.order_by(UserSwipe.created_at.desc()).offset(skip).limit(limit).all()
+    return swipe_history(db, current_user.id, action.value if action else None, skip, limit)
 
 
 @router.get("/saved", response_model=List[SwipeResponse])
@@ -139,10 +136,7 @@ def get_saved_opportunities(
     db: Session = Depends(get_db)
 ):
     """Get user's saved opportunities."""
-    return db.query(UserSwipe).filter(
-        UserSwipe.user_id == current_user.id,
-        UserSwipe.action == "save"
-    ).order_by(UserSwipe.created_at.desc()).offset(skip).limit(limit).all()
+    return swipe_history(db, current_user.id, "save", skip, limit)
 
 
 @router.get("/liked", response_model=List[SwipeResponse])
@@ -153,10 +147,7 @@ def get_liked_opportunities(
     db: Session = Depends(get_db)
 ):
     """Get user's liked opportunities."""
-    return db.query(UserSwipe).filter(
-        UserSwipe.user_id == current_user.id,
-        UserSwipe.action == "like"
-    ).order_by(UserSwipe.created_at.desc()).offset(skip).limit(limit).all()
+    return swipe_history(db, current_user.id, "like", skip, limit)
 
 
 @router.delete("/{swipe_id}")
@@ -174,8 +165,12 @@ def delete_swipe(
     if not swipe:
         raise HTTPException(status_code=404, detail="Swipe not found")
 
+    opportunity_id = swipe.opportunity_id
     db.delete(swipe)
     db.commit()
+    # The opportunity is eligible for the feed again
+    get_feed_snapshots().invalidate(current_user.id)
+    get_swiped_sets().remove(current_user.id, opportunity_id, swipe_id)
     return {"deleted": True, "id": swipe_id}
 
 
@@ -185,27 +180,7 @@ def get_swipe_stats(
     db: Session = Depends(get_db)
 ):
     """Get swipe statistics for the current user."""
-    likes = db.query(UserSwipe).filter(
-        UserSwipe.user_id == current_user.id,
-        UserSwipe.action == "like"
-    ).count()
-
-    dislikes = db.query(UserSwipe).filter(
-        UserSwipe.user_id == current_user.id,
-        UserSwipe.action == "dislike"
-    ).count()
-
-    saves = db.query(UserSwipe).filter(
-        UserSwipe.user_id == current_user.id,
-        UserSwipe.action == "save"
-    ).count()
-
-    return {
-        "likes": likes,
-        "dislikes": dislikes,
-        "saves": saves,
-        "total": likes + dislikes + saves
-    }
+    return swipe_stats(get_user_counters(db, current_user.id))
 
 
 @router.get("/limits", response_model=SwipeLimitsResponse)
@@ -236,7 +211,9 @@ def get_pending_swipes(
     db: Session = Depends(get_db)
 ):
     """Get user's pending swipes (likes that need approval)."""
-    swipes = db.query(UserSwipe).filter(
+    swipes = db.query(UserSwipe).options(
+        card_loader(UserSwipe.opportunity, SWIPE_CARD_COLUMNS)
+    ).filter(
         UserSwipe.user_id == current_user.id,
         UserSwipe.action == "like",
         UserSwipe.status == "pending"
@@ -244,7 +221,6 @@ def get_pending_swipes(
     
     result = []
     for swipe in swipes:
-        opp = swipe.opportunity
         result.append({
             "id": swipe.id,
             "user_id": swipe.user_id,
@@ -255,17 +231,7 @@ def get_pending_swipes(
             "swipe_date": swipe.swipe_date,
             "preview_data": swipe.preview_data,
             "edited_data": swipe.edited_data,
-            "opportunity": {
-                "id": opp.id,
-                "title": opp.title,
-                "company_name": opp.company_name,
-                "company_logo_url": opp.company_logo_url,
-                "city": opp.city,
-                "country": opp.country,
-                "is_remote": opp.is_remote,
-                "opportunity_type": opp.opportunity_type,
-                "description": opp.description,
-            }
+            "opportunity": opportunity_card(swipe.opportunity, SWIPE_CARD_COLUMNS),
         })
     
     return result
@@ -4,6 +4,7 @@ from typing import Optional, List
 
 from app.security import get_db, get_current_user
 from app.models.user import User
+from app.services.embedding_store import invalidate_user_embedding
 from app.schemas.profile import (
     UserProfileResponse,
     UserProfileUpdate,
@@ -68,6 +69,9 @@ def update_my_profile(
     for field, value in update_data.items():
         setattr(current_user, field, value)
 
+    # Profile text changed: the cached matching vector is now outdated
+    invalidate_user_embedding(db, current_user.id)
+
     db.commit()
     db.refresh(current_user)
     return user_to_response(current_user)
@@ -1,12 +1,113 @@
-from sqlalchemy import create_engine
+"""
+Database engine and session factory
+
+The backend comes from DATABASE_URL (default: SQLite file ./app.db).
+PostgreSQL URLs (postgresql://...) use psycopg2 and a connection pool sized
+by DB_POOL_SIZE / DB_MAX_OVERFLOW, with connections recycled after
+DB_POOL_RECYCLE seconds and checked before use.
+
+SQLite connections are tuned on connect: write-ahead logging so readers no
+longer block on a writer, synchronous=NORMAL (durable at checkpoints rather
+than every commit), memory-mapped reads, and a busy timeout so concurrent
+writers wait for the lock instead of failing with "database is locked".
+"""
+import os
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
 from sqlalchemy.orm import sessionmaker, declarative_base
 
-DATABASE_URL = "sqlite:///./app.db"
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./app.db")
+# Hosting providers still hand out the pre-1.4 "postgres://" scheme
+if DATABASE_URL.startswith("postgres://"):
+    DATABASE_URL = "postgresql://" + DATABASE_URL[len("postgres://"):]
+
+# Connection pool (ignored for in-memory SQLite)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_ECHO = os.getenv("DB_ECHO", "0") == "1"
+
+# SQLite pragmas applied to every new connection
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+
+def is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+
+def is_memory_sqlite(url: str) -> bool:
+    database = make_url(url).database
+    return is_sqlite(url) and (not database or database == ":memory:" or "mode=memory" in url)
+
+
+def sqlite_pragmas(
+    journal_mode: str = None,
+    synchronous: str = None,
+    mmap_size: int = None,
+    busy_timeout_ms: int = None,
+) -> dict:
+    """Pragma name -> value, defaulting to the SQLITE_* settings."""
+    return {
+        "journal_mode": journal_mode or SQLITE_JOURNAL_MODE,
+        "synchronous": synchronous or SQLITE_SYNCHRONOUS,
+        "mmap_size": SQLITE_MMAP_SIZE if mmap_size is None else mmap_size,
+        "busy_timeout": SQLITE_BUSY_TIMEOUT_MS if busy_timeout_ms is None else busy_timeout_ms,
+    }
+
+
+def engine_options(url: str) -> dict:
+    """Keyword arguments for `create_engine` on this backend."""
+    options = {"echo": DB_ECHO}
+    if is_sqlite(url):
+        options["connect_args"] = {"check_same_thread": False}
+        if is_memory_sqlite(url):
+            return options
+    else:
+        options["pool_pre_ping"] = True
+    options.update(
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_timeout=DB_POOL_TIMEOUT,
+    )
+    return options
+
+
+def apply_sqlite_pragmas(engine: Engine, pragmas: dict) -> None:
+    """Run `pragmas` on every connection `engine` opens."""
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+def create_database_engine(url: str = DATABASE_URL, pragmas: dict = None, **overrides) -> Engine:
+    """
+    Engine for `url` with the configured pool and, for SQLite, pragmas.
+
+    Args:
+        url: SQLAlchemy database URL
+        pragmas: SQLite pragmas to use instead of `sqlite_pragmas()`
+        **overrides: Extra `create_engine` arguments
+    """
+    engine = create_engine(url, **{**engine_options(url), **overrides})
+    if is_sqlite(url):
+        apply_sqlite_pragmas(engine, sqlite_pragmas() if pragmas is None else pragmas)
+    return engine
+
 
-engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False}
-)
+engine = create_database_engine()
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-Base = declarative_base()
\ No newline at end of file
+Base = declarative_base()
@@ -1,4 +1,9 @@
+import logging
+import threading
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 
@@ -7,15 +12,46 @@ load_dotenv()
 
 from app.database import Base, engine
 from app.api import auth, users, opportunities, match, preferences, swipes, files, applications, sync, screening, parsing, conversations
-from app.models import user, opportunity, preferences as prefs_model, swipe, application, document, conversation
+from app.services.embedding import (
+    EMBEDDING_WARMUP,
+    get_inference_metrics,
+    get_model_readiness,
+    warm_up_model,
+)
+from app.services.sharded_scoring import shutdown_shard_executor
+from app.models import user, opportunity, preferences as prefs_model, swipe, application, document, conversation, embedding, skill, match_score, user_counters
+from app.services import skill_vocabulary  # noqa: F401 (registers skill-id listeners)
+from app.services import opportunity_features  # noqa: F401 (registers derived-column listeners)
 
 # Create all database tables
 Base.metadata.create_all(bind=engine)
 
+logger = logging.getLogger(__name__)
+
+
+def _warm_up_in_background():
+    try:
+        warm_up_model()
+    except Exception:
+        pass  # logged by warm_up_model and reported by /health/ready
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the embedding model off the event loop; /health/ready turns
+    # green once it is in memory
+    if EMBEDDING_WARMUP:
+        logger.info("Warming up embedding model in the background")
+        threading.Thread(target=_warm_up_in_background, name="embedding-warmup", daemon=True).start()
+    yield
+    shutdown_shard_executor()
+
+
 app = FastAPI(
     title="TENDER - AI-Powered Opportunity Matching Platform",
     description="Swipe-based opportunity matching for students and graduates",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Allow frontend to call the backend
@@ -84,3 +120,16 @@ def root():
 @app.get("/health")
 def health_check():
     return {"status": "healthy"}
+
+
+@app.get("/health/ready")
+def readiness_check():
+    """Ready to serve matching traffic (model loaded when warm-up is enabled)."""
+    readiness = get_model_readiness()
+    return JSONResponse(status_code=200 if readiness["ready"] else 503, content=readiness)
+
+
+@app.get("/health/inference")
+def inference_metrics():
+    """Embedding micro-batcher queue depth and batch sizes."""
+    return get_inference_metrics()
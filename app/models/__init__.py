@@ -0,0 +1,15 @@
+# Every model is imported with the package so Base.metadata is complete and
+# model-level listeners (user_counters) are registered for any writer
+from app.models import (  # noqa: F401
+    user,
+    opportunity,
+    preferences,
+    swipe,
+    application,
+    document,
+    conversation,
+    embedding,
+    skill,
+    match_score,
+    user_counters,
+)
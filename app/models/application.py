@@ -1,6 +1,5 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
-from sqlalchemy.dialects.sqlite import JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, JSON
+from sqlalchemy.orm import column_property, relationship
 from datetime import datetime
 from app.database import Base
 
@@ -13,7 +12,8 @@ class Application(Base):
     opportunity_id = Column(Integer, ForeignKey("opportunities.id"), nullable=False, index=True)
 
     # Status: pending, submitted, viewed, interview, offer, rejected, withdrawn
-    status = Column(String, default="pending")
+    # (old value kept on change for user_counters)
+    status = column_property(Column(String, default="pending"), active_history=True)
 
     # Application details
     cover_letter = Column(Text)
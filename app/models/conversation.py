@@ -26,7 +26,7 @@ class Conversation(Base):
 
     # Relationships
     user = relationship("User", backref="conversations")
-    application = relationship("Application", backref="conversations")
+    application = relationship("Application", foreign_keys=[application_id], backref="conversations")
     opportunity = relationship("Opportunity", backref="conversations")
     events = relationship(
         "ConversationEvent",
@@ -2,8 +2,7 @@
 Document and ParsedDocument models for file vault and parsing.
 Per PRD lines 55-56 (Data Model section).
 """
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey
-from sqlalchemy.dialects.sqlite import JSON
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, ForeignKey, JSON
 from datetime import datetime
 from app.database import Base
 
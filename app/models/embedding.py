@@ -0,0 +1,42 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, LargeBinary
+from datetime import datetime
+from app.database import Base
+
+
+class OpportunityEmbedding(Base):
+    """
+    Precomputed embedding for an opportunity.
+
+    Vectors are stored as raw float32 bytes. `text_hash` is the sha256 of the
+    text produced by `build_opportunity_text`, so a row is only reused while
+    the opportunity's embedded text is unchanged.
+    """
+    __tablename__ = "opportunity_embeddings"
+
+    opportunity_id = Column(
+        Integer, ForeignKey("opportunities.id", ondelete="CASCADE"), primary_key=True
+    )
+    text_hash = Column(String(64), nullable=False)
+    model_name = Column(String, nullable=False)
+    dim = Column(Integer, nullable=False)
+    vector = Column(LargeBinary, nullable=False)  # float32, little-endian
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class UserEmbedding(Base):
+    """
+    Cached embedding of a user's profile text.
+
+    `text_hash` acts as the profile version: a row is only reused while the
+    hash of `build_user_profile_text` still matches.
+    """
+    __tablename__ = "user_embeddings"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    text_hash = Column(String(64), nullable=False)
+    model_name = Column(String, nullable=False)
+    dim = Column(Integer, nullable=False)
+    vector = Column(LargeBinary, nullable=False)  # float32, little-endian
+
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, UniqueConstraint
+from datetime import datetime
+from app.database import Base
+
+
+class UserMatchScore(Base):
+    """
+    Precomputed top-N match for a user (written by the offline batch job).
+
+    Rows for a user are replaced as a set on every run; `rank` is 0-based
+    (best first) and the score columns mirror `MatchResult`.
+    """
+    __tablename__ = "user_match_scores"
+    __table_args__ = (
+        UniqueConstraint("user_id", "opportunity_id", name="uq_user_match_scores_user_opportunity"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    opportunity_id = Column(Integer, ForeignKey("opportunities.id", ondelete="CASCADE"), nullable=False)
+    rank = Column(Integer, nullable=False)
+
+    overall_score = Column(Float, nullable=False)
+    semantic_score = Column(Float, nullable=False)
+    skills_score = Column(Float, nullable=False)
+    preferences_score = Column(Float, nullable=False)
+    experience_score = Column(Float, nullable=False)
+
+    computed_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -1,5 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Text, UniqueConstraint
-from sqlalchemy.dialects.sqlite import JSON
+from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, Text, UniqueConstraint, Index, JSON
 from datetime import datetime
 from app.database import Base
 
@@ -8,6 +7,11 @@ class Opportunity(Base):
     __tablename__ = "opportunities"
     __table_args__ = (
         UniqueConstraint("source", "external_id", name="uq_opportunity_source_external"),
+        # Hot-query indexes (see migrate_db.py and app/services/query_audit.py)
+        Index("ix_opportunities_live_type_norm", "is_active", "is_stale", "opportunity_type_norm"),
+        Index("ix_opportunities_live_updated", "is_active", "is_stale", "updated_at"),  # catalog version
+        Index("ix_opportunities_stale_refreshed", "is_stale", "refreshed_at"),  # /opportunities/feed
+        Index("ix_opportunities_stale_created", "is_stale", "created_at"),  # /opportunities listing
     )
 
     id = Column(Integer, primary_key=True, index=True)
@@ -17,6 +21,8 @@ class Opportunity(Base):
     description = Column(Text)
     required_skills = Column(JSON, default=list)  # Normalized skills list
     preferred_skills = Column(JSON, default=list)  # Nice-to-have skills
+    required_skill_ids = Column(JSON)  # Sorted skill-vocabulary ids, set on write
+    preferred_skill_ids = Column(JSON)
     category = Column(String)
 
     # Company info
@@ -30,12 +36,12 @@ class Opportunity(Base):
     location = Column(String)
     city = Column(String)
     state = Column(String)
-    country = Column(String)
+    country = Column(String, index=True)
     is_remote = Column(Boolean, default=False)
 
     # Compensation
-    salary_min = Column(Float)
-    salary_max = Column(Float)
+    salary_min = Column(Float, index=True)
+    salary_max = Column(Float, index=True)
     salary_currency = Column(String, default="USD")
     salary_period = Column(String, default="yearly")  # "yearly", "monthly", "hourly"
     is_salary_visible = Column(Boolean, default=True)
@@ -76,6 +82,16 @@ class Opportunity(Base):
     refreshed_at = Column(DateTime)
     is_stale = Column(Boolean, default=False)
 
+    # Normalized matching inputs, set on write (see services/opportunity_features)
+    location_norm = Column(String)
+    country_norm = Column(String, index=True)  # must-have filters
+    work_arrangement_norm = Column(String, index=True)
+    opportunity_type_norm = Column(String, index=True)
+    company_size_norm = Column(String)
+    experience_level_norm = Column(String)
+    description_excerpt = Column(Text)
+    skills_text = Column(Text)
+
     def mark_refreshed(self):
         self.refreshed_at = datetime.utcnow()
         self.is_stale = False
@@ -1,5 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey
-from sqlalchemy.dialects.sqlite import JSON
+from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, JSON
 from sqlalchemy.orm import relationship
 from app.database import Base
 
@@ -37,5 +36,11 @@ class UserPreferences(Base):
     # Company size preferences
     company_sizes = Column(JSON, default=list)  # ["startup", "small", "medium", "large", "enterprise"]
 
+    # Must-have flags: turn the preference into a hard filter (see preference_filters)
+    must_have_opportunity_types = Column(Boolean, default=False)
+    must_have_work_arrangements = Column(Boolean, default=False)
+    must_have_salary = Column(Boolean, default=False)
+    must_have_countries = Column(Boolean, default=False)
+
     # Relationship
     user = relationship("User", backref="preferences")
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String
+from app.database import Base
+
+
+class Skill(Base):
+    """
+    Interned skill vocabulary.
+
+    `name` is the canonical form (see `canonical_skill`); the integer id is
+    what opportunities store in `required_skill_ids` / `preferred_skill_ids`.
+    """
+    __tablename__ = "skills"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True, nullable=False, index=True)
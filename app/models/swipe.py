@@ -1,6 +1,5 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, UniqueConstraint, Date
-from sqlalchemy.dialects.sqlite import JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, UniqueConstraint, Index, Date, JSON
+from sqlalchemy.orm import column_property, relationship
 from datetime import datetime, date
 from app.database import Base
 
@@ -12,7 +11,8 @@ class UserSwipe(Base):
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     opportunity_id = Column(Integer, ForeignKey("opportunities.id"), nullable=False, index=True)
 
-    action = Column(String, nullable=False)  # "like", "dislike", "save"
+    # "like", "dislike", "save" (old value kept on change for user_counters)
+    action = column_property(Column(String, nullable=False), active_history=True)
     status = Column(String, default="pending")  # "pending", "approved", "submitted", "rejected"
     created_at = Column(DateTime, default=datetime.utcnow)
     swipe_date = Column(Date, default=date.today, index=True)  # For daily limit tracking
@@ -28,4 +28,7 @@ class UserSwipe(Base):
     # Ensure each user can only swipe once per opportunity
     __table_args__ = (
         UniqueConstraint('user_id', 'opportunity_id', name='unique_user_opportunity_swipe'),
+        # Daily swipe limit and swipe history (see migrate_db.py)
+        Index('ix_user_swipes_user_date', 'user_id', 'swipe_date'),
+        Index('ix_user_swipes_user_created', 'user_id', 'created_at'),
     )
@@ -0,0 +1,186 @@
+"""
+Per-user swipe and application tallies
+
+One `user_counters` row per user, created with the user and kept equal to
+COUNT queries over `user_swipes` and `applications` by a `before_flush`
+listener on every Session: swipes and applications being inserted,
+deleted or changing action/status become per-user deltas applied in the
+same flush, so the tallies commit or roll back with the rows they count.
+Deltas on stored rows are written as `column = column + n`, so concurrent
+requests for the same user do not overwrite each other's increments.
+
+The listener is registered by importing this module, which
+`app/models/__init__.py` does for every model import. Reads, backfill and
+rebuild live in app/services/user_counters.py.
+"""
+from collections import defaultdict
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import Column, Integer, Date, ForeignKey, case, event, inspect
+from sqlalchemy.orm import Session, relationship
+
+from app.database import Base
+from app.models.application import Application
+from app.models.swipe import UserSwipe
+from app.models.user import User
+
+SWIPE_COLUMNS = {"like": "likes", "dislike": "dislikes", "save": "saves"}
+APPLICATION_STATUSES = ("pending", "submitted", "viewed", "interview", "offer", "rejected", "withdrawn")
+
+
+class UserCounters(Base):
+    __tablename__ = "user_counters"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+
+    # Swipes by action
+    likes = Column(Integer, nullable=False, default=0)
+    dislikes = Column(Integer, nullable=False, default=0)
+    saves = Column(Integer, nullable=False, default=0)
+
+    # Daily swipe limit: swipes made on swipes_date
+    swipes_date = Column(Date)
+    swipes_today = Column(Integer, nullable=False, default=0)
+
+    # Applications by status
+    applications_total = Column(Integer, nullable=False, default=0)
+    applications_pending = Column(Integer, nullable=False, default=0)
+    applications_submitted = Column(Integer, nullable=False, default=0)
+    applications_viewed = Column(Integer, nullable=False, default=0)
+    applications_interview = Column(Integer, nullable=False, default=0)
+    applications_offer = Column(Integer, nullable=False, default=0)
+    applications_rejected = Column(Integer, nullable=False, default=0)
+    applications_withdrawn = Column(Integer, nullable=False, default=0)
+
+    user = relationship("User")
+
+
+COUNT_COLUMNS = tuple(SWIPE_COLUMNS.values()) + ("swipes_today", "applications_total") + tuple(
+    f"applications_{status}" for status in APPLICATION_STATUSES
+)
+
+
+def zero_counts() -> dict:
+    """Every count column at 0 (column defaults only apply on INSERT)."""
+    return dict.fromkeys(COUNT_COLUMNS, 0)
+
+
+def _committed(obj, key: str):
+    """Value of `key` as last flushed (the models keep it on change via active_history)."""
+    history = inspect(obj).attrs[key].history
+    values = history.deleted or history.unchanged
+    return values[0] if values else getattr(obj, key)
+
+
+def _owner(obj):
+    """user_id of a swipe or application, or its User while that user is still pending."""
+    if obj.user_id is not None:
+        return obj.user_id
+    user = obj.user
+    if user is None:
+        return None
+    return user.id if user.id is not None else user
+
+
+def _add(counters: UserCounters, column: str, n: int) -> None:
+    if inspect(counters).persistent:
+        setattr(counters, column, getattr(UserCounters, column) + n)
+    else:
+        setattr(counters, column, getattr(counters, column) + n)
+
+
+def _add_day(counters: UserCounters, day: date, n: int) -> None:
+    if counters.swipes_date == day:
+        _add(counters, "swipes_today", n)
+    elif n > 0 and (counters.swipes_date is None or day > counters.swipes_date):
+        # First swipe of a new day; another request may have rolled over already
+        if inspect(counters).persistent:
+            counters.swipes_today = case(
+                (UserCounters.swipes_date == day, UserCounters.swipes_today + n), else_=n
+            )
+        else:
+            counters.swipes_today = n
+        counters.swipes_date = day
+
+
+def _swipe_deltas(deltas, days, swipe: UserSwipe, action: Optional[str], swipe_date: Optional[date], n: int) -> None:
+    owner = _owner(swipe)
+    if owner is None:
+        return
+    if action in SWIPE_COLUMNS:
+        deltas[owner][SWIPE_COLUMNS[action]] += n
+    # swipe_date's default is only applied by the INSERT itself
+    days[owner][swipe_date or date.today()] += n
+
+
+def _application_deltas(deltas, application: Application, status: Optional[str], n: int) -> None:
+    owner = _owner(application)
+    if owner is None:
+        return
+    status = status or "pending"
+    deltas[owner]["applications_total"] += n
+    # A status outside APPLICATION_STATUSES only counts towards the total
+    if status in APPLICATION_STATUSES:
+        deltas[owner][f"applications_{status}"] += n
+
+
+def _find_counters(session: Session, owner, created: dict) -> Optional[UserCounters]:
+    if owner in created:
+        return created[owner]
+    if not isinstance(owner, int):
+        return None
+    for obj in session.new:
+        if isinstance(obj, UserCounters) and obj.user_id == owner:
+            return obj
+    # None for users from before the table until the migration backfills them
+    return session.get(UserCounters, owner)
+
+
+@event.listens_for(Session, "before_flush")
+def _counters_on_flush(session, flush_context, instances):
+    created = {}
+    for obj in session.new:
+        if isinstance(obj, User):
+            counters = UserCounters(user=obj, **zero_counts())
+            session.add(counters)
+            created[obj.id if obj.id is not None else obj] = counters
+
+    deltas = defaultdict(lambda: defaultdict(int))
+    days = defaultdict(lambda: defaultdict(int))
+
+    for obj in session.new:
+        if isinstance(obj, UserSwipe):
+            _swipe_deltas(deltas, days, obj, obj.action, obj.swipe_date, 1)
+        elif isinstance(obj, Application):
+            _application_deltas(deltas, obj, obj.status, 1)
+
+    for obj in session.deleted:
+        if isinstance(obj, UserSwipe):
+            _swipe_deltas(deltas, days, obj, _committed(obj, "action"), _committed(obj, "swipe_date"), -1)
+        elif isinstance(obj, Application):
+            _application_deltas(deltas, obj, _committed(obj, "status"), -1)
+
+    for obj in session.dirty:
+        if isinstance(obj, UserSwipe):
+            old, new = _committed(obj, "action"), obj.action
+            if old != new:
+                for action, n in ((old, -1), (new, 1)):
+                    if action in SWIPE_COLUMNS:
+                        deltas[_owner(obj)][SWIPE_COLUMNS[action]] += n
+        elif isinstance(obj, Application):
+            old, new = _committed(obj, "status"), obj.status
+            if old != new:
+                _application_deltas(deltas, obj, old, -1)
+                _application_deltas(deltas, obj, new, 1)
+
+    for owner in set(deltas) | set(days):
+        counters = _find_counters(session, owner, created)
+        if counters is None:
+            continue
+        for column, n in deltas[owner].items():
+            if n:
+                _add(counters, column, n)
+        for day, n in sorted(days[owner].items()):
+            if n:
+                _add_day(counters, day, n)
@@ -0,0 +1,12 @@
+from pydantic import BaseModel, Field
+from typing import List
+
+# Cards explained per batch request (one feed page is at most 50)
+EXPLAIN_BATCH_MAX = 50
+
+
+class ExplainBatchRequest(BaseModel):
+    opportunity_ids: List[int] = Field(
+        ..., min_length=1, max_length=EXPLAIN_BATCH_MAX,
+        description="Opportunities to explain (e.g. the cards of one feed page)"
+    )
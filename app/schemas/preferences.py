@@ -20,6 +20,10 @@ class UserPreferencesCreate(BaseModel):
     opportunity_types: List[str] = []  # ["job", "internship", "scholarship", "grant"]
     preferred_industries: List[str] = []
     company_sizes: List[str] = []  # ["startup", "small", "medium", "large", "enterprise"]
+    must_have_opportunity_types: bool = False
+    must_have_work_arrangements: bool = False
+    must_have_salary: bool = False
+    must_have_countries: bool = False
 
 
 class UserPreferencesUpdate(BaseModel):
@@ -34,6 +38,10 @@ class UserPreferencesUpdate(BaseModel):
     opportunity_types: Optional[List[str]] = None
     preferred_industries: Optional[List[str]] = None
     company_sizes: Optional[List[str]] = None
+    must_have_opportunity_types: Optional[bool] = None
+    must_have_work_arrangements: Optional[bool] = None
+    must_have_salary: Optional[bool] = None
+    must_have_countries: Optional[bool] = None
 
 
 class UserPreferencesResponse(BaseModel):
@@ -50,6 +58,10 @@ class UserPreferencesResponse(BaseModel):
     opportunity_types: List[str] = []
     preferred_industries: List[str] = []
     company_sizes: List[str] = []
+    must_have_opportunity_types: bool = False
+    must_have_work_arrangements: bool = False
+    must_have_salary: bool = False
+    must_have_countries: bool = False
 
     class Config:
         from_attributes = True
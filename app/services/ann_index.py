@@ -0,0 +1,376 @@
+"""
+ANN Index - In-process approximate nearest-neighbour search over opportunity vectors
+
+An IVF-flat index written over NumPy:
+1. Vectors are L2-normalised so inner product == cosine similarity
+2. A spherical k-means splits the catalog into `n_lists` inverted lists
+3. A query scores only the `n_probe` lists whose centroids are closest,
+   probing further lists while filters leave fewer than k candidates
+
+Rows can be added and removed incrementally (job sync inserts / stales rows)
+without retraining. Until the catalog is large enough to train on, search
+falls back to an exact scan, so small catalogs always get exact results.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# How many semantic candidates the AI feed pulls from the index
+ANN_CANDIDATE_POOL = int(os.getenv("ANN_CANDIDATE_POOL", "300"))
+
+# Rebuild the process-wide index from the database after this many seconds,
+# so writes made by other workers are eventually picked up
+ANN_INDEX_MAX_AGE_SECONDS = int(os.getenv("ANN_INDEX_MAX_AGE_SECONDS", "900"))
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """Return row-normalised float32 vectors (zero rows stay zero)."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[np.newaxis, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class IVFFlatIndex:
+    """
+    Inverted-file index with exact (flat) scoring inside each probed list.
+    """
+
+    def __init__(
+        self,
+        dim: int,
+        n_lists: Optional[int] = None,
+        n_probe: int = 8,
+        min_train_size: int = 1024,
+        kmeans_iters: int = 10,
+        seed: int = 0,
+        exact_scan_factor: int = 4,
+    ):
+        """
+        Args:
+            dim: Vector dimensionality
+            n_lists: Number of inverted lists (defaults to ~sqrt(N) at train time)
+            n_probe: Lists scanned per query; higher = better recall, slower
+            min_train_size: Below this many vectors, search is exact
+            kmeans_iters: Lloyd iterations used to train the centroids
+            seed: RNG seed for centroid initialisation
+            exact_scan_factor: An `allowed` set of at most this many times k
+                ids is scored exactly instead of probing lists
+        """
+        self.dim = dim
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.min_train_size = min_train_size
+        self.kmeans_iters = kmeans_iters
+        self.seed = seed
+        self.exact_scan_factor = exact_scan_factor
+
+        self._vectors = np.zeros((0, dim), dtype=np.float32)
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._alive = np.zeros(0, dtype=bool)
+        self._size = 0  # rows used in the backing arrays
+        self._row_of: Dict[int, int] = {}
+
+        self._centroids: Optional[np.ndarray] = None
+        self._lists: List[List[int]] = []
+
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    def __contains__(self, opportunity_id: int) -> bool:
+        return opportunity_id in self._row_of
+
+    @property
+    def is_trained(self) -> bool:
+        return self._centroids is not None
+
+    # ------------------------------------------------------------------
+    # Building
+    # ------------------------------------------------------------------
+
+    def build(self, ids: Sequence[int], vectors: np.ndarray) -> None:
+        """Replace the index contents and (re)train centroids if large enough."""
+        with self._lock:
+            self._vectors = np.zeros((0, self.dim), dtype=np.float32)
+            self._ids = np.zeros(0, dtype=np.int64)
+            self._alive = np.zeros(0, dtype=bool)
+            self._size = 0
+            self._row_of = {}
+            self._centroids = None
+            self._lists = []
+            # add() trains the centroids once there are enough vectors
+            self.add(ids, vectors)
+
+    def train(self) -> None:
+        """Train centroids with spherical k-means on the live vectors."""
+        with self._lock:
+            live_rows = np.flatnonzero(self._alive[:self._size])
+            data = self._vectors[live_rows]
+            n_lists = self.n_lists or max(1, int(np.sqrt(len(data))))
+            n_lists = min(n_lists, len(data))
+
+            rng = np.random.default_rng(self.seed)
+            centroids = data[rng.choice(len(data), n_lists, replace=False)].copy()
+            sample = data
+            if len(data) > 50 * n_lists:
+                sample = data[rng.choice(len(data), 50 * n_lists, replace=False)]
+
+            for _ in range(self.kmeans_iters):
+                labels = np.argmax(sample @ centroids.T, axis=1)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, labels, sample)
+                counts = np.bincount(labels, minlength=n_lists)
+                empty = counts == 0
+                if empty.any():
+                    # Re-seed empty lists from random points
+                    sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+                centroids = _normalize(sums)
+
+            self._centroids = centroids
+            self._lists = [[] for _ in range(n_lists)]
+            self._assign(live_rows)
+
+    def _assign(self, rows: np.ndarray) -> None:
+        if self._centroids is None or len(rows) == 0:
+            return
+        labels = np.argmax(self._vectors[rows] @ self._centroids.T, axis=1)
+        for row, label in zip(rows.tolist(), labels.tolist()):
+            self._lists[label].append(row)
+
+    def _grow(self, extra: int) -> None:
+        needed = self._size + extra
+        capacity = len(self._alive)
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2, 64)
+        vectors = np.zeros((new_capacity, self.dim), dtype=np.float32)
+        vectors[:self._size] = self._vectors[:self._size]
+        ids = np.zeros(new_capacity, dtype=np.int64)
+        ids[:self._size] = self._ids[:self._size]
+        alive = np.zeros(new_capacity, dtype=bool)
+        alive[:self._size] = self._alive[:self._size]
+        self._vectors, self._ids, self._alive = vectors, ids, alive
+
+    # ------------------------------------------------------------------
+    # Incremental updates
+    # ------------------------------------------------------------------
+
+    def add(self, ids: Sequence[int], vectors: np.ndarray) -> None:
+        """Insert or replace vectors for the given opportunity ids."""
+        ids = [int(i) for i in ids]
+        if not ids:
+            return
+        vectors = _normalize(vectors)
+        with self._lock:
+            self.remove(ids)
+            self._grow(len(ids))
+            start = self._size
+            rows = np.arange(start, start + len(ids))
+            self._vectors[rows] = vectors
+            self._ids[rows] = ids
+            self._alive[rows] = True
+            self._size += len(ids)
+            for opportunity_id, row in zip(ids, rows.tolist()):
+                self._row_of[opportunity_id] = row
+            self._assign(rows)
+
+            if not self.is_trained and len(self) >= self.min_train_size:
+                self.train()
+            elif self._size > 2 * max(len(self), 1) and self._size > 1024:
+                self._compact()
+
+    def remove(self, ids: Iterable[int]) -> int:
+        """Drop vectors for the given ids. Returns how many were present."""
+        removed = 0
+        with self._lock:
+            for opportunity_id in ids:
+                row = self._row_of.pop(int(opportunity_id), None)
+                if row is not None:
+                    self._alive[row] = False
+                    removed += 1
+        return removed
+
+    def _compact(self) -> None:
+        """Drop dead rows from the backing arrays (keeps trained centroids)."""
+        live_rows = np.flatnonzero(self._alive[:self._size])
+        ids = self._ids[live_rows].copy()
+        vectors = self._vectors[live_rows].copy()
+        centroids = self._centroids
+        self._vectors = np.zeros((0, self.dim), dtype=np.float32)
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._alive = np.zeros(0, dtype=bool)
+        self._size = 0
+        self._row_of = {}
+        self._lists = [[] for _ in range(len(centroids))] if centroids is not None else []
+        self.add(ids.tolist(), vectors)
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+
+    def search(
+        self,
+        query: Sequence[float],
+        k: int,
+        exclude: Optional[Set[int]] = None,
+        allowed: Optional[Set[int]] = None,
+    ) -> Tuple[List[int], List[float]]:
+        """
+        Find the k nearest opportunities by cosine similarity.
+
+        Args:
+            query: Query vector (need not be normalised)
+            k: Number of results
+            exclude: Opportunity ids that must not be returned (e.g. swiped)
+            allowed: If given, only these ids may be returned
+
+        Returns:
+            Tuple of (opportunity_ids, similarities), best first
+        """
+        q = _normalize(np.asarray(query, dtype=np.float32))[0]
+        excluded = np.fromiter(exclude, dtype=np.int64) if exclude else None
+        permitted = np.fromiter(allowed, dtype=np.int64) if allowed is not None else None
+        with self._lock:
+            if allowed is not None and len(allowed) <= self.exact_scan_factor * k:
+                # Few ids allowed: score them all rather than hunt for them in lists
+                rows = np.fromiter(
+                    (self._row_of[i] for i in allowed if i in self._row_of), dtype=np.int64
+                )
+                rows, ids = self._survivors(rows, excluded, None)
+            elif self.is_trained:
+                rows, ids = self._probe(q, k, excluded, permitted)
+            else:
+                rows, ids = self._survivors(np.arange(self._size), excluded, permitted)
+            if len(rows) == 0:
+                return [], []
+
+            scores = self._vectors[rows] @ q
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return ids[top].tolist(), scores[top].tolist()
+
+    def _survivors(
+        self,
+        rows: np.ndarray,
+        excluded: Optional[np.ndarray],
+        permitted: Optional[np.ndarray],
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """(rows, ids) of the live rows passing the search filters."""
+        # Removed/replaced rows stay in their list until compaction
+        rows = rows[self._alive[rows]]
+        ids = self._ids[rows]
+        if excluded is not None:
+            keep = ~np.isin(ids, excluded)
+            rows, ids = rows[keep], ids[keep]
+        if permitted is not None:
+            keep = np.isin(ids, permitted)
+            rows, ids = rows[keep], ids[keep]
+        return rows, ids
+
+    def _probe(
+        self,
+        q: np.ndarray,
+        k: int,
+        excluded: Optional[np.ndarray],
+        permitted: Optional[np.ndarray],
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Survivors of the closest lists, doubling the lists probed until at
+        least k rows pass the filters or every list has been probed.
+        """
+        order = np.argsort(-(self._centroids @ q), kind="stable")
+        found_rows, found_ids = [], []
+        found = probed = 0
+        n_probe = min(self.n_probe, len(order))
+        while True:
+            rows = np.fromiter(
+                (row for label in order[probed:n_probe].tolist() for row in self._lists[label]),
+                dtype=np.int64,
+            )
+            rows, ids = self._survivors(rows, excluded, permitted)
+            found_rows.append(rows)
+            found_ids.append(ids)
+            found += len(rows)
+            probed = n_probe
+            if found >= k or probed == len(order):
+                break
+            n_probe = min(2 * n_probe, len(order))
+        return np.concatenate(found_rows), np.concatenate(found_ids)
+
+
+# ============================================================================
+# Process-wide opportunity index
+# ============================================================================
+
+_index: Optional[IVFFlatIndex] = None
+_index_built_at = 0.0
+_index_lock = threading.Lock()
+
+
+def build_opportunity_index(db: Session) -> IVFFlatIndex:
+    """Build an index over stored embeddings of active, non-stale opportunities."""
+    from app.models.embedding import OpportunityEmbedding
+    from app.models.opportunity import Opportunity
+    from app.services.embedding import EMBEDDING_DIM, MODEL_NAME
+
+    rows = db.query(
+        OpportunityEmbedding.opportunity_id,
+        OpportunityEmbedding.vector,
+    ).join(
+        Opportunity, Opportunity.id == OpportunityEmbedding.opportunity_id
+    ).filter(
+        Opportunity.is_active == True,
+        Opportunity.is_stale == False,
+        OpportunityEmbedding.model_name == MODEL_NAME,
+    ).all()
+
+    index = IVFFlatIndex(dim=EMBEDDING_DIM)
+    if rows:
+        ids = [row[0] for row in rows]
+        vectors = np.frombuffer(b"".join(row[1] for row in rows), dtype="<f4")
+        index.build(ids, vectors.reshape(len(rows), EMBEDDING_DIM))
+    logger.info(f"Built opportunity ANN index with {len(index)} vectors")
+    return index
+
+
+def get_opportunity_index(db: Session) -> IVFFlatIndex:
+    """Get the process-wide index, building it on first use or when expired."""
+    global _index, _index_built_at
+    with _index_lock:
+        expired = time.monotonic() - _index_built_at > ANN_INDEX_MAX_AGE_SECONDS
+        if _index is None or expired:
+            _index = build_opportunity_index(db)
+            _index_built_at = time.monotonic()
+        return _index
+
+
+def index_upsert(ids: Sequence[int], vectors: np.ndarray) -> None:
+    """Add vectors to the process-wide index if it has been built."""
+    if _index is not None and len(ids):
+        _index.add(ids, vectors)
+
+
+def index_remove(ids: Iterable[int]) -> None:
+    """Remove ids from the process-wide index if it has been built."""
+    if _index is not None:
+        _index.remove(ids)
+
+
+def reset_opportunity_index() -> None:
+    """Drop the process-wide index so the next use rebuilds it."""
+    global _index
+    with _index_lock:
+        _index = None
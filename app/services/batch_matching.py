@@ -0,0 +1,284 @@
+"""
+Batch Matching - Offline top-N matches for every screened user
+
+Scores the whole catalog for every screened user in one pass and stores the
+best `top_n` per user in `user_match_scores`:
+
+1. User and opportunity embeddings are stacked into row-normalised float32
+   matrices (stored vectors are reused; the model only runs for profiles
+   or opportunities whose text changed).
+2. Users are split into blocks; each block's semantic scores are one
+   matrix product `U_block @ O.T`.
+3. The other components come from `MatchingService.score_batch` over
+   `CandidateFeatures` encoded once per worker, so weights and scoring are
+   identical to the online feed.
+4. Blocks run on a process pool; the parent writes each finished block.
+
+With `FEED_PRECOMPUTED_CANDIDATES=1` the AI feed scores a user's stored
+candidates, plus opportunities written since the run, instead of searching
+the ANN index; once a user pages past them the feed ranks live again.
+
+Run with:
+    python -m app.services.batch_matching --top-n 200 --workers 4
+"""
+import argparse
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session
+
+from app.models.match_score import UserMatchScore
+from app.models.opportunity import Opportunity
+from app.models.preferences import UserPreferences
+from app.models.swipe import UserSwipe
+from app.models.user import User
+from app.services.embedding_store import load_opportunity_embeddings, load_user_embeddings
+from app.services.feature_matrix import CandidateFeatures, round3, top_k
+from app.services.matching import (
+    MatchingService,
+    get_matching_service,
+    opportunity_to_dict,
+    preferences_to_dict,
+    user_to_dict,
+)
+from app.services.skill_vocabulary import get_skill_vocabulary
+
+logger = logging.getLogger(__name__)
+
+BATCH_MATCH_TOP_N = int(os.getenv("BATCH_MATCH_TOP_N", "200"))
+# Users per matrix-multiplication block (bounds the block x catalog score matrix)
+BATCH_MATCH_BLOCK_SIZE = int(os.getenv("BATCH_MATCH_BLOCK_SIZE", "128"))
+BATCH_MATCH_WORKERS = int(os.getenv("BATCH_MATCH_WORKERS", str(os.cpu_count() or 1)))
+
+# Serve the AI feed from precomputed candidates (see module docstring)
+FEED_PRECOMPUTED_CANDIDATES = os.getenv("FEED_PRECOMPUTED_CANDIDATES", "0") == "1"
+
+# (user_id, user_data, user_preferences, swiped opportunity ids)
+UserRow = Tuple[int, dict, dict, List[int]]
+# (opportunity_id, rank, overall, semantic, skills, preferences, experience)
+ScoreRow = Tuple[int, int, float, float, float, float, float]
+
+
+def _normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class BlockScorer:
+    """
+    Scores blocks of users against one encoded catalog.
+    """
+
+    def __init__(
+        self,
+        opportunities: List[dict],
+        opportunity_vectors: np.ndarray,
+        weights: Dict[str, float],
+        top_n: int,
+    ):
+        self.ids = [opp["id"] for opp in opportunities]
+        self.columns = {opp_id: i for i, opp_id in enumerate(self.ids)}
+        self.vectors = _normalize_rows(opportunity_vectors)
+        self.features = CandidateFeatures(opportunities)
+        self.service = MatchingService(weights)
+        self.top_n = top_n
+
+    def score_block(
+        self,
+        users: Sequence[UserRow],
+        user_vectors: np.ndarray
+    ) -> List[Tuple[int, List[ScoreRow]]]:
+        """Top-N rows for each user of a block."""
+        similarities = _normalize_rows(user_vectors) @ self.vectors.T
+
+        results = []
+        for row, (user_id, user_data, user_preferences, swiped) in zip(similarities, users):
+            semantic = (row.astype(np.float64) + 1) / 2
+            overall, scores = self.service.score_batch(user_data, user_preferences, self.features, semantic)
+
+            excluded = [self.columns[i] for i in swiped if i in self.columns]
+            if excluded:
+                overall[excluded] = -1.0
+            order = top_k(overall, self.top_n + len(excluded))
+            order = order[overall[order] >= 0][:self.top_n]
+
+            columns = zip(
+                order.tolist(),
+                overall[order].tolist(),
+                round3(semantic[order]).tolist(),
+                scores.skills[order].tolist(),
+                scores.preferences[order].tolist(),
+                scores.experience[order].tolist(),
+            )
+            results.append((user_id, [
+                (self.ids[i], rank, total, sem, skills, prefs, experience)
+                for rank, (i, total, sem, skills, prefs, experience) in enumerate(columns)
+            ]))
+        return results
+
+
+# Per-process scorer (set by the pool initializer)
+_scorer: Optional[BlockScorer] = None
+
+
+def _init_worker(opportunities, opportunity_vectors, weights, top_n) -> None:
+    global _scorer
+    _scorer = BlockScorer(opportunities, opportunity_vectors, weights, top_n)
+
+
+def _score_block(users: Sequence[UserRow], user_vectors: np.ndarray):
+    return _scorer.score_block(users, user_vectors)
+
+
+def load_screened_users(db: Session) -> List[UserRow]:
+    """Matching inputs for every screened user."""
+    users = db.query(User).filter(User.screening_completed == True).order_by(User.id).all()
+    prefs = {p.user_id: p for p in db.query(UserPreferences).all()}
+    swiped: Dict[int, List[int]] = {}
+    for user_id, opportunity_id in db.query(UserSwipe.user_id, UserSwipe.opportunity_id).all():
+        swiped.setdefault(user_id, []).append(opportunity_id)
+
+    return [
+        (user.id, user_to_dict(user), preferences_to_dict(prefs.get(user.id)), swiped.get(user.id, []))
+        for user in users
+    ]
+
+
+def write_user_scores(db: Session, block: List[Tuple[int, List[ScoreRow]]], computed_at: datetime) -> int:
+    """Replace the stored rows of each user in `block`. Returns rows written."""
+    user_ids = [user_id for user_id, _ in block]
+    db.execute(delete(UserMatchScore).where(UserMatchScore.user_id.in_(user_ids)))
+    rows = [
+        {
+            "user_id": user_id,
+            "opportunity_id": opp_id,
+            "rank": rank,
+            "overall_score": overall,
+            "semantic_score": semantic,
+            "skills_score": skills,
+            "preferences_score": prefs,
+            "experience_score": experience,
+            "computed_at": computed_at,
+        }
+        for user_id, scored in block
+        for opp_id, rank, overall, semantic, skills, prefs, experience in scored
+    ]
+    if rows:
+        db.execute(insert(UserMatchScore), rows)
+    db.commit()
+    return len(rows)
+
+
+def run_batch_matching(
+    db: Session,
+    top_n: int = BATCH_MATCH_TOP_N,
+    block_size: int = BATCH_MATCH_BLOCK_SIZE,
+    workers: int = BATCH_MATCH_WORKERS,
+) -> dict:
+    """
+    Compute and store the top-N opportunities for every screened user.
+
+    Args:
+        db: Database session
+        top_n: Matches kept per user
+        block_size: Users per matrix-multiplication block
+        workers: Worker processes (1 scores in this process)
+
+    Returns:
+        Run summary (users, opportunities, rows, seconds)
+    """
+    started = time.perf_counter()
+    computed_at = datetime.utcnow()
+
+    opportunities = [
+        opportunity_to_dict(opp) for opp in db.query(Opportunity).filter(
+            Opportunity.is_active == True,
+            Opportunity.is_stale == False
+        ).order_by(Opportunity.id).all()
+    ]
+    users = load_screened_users(db)
+    summary = {"users": len(users), "opportunities": len(opportunities), "rows": 0}
+    if not users:
+        summary["seconds"] = round(time.perf_counter() - started, 3)
+        return summary
+
+    # Stored skill ids must resolve against an up-to-date vocabulary
+    get_skill_vocabulary(db)
+    opportunity_vectors = load_opportunity_embeddings(db, opportunities)
+    # Changed profiles are encoded in one batch and written back with one commit
+    user_vectors = load_user_embeddings(db, [user_data for _, user_data, _, _ in users])
+    weights = get_matching_service().weights
+
+    blocks = [
+        (users[start:start + block_size], user_vectors[start:start + block_size])
+        for start in range(0, len(users), block_size)
+    ]
+
+    if workers <= 1 or len(blocks) == 1:
+        scorer = BlockScorer(opportunities, opportunity_vectors, weights, top_n)
+        for block_users, block_vectors in blocks:
+            summary["rows"] += write_user_scores(db, scorer.score_block(block_users, block_vectors), computed_at)
+    else:
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(blocks)),
+            initializer=_init_worker,
+            initargs=(opportunities, opportunity_vectors, weights, top_n),
+        ) as pool:
+            futures = [pool.submit(_score_block, block_users, block_vectors) for block_users, block_vectors in blocks]
+            for future in futures:
+                summary["rows"] += write_user_scores(db, future.result(), computed_at)
+
+    summary["seconds"] = round(time.perf_counter() - started, 3)
+    logger.info(
+        f"Batch matching: {summary['users']} users x {summary['opportunities']} opportunities, "
+        f"{summary['rows']} rows in {summary['seconds']}s"
+    )
+    return summary
+
+
+def precomputed_candidates(db: Session, user_id: int) -> Tuple[List[int], Optional[datetime]]:
+    """
+    Opportunity ids stored for a user by the last batch run (best first)
+    and when that run started (None if the user has no rows).
+    """
+    rows = db.query(UserMatchScore.opportunity_id, UserMatchScore.computed_at).filter(
+        UserMatchScore.user_id == user_id
+    ).order_by(UserMatchScore.rank).all()
+    return [row[0] for row in rows], min((row[1] for row in rows), default=None)
+
+
+def precomputed_candidate_ids(db: Session, user_id: int) -> List[int]:
+    """Opportunity ids stored for a user by the last batch run (best first)."""
+    return precomputed_candidates(db, user_id)[0]
+
+
+if __name__ == "__main__":
+    from app.database import Base, SessionLocal, engine
+    from app.models import user, opportunity, preferences, swipe, embedding, skill, match_score  # noqa: F401
+    from app.services import skill_vocabulary  # noqa: F401 (registers skill-id listeners)
+
+    parser = argparse.ArgumentParser(description="Precompute top-N opportunity matches for every screened user")
+    parser.add_argument("--top-n", type=int, default=BATCH_MATCH_TOP_N)
+    parser.add_argument("--block-size", type=int, default=BATCH_MATCH_BLOCK_SIZE)
+    parser.add_argument("--workers", type=int, default=BATCH_MATCH_WORKERS)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    try:
+        result = run_batch_matching(db, args.top_n, args.block_size, args.workers)
+        print(
+            f"Stored {result['rows']} matches for {result['users']} users "
+            f"over {result['opportunities']} opportunities in {result['seconds']}s"
+        )
+    finally:
+        db.close()
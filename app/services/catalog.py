@@ -0,0 +1,251 @@
+"""
+Opportunity Catalog - Process-wide columnar snapshot of feed-eligible opportunities
+
+Feed requests used to load every candidate as a full `Opportunity` ORM
+object (description and all), convert it with `opportunity_to_dict` and
+encode it for scoring. The catalog does that once per process:
+
+- Active, non-stale opportunities are read with a column projection
+  (the stored 500-character description excerpt the embedding text uses,
+  and the normalized matching columns).
+- Each row becomes a small record dict with interned strings, plus a
+  precomputed embedding-text hash, and the whole catalog is encoded once as
+  `CandidateFeatures`. Filter columns (type, arrangement, country, salary,
+  remote) are NumPy arrays.
+- A request filters with boolean masks (`eligible`) and scores
+  `take(rows)`; only the final page is read from the database.
+
+The catalog is read-only and replaced as a whole. When the catalog version
+changes (sync, CRUD, staling) the next request rebuilds it incrementally:
+unchanged records and their text hashes are reused and only rows past the
+last build's `updated_at`/id watermarks (plus older ids back in the feed)
+are fetched.
+"""
+import logging
+import os
+import sys
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.opportunity import Opportunity
+from app.services.embedding import build_opportunity_text
+from app.services.embedding_store import QUERY_CHUNK_SIZE, hash_text
+from app.services.feature_matrix import CandidateFeatures, _encode
+from app.services.feed_snapshot import catalog_version
+from app.services.opportunity_features import DESCRIPTION_CHARS, normalize, normalized
+from app.services.preference_filters import must_have_mask
+from app.services.skill_vocabulary import get_skill_vocabulary
+
+logger = logging.getLogger(__name__)
+
+# Serve the AI feed from the in-memory catalog (0 = query the database per request)
+OPPORTUNITY_CATALOG = os.getenv("OPPORTUNITY_CATALOG", "1") == "1"
+
+# Rebuild from scratch after this many seconds, so edits that bypass
+# `updated_at` (bulk UPDATEs) are eventually picked up
+CATALOG_MAX_AGE_SECONDS = int(os.getenv("CATALOG_MAX_AGE_SECONDS", "3600"))
+
+CATALOG_COLUMNS = (
+    Opportunity.id,
+    Opportunity.title,
+    Opportunity.company_name,
+    Opportunity.company,
+    Opportunity.location,
+    Opportunity.country,
+    Opportunity.is_remote,
+    # Stored excerpt; rows not yet backfilled are truncated by the database
+    func.coalesce(
+        Opportunity.description_excerpt, func.substr(Opportunity.description, 1, DESCRIPTION_CHARS)
+    ).label("description"),
+    Opportunity.required_skills,
+    Opportunity.preferred_skills,
+    Opportunity.required_skill_ids,
+    Opportunity.preferred_skill_ids,
+    Opportunity.job_type,
+    Opportunity.experience_level,
+    Opportunity.opportunity_type,
+    Opportunity.category,
+    Opportunity.work_arrangement,
+    Opportunity.company_size,
+    Opportunity.salary_min,
+    Opportunity.salary_max,
+    Opportunity.location_norm,
+    Opportunity.country_norm,
+    Opportunity.work_arrangement_norm,
+    Opportunity.opportunity_type_norm,
+    Opportunity.company_size_norm,
+    Opportunity.experience_level_norm,
+    Opportunity.updated_at,
+)
+
+# Repetitive string fields stored once per distinct value
+INTERNED_FIELDS = (
+    "company_name", "company", "location", "country", "job_type", "experience_level",
+    "opportunity_type", "category", "work_arrangement", "company_size",
+    "location_norm", "country_norm", "work_arrangement_norm", "opportunity_type_norm", "company_size_norm",
+    "experience_level_norm",
+)
+
+
+def scoring_record(row, text_hash: bool = True) -> dict:
+    """
+    Scoring and embedding-text fields of one row projected on
+    `CATALOG_COLUMNS`, with the embedding-text hash unless `text_hash` is
+    false (it is then computed only for rows that need a similarity).
+    """
+    record = dict(row._mapping)
+    for field in INTERNED_FIELDS:
+        if isinstance(record[field], str):
+            record[field] = sys.intern(record[field])
+    record["required_skills"] = record["required_skills"] or []
+    record["preferred_skills"] = record["preferred_skills"] or []
+    if text_hash:
+        record["text_hash"] = hash_text(build_opportunity_text(record))
+    return record
+
+
+def _float_column(values: Iterable) -> np.ndarray:
+    """Float array with NaN for NULL."""
+    return np.array([np.nan if v is None else v for v in values], dtype=np.float64)
+
+
+class OpportunityCatalog:
+    """
+    Immutable columnar snapshot of feed-eligible opportunities, ordered by id.
+    """
+
+    def __init__(self, records: List[dict], version: str):
+        self.version = version
+        self.built_at = time.monotonic()
+        self.records = sorted(records, key=lambda r: r["id"])
+        self.ids = np.array([r["id"] for r in self.records], dtype=np.int64)
+        self.last_update = max((r["updated_at"] for r in self.records if r["updated_at"]), default=None)
+
+        self.features = CandidateFeatures(self.records)
+        # Lowercase stored values, as filtered in SQL (`*_norm`)
+        self.type_codes, self.types = _encode([normalized(r, "opportunity_type") for r in self.records])
+        self.arrangement_codes, self.arrangements = _encode([normalized(r, "work_arrangement") for r in self.records])
+        self.country_codes, self.countries = _encode([normalized(r, "country") for r in self.records])
+        self.is_remote = np.array([r["is_remote"] is True for r in self.records], dtype=bool)
+        self.salary_min = _float_column(r["salary_min"] for r in self.records)
+        self.salary_max = _float_column(r["salary_max"] for r in self.records)
+        self.updated_at = np.array([r["updated_at"] for r in self.records], dtype="datetime64[us]")
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def rows_for(self, ids: Iterable[int]) -> np.ndarray:
+        """Row indices (ascending) of the given ids that are in the catalog."""
+        ids = np.fromiter(ids, dtype=np.int64)
+        rows = np.searchsorted(self.ids, ids)
+        found = rows < len(self.ids)
+        rows, ids = rows[found], ids[found]
+        return np.unique(rows[self.ids[rows] == ids])
+
+    @staticmethod
+    def in_values(codes: np.ndarray, table: List, values: Iterable) -> np.ndarray:
+        """Mask of rows whose value is one of `values` (exact match, like SQL `IN`)."""
+        values = set(values)
+        return np.isin(codes, [code for code, value in enumerate(table) if value in values])
+
+    def eligible(self, opportunity_type: Optional[str] = None, user_preferences: Optional[dict] = None) -> np.ndarray:
+        """
+        Boolean mask of rows passing the feed filters: the type filter and
+        the user's must-have preferences (same rules as the SQL filters).
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if opportunity_type:
+            mask &= self.in_values(self.type_codes, self.types, [normalize(opportunity_type)])
+        mask &= must_have_mask(self, user_preferences)
+        return mask
+
+    def take(self, rows: np.ndarray) -> Tuple[List[dict], CandidateFeatures]:
+        """Records and encoded features of `rows`, in that order."""
+        return [self.records[i] for i in rows.tolist()], self.features.take(rows)
+
+
+def build_catalog(db: Session, previous: Optional[OpportunityCatalog] = None, version: Optional[str] = None) -> OpportunityCatalog:
+    """
+    Build the catalog, reusing records of `previous` that have not changed.
+
+    Only rows updated since `previous` was built or with ids above its
+    largest are fetched in full. The live id list is compared with
+    `previous.ids` in NumPy: rows that left the feed are dropped, and older
+    ids that came back without an `updated_at` change are fetched by id.
+    """
+    version = version or catalog_version(db)
+    # Stored skill ids must resolve against an up-to-date vocabulary
+    get_skill_vocabulary(db)
+    live = Opportunity.is_active == True, Opportunity.is_stale == False
+
+    if previous is None or previous.last_update is None:
+        rows = db.query(*CATALOG_COLUMNS).filter(*live).order_by(Opportunity.id).all()
+        return OpportunityCatalog([scoring_record(row) for row in rows], version)
+
+    last_id = int(previous.ids[-1])
+    live_ids = np.array(
+        [row[0] for row in db.query(Opportunity.id).filter(*live).order_by(Opportunity.id).all()], dtype=np.int64
+    )
+    changed = db.query(*CATALOG_COLUMNS).filter(
+        *live,
+        (Opportunity.updated_at >= previous.last_update) | (Opportunity.id > last_id)
+    ).all()
+    # Older ids back in the feed without an updated_at change (e.g. a bulk un-staling)
+    returned = np.setdiff1d(live_ids[live_ids <= last_id], previous.ids, assume_unique=True)
+    returned = np.setdiff1d(returned, np.array([row.id for row in changed], dtype=np.int64))
+    for start in range(0, len(returned), QUERY_CHUNK_SIZE):
+        chunk = returned[start:start + QUERY_CHUNK_SIZE].tolist()
+        changed.extend(db.query(*CATALOG_COLUMNS).filter(*live, Opportunity.id.in_(chunk)).all())
+
+    kept = np.isin(previous.ids, live_ids, assume_unique=True)
+    records: Dict[int, dict] = {r["id"]: r for r, keep in zip(previous.records, kept.tolist()) if keep}
+    for row in changed:
+        records[row.id] = scoring_record(row)
+    logger.info(
+        f"Catalog refresh: {len(changed)} changed, {len(previous) - int(kept.sum())} removed, {len(records)} total"
+    )
+    return OpportunityCatalog(list(records.values()), version)
+
+
+# ============================================================================
+# Process-wide catalog
+# ============================================================================
+
+_catalog: Optional[OpportunityCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_opportunity_catalog(db: Session, version: Optional[str] = None) -> OpportunityCatalog:
+    """
+    Current catalog, rebuilt (incrementally) when the catalog version has
+    changed and from scratch once it is older than CATALOG_MAX_AGE_SECONDS.
+
+    Args:
+        version: `catalog_version(db)` if the caller already has it
+    """
+    global _catalog
+    version = version or catalog_version(db)
+    catalog = _catalog
+    if catalog is not None and catalog.version == version and \
+            time.monotonic() - catalog.built_at <= CATALOG_MAX_AGE_SECONDS:
+        return catalog
+
+    with _catalog_lock:
+        catalog = _catalog
+        if catalog is None or time.monotonic() - catalog.built_at > CATALOG_MAX_AGE_SECONDS:
+            _catalog = build_catalog(db, version=version)
+        elif catalog.version != version:
+            _catalog = build_catalog(db, catalog, version)
+        return _catalog
+
+
+def reset_opportunity_catalog() -> None:
+    """Drop the catalog (the next request rebuilds it)."""
+    global _catalog
+    with _catalog_lock:
+        _catalog = None
@@ -5,33 +5,208 @@ Uses a lightweight model (all-MiniLM-L6-v2) for fast inference.
 Embeddings are 384-dimensional vectors.
 """
 import logging
-from typing import List, Optional, Union
+import os
+import threading
+import time
+from typing import List, Optional, Sequence, Union
 from functools import lru_cache
 import numpy as np
 
+from app.config import BASE_DIR
+from app.services.inference_batcher import BATCH_MAX_SIZE, MICROBATCH_ENABLED, MicroBatcher
+
 logger = logging.getLogger(__name__)
 
+MODEL_NAME = "all-MiniLM-L6-v2"
+EMBEDDING_DIM = 384
+
+# Inference backend: "sentence-transformers" (stock), "onnx" (exported
+# ONNX graph run by onnxruntime) or "torch-quantized" (dynamic int8 Linear layers)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "sentence-transformers")
+EMBEDDING_ONNX_PATH = os.getenv(
+    "EMBEDDING_ONNX_PATH", os.path.join(BASE_DIR, "data", "onnx", MODEL_NAME)
+)
+
+# Opt-in: load and warm the model when the app starts instead of on the first request
+EMBEDDING_WARMUP = os.getenv("EMBEDDING_WARMUP", "0") == "1"
+WARMUP_BATCH_SIZE = 8
+
 # Lazy load the model to avoid slow startup
 _model = None
+_model_lock = threading.Lock()
+_warmup_error: Optional[str] = None
+
+# Shared micro-batcher for concurrent encode calls (created on first use)
+_batcher: Optional[MicroBatcher] = None
+
+
+class OnnxEmbeddingModel:
+    """
+    all-MiniLM-L6-v2 exported to ONNX, run with onnxruntime on CPU.
+
+    Reproduces the sentence-transformers pipeline (mean pooling over the
+    attention mask, then L2 normalisation) and exposes the same `encode`.
+    """
+
+    def __init__(self, path: str):
+        import onnxruntime
+        from transformers import AutoTokenizer
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = onnxruntime.InferenceSession(
+            os.path.join(path, "model.onnx"), options, providers=["CPUExecutionProvider"]
+        )
+        self.tokenizer = AutoTokenizer.from_pretrained(path)
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def encode(
+        self,
+        texts: Union[str, List[str]],
+        batch_size: int = 32,
+        convert_to_numpy: bool = True,
+        **kwargs
+    ) -> np.ndarray:
+        single = isinstance(texts, str)
+        if single:
+            texts = [texts]
+
+        outputs = []
+        for start in range(0, len(texts), batch_size):
+            tokens = self.tokenizer(
+                texts[start:start + batch_size], padding=True, truncation=True,
+                max_length=256, return_tensors="np",
+            )
+            feed = {k: v.astype(np.int64) for k, v in tokens.items() if k in self.input_names}
+            hidden = self.session.run(None, feed)[0]
+
+            mask = tokens["attention_mask"][..., np.newaxis].astype(np.float32)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+            outputs.append(pooled / np.clip(norms, 1e-12, None))
+
+        embeddings = np.concatenate(outputs).astype(np.float32)
+        return embeddings[0] if single else embeddings
+
+
+def _load_sentence_transformers():
+    from sentence_transformers import SentenceTransformer
+    # all-MiniLM-L6-v2 is fast and produces good results
+    # 384-dimensional embeddings, ~80MB model
+    return SentenceTransformer(MODEL_NAME)
+
+
+def _load_torch_quantized():
+    import torch
+    from sentence_transformers import SentenceTransformer
+    model = SentenceTransformer(MODEL_NAME, device="cpu")
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def _load_onnx():
+    if not os.path.exists(os.path.join(EMBEDDING_ONNX_PATH, "model.onnx")):
+        raise FileNotFoundError(
+            f"No ONNX model at {EMBEDDING_ONNX_PATH}; run "
+            "`python -m app.services.embedding export-onnx` first"
+        )
+    return OnnxEmbeddingModel(EMBEDDING_ONNX_PATH)
+
+
+BACKEND_LOADERS = {
+    "sentence-transformers": _load_sentence_transformers,
+    "torch-quantized": _load_torch_quantized,
+    "onnx": _load_onnx,
+}
+
+
+def load_model(backend: str = EMBEDDING_BACKEND):
+    """Load a fresh model instance for the given backend."""
+    if backend not in BACKEND_LOADERS:
+        raise ValueError(f"Unknown embedding backend '{backend}'. Valid: {list(BACKEND_LOADERS)}")
+    return BACKEND_LOADERS[backend]()
 
 
 def get_model():
-    """Lazy load the sentence transformer model."""
+    """Lazy load the embedding model for the configured backend."""
     global _model
     if _model is None:
-        try:
-            from sentence_transformers import SentenceTransformer
-            logger.info("Loading sentence-transformers model...")
-            # all-MiniLM-L6-v2 is fast and produces good results
-            # 384-dimensional embeddings, ~80MB model
-            _model = SentenceTransformer('all-MiniLM-L6-v2')
-            logger.info("Model loaded successfully")
-        except Exception as e:
-            logger.error(f"Failed to load model: {e}")
-            raise
+        with _model_lock:
+            if _model is None:
+                try:
+                    logger.info(f"Loading {EMBEDDING_BACKEND} embedding model...")
+                    _model = load_model(EMBEDDING_BACKEND)
+                    logger.info("Model loaded successfully")
+                except Exception as e:
+                    logger.error(f"Failed to load model: {e}")
+                    raise
     return _model
 
 
+def is_model_loaded() -> bool:
+    """Whether the model has been loaded in this process."""
+    return _model is not None
+
+
+def warm_up_model() -> float:
+    """
+    Load the model and run a dummy batch so the first real request does not
+    pay for weight loading or first-call allocation.
+
+    Returns:
+        Seconds spent warming up
+    """
+    global _warmup_error
+    started = time.monotonic()
+    try:
+        model = get_model()
+        model.encode(["warm-up"] * WARMUP_BATCH_SIZE, convert_to_numpy=True)
+        _warmup_error = None
+    except Exception as e:
+        _warmup_error = str(e)
+        logger.error(f"Embedding model warm-up failed: {e}")
+        raise
+    elapsed = time.monotonic() - started
+    logger.info(f"Embedding model warmed up in {elapsed:.2f}s")
+    return elapsed
+
+
+def get_model_readiness() -> dict:
+    """
+    Model readiness for `/health/ready`.
+
+    With warm-up enabled the service is ready only once the model is loaded;
+    without it the model loads lazily and readiness does not wait for it.
+    """
+    loaded = is_model_loaded()
+    return {
+        "ready": loaded or not EMBEDDING_WARMUP,
+        "model_loaded": loaded,
+        "backend": EMBEDDING_BACKEND,
+        "warmup_enabled": EMBEDDING_WARMUP,
+        "error": _warmup_error,
+    }
+
+
+def _encode_texts(texts: List[str]) -> np.ndarray:
+    """Run one model.encode call over a list of texts."""
+    return get_model().encode(texts, convert_to_numpy=True)
+
+
+def get_batcher() -> MicroBatcher:
+    """Get the process-wide inference batcher."""
+    global _batcher
+    if _batcher is None:
+        _batcher = MicroBatcher(_encode_texts)
+    return _batcher
+
+
+def get_inference_metrics() -> dict:
+    """Batching and queue-depth statistics for the embedding model."""
+    if not MICROBATCH_ENABLED:
+        return {"enabled": False}
+    return get_batcher().metrics()
+
+
 def generate_embedding(text: str) -> List[float]:
     """
     Generate embedding for a single text string.
@@ -44,7 +219,11 @@ def generate_embedding(text: str) -> List[float]:
     """
     if not text or not text.strip():
         # Return zero vector for empty text
-        return [0.0] * 384
+        return [0.0] * EMBEDDING_DIM
+
+    if MICROBATCH_ENABLED:
+        # Shares one encode call with whatever else arrives in the batch window
+        return get_batcher().encode([text])[0].tolist()
 
     model = get_model()
     embedding = model.encode(text, convert_to_numpy=True)
@@ -67,12 +246,15 @@ def generate_embeddings_batch(texts: List[str]) -> List[List[float]]:
     # Replace empty strings with placeholder
     processed_texts = [t if t and t.strip() else " " for t in texts]
 
+    if MICROBATCH_ENABLED and len(processed_texts) < BATCH_MAX_SIZE:
+        return get_batcher().encode(processed_texts).tolist()
+
     model = get_model()
     embeddings = model.encode(processed_texts, convert_to_numpy=True)
     return embeddings.tolist()
 
 
-def cosine_similarity(vec1: List[float], vec2: List[float]) -> float:
+def cosine_similarity(vec1: Sequence[float], vec2: Sequence[float]) -> float:
     """
     Calculate cosine similarity between two vectors.
 
@@ -83,7 +265,7 @@ def cosine_similarity(vec1: List[float], vec2: List[float]) -> float:
     Returns:
         Similarity score between -1 and 1 (higher is more similar)
     """
-    if not vec1 or not vec2:
+    if vec1 is None or vec2 is None or len(vec1) == 0 or len(vec2) == 0:
         return 0.0
 
     a = np.array(vec1)
@@ -100,24 +282,25 @@ def cosine_similarity(vec1: List[float], vec2: List[float]) -> float:
 
 
 def cosine_similarity_batch(
-    query_vec: List[float],
-    candidate_vecs: List[List[float]]
+    query_vec: Sequence[float],
+    candidate_vecs: Sequence[Sequence[float]]
 ) -> List[float]:
     """
     Calculate cosine similarity between a query and multiple candidates.
 
     Args:
         query_vec: Query vector
-        candidate_vecs: List of candidate vectors
+        candidate_vecs: List of candidate vectors (or a 2-D numpy array)
 
     Returns:
         List of similarity scores
     """
-    if not query_vec or not candidate_vecs:
-        return [0.0] * len(candidate_vecs) if candidate_vecs else []
+    if query_vec is None or candidate_vecs is None or len(query_vec) == 0 or len(candidate_vecs) == 0:
+        return [0.0] * len(candidate_vecs) if candidate_vecs is not None else []
 
-    query = np.array(query_vec)
-    candidates = np.array(candidate_vecs)
+    # float32 and no copy when callers already pass numpy arrays
+    query = np.asarray(query_vec, dtype=np.float32)
+    candidates = np.asarray(candidate_vecs, dtype=np.float32)
 
     # Normalize
     query_norm = np.linalg.norm(query)
@@ -240,8 +423,9 @@ def build_opportunity_text(opp_data: dict) -> str:
     if opp_data.get("is_remote"):
         parts.append("Remote work available")
 
-    # Description (truncate to avoid too long text)
-    description = opp_data.get("description", "")
+    # Description (truncate to avoid too long text); the excerpt is
+    # stored on write (see opportunity_features)
+    description = opp_data.get("description_excerpt") or opp_data.get("description", "")
     if description:
         # Take first 500 chars of description
         parts.append(f"Description: {description[:500]}")
@@ -315,3 +499,52 @@ def get_opportunity_embeddings_batch(opportunities: List[dict]) -> List[List[flo
     """
     texts = [build_opportunity_text(opp) for opp in opportunities]
     return generate_embeddings_batch(texts)
+
+
+# ============================================================================
+# ONNX export
+# ============================================================================
+
+def export_onnx_model(path: str = EMBEDDING_ONNX_PATH) -> str:
+    """
+    Export the stock transformer to `path/model.onnx` with its tokenizer,
+    for use with EMBEDDING_BACKEND=onnx.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    st_model = SentenceTransformer(MODEL_NAME, device="cpu")
+    transformer = st_model[0].auto_model.eval()
+    tokenizer = st_model.tokenizer
+
+    os.makedirs(path, exist_ok=True)
+    dummy = tokenizer(["export"], return_tensors="pt")
+    names = ["input_ids", "attention_mask", "token_type_ids"]
+    dynamic = {name: {0: "batch", 1: "sequence"} for name in names}
+    dynamic["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            tuple(dummy[name] for name in names),
+            os.path.join(path, "model.onnx"),
+            input_names=names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic,
+            opset_version=14,
+        )
+    tokenizer.save_pretrained(path)
+    logger.info(f"Exported {MODEL_NAME} to {path}")
+    return path
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Embedding model utilities")
+    parser.add_argument("command", choices=["export-onnx"])
+    parser.add_argument("--path", default=EMBEDDING_ONNX_PATH)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    print(f"Exported ONNX model to {export_onnx_model(args.path)}")
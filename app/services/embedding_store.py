@@ -0,0 +1,516 @@
+"""
+Embedding Store - Persistent opportunity embeddings computed at ingest time
+
+Opportunity vectors are computed once when a row is written (sync, bulk
+import, CRUD) and stored as float32 blobs in `opportunity_embeddings`, keyed
+by opportunity id and a hash of the embedded text. The matching endpoints
+read them back instead of re-encoding the catalog on every request.
+
+Rows whose text hash no longer matches (or that were never computed) are
+encoded lazily on read and written back, so the store self-heals.
+
+User profile vectors get the same treatment in `user_embeddings`, fronted by
+a bounded in-process LRU. The profile text hash is the cache version, and
+profile writes invalidate both layers explicitly. Read endpoints encode
+profiles lazily, so those rows are written with an insert-or-update in a
+short session of their own rather than by committing the request's session.
+"""
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import delete, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models.embedding import OpportunityEmbedding, UserEmbedding
+from app.models.opportunity import Opportunity
+from app.services.embedding import (
+    MODEL_NAME,
+    EMBEDDING_DIM,
+    build_opportunity_text,
+    build_user_profile_text,
+    cosine_similarity_batch,
+    generate_embedding,
+    generate_embeddings_batch,
+)
+from app.services.ann_index import index_remove, index_upsert
+from app.services.vector_matrix import get_embedding_matrix, hash_prefix
+
+logger = logging.getLogger(__name__)
+
+# Keep IN (...) lists well below SQLite's bound-parameter limit
+QUERY_CHUNK_SIZE = 500
+
+# Max rows encoded per lazy backfill pass on the request path
+BACKFILL_BATCH_SIZE = 1000
+
+# In-process user vectors kept per worker (~1.5 KB each)
+USER_EMBEDDING_CACHE_SIZE = int(os.getenv("USER_EMBEDDING_CACHE_SIZE", "10000"))
+
+
+def hash_text(text: str) -> str:
+    """Return the sha256 hex digest used to key stored embeddings."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def opportunity_text_hash(opp: dict) -> str:
+    """Text hash of an opportunity dict (precomputed by the catalog when present)."""
+    return opp.get("text_hash") or hash_text(build_opportunity_text(opp))
+
+
+def vector_to_blob(vector: Sequence[float]) -> bytes:
+    """Serialize a vector as compact little-endian float32 bytes."""
+    return np.asarray(vector, dtype="<f4").tobytes()
+
+
+def blob_to_vector(blob: bytes) -> np.ndarray:
+    """Deserialize a float32 blob into a (read-only) numpy vector."""
+    return np.frombuffer(blob, dtype="<f4")
+
+
+def opportunity_text_fields(opp: Opportunity) -> dict:
+    """Fields of an Opportunity row that feed `build_opportunity_text`."""
+    return {
+        "id": opp.id,
+        "title": opp.title,
+        "company_name": opp.company_name,
+        "company": opp.company,
+        "location": opp.location,
+        "is_remote": opp.is_remote,
+        "description": opp.description,
+        "description_excerpt": opp.description_excerpt,
+        "required_skills": opp.required_skills or [],
+        "preferred_skills": opp.preferred_skills or [],
+        "job_type": opp.job_type,
+        "experience_level": opp.experience_level,
+        "opportunity_type": opp.opportunity_type,
+        "category": opp.category,
+    }
+
+
+def _chunks(items: Sequence, size: int = QUERY_CHUNK_SIZE) -> Iterable[Sequence]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _load_stored_rows(db: Session, ids: Sequence[int]) -> Dict[int, tuple]:
+    """Fetch (text_hash, vector_blob) for the given ids, keyed by id."""
+    stored: Dict[int, tuple] = {}
+    for chunk in _chunks(list(ids)):
+        rows = db.query(
+            OpportunityEmbedding.opportunity_id,
+            OpportunityEmbedding.text_hash,
+            OpportunityEmbedding.model_name,
+            OpportunityEmbedding.vector,
+        ).filter(
+            OpportunityEmbedding.opportunity_id.in_(chunk)
+        ).all()
+        for opp_id, text_hash, model_name, vector in rows:
+            if model_name == MODEL_NAME:
+                stored[opp_id] = (text_hash, vector)
+    return stored
+
+
+def _write_rows(db: Session, rows: List[dict]) -> None:
+    """Replace stored embeddings for the given rows (portable upsert)."""
+    if not rows:
+        return
+    ids = [row["opportunity_id"] for row in rows]
+    for chunk in _chunks(ids):
+        db.execute(
+            delete(OpportunityEmbedding).where(
+                OpportunityEmbedding.opportunity_id.in_(chunk)
+            )
+        )
+    db.execute(insert(OpportunityEmbedding), rows)
+
+
+def _encode_missing(
+    db: Session,
+    opp_dicts: List[dict],
+    hashes: List[str],
+    stored: Dict[int, tuple],
+) -> Dict[int, np.ndarray]:
+    """Encode opportunities whose stored hash is missing or stale and persist them."""
+    pending = [
+        (opp, text_hash)
+        for opp, text_hash in zip(opp_dicts, hashes)
+        if stored.get(opp["id"], (None,))[0] != text_hash
+    ]
+    if not pending:
+        return {}
+
+    texts = [build_opportunity_text(opp) for opp, _ in pending]
+    vectors = np.asarray(generate_embeddings_batch(texts), dtype=np.float32)
+
+    rows = [
+        {
+            "opportunity_id": opp["id"],
+            "text_hash": text_hash,
+            "model_name": MODEL_NAME,
+            "dim": vectors.shape[1],
+            "vector": vector_to_blob(vector),
+        }
+        for (opp, text_hash), vector in zip(pending, vectors)
+    ]
+    _write_rows(db, rows)
+
+    return {opp["id"]: vector for (opp, _), vector in zip(pending, vectors)}
+
+
+def refresh_opportunity_embeddings(db: Session, opportunities: List[Opportunity]) -> int:
+    """
+    Compute and store embeddings for freshly written opportunities.
+
+    Only rows whose embedded text changed since the last run are re-encoded.
+    Failures (e.g. the model cannot be loaded) are logged and left for the
+    lazy backfill in `load_opportunity_embeddings`.
+
+    Args:
+        db: Database session (committed on success)
+        opportunities: Opportunity rows that were just inserted or updated
+
+    Returns:
+        Number of embeddings (re)computed
+    """
+    opportunities = [opp for opp in opportunities if opp.id is not None]
+    if not opportunities:
+        return 0
+    opp_dicts = [opportunity_text_fields(opp) for opp in opportunities]
+
+    try:
+        hashes = [hash_text(build_opportunity_text(opp)) for opp in opp_dicts]
+        stored = _load_stored_rows(db, [opp["id"] for opp in opp_dicts])
+        computed = _encode_missing(db, opp_dicts, hashes, stored)
+        db.commit()
+    except Exception as e:
+        logger.warning(f"Could not refresh opportunity embeddings: {e}")
+        db.rollback()
+        return 0
+
+    # Keep the in-process ANN index in step with the catalog
+    live_ids, live_vectors, dead_ids = [], [], []
+    for opp in opportunities:
+        if not opp.is_active or opp.is_stale:
+            dead_ids.append(opp.id)
+            continue
+        vector = computed.get(opp.id)
+        if vector is None:
+            vector = blob_to_vector(stored[opp.id][1])
+        live_ids.append(opp.id)
+        live_vectors.append(vector)
+    if live_ids:
+        index_upsert(live_ids, np.vstack(live_vectors))
+    index_remove(dead_ids)
+
+    if computed:
+        logger.info(f"Stored {len(computed)} opportunity embeddings")
+    return len(computed)
+
+
+def refresh_embeddings_in_background(opportunity_ids: Sequence[int], session_factory=None) -> int:
+    """
+    `refresh_opportunity_embeddings` for rows committed by a request, in a
+    session of its own.
+
+    Write endpoints queue this as a background task so the response never
+    waits on the encoder; rows it misses are embedded by the lazy backfill.
+
+    Returns:
+        Number of embeddings (re)computed
+    """
+    db = (session_factory or SessionLocal)()
+    try:
+        ids = list(opportunity_ids)
+        opportunities = []
+        for start in range(0, len(ids), QUERY_CHUNK_SIZE):
+            chunk = ids[start:start + QUERY_CHUNK_SIZE]
+            opportunities.extend(db.query(Opportunity).filter(Opportunity.id.in_(chunk)).all())
+        return refresh_opportunity_embeddings(db, opportunities)
+    finally:
+        db.close()
+
+
+def backfill_missing_embeddings(db: Session, limit: int = BACKFILL_BATCH_SIZE) -> int:
+    """
+    Embed active opportunities that have no stored vector yet.
+
+    Catches rows written before the store existed or whose ingest-time
+    encoding failed, so they still reach the ANN index.
+
+    Returns:
+        Number of embeddings computed
+    """
+    missing = db.query(Opportunity).outerjoin(
+        OpportunityEmbedding,
+        OpportunityEmbedding.opportunity_id == Opportunity.id,
+    ).filter(
+        Opportunity.is_active == True,
+        Opportunity.is_stale == False,
+        OpportunityEmbedding.opportunity_id == None,
+    ).limit(limit).all()
+
+    if not missing:
+        return 0
+    return refresh_opportunity_embeddings(db, missing)
+
+
+def load_opportunity_embeddings(db: Session, opportunities: List[dict]) -> np.ndarray:
+    """
+    Return embeddings for the given opportunities, row-aligned with the input.
+
+    Stored vectors are used when their text hash still matches; anything
+    missing or outdated is encoded in one batch and written back.
+
+    Args:
+        db: Database session
+        opportunities: Opportunity dictionaries (must include "id")
+
+    Returns:
+        float32 array of shape (len(opportunities), dim)
+    """
+    if not opportunities:
+        return np.zeros((0, EMBEDDING_DIM), dtype=np.float32)
+
+    hashes = [opportunity_text_hash(opp) for opp in opportunities]
+    stored = _load_stored_rows(db, [opp["id"] for opp in opportunities])
+    computed = _encode_missing(db, opportunities, hashes, stored)
+    if computed:
+        db.commit()
+        logger.info(f"Backfilled {len(computed)} opportunity embeddings")
+
+    matrix = np.empty((len(opportunities), EMBEDDING_DIM), dtype=np.float32)
+    for i, opp in enumerate(opportunities):
+        vector = computed.get(opp["id"])
+        if vector is None:
+            vector = blob_to_vector(stored[opp["id"]][1])
+        matrix[i] = vector
+    return matrix
+
+
+
+def opportunity_similarities(
+    db: Session,
+    user_embedding: Sequence[float],
+    opportunities: List[dict],
+) -> np.ndarray:
+    """
+    Cosine similarity between a user vector and each opportunity.
+
+    Rows present in the shared memory-mapped matrix (see vector_matrix) with
+    an up-to-date text hash are scored directly on the quantized data; the
+    rest fall back to stored float32 blobs (or lazy encoding).
+
+    Returns:
+        float32 array of raw cosine similarities in [-1, 1]
+    """
+    scores = np.zeros(len(opportunities), dtype=np.float32)
+    if not opportunities:
+        return scores
+
+    pending = np.arange(len(opportunities))
+    matrix = get_embedding_matrix()
+    if matrix is not None and len(matrix):
+        ids = [opp["id"] for opp in opportunities]
+        rows = matrix.rows_for(ids)
+        found = np.flatnonzero(rows >= 0)
+        if len(found):
+            expected = np.array(
+                [hash_prefix(opportunity_text_hash(opportunities[i])) for i in found],
+                dtype=np.uint64,
+            )
+            fresh = found[matrix.hashes[rows[found]] == expected]
+            scores[fresh] = matrix.dot(user_embedding, rows[fresh])
+            pending = np.setdiff1d(pending, fresh, assume_unique=True)
+
+    if len(pending):
+        vectors = load_opportunity_embeddings(db, [opportunities[i] for i in pending])
+        scores[pending] = cosine_similarity_batch(user_embedding, vectors)
+    return scores
+
+
+# ============================================================================
+# User profile embeddings
+# ============================================================================
+
+class LRUEmbeddingCache:
+    """Thread-safe, size-bounded LRU of key -> (text_hash, vector)."""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[int, Tuple[str, np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: int, text_hash: str) -> Optional[np.ndarray]:
+        """Return the cached vector if present and still at `text_hash`."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] != text_hash:
+                return None
+            self._data.move_to_end(key)
+            return entry[1]
+
+    def put(self, key: int, text_hash: str, vector: np.ndarray) -> None:
+        with self._lock:
+            self._data[key] = (text_hash, vector)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: int) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+user_embedding_cache = LRUEmbeddingCache(USER_EMBEDDING_CACHE_SIZE)
+
+
+def _user_embedding_row(user_id: int, text_hash: str, vector: np.ndarray) -> dict:
+    return {
+        "user_id": user_id,
+        "text_hash": text_hash,
+        "model_name": MODEL_NAME,
+        "dim": len(vector),
+        "vector": vector_to_blob(vector),
+    }
+
+
+def _store_user_embeddings(db: Session, rows: List[dict]) -> None:
+    """
+    Insert or update `user_embeddings` rows in a transaction of their own.
+
+    Two requests encoding the same new profile both write instead of one
+    failing on the primary key. A failed write is logged, not raised: the
+    vector is still served and kept in the LRU.
+    """
+    bind = db.get_bind()
+    try:
+        with Session(bind=bind) as writer:
+            if bind.dialect.name in ("sqlite", "postgresql"):
+                dialect_insert = sqlite.insert if bind.dialect.name == "sqlite" else postgresql.insert
+                statement = dialect_insert(UserEmbedding)
+                statement = statement.on_conflict_do_update(
+                    index_elements=[UserEmbedding.user_id],
+                    set_={
+                        column: statement.excluded[column]
+                        for column in ("text_hash", "model_name", "dim", "vector", "updated_at")
+                    },
+                )
+            else:
+                # No portable upsert; replace the rows instead
+                user_ids = [row["user_id"] for row in rows]
+                for chunk in _chunks(user_ids):
+                    writer.execute(delete(UserEmbedding).where(UserEmbedding.user_id.in_(chunk)))
+                statement = insert(UserEmbedding)
+            writer.execute(statement, rows)
+            writer.commit()
+    except SQLAlchemyError as e:
+        logger.warning(f"Could not store {len(rows)} user embeddings: {e}")
+
+
+def get_cached_user_embedding(db: Session, user_data: dict) -> np.ndarray:
+    """
+    Return the user's profile embedding, encoding it only when the profile changed.
+
+    Lookup order: in-process LRU, then `user_embeddings`, then the model
+    (result written back to both; the request's session is not committed).
+
+    Args:
+        db: Database session
+        user_data: User profile dictionary (must include "id")
+
+    Returns:
+        float32 embedding vector
+    """
+    user_id = user_data["id"]
+    text = build_user_profile_text(user_data)
+    text_hash = hash_text(text)
+
+    vector = user_embedding_cache.get(user_id, text_hash)
+    if vector is not None:
+        return vector
+
+    row = db.query(UserEmbedding).filter(UserEmbedding.user_id == user_id).first()
+    if row and row.text_hash == text_hash and row.model_name == MODEL_NAME:
+        vector = blob_to_vector(row.vector)
+    else:
+        vector = np.asarray(generate_embedding(text), dtype=np.float32)
+        _store_user_embeddings(db, [_user_embedding_row(user_id, text_hash, vector)])
+
+    user_embedding_cache.put(user_id, text_hash, vector)
+    return vector
+
+
+def load_user_embeddings(db: Session, users: List[dict]) -> np.ndarray:
+    """
+    Return profile embeddings for many users, row-aligned with the input.
+
+    The bulk form of `get_cached_user_embedding`: stored vectors are used
+    while their text hash matches; the rest are encoded in one batch and
+    written back.
+
+    Args:
+        db: Database session
+        users: User profile dictionaries (must include "id")
+
+    Returns:
+        float32 array of shape (len(users), dim)
+    """
+    matrix = np.empty((len(users), EMBEDDING_DIM), dtype=np.float32)
+    if not users:
+        return matrix
+
+    texts = [build_user_profile_text(user) for user in users]
+    hashes = [hash_text(text) for text in texts]
+    stored: Dict[int, tuple] = {}
+    for chunk in _chunks([user["id"] for user in users]):
+        rows = db.query(
+            UserEmbedding.user_id,
+            UserEmbedding.text_hash,
+            UserEmbedding.model_name,
+            UserEmbedding.vector,
+        ).filter(UserEmbedding.user_id.in_(chunk)).all()
+        for user_id, text_hash, model_name, vector in rows:
+            if model_name == MODEL_NAME:
+                stored[user_id] = (text_hash, vector)
+
+    pending = [
+        i for i, (user, text_hash) in enumerate(zip(users, hashes))
+        if stored.get(user["id"], (None,))[0] != text_hash
+    ]
+    for i, user in enumerate(users):
+        row = stored.get(user["id"])
+        if row is not None and row[0] == hashes[i]:
+            matrix[i] = blob_to_vector(row[1])
+
+    if pending:
+        vectors = np.asarray(generate_embeddings_batch([texts[i] for i in pending]), dtype=np.float32)
+        _store_user_embeddings(db, [
+            _user_embedding_row(users[i]["id"], hashes[i], vector)
+            for i, vector in zip(pending, vectors)
+        ])
+        matrix[pending] = vectors
+        logger.info(f"Stored {len(pending)} user embeddings")
+    return matrix
+
+
+def invalidate_user_embedding(db: Session, user_id: int) -> None:
+    """Drop a user's cached embedding after a profile write (caller commits)."""
+    user_embedding_cache.pop(user_id)
+    db.query(UserEmbedding).filter(UserEmbedding.user_id == user_id).delete(
+        synchronize_session=False
+    )
@@ -0,0 +1,517 @@
+"""
+Feature Matrix - Vectorized scoring inputs for MatchingService
+
+The scalar scorers in `matching.py` re-lowercase the user's skills and
+preferences and re-estimate their experience for every candidate. Here the
+user side is prepared once (`UserContext`) and the candidates are encoded as
+NumPy columns (`CandidateFeatures`): skill-id sets in CSR form, and small
+integer codes for location, work arrangement, type, company size and level.
+String rules such as the location substring match are then evaluated once per
+distinct value rather than once per candidate.
+
+`score_candidates` reproduces `calculate_skills_score`,
+`calculate_preferences_score` and `calculate_experience_score` bit for bit,
+including the order of float additions and Python's `round`.
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.services.opportunity_features import normalized
+from app.services.skill_vocabulary import TemporaryIds, canonical_skill, get_skill_vocabulary
+
+LEVEL_ORDER = ["entry", "mid", "senior", "executive"]
+RELOCATE_SCORES = {"yes": 0.7, "maybe": 0.5}
+
+
+def _encode(values: Sequence[str]) -> Tuple[np.ndarray, List[str]]:
+    """Dictionary-encode strings into (codes, distinct values in code order)."""
+    lookup: Dict[str, int] = {}
+    codes = np.fromiter(
+        (lookup.setdefault(v, len(lookup)) for v in values), dtype=np.int32, count=len(values)
+    )
+    return codes, list(lookup)
+
+
+def round3(values: np.ndarray) -> np.ndarray:
+    """
+    Element-wise equivalent of Python's `round(x, 3)`.
+
+    `np.round` scales by 1000 first, which can tip values sitting next to a
+    half-way point the other way; those few are re-rounded in Python.
+    """
+    rounded = np.round(values, 3)
+    scaled = values * 1000.0
+    near_half = np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+    for i in near_half.tolist():
+        rounded[i] = round(float(values[i]), 3)
+    return rounded
+
+
+class UserContext:
+    """
+    Per-user inputs of the scoring rules, normalised once per request.
+    """
+
+    def __init__(self, user_data: dict, user_preferences: Optional[dict]):
+        prefs = user_preferences or {}
+        self.has_preferences = bool(prefs)
+
+        self.skills: List[str] = list(user_data.get("skills") or [])
+        self.skill_set = {canonical_skill(s) for s in self.skills} - {""}
+
+        self.locations = []
+        for loc in prefs.get("preferred_locations") or []:
+            if isinstance(loc, dict):
+                self.locations.append(f"{loc.get('city', '')} {loc.get('country', '')}".lower())
+            else:
+                self.locations.append(str(loc).lower())
+
+        self.willing_to_relocate = prefs.get("willing_to_relocate", "no")
+        self.salary_min = prefs.get("salary_min")
+        self.work_arrangements = [w.lower() for w in prefs.get("work_arrangements") or []]
+        self.wants_remote = "remote" in self.work_arrangements
+        self.opportunity_types = [t.lower() for t in prefs.get("opportunity_types") or []]
+        self.company_sizes = [s.lower() for s in prefs.get("company_sizes") or []]
+
+        # Same rough estimate as calculate_experience_score
+        years = 0
+        for exp in user_data.get("work_experiences", []):
+            years += 2 if exp.get("is_current", False) else 1.5
+        if years <= 2:
+            self.level_index = 0
+        elif years <= 5:
+            self.level_index = 1
+        elif years <= 10:
+            self.level_index = 2
+        else:
+            self.level_index = 3
+
+    def location_matches(self, opp_location: str) -> bool:
+        """The substring rule from calculate_preferences_score."""
+        return any(loc in opp_location or opp_location in loc for loc in self.locations)
+
+
+class CandidateFeatures:
+    """
+    Column-encoded scoring features for a list of opportunity dicts.
+
+    Independent of the user, so one encoding can be scored for many users.
+    """
+
+    # Per-candidate arrays and distinct-value tables that fully describe an
+    # encoding (see `from_columns`)
+    ARRAY_COLUMNS = (
+        "required_ids", "required_offsets", "preferred_ids", "preferred_offsets",
+        "location_codes", "arrangement_codes", "type_codes", "size_codes",
+        "level_index", "is_remote", "has_salary", "salary",
+    )
+    TABLE_COLUMNS = ("locations", "arrangements", "types", "sizes")
+
+    def __init__(self, opportunities: Sequence[dict]):
+        n = len(opportunities)
+        self.size = n
+        # Encoding this one was taken from (see `take`), and the rows taken
+        self.source: Optional["CandidateFeatures"] = None
+        self.source_rows: Optional[np.ndarray] = None
+
+        # Skill-vocabulary id sets in CSR layout: ids of candidate i are
+        # required_ids[required_offsets[i]:required_offsets[i + 1]]
+        self.vocabulary = get_skill_vocabulary()
+        self.temporary_ids = TemporaryIds(self.vocabulary.next_id)
+        self.required_ids, self.required_offsets = self._skill_sets(opportunities, "required_skills")
+        self.preferred_ids, self.preferred_offsets = self._skill_sets(opportunities, "preferred_skills")
+        self.id_space = self.temporary_ids.base + len(self.temporary_ids)
+        self.required_counts = np.diff(self.required_offsets)
+        self.preferred_counts = np.diff(self.preferred_offsets)
+        self.required_owner = np.repeat(np.arange(n, dtype=np.int32), self.required_counts)
+        self.preferred_owner = np.repeat(np.arange(n, dtype=np.int32), self.preferred_counts)
+
+        self.location_codes, self.locations = _encode([normalized(o, "location") for o in opportunities])
+        self.arrangement_codes, self.arrangements = _encode(
+            [normalized(o, "work_arrangement") for o in opportunities]
+        )
+        self.type_codes, self.types = _encode([normalized(o, "opportunity_type") for o in opportunities])
+        self.size_codes, self.sizes = _encode([normalized(o, "company_size") for o in opportunities])
+        level_codes, levels = _encode([normalized(o, "experience_level") for o in opportunities])
+        level_lookup = np.array(
+            [LEVEL_ORDER.index(lv) if lv in LEVEL_ORDER else -1 for lv in levels], dtype=np.int32
+        )
+        self.level_index = level_lookup[level_codes] if n else np.zeros(0, dtype=np.int32)
+
+        self.is_remote = np.fromiter(
+            (bool(o.get("is_remote", False)) for o in opportunities), dtype=bool, count=n
+        )
+        self.has_salary = np.fromiter(
+            (o.get("salary_min") is not None or o.get("salary_max") is not None for o in opportunities),
+            dtype=bool, count=n,
+        )
+        self.salary = np.fromiter(
+            (o.get("salary_max") or o.get("salary_min") or 0 for o in opportunities),
+            dtype=np.float64, count=n,
+        )
+
+    def __len__(self) -> int:
+        return self.size
+
+    def take(self, rows: np.ndarray) -> "CandidateFeatures":
+        """
+        Features of candidates `rows` (in that order), sharing this
+        encoding's id space and value tables. The subset remembers the
+        full encoding and its rows there (`source`, `source_rows`).
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        subset = object.__new__(CandidateFeatures)
+        subset.size = len(rows)
+        subset.vocabulary = self.vocabulary
+        subset.temporary_ids = self.temporary_ids
+        subset.id_space = self.id_space
+        if "skill_id" in self.__dict__:
+            # Rebuilt by `from_columns`: skill names resolve through its table
+            subset.skill_id = self.skill_id
+        if self.source is None:
+            subset.source, subset.source_rows = self, rows
+        else:
+            subset.source, subset.source_rows = self.source, self.source_rows[rows]
+        for kind in ("required", "preferred"):
+            ids = getattr(self, f"{kind}_ids")
+            starts = getattr(self, f"{kind}_offsets")[rows]
+            counts = getattr(self, f"{kind}_counts")[rows]
+            offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+            np.cumsum(counts, out=offsets[1:])
+            # Position of every kept id in the source CSR array
+            source = np.repeat(starts - offsets[:-1], counts) + np.arange(offsets[-1])
+            setattr(subset, f"{kind}_ids", ids[source])
+            setattr(subset, f"{kind}_offsets", offsets)
+            setattr(subset, f"{kind}_counts", counts)
+            setattr(subset, f"{kind}_owner", np.repeat(np.arange(len(rows), dtype=np.int32), counts))
+
+        subset.location_codes, subset.locations = self.location_codes[rows], self.locations
+        subset.arrangement_codes, subset.arrangements = self.arrangement_codes[rows], self.arrangements
+        subset.type_codes, subset.types = self.type_codes[rows], self.types
+        subset.size_codes, subset.sizes = self.size_codes[rows], self.sizes
+        subset.level_index = self.level_index[rows]
+        subset.is_remote = self.is_remote[rows]
+        subset.has_salary = self.has_salary[rows]
+        subset.salary = self.salary[rows]
+        return subset
+
+    def slice(self, start: int, stop: int) -> "CandidateFeatures":
+        """
+        Features of the contiguous candidates `start:stop`; per-candidate
+        columns are views, not copies.
+        """
+        subset = object.__new__(CandidateFeatures)
+        subset.__dict__.update(self.__dict__)
+        subset.size = stop - start
+        for kind in ("required", "preferred"):
+            offsets = getattr(self, f"{kind}_offsets")
+            first, last = int(offsets[start]), int(offsets[stop])
+            counts = getattr(self, f"{kind}_counts")[start:stop]
+            setattr(subset, f"{kind}_ids", getattr(self, f"{kind}_ids")[first:last])
+            setattr(subset, f"{kind}_offsets", offsets[start:stop + 1] - first)
+            setattr(subset, f"{kind}_counts", counts)
+            setattr(subset, f"{kind}_owner", np.repeat(np.arange(subset.size, dtype=np.int32), counts))
+        # Everything after the two CSR pairs is one value per candidate
+        for name in self.ARRAY_COLUMNS[4:]:
+            setattr(subset, name, getattr(self, name)[start:stop])
+        if self.source_rows is not None:
+            subset.source_rows = self.source_rows[start:stop]
+        return subset
+
+    @classmethod
+    def from_columns(
+        cls,
+        arrays: Dict[str, np.ndarray],
+        tables: Dict[str, List[str]],
+        id_space: int,
+        skill_ids: Dict[str, Optional[int]],
+    ) -> "CandidateFeatures":
+        """
+        Rebuild an encoding from its `ARRAY_COLUMNS` and `TABLE_COLUMNS`
+        (e.g. attached from shared memory in another process).
+
+        Args:
+            arrays: Per-candidate arrays (used as given, not copied)
+            tables: Distinct-value tables
+            id_space: `id_space` of the source encoding
+            skill_ids: Source-encoding ids of the skill names that will be
+                looked up (the user's skills); other names resolve to None
+        """
+        features = object.__new__(cls)
+        features.vocabulary = None
+        features.temporary_ids = None
+        features.skill_id = skill_ids.get
+        features.id_space = id_space
+        features.source = features.source_rows = None
+        for name in cls.ARRAY_COLUMNS:
+            setattr(features, name, arrays[name])
+        for name in cls.TABLE_COLUMNS:
+            setattr(features, name, tables[name])
+        features.size = len(features.location_codes)
+        for kind in ("required", "preferred"):
+            counts = np.diff(getattr(features, f"{kind}_offsets"))
+            setattr(features, f"{kind}_counts", counts)
+            setattr(features, f"{kind}_owner", np.repeat(np.arange(features.size, dtype=np.int32), counts))
+        return features
+
+    def _skill_sets(self, opportunities: Sequence[dict], field: str) -> Tuple[np.ndarray, np.ndarray]:
+        id_field = field[:-1] + "_ids"  # required_skills -> required_skill_ids
+        known = self.temporary_ids.base
+        ids: List[int] = []
+        offsets = [0]
+        for opp in opportunities:
+            stored = opp.get(id_field)
+            if stored is not None and all(sid < known for sid in stored):
+                # Precomputed on write; already sorted and unique
+                ids.extend(stored)
+            else:
+                ids.extend({
+                    sid for sid in (self.skill_id(s) for s in (opp.get(field) or [])) if sid is not None
+                })
+            offsets.append(len(ids))
+        return np.array(ids, dtype=np.int64), np.array(offsets, dtype=np.int64)
+
+    def skill_id(self, name: str) -> Optional[int]:
+        """Vocabulary id of a skill name in this encoding's id space."""
+        return self.vocabulary.id_or_temporary(name, self.temporary_ids)
+
+    def skill_ids(self, i: int) -> set:
+        """Required and preferred skill ids of candidate i."""
+        return set(self.required_ids[self.required_offsets[i]:self.required_offsets[i + 1]].tolist()) | \
+            set(self.preferred_ids[self.preferred_offsets[i]:self.preferred_offsets[i + 1]].tolist())
+
+
+class BatchScores:
+    """
+    Component scores for every candidate, plus what is needed to rebuild
+    the scalar scorers' matched-skill lists and reason strings on demand.
+
+    Both are keyed by small per-candidate codes (a bitmask of matched user
+    skills, an index into the distinct reason lists), so each distinct
+    list is built once rather than once per candidate.
+    """
+
+    def __init__(self, context: UserContext, features: CandidateFeatures):
+        self.context = context
+        self.features = features
+        self.skills: np.ndarray
+        self.preferences: np.ndarray
+        self.experience: np.ndarray
+        self.location_match: np.ndarray
+        self.arrangement_match: np.ndarray
+        self.salary_met: np.ndarray
+
+        # Bit k set when the k-th distinct user skill is in the candidate's
+        # skills (None when the user lists more than 64 distinct skills)
+        self.skill_mask: Optional[np.ndarray] = None
+        self.skill_overlap: np.ndarray
+        self._skill_bits: List[Tuple[str, int]] = []
+        self._matched_cache: Dict[int, List[str]] = {}
+
+        self._reason_index: Optional[List[int]] = None
+        self._reason_lists: List[List[str]] = []
+
+    def matched_skills(self, i: int) -> List[str]:
+        """User skills (original case) found in candidate i's skills."""
+        if self.skill_mask is None:
+            if not self.skill_overlap[i]:
+                return []
+            ids = self.features.skill_ids(i)
+            return [s for s in self.context.skills if self.features.skill_id(s) in ids]
+
+        mask = int(self.skill_mask[i])
+        if not mask:
+            return []
+        matched = self._matched_cache.get(mask)
+        if matched is None:
+            matched = [s for s, bit in self._skill_bits if bit >= 0 and mask >> bit & 1]
+            self._matched_cache[mask] = matched
+        return list(matched)
+
+    def preference_reasons(self, i: int) -> List[str]:
+        """Reasons in the order calculate_preferences_score emits them."""
+        if self._reason_index is None:
+            return self._build_reasons(i)
+        return list(self._reason_lists[self._reason_index[i]])
+
+    def _build_reasons(self, i: int) -> List[str]:
+        context = self.context
+        if not context.has_preferences:
+            return []
+        features = self.features
+        reasons = []
+        remote_ok = bool(features.is_remote[i]) and context.wants_remote
+        if context.locations:
+            if self.location_match[i]:
+                reasons.append(f"Location matches: {features.locations[features.location_codes[i]]}")
+            if remote_ok:
+                reasons.append("Remote work available")
+        if self.salary_met[i]:
+            reasons.append("Salary meets expectations")
+        if context.work_arrangements:
+            if self.arrangement_match[i]:
+                reasons.append(f"Work arrangement: {features.arrangements[features.arrangement_codes[i]]}")
+            elif remote_ok:
+                reasons.append("Remote work available")
+        return reasons
+
+    def index_reasons(self) -> None:
+        """
+        Group candidates by everything their preference reasons depend on,
+        so materialising many results builds each distinct list once.
+        """
+        features = self.features
+        if not self.context.has_preferences or not len(features):
+            return
+        remote_ok = features.is_remote & self.context.wants_remote
+        location = np.where(self.location_match, features.location_codes, -1).astype(np.int64) + 1
+        arrangement = np.where(self.arrangement_match, features.arrangement_codes, -1).astype(np.int64) + 1
+        key = (location * (len(features.arrangements) + 1) + arrangement) * 4 + remote_ok * 2 + self.salary_met
+        _, first, inverse = np.unique(key, return_index=True, return_inverse=True)
+        self._reason_lists = [self._build_reasons(i) for i in first.tolist()]
+        self._reason_index = inverse.ravel().tolist()
+
+
+def _skill_masks(context: UserContext, features: CandidateFeatures, scores: BatchScores) -> None:
+    distinct = list(dict.fromkeys(features.skill_id(s) for s in context.skills))
+    distinct = [sid for sid in distinct if sid is not None]
+    if len(distinct) > 64:
+        return
+    bit_of_id = {sid: bit for bit, sid in enumerate(distinct)}
+    bit_of_vocab = np.full(features.id_space, -1, dtype=np.int64)
+    for sid, bit in bit_of_id.items():
+        if sid < features.id_space:
+            bit_of_vocab[sid] = bit
+
+    mask = np.zeros(len(features), dtype=np.uint64)
+    for ids, owner in ((features.required_ids, features.required_owner),
+                       (features.preferred_ids, features.preferred_owner)):
+        bits = bit_of_vocab[ids]
+        hit = bits >= 0
+        np.bitwise_or.at(mask, owner[hit], np.left_shift(np.uint64(1), bits[hit].astype(np.uint64)))
+
+    scores.skill_mask = mask
+    scores._skill_bits = [(s, bit_of_id.get(features.skill_id(s), -1)) for s in context.skills]
+
+
+def _skills_scores(context: UserContext, features: CandidateFeatures, scores: BatchScores) -> np.ndarray:
+    n = len(features)
+    in_profile = np.zeros(features.id_space, dtype=np.float64)
+    for skill in context.skill_set:
+        sid = features.skill_id(skill)
+        if sid is not None and sid < features.id_space:
+            in_profile[sid] = 1.0
+
+    required_hits = np.bincount(features.required_owner, weights=in_profile[features.required_ids], minlength=n)
+    preferred_hits = np.bincount(features.preferred_owner, weights=in_profile[features.preferred_ids], minlength=n)
+    scores.skill_overlap = (required_hits + preferred_hits) > 0
+    _skill_masks(context, features, scores)
+
+    required_score = np.ones(n)
+    np.divide(required_hits, features.required_counts, out=required_score, where=features.required_counts > 0)
+    preferred_score = np.ones(n)
+    np.divide(preferred_hits, features.preferred_counts, out=preferred_score, where=features.preferred_counts > 0)
+
+    # Weight: 70% required, 30% preferred; no requirements = perfect match
+    score = 0.7 * required_score + 0.3 * preferred_score
+    no_requirements = (features.required_counts == 0) & (features.preferred_counts == 0)
+    return round3(np.where(no_requirements, 1.0, score))
+
+
+def _preferences_scores(context: UserContext, features: CandidateFeatures, scores: BatchScores) -> np.ndarray:
+    n = len(features)
+    scores.location_match = np.zeros(n, dtype=bool)
+    scores.arrangement_match = np.zeros(n, dtype=bool)
+    scores.salary_met = np.zeros(n, dtype=bool)
+    if not context.has_preferences:
+        return np.full(n, 0.5)
+
+    remote_ok = features.is_remote & context.wants_remote
+
+    # Location
+    if context.locations:
+        by_code = np.array([context.location_matches(loc) for loc in features.locations], dtype=bool)
+        scores.location_match = by_code[features.location_codes]
+        fallback = RELOCATE_SCORES.get(context.willing_to_relocate, 0.2)
+        location = np.where(scores.location_match | remote_ok, 1.0, fallback)
+    else:
+        location = np.full(n, 0.5)
+
+    # Salary
+    user_min = context.salary_min
+    if user_min is not None:
+        salary = features.salary
+        scores.salary_met = features.has_salary & (salary >= user_min)
+        salary_score = np.select(
+            [~features.has_salary, salary >= user_min, salary >= user_min * 0.9, salary >= user_min * 0.8],
+            [0.5, 1.0, 0.8, 0.6],
+            0.3,
+        )
+    else:
+        salary_score = np.full(n, 0.5)
+
+    # Work arrangement
+    if context.work_arrangements:
+        by_code = np.array([a in context.work_arrangements for a in features.arrangements], dtype=bool)
+        scores.arrangement_match = by_code[features.arrangement_codes]
+        arrangement = np.where(scores.arrangement_match | remote_ok, 1.0, 0.3)
+    else:
+        arrangement = np.full(n, 0.5)
+
+    # Opportunity type
+    if context.opportunity_types:
+        by_code = np.array([t in context.opportunity_types for t in features.types], dtype=bool)
+        opp_type = np.where(by_code[features.type_codes], 1.0, 0.2)
+    else:
+        opp_type = np.full(n, 0.5)
+
+    # Same left-to-right summation as sum(scores) / len(scores)
+    total = location + salary_score
+    total = total + arrangement
+    total = total + opp_type
+
+    # Company size only counts when both sides specify it
+    if context.company_sizes:
+        known = np.array([bool(s) for s in features.sizes], dtype=bool)[features.size_codes]
+        matched = np.array([s in context.company_sizes for s in features.sizes], dtype=bool)[features.size_codes]
+        size_score = np.where(matched, 1.0, 0.5)
+        final = np.where(known, (total + size_score) / 5, total / 4)
+    else:
+        final = total / 4
+    return round3(final)
+
+
+def _experience_scores(context: UserContext, features: CandidateFeatures) -> np.ndarray:
+    diff = np.abs(features.level_index - context.level_index)
+    score = np.select([diff == 0, diff == 1, diff == 2], [1.0, 0.7, 0.4], 0.2)
+    return np.where(features.level_index < 0, 0.5, score)
+
+
+def score_candidates(context: UserContext, features: CandidateFeatures) -> BatchScores:
+    """Compute skills, preferences and experience scores for all candidates."""
+    scores = BatchScores(context, features)
+    scores.skills = _skills_scores(context, features, scores)
+    scores.preferences = _preferences_scores(context, features, scores)
+    scores.experience = _experience_scores(context, features)
+    return scores
+
+
+def top_k(overall: np.ndarray, k: Optional[int] = None) -> np.ndarray:
+    """
+    Indices of the k best scores, best first.
+
+    Same order as a stable descending sort (ties keep candidate order),
+    but only the top k are sorted: `argpartition` finds the k-th score,
+    and only candidates at or above it go through the final sort.
+    """
+    n = len(overall)
+    if k is None or k >= n:
+        return np.argsort(-overall, kind="stable")
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+
+    kth = -np.partition(-overall, k - 1)[k - 1]
+    contenders = np.flatnonzero(overall >= kth)
+    order = np.lexsort((contenders, -overall[contenders]))
+    return contenders[order[:k]]
@@ -0,0 +1,314 @@
+"""
+Feed Snapshots - Materialized per-user ranked feeds
+
+Ranking the AI feed (embeddings, ANN search, batch scoring) is the expensive
+part of a feed request, yet consecutive requests from the same user almost
+always rank the same catalog against the same profile. A `FeedSnapshot`
+keeps the ranked head of that result so later pages are served by walking
+a list:
+
+- The snapshot is keyed by a version string built from the user's profile,
+  preferences, feed filters and the catalog version. Any change there (an
+  edited profile, new preferences, a sync adding or staling opportunities)
+  produces a new version and the next request re-ranks.
+- Swipes drop an id from the snapshot in O(1) (`discard`), without
+  re-ranking.
+- Pages are addressed by an opaque cursor (`encode_cursor`) naming the
+  snapshot and a position in it, so "next page" is an O(limit) slice. A
+  cursor for a snapshot that has since been replaced or expired is stale
+  and the caller serves a fresh ranking instead.
+- Snapshots expire after `FEED_SNAPSHOT_TTL_SECONDS` and start at
+  `FEED_SNAPSHOT_DEPTH` results (deeper when a client pages past the head).
+  At most `FEED_SNAPSHOT_MAX_USERS` snapshots holding `FEED_SNAPSHOT_MAX_ROWS`
+  results in total are kept; least recently used are evicted first.
+"""
+import base64
+import binascii
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Container, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.opportunity import Opportunity
+from app.services.matching import MatchResult
+
+logger = logging.getLogger(__name__)
+
+FEED_SNAPSHOT_TTL_SECONDS = int(os.getenv("FEED_SNAPSHOT_TTL_SECONDS", "600"))
+FEED_SNAPSHOT_MAX_USERS = int(os.getenv("FEED_SNAPSHOT_MAX_USERS", "2000"))
+# Ranked results kept per snapshot (pages beyond this trigger a re-rank)
+FEED_SNAPSHOT_DEPTH = int(os.getenv("FEED_SNAPSHOT_DEPTH", "200"))
+# Ranked results kept across all snapshots (bounds memory as users page deeper)
+FEED_SNAPSHOT_MAX_ROWS = int(os.getenv("FEED_SNAPSHOT_MAX_ROWS", str(FEED_SNAPSHOT_MAX_USERS * FEED_SNAPSHOT_DEPTH)))
+
+
+def catalog_version(db: Session) -> str:
+    """
+    Version of the feed-eligible catalog.
+
+    Changes when opportunities are added (max id), edited (max updated_at)
+    or leave the feed (active, non-stale count).
+    """
+    count, max_id, last_update = db.query(
+        func.count(Opportunity.id),
+        func.max(Opportunity.id),
+        func.max(Opportunity.updated_at),
+    ).filter(
+        Opportunity.is_active == True,
+        Opportunity.is_stale == False
+    ).one()
+    return f"{count}:{max_id}:{last_update}"
+
+
+def feed_version(
+    user_data: dict,
+    user_preferences: Optional[dict],
+    catalog: str,
+    **filters
+) -> str:
+    """Hash of everything a ranked feed depends on."""
+    payload = json.dumps(
+        [user_data, user_preferences, filters, catalog],
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def encode_cursor(snapshot_id: str, position: int, after_id: Optional[int]) -> str:
+    """Opaque page cursor: snapshot, position and the last id served."""
+    payload = json.dumps({"s": snapshot_id, "p": position, "a": after_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Optional[Tuple[str, int, Optional[int]]]:
+    """
+    Inverse of `encode_cursor`.
+
+    Returns:
+        (snapshot_id, position, after_id), or None if the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        snapshot_id, position, after_id = payload["s"], payload["p"], payload["a"]
+    except (binascii.Error, ValueError, KeyError, TypeError, UnicodeError):
+        return None
+    if not isinstance(snapshot_id, str) or not isinstance(position, int) or position < 0:
+        return None
+    if after_id is not None and not isinstance(after_id, int):
+        return None
+    return snapshot_id, position, after_id
+
+
+class FeedSnapshot:
+    """
+    Ranked head of one user's feed.
+    """
+
+    __slots__ = ("snapshot_id", "user_id", "version", "results", "total_available",
+                 "exhausted", "created_at", "_positions", "_removed")
+
+    def __init__(
+        self,
+        user_id: int,
+        version: str,
+        results: List[MatchResult],
+        total_available: int,
+        exhausted: bool = True
+    ):
+        """
+        Args:
+            exhausted: True when ranking deeper would not find more results
+        """
+        self.snapshot_id = uuid.uuid4().hex
+        self.user_id = user_id
+        self.version = version
+        self.results = results
+        self.total_available = total_available
+        self.exhausted = exhausted or len(results) >= total_available
+        self.created_at = time.monotonic()
+        self._positions = {r.opportunity_id: i for i, r in enumerate(results)}
+        self._removed = set()
+
+    def __len__(self) -> int:
+        return len(self.results) - len(self._removed)
+
+    def expired(self, ttl: float) -> bool:
+        return time.monotonic() - self.created_at > ttl
+
+    def discard(self, opportunity_id: int) -> None:
+        """Drop an opportunity (e.g. after a swipe)."""
+        if opportunity_id in self._positions:
+            self._removed.add(opportunity_id)
+
+    @property
+    def remaining(self) -> int:
+        """Opportunities still available to the user (not just those held here)."""
+        return max(self.total_available - len(self._removed), 0)
+
+    def page(
+        self,
+        limit: int,
+        start: int = 0,
+        exclude: Container[int] = ()
+    ) -> Tuple[List[MatchResult], int]:
+        """
+        Next `limit` results from position `start`, skipping discarded ids
+        and `exclude`.
+
+        Returns:
+            (results, position to continue from)
+        """
+        # Anything with fast membership (a set, a SwipedBitmap) is used as is
+        exclude = set(exclude) if isinstance(exclude, (list, tuple)) else exclude
+        page = []
+        position = start
+        while position < len(self.results) and len(page) < limit:
+            result = self.results[position]
+            position += 1
+            if result.opportunity_id in self._removed or result.opportunity_id in exclude:
+                continue
+            page.append(result)
+        return page, position
+
+    def position_after(self, opportunity_id: Optional[int], default: int) -> int:
+        """Position following `opportunity_id`, or `default` if it is not held."""
+        position = self._positions.get(opportunity_id)
+        if position is None:
+            return min(default, len(self.results))
+        return position + 1
+
+
+class FeedSnapshotCache:
+    """
+    Per-user snapshots with a TTL and an LRU bound on the number of users
+    and on the results they hold in total.
+    """
+
+    def __init__(
+        self,
+        max_users: int = FEED_SNAPSHOT_MAX_USERS,
+        ttl_seconds: float = FEED_SNAPSHOT_TTL_SECONDS,
+        depth: int = FEED_SNAPSHOT_DEPTH,
+        max_rows: int = FEED_SNAPSHOT_MAX_ROWS,
+    ):
+        self.max_users = max_users
+        self.ttl_seconds = ttl_seconds
+        self.depth = depth
+        self.max_rows = max_rows
+        self._snapshots: "OrderedDict[int, FeedSnapshot]" = OrderedDict()
+        self._rows = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._snapshots)
+
+    @property
+    def rows(self) -> int:
+        """Results held across all snapshots."""
+        return self._rows
+
+    def _pop(self, user_id: int) -> None:
+        """Drop a user's snapshot (call with the lock held)."""
+        snapshot = self._snapshots.pop(user_id, None)
+        if snapshot is not None:
+            self._rows -= len(snapshot.results)
+
+    def get(self, user_id: int, version: str) -> Optional[FeedSnapshot]:
+        """Current snapshot for a user, or None if missing, stale or expired."""
+        with self._lock:
+            snapshot = self._snapshots.get(user_id)
+            if snapshot is None or snapshot.version != version or snapshot.expired(self.ttl_seconds):
+                if snapshot is not None:
+                    self._pop(user_id)
+                self.misses += 1
+                return None
+            self._snapshots.move_to_end(user_id)
+            self.hits += 1
+            return snapshot
+
+    def put(
+        self,
+        user_id: int,
+        version: str,
+        results: List[MatchResult],
+        total_available: int,
+        depth: Optional[int] = None
+    ) -> FeedSnapshot:
+        """
+        Store a freshly ranked feed and return it.
+
+        Results are truncated to `depth` (default: the cache's depth; deeper
+        snapshots are built when a client pages past the stored head).
+        """
+        depth = depth or self.depth
+        snapshot = FeedSnapshot(
+            user_id, version, results[:depth], total_available, exhausted=len(results) < depth
+        )
+        with self._lock:
+            self._pop(user_id)
+            self._snapshots[user_id] = snapshot
+            self._rows += len(snapshot.results)
+            # The newest snapshot is kept even if it alone exceeds max_rows
+            while len(self._snapshots) > 1 and (
+                len(self._snapshots) > self.max_users or self._rows > self.max_rows
+            ):
+                self._pop(next(iter(self._snapshots)))
+        return snapshot
+
+    def discard(self, user_id: int, opportunity_id: int) -> None:
+        """Remove one opportunity from a user's snapshot, if any."""
+        with self._lock:
+            snapshot = self._snapshots.get(user_id)
+            if snapshot is not None:
+                snapshot.discard(opportunity_id)
+
+    def invalidate(self, user_id: int) -> None:
+        """Drop a user's snapshot so the next request re-ranks."""
+        with self._lock:
+            self._pop(user_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._snapshots.clear()
+            self._rows = 0
+
+    def metrics(self) -> dict:
+        return {
+            "users": len(self._snapshots),
+            "max_users": self.max_users,
+            "ttl_seconds": self.ttl_seconds,
+            "depth": self.depth,
+            "rows": self._rows,
+            "max_rows": self.max_rows,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+# ============================================================================
+# Process-wide cache
+# ============================================================================
+
+_cache = FeedSnapshotCache()
+
+
+def get_feed_snapshots() -> FeedSnapshotCache:
+    return _cache
+
+
+def reset_feed_snapshots() -> None:
+    """Drop every snapshot (used by tests)."""
+    global _cache
+    _cache = FeedSnapshotCache()
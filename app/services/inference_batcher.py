@@ -0,0 +1,167 @@
+"""
+Inference Batcher - Dynamic micro-batching for embedding requests
+
+Concurrent callers of `generate_embedding` each used to call
+`model.encode` on their own, serialising on the GIL and wasting the model's
+batch efficiency. The batcher queues their texts, and a single worker thread
+gathers whatever arrives within a short window (`max_wait_ms`) or until
+`max_batch_size` texts are waiting, encodes them in calls of at most
+`max_batch_size` texts and fans the rows back out to each caller's future.
+
+Tuning (environment):
+    EMBEDDING_MICROBATCH=1            enable (off by default: callers use the model directly)
+    EMBEDDING_BATCH_MAX_SIZE=64       max texts per encode call
+    EMBEDDING_BATCH_MAX_WAIT_MS=5     how long the first request waits for company
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MICROBATCH_ENABLED = os.getenv("EMBEDDING_MICROBATCH", "0") == "1"
+BATCH_MAX_SIZE = int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", "64"))
+BATCH_MAX_WAIT_MS = float(os.getenv("EMBEDDING_BATCH_MAX_WAIT_MS", "5"))
+
+
+class MicroBatcher:
+    """
+    Collects encode requests from many threads into batched model calls.
+    """
+
+    def __init__(
+        self,
+        encode_fn: Callable[[List[str]], np.ndarray],
+        max_batch_size: int = BATCH_MAX_SIZE,
+        max_wait_ms: float = BATCH_MAX_WAIT_MS,
+    ):
+        """
+        Args:
+            encode_fn: Encodes a list of texts into a (n, dim) array
+            max_batch_size: Upper bound on texts per encode call (larger
+                requests are split across calls)
+            max_wait_ms: Max time a request waits for others to join its batch
+        """
+        self.encode_fn = encode_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._queue: "queue.Queue[tuple]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._stopped = False
+
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._texts = 0
+        self._max_queue_depth = 0
+        self._last_batch_size = 0
+        self._total_wait = 0.0
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._start_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._stopped = False
+                self._worker = threading.Thread(
+                    target=self._run, name="embedding-microbatcher", daemon=True
+                )
+                self._worker.start()
+
+    def submit(self, texts: Sequence[str]) -> Future:
+        """Queue texts for encoding; the future resolves to a (len(texts), dim) array."""
+        future: Future = Future()
+        self._ensure_worker()
+        self._queue.put((list(texts), future, time.monotonic()))
+        with self._stats_lock:
+            self._max_queue_depth = max(self._max_queue_depth, self._queue.qsize())
+        return future
+
+    def encode(self, texts: Sequence[str], timeout: Optional[float] = None) -> np.ndarray:
+        """Blocking helper: submit and wait for the result."""
+        return self.submit(texts).result(timeout=timeout)
+
+    def _collect(self) -> List[tuple]:
+        """Block for the first request, then gather more until full or the window closes."""
+        first = self._queue.get()
+        if first is None:
+            return []
+        batch = [first]
+        size = len(first[0])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self._stopped = True
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    def _run(self) -> None:
+        while not self._stopped:
+            batch = self._collect()
+            if not batch:
+                break
+
+            texts = [text for item in batch for text in item[0]]
+            started = time.monotonic()
+            chunks = range(0, len(texts), self.max_batch_size)
+            try:
+                vectors = np.concatenate([
+                    np.asarray(self.encode_fn(texts[start:start + self.max_batch_size])) for start in chunks
+                ])
+            except Exception as e:
+                logger.error(f"Batched encode of {len(texts)} texts failed: {e}")
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                continue
+
+            offset = 0
+            for item_texts, future, _ in batch:
+                future.set_result(vectors[offset:offset + len(item_texts)])
+                offset += len(item_texts)
+
+            with self._stats_lock:
+                self._batches += len(chunks)
+                self._texts += len(texts)
+                self._last_batch_size = len(texts) - chunks[-1]
+                self._total_wait += sum(
+                    (started - enqueued) * len(item_texts) for item_texts, _, enqueued in batch
+                )
+
+    def shutdown(self, timeout: float = 1.0) -> None:
+        """Stop the worker thread after it finishes the current batch."""
+        if self._worker is not None and self._worker.is_alive():
+            self._queue.put(None)
+            self._worker.join(timeout)
+        self._worker = None
+
+    def metrics(self) -> dict:
+        """Queue-depth and batching statistics for monitoring."""
+        with self._stats_lock:
+            return {
+                "enabled": True,
+                "queue_depth": self._queue.qsize(),
+                "max_queue_depth": self._max_queue_depth,
+                "batches": self._batches,
+                "texts": self._texts,
+                "avg_batch_size": round(self._texts / self._batches, 2) if self._batches else 0.0,
+                "last_batch_size": self._last_batch_size,
+                "avg_queue_wait_ms": round(1000 * self._total_wait / self._texts, 3) if self._texts else 0.0,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000,
+            }
@@ -12,12 +12,14 @@ from datetime import datetime, timedelta
 from typing import List, Optional, Dict, Any
 import logging
 
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy import and_, or_
 
 from app.services.job_adapters import get_adapter, AVAILABLE_SOURCES
 from app.schemas.opportunity import OpportunityCreate, SyncResponse
 from app.models.opportunity import Opportunity
+from app.services.embedding_store import refresh_embeddings_in_background
+from app.services.ann_index import index_remove
 
 
 logger = logging.getLogger(__name__)
@@ -130,6 +132,7 @@ class JobSyncService:
         """
         inserted = 0
         updated = 0
+        saved: List[Opportunity] = []
         
         for job_data in jobs:
             try:
@@ -157,6 +160,7 @@ class JobSyncService:
                     existing.url = job_data.url
                     existing.application_url = job_data.url
                     existing.mark_refreshed()
+                    saved.append(existing)
                     updated += 1
                 else:
                     # Insert new job
@@ -180,6 +184,7 @@ class JobSyncService:
                         is_stale=False
                     )
                     self.db.add(new_job)
+                    saved.append(new_job)
                     inserted += 1
                     
             except Exception as e:
@@ -188,12 +193,22 @@ class JobSyncService:
         
         # Commit all changes
         try:
+            # Ids are read before the commit expires the rows
+            self.db.flush()
+            saved_ids = [job.id for job in saved if job.id is not None]
             self.db.commit()
         except Exception as e:
             logger.error(f"Error committing jobs: {e}")
             self.db.rollback()
             raise
         
+        # Embed inserted/changed jobs once here instead of on every feed request,
+        # in a worker thread with its own session so the event loop keeps serving
+        if saved_ids:
+            await asyncio.to_thread(
+                refresh_embeddings_in_background, saved_ids, sessionmaker(bind=self.db.get_bind())
+            )
+        
         logger.info(f"Saved jobs: {inserted} inserted, {updated} updated")
         return inserted, updated
     
@@ -211,22 +226,26 @@ class JobSyncService:
         cutoff = datetime.utcnow() - timedelta(hours=hours)
         
         # Only mark jobs from the synced sources as stale
-        stale_count = self.db.query(Opportunity).filter(
-            and_(
-                Opportunity.source.in_(sources),
-                Opportunity.is_stale == False,
-                or_(
-                    Opportunity.refreshed_at == None,
-                    Opportunity.refreshed_at < cutoff
-                )
+        stale_filter = and_(
+            Opportunity.source.in_(sources),
+            Opportunity.is_stale == False,
+            or_(
+                Opportunity.refreshed_at == None,
+                Opportunity.refreshed_at < cutoff
             )
-        ).update(
+        )
+        stale_ids = [row[0] for row in self.db.query(Opportunity.id).filter(stale_filter).all()]
+        
+        stale_count = self.db.query(Opportunity).filter(stale_filter).update(
             {"is_stale": True},
             synchronize_session=False
         )
         
         self.db.commit()
         
+        # Stale jobs must no longer be retrieved as semantic candidates
+        index_remove(stale_ids)
+        
         if stale_count > 0:
             logger.info(f"Marked {stale_count} jobs as stale")
         
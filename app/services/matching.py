@@ -10,9 +10,15 @@ Scoring Components:
 The weights can be adjusted based on user feedback and A/B testing.
 """
 import logging
-from typing import List, Dict, Any, Optional, Tuple
+import os
+from typing import Callable, List, Dict, Any, Optional, Sequence, Tuple
 from dataclasses import dataclass
 
+import numpy as np
+
+from app.models.opportunity import Opportunity
+from app.models.preferences import UserPreferences
+from app.models.user import User
 from app.services.embedding import (
     get_user_embedding,
     get_opportunity_embedding,
@@ -20,6 +26,17 @@ from app.services.embedding import (
     cosine_similarity,
     cosine_similarity_batch,
 )
+from app.services.opportunity_features import normalized
+from app.services.skill_vocabulary import get_skill_vocabulary
+from app.services.sharded_scoring import sharded_top_rows, should_shard
+from app.services.feature_matrix import (
+    BatchScores,
+    CandidateFeatures,
+    UserContext,
+    round3,
+    score_candidates,
+    top_k as select_top_k,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -32,8 +49,23 @@ DEFAULT_WEIGHTS = {
     "experience": 0.10,    # Experience level alignment
 }
 
+# Two-stage ranking: only the best M candidates by skills, preferences and
+# experience get a semantic score (0 scores every candidate)
+MATCH_SEMANTIC_BUDGET = int(os.getenv("MATCH_SEMANTIC_BUDGET", "0"))
+
+# Above this many results, reason lists are shared between candidates that
+# would get identical ones instead of being built one by one
+REASON_INDEX_MIN_RESULTS = 256
+
+
+def _combine(bits: List[int]) -> int:
+    combined = 0
+    for bit in bits:
+        combined |= bit
+    return combined
 
-@dataclass
+
+@dataclass(slots=True)
 class MatchResult:
     """Result of matching an opportunity to a user."""
     opportunity_id: int
@@ -51,15 +83,21 @@ class MatchingService:
     Service for AI-powered opportunity matching.
     """
 
-    def __init__(self, weights: Optional[Dict[str, float]] = None):
+    def __init__(
+        self,
+        weights: Optional[Dict[str, float]] = None,
+        semantic_budget: int = MATCH_SEMANTIC_BUDGET
+    ):
         """
         Initialize the matching service.
 
         Args:
             weights: Custom weights for scoring components
+            semantic_budget: Candidates that get a semantic score in batch
+                matching (0 = all; see `match_opportunities_batch`)
         """
         self.weights = weights or DEFAULT_WEIGHTS.copy()
-        self._user_embedding_cache: Dict[int, List[float]] = {}
+        self.semantic_budget = semantic_budget
 
     def calculate_skills_score(
         self,
@@ -68,7 +106,8 @@ class MatchingService:
         preferred_skills: List[str] = None
     ) -> Tuple[float, List[str]]:
         """
-        Calculate skills match using Jaccard similarity.
+        Calculate skills match as the share of required and preferred
+        skills the user has, using canonical skill bitsets.
 
         Args:
             user_skills: User's skills
@@ -78,26 +117,26 @@ class MatchingService:
         Returns:
             Tuple of (score, matched_skills)
         """
-        user_set = set(s.lower() for s in (user_skills or []))
-        required_set = set(s.lower() for s in (required_skills or []))
-        preferred_set = set(s.lower() for s in (preferred_skills or []))
+        # Canonical skill bitsets (aliases and case folded by the vocabulary)
+        user_bits, required_bits, preferred_bits = get_skill_vocabulary().skill_bits(
+            user_skills, required_skills, preferred_skills
+        )
+        user_set = _combine(user_bits)
+        required_set = _combine(required_bits)
+        preferred_set = _combine(preferred_bits)
 
         # No requirements = perfect match
         if not required_set and not preferred_set:
             return 1.0, []
 
-        # Calculate overlap
-        required_match = user_set & required_set
-        preferred_match = user_set & preferred_set
-
         # Weighted score: required skills matter more
         if required_set:
-            required_score = len(required_match) / len(required_set)
+            required_score = (user_set & required_set).bit_count() / required_set.bit_count()
         else:
             required_score = 1.0
 
         if preferred_set:
-            preferred_score = len(preferred_match) / len(preferred_set)
+            preferred_score = (user_set & preferred_set).bit_count() / preferred_set.bit_count()
         else:
             preferred_score = 1.0
 
@@ -105,10 +144,8 @@ class MatchingService:
         score = 0.7 * required_score + 0.3 * preferred_score
 
         # Return matched skills (use original case from user's skills)
-        matched = []
-        for skill in (user_skills or []):
-            if skill.lower() in required_match or skill.lower() in preferred_match:
-                matched.append(skill)
+        wanted = required_set | preferred_set
+        matched = [skill for skill, bit in zip(user_skills or [], user_bits) if bit & wanted]
 
         return round(score, 3), matched
 
@@ -135,7 +172,7 @@ class MatchingService:
 
         # Location match
         preferred_locations = user_preferences.get("preferred_locations", [])
-        opp_location = (opportunity.get("location") or "").lower()
+        opp_location = normalized(opportunity, "location")
         opp_is_remote = opportunity.get("is_remote", False)
         willing_to_relocate = user_preferences.get("willing_to_relocate", "no")
 
@@ -192,7 +229,7 @@ class MatchingService:
 
         # Work arrangement match
         work_arrangements = [w.lower() for w in user_preferences.get("work_arrangements", [])]
-        opp_arrangement = (opportunity.get("work_arrangement") or "").lower()
+        opp_arrangement = normalized(opportunity, "work_arrangement")
 
         if work_arrangements:
             if opp_arrangement in work_arrangements:
@@ -208,7 +245,7 @@ class MatchingService:
 
         # Opportunity type match
         preferred_types = [t.lower() for t in user_preferences.get("opportunity_types", [])]
-        opp_type = (opportunity.get("opportunity_type") or "job").lower()
+        opp_type = normalized(opportunity, "opportunity_type")
 
         if preferred_types:
             if opp_type in preferred_types:
@@ -220,7 +257,7 @@ class MatchingService:
 
         # Company size match (if specified)
         preferred_sizes = [s.lower() for s in user_preferences.get("company_sizes", [])]
-        opp_size = (opportunity.get("company_size") or "").lower()
+        opp_size = normalized(opportunity, "company_size")
 
         if preferred_sizes and opp_size:
             if opp_size in preferred_sizes:
@@ -247,7 +284,7 @@ class MatchingService:
         Returns:
             Score between 0 and 1
         """
-        opp_level = (opportunity.get("experience_level") or "entry").lower()
+        opp_level = normalized(opportunity, "experience_level")
 
         # Estimate user's experience level from work history
         work_experiences = user_data.get("work_experiences", [])
@@ -292,7 +329,8 @@ class MatchingService:
         user_data: dict,
         user_preferences: Optional[dict],
         opportunity: dict,
-        user_embedding: Optional[List[float]] = None
+        user_embedding: Optional[List[float]] = None,
+        opportunity_embedding: Optional[Sequence[float]] = None
     ) -> MatchResult:
         """
         Calculate match score for a single opportunity.
@@ -302,6 +340,7 @@ class MatchingService:
             user_preferences: User's job preferences
             opportunity: Opportunity data
             user_embedding: Pre-computed user embedding (optional)
+            opportunity_embedding: Stored opportunity embedding (optional)
 
         Returns:
             MatchResult with scores and reasons
@@ -311,7 +350,9 @@ class MatchingService:
             user_embedding = get_user_embedding(user_data)
 
         # Get opportunity embedding
-        opp_embedding = get_opportunity_embedding(opportunity)
+        opp_embedding = opportunity_embedding
+        if opp_embedding is None:
+            opp_embedding = get_opportunity_embedding(opportunity)
 
         # Calculate semantic similarity
         semantic_score = cosine_similarity(user_embedding, opp_embedding)
@@ -359,19 +400,204 @@ class MatchingService:
             match_reasons=match_reasons[:5]  # Limit reasons
         )
 
+    def score_batch(
+        self,
+        user_data: dict,
+        user_preferences: Optional[dict],
+        features: CandidateFeatures,
+        semantic_scores: np.ndarray
+    ) -> Tuple[np.ndarray, BatchScores]:
+        """
+        Score encoded candidates with array operations.
+
+        Args:
+            user_data: User profile data
+            user_preferences: User's job preferences
+            features: Encoded candidates
+            semantic_scores: Semantic scores already normalised to [0, 1]
+
+        Returns:
+            Tuple of (rounded overall scores, component scores)
+        """
+        scores = score_candidates(UserContext(user_data, user_preferences), features)
+        return self.blend(semantic_scores, scores), scores
+
+    def blend(self, semantic_scores: np.ndarray, scores: BatchScores, rows=slice(None)) -> np.ndarray:
+        """
+        Rounded weighted overall score of candidates `rows`.
+
+        Args:
+            semantic_scores: Normalised semantic scores of `rows`
+            scores: Component scores of every candidate
+            rows: Candidate indices (default: all)
+        """
+        # Same operand order as match_opportunity
+        return round3(
+            self.weights["semantic"] * semantic_scores +
+            self.weights["skills"] * scores.skills[rows] +
+            self.weights["preferences"] * scores.preferences[rows] +
+            self.weights["experience"] * scores.experience[rows]
+        )
+
+    def cheap_scores(self, scores: BatchScores) -> np.ndarray:
+        """Weighted skills, preferences and experience (no semantic part)."""
+        return (
+            self.weights["skills"] * scores.skills +
+            self.weights["preferences"] * scores.preferences +
+            self.weights["experience"] * scores.experience
+        )
+
+    def shortlist(self, scores: BatchScores, budget: int) -> np.ndarray:
+        """
+        Cheap first stage: indices (ascending) of the `budget` best
+        candidates by skills, preferences and experience alone.
+        """
+        return np.sort(select_top_k(self.cheap_scores(scores), budget))
+
+    def _similarities(
+        self,
+        user_data: dict,
+        opportunities: List[dict],
+        rows: Optional[np.ndarray],
+        opportunity_embeddings: Optional[Sequence[Sequence[float]]],
+        user_embedding: Optional[List[float]],
+        semantic_similarities: Optional[Sequence[float]],
+        similarity_fn: Optional[Callable[[List[dict]], Sequence[float]]],
+    ) -> np.ndarray:
+        """Raw cosine similarities of candidates `rows` (all if None)."""
+        if semantic_similarities is not None:
+            similarities = np.asarray(semantic_similarities, dtype=np.float64)
+            if rows is not None:
+                similarities = similarities[rows]
+        else:
+            subset = opportunities if rows is None else [opportunities[i] for i in rows.tolist()]
+            if similarity_fn is not None:
+                similarities = similarity_fn(subset)
+            else:
+                # Get user embedding once
+                if user_embedding is None:
+                    user_embedding = get_user_embedding(user_data)
+
+                # Use stored opportunity embeddings, encoding in batch only if absent
+                opp_embeddings = opportunity_embeddings
+                if opp_embeddings is None:
+                    opp_embeddings = get_opportunity_embeddings_batch(subset)
+                elif rows is not None:
+                    opp_embeddings = np.asarray(opp_embeddings)[rows]
+
+                # Calculate semantic similarities in batch
+                similarities = cosine_similarity_batch(user_embedding, opp_embeddings)
+        return np.asarray(similarities, dtype=np.float64)
+
+    def _semantic_scores(
+        self,
+        user_data: dict,
+        opportunities: List[dict],
+        rows: Optional[np.ndarray],
+        opportunity_embeddings: Optional[Sequence[Sequence[float]]],
+        user_embedding: Optional[List[float]],
+        semantic_similarities: Optional[Sequence[float]],
+        similarity_fn: Optional[Callable[[List[dict]], Sequence[float]]],
+    ) -> np.ndarray:
+        """Semantic scores in [0, 1] of candidates `rows` (all if None)."""
+        similarities = self._similarities(
+            user_data, opportunities, rows, opportunity_embeddings, user_embedding,
+            semantic_similarities, similarity_fn
+        )
+        # Normalize from [-1, 1] to [0, 1]
+        return (similarities + 1) / 2
+
+    def _match_sharded(
+        self,
+        user_data: dict,
+        user_preferences: Optional[dict],
+        opportunities: List[dict],
+        features: CandidateFeatures,
+        budget: int,
+        top_k: Optional[int],
+        opportunity_embeddings: Optional[Sequence[Sequence[float]]],
+        user_embedding: Optional[List[float]],
+        semantic_similarities: Optional[Sequence[float]],
+        similarity_fn: Optional[Callable[[List[dict]], Sequence[float]]],
+    ) -> List[MatchResult]:
+        """
+        `match_opportunities_batch` with the full scoring pass spread over
+        the sharded-scoring process pool. The pool only selects the rows
+        that can appear in the result (the two-stage shortlist, or the top
+        k); those are then matched in-process as usual.
+        """
+        context = UserContext(user_data, user_preferences)
+        if budget and len(opportunities) > budget:
+            # Semantic scores are still only computed for the shortlist
+            rows = sharded_top_rows(features, context, self.weights, budget)
+            similarities = semantic_similarities
+        else:
+            similarities = self._similarities(
+                user_data, opportunities, None, opportunity_embeddings, user_embedding,
+                semantic_similarities, similarity_fn
+            )
+            rows = sharded_top_rows(features, context, self.weights, top_k, (similarities + 1) / 2)
+
+        return self.match_opportunities_batch(
+            user_data,
+            user_preferences,
+            [opportunities[i] for i in rows.tolist()],
+            opportunity_embeddings=None if opportunity_embeddings is None else np.asarray(opportunity_embeddings)[rows],
+            user_embedding=user_embedding,
+            semantic_similarities=None if similarities is None else np.asarray(similarities, dtype=np.float64)[rows],
+            features=features.take(rows),
+            top_k=top_k,
+            similarity_fn=similarity_fn,
+            semantic_budget=budget,
+            sharded=False,
+        )
+
     def match_opportunities_batch(
         self,
         user_data: dict,
         user_preferences: Optional[dict],
-        opportunities: List[dict]
+        opportunities: List[dict],
+        opportunity_embeddings: Optional[Sequence[Sequence[float]]] = None,
+        user_embedding: Optional[List[float]] = None,
+        semantic_similarities: Optional[Sequence[float]] = None,
+        features: Optional[CandidateFeatures] = None,
+        top_k: Optional[int] = None,
+        similarity_fn: Optional[Callable[[List[dict]], Sequence[float]]] = None,
+        semantic_budget: Optional[int] = None,
+        sharded: Optional[bool] = None
     ) -> List[MatchResult]:
         """
         Match multiple opportunities efficiently using batch embedding.
 
+        Scores are computed as array operations (see feature_matrix) and are
+        identical to calling `match_opportunity` on each candidate.
+
+        With a semantic budget M, ranking runs in two stages: every candidate
+        is ranked by skills, preferences and experience, and only the best M
+        get a semantic score and the final weighted blend. Scores of the
+        returned results are unchanged; candidates outside the shortlist are
+        never returned.
+
+        Very large candidate sets are scored on a process pool when sharded
+        scoring is enabled (see sharded_scoring); results are identical.
+
         Args:
             user_data: User profile data
             user_preferences: User's job preferences
             opportunities: List of opportunity data
+            opportunity_embeddings: Stored embeddings row-aligned with
+                `opportunities` (see embedding_store). Encoded on the fly if omitted.
+            user_embedding: Pre-computed user embedding (optional)
+            semantic_similarities: Pre-computed raw cosine similarities
+                row-aligned with `opportunities` (skips embeddings entirely)
+            features: Pre-encoded `CandidateFeatures` of `opportunities` (optional)
+            top_k: Only return the best k results; matched skills and
+                reasons are only built for those (all candidates if omitted)
+            similarity_fn: Returns raw cosine similarities for a list of
+                opportunities; called only for the candidates that need them
+            semantic_budget: Override the service's `semantic_budget`
+            sharded: Force (True) or prevent (False) sharded scoring
+                (default: by candidate count)
 
         Returns:
             List of MatchResults sorted by score (best first)
@@ -379,65 +605,75 @@ class MatchingService:
         if not opportunities:
             return []
 
-        # Get user embedding once
-        user_embedding = get_user_embedding(user_data)
-
-        # Get all opportunity embeddings in batch
-        opp_embeddings = get_opportunity_embeddings_batch(opportunities)
-
-        # Calculate semantic similarities in batch
-        semantic_scores = cosine_similarity_batch(user_embedding, opp_embeddings)
-        # Normalize from [-1, 1] to [0, 1]
-        semantic_scores = [(s + 1) / 2 for s in semantic_scores]
-
-        results = []
-        for i, opp in enumerate(opportunities):
-            # Calculate skills score
-            skills_score, matched_skills = self.calculate_skills_score(
-                user_data.get("skills", []),
-                opp.get("required_skills", []),
-                opp.get("preferred_skills", [])
+        if features is None:
+            features = CandidateFeatures(opportunities)
+        budget = self.semantic_budget if semantic_budget is None else semantic_budget
+
+        if sharded is None:
+            sharded = should_shard(len(opportunities))
+        # Only worth it when the pool can narrow the candidates down
+        if sharded and ((budget and len(opportunities) > budget) or (top_k is not None and top_k < len(opportunities))):
+            return self._match_sharded(
+                user_data, user_preferences, opportunities, features, budget, top_k,
+                opportunity_embeddings, user_embedding, semantic_similarities, similarity_fn
             )
 
-            # Calculate preferences score
-            preferences_score, match_reasons = self.calculate_preferences_score(
-                user_preferences or {},
-                opp
+        if budget and len(opportunities) > budget:
+            scores = score_candidates(UserContext(user_data, user_preferences), features)
+            rows = self.shortlist(scores, budget)
+            semantic = self._semantic_scores(
+                user_data, opportunities, rows, opportunity_embeddings, user_embedding,
+                semantic_similarities, similarity_fn
             )
-
-            # Calculate experience score
-            experience_score = self.calculate_experience_score(user_data, opp)
-
-            # Weighted overall score
-            semantic_score = semantic_scores[i]
-            overall_score = (
-                self.weights["semantic"] * semantic_score +
-                self.weights["skills"] * skills_score +
-                self.weights["preferences"] * preferences_score +
-                self.weights["experience"] * experience_score
+            overall = self.blend(semantic, scores, rows)
+            # Shortlist rows are ascending, so ties still break by input order
+            local = select_top_k(overall, top_k)
+            order = rows[local]
+            overall, semantic = overall[local], semantic[local]
+        else:
+            semantic = self._semantic_scores(
+                user_data, opportunities, None, opportunity_embeddings, user_embedding,
+                semantic_similarities, similarity_fn
             )
+            overall, scores = self.score_batch(user_data, user_preferences, features, semantic)
+            # Select and order the best results (stable, like list.sort)
+            order = select_top_k(overall, top_k)
+            overall, semantic = overall[order], semantic[order]
+
+        if len(order) > REASON_INDEX_MIN_RESULTS:
+            scores.index_reasons()
+
+        # Only the selected rows are turned into Python objects
+        ids = [opportunities[i].get("id", 0) for i in order.tolist()]
+        overall_list = overall.tolist()
+        semantic_raw = semantic.tolist()
+        semantic_list = round3(semantic).tolist()
+        skills_list = scores.skills[order].tolist()
+        preferences_list = scores.preferences[order].tolist()
+        experience_list = scores.experience[order].tolist()
+
+        results = []
+        for rank, i in enumerate(order.tolist()):
+            matched_skills = scores.matched_skills(i)
 
             # Build match reasons
-            reasons = match_reasons.copy()
-            if semantic_score > 0.7:
+            reasons = scores.preference_reasons(i)
+            if semantic_raw[rank] > 0.7:
                 reasons.insert(0, "Strong profile match")
-            if skills_score > 0.7 and matched_skills:
+            if skills_list[rank] > 0.7 and matched_skills:
                 reasons.insert(0, f"Skills match: {', '.join(matched_skills[:3])}")
 
             results.append(MatchResult(
-                opportunity_id=opp.get("id", 0),
-                overall_score=round(overall_score, 3),
-                semantic_score=round(semantic_score, 3),
-                skills_score=round(skills_score, 3),
-                preferences_score=round(preferences_score, 3),
-                experience_score=round(experience_score, 3),
-                matched_skills=matched_skills,
-                match_reasons=reasons[:5]
+                ids[rank],
+                overall_list[rank],
+                semantic_list[rank],
+                skills_list[rank],
+                preferences_list[rank],
+                experience_list[rank],
+                matched_skills,
+                reasons[:5]
             ))
 
-        # Sort by overall score (best first)
-        results.sort(key=lambda x: x.overall_score, reverse=True)
-
         return results
 
 
@@ -451,3 +687,84 @@ def get_matching_service(weights: Optional[Dict[str, float]] = None) -> Matching
     if _matching_service is None or weights is not None:
         _matching_service = MatchingService(weights)
     return _matching_service
+
+
+# Model -> dict conversion for the matching service (API, batch job, reverse matching)
+
+def user_to_dict(user: User) -> dict:
+    """Convert User model to dictionary for matching service."""
+    return {
+        "id": user.id,
+        "name": user.name,
+        "headline": user.headline,
+        "bio": user.bio,
+        "skills": user.skills or [],
+        "work_experiences": user.work_experiences or [],
+        "education_entries": user.education_entries or [],
+        "projects": user.projects or [],
+        "interests": user.interests or [],
+        "goals": user.goals,
+    }
+
+
+def preferences_to_dict(prefs: Optional[UserPreferences]) -> dict:
+    """Convert UserPreferences model to dictionary."""
+    if not prefs:
+        return {}
+    return {
+        "desired_job_titles": prefs.desired_job_titles or [],
+        "preferred_locations": prefs.preferred_locations or [],
+        "willing_to_relocate": prefs.willing_to_relocate,
+        "salary_min": prefs.salary_min,
+        "salary_max": prefs.salary_max,
+        "salary_currency": prefs.salary_currency,
+        "job_levels": prefs.job_levels or [],
+        "work_arrangements": prefs.work_arrangements or [],
+        "opportunity_types": prefs.opportunity_types or [],
+        "preferred_industries": prefs.preferred_industries or [],
+        "company_sizes": prefs.company_sizes or [],
+        "must_have_opportunity_types": bool(prefs.must_have_opportunity_types),
+        "must_have_work_arrangements": bool(prefs.must_have_work_arrangements),
+        "must_have_salary": bool(prefs.must_have_salary),
+        "must_have_countries": bool(prefs.must_have_countries),
+    }
+
+
+def opportunity_to_dict(opp: Opportunity) -> dict:
+    """Convert Opportunity model to dictionary."""
+    return {
+        "id": opp.id,
+        "title": opp.title,
+        "description": opp.description,
+        "company_name": opp.company_name,
+        "company": opp.company,
+        "company_logo_url": opp.company_logo_url,
+        "company_size": opp.company_size,
+        "location": opp.location,
+        "city": opp.city,
+        "country": opp.country,
+        "is_remote": opp.is_remote,
+        "salary_min": opp.salary_min,
+        "salary_max": opp.salary_max,
+        "salary_currency": opp.salary_currency,
+        "is_salary_visible": opp.is_salary_visible,
+        "job_type": opp.job_type,
+        "opportunity_type": opp.opportunity_type,
+        "work_arrangement": opp.work_arrangement,
+        "experience_level": opp.experience_level,
+        "education_requirement": opp.education_requirement,
+        "required_skills": opp.required_skills or [],
+        "preferred_skills": opp.preferred_skills or [],
+        "required_skill_ids": opp.required_skill_ids,
+        "preferred_skill_ids": opp.preferred_skill_ids,
+        "location_norm": opp.location_norm,
+        "work_arrangement_norm": opp.work_arrangement_norm,
+        "opportunity_type_norm": opp.opportunity_type_norm,
+        "company_size_norm": opp.company_size_norm,
+        "experience_level_norm": opp.experience_level_norm,
+        "description_excerpt": opp.description_excerpt,
+        "category": opp.category,
+        "url": opp.url,
+        "application_url": opp.application_url,
+        "source": opp.source,
+    }
@@ -0,0 +1,45 @@
+"""
+Opportunity Cards - Opportunity summaries shown next to applications,
+swipes and conversations
+
+Listings used to reach the opportunity through the lazy `.opportunity`
+relationship, one query per row. `card_loader` eager-loads it in the
+listing's own query (card columns only) and `opportunity_card` turns the
+loaded row into the response dict, so every listing returns the same
+fields for the same card.
+"""
+from typing import Optional, Sequence
+
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.attributes import InstrumentedAttribute
+
+from app.models.opportunity import Opportunity
+
+# Applications and conversations (OpportunityBrief)
+BRIEF_COLUMNS = (
+    Opportunity.id,
+    Opportunity.title,
+    Opportunity.company_name,
+    Opportunity.company_logo_url,
+    Opportunity.city,
+    Opportunity.country,
+)
+
+# Pending swipes (OpportunityCardResponse)
+SWIPE_CARD_COLUMNS = BRIEF_COLUMNS + (
+    Opportunity.is_remote,
+    Opportunity.opportunity_type,
+    Opportunity.description,
+)
+
+
+def card_loader(relationship: InstrumentedAttribute, columns: Sequence = BRIEF_COLUMNS):
+    """Loader option joining a many-to-one opportunity relationship, card columns only."""
+    return joinedload(relationship).load_only(*columns)
+
+
+def opportunity_card(opportunity: Optional[Opportunity], columns: Sequence = BRIEF_COLUMNS) -> Optional[dict]:
+    """Card dict of an opportunity loaded through `card_loader` with the same columns."""
+    if opportunity is None:
+        return None
+    return {column.key: getattr(opportunity, column.key) for column in columns}
@@ -0,0 +1,147 @@
+"""
+Opportunity Features - Normalized matching inputs stored with each row
+
+Matching and search used to re-derive the same values from the raw columns
+on every request: lowercased location, country, work arrangement, type,
+company size and level, the 500-character description excerpt embedded by
+`build_opportunity_text`, and the skill text. They are now derived once and
+stored on the opportunity (`*_norm`, `description_excerpt`, `skills_text`),
+filled in automatically on insert and update, so sync, bulk and CSV import
+and the CRUD endpoints all get them. `is_remote` is stored as a strict
+boolean at the same time.
+
+Readers go through `normalized`, which falls back to deriving the value
+for rows written before the columns existed.
+
+Backfill existing rows with:
+    python -m app.services.opportunity_features
+"""
+import logging
+from typing import Optional, Sequence
+
+from sqlalchemy import event, inspect
+
+from app.models.opportunity import Opportunity
+
+logger = logging.getLogger(__name__)
+
+# Characters of the description used by `build_opportunity_text`
+DESCRIPTION_CHARS = 500
+
+# Normalized column -> (source column, value used when the source is empty)
+NORMALIZED_COLUMNS = {
+    "location_norm": ("location", ""),
+    "country_norm": ("country", ""),
+    "work_arrangement_norm": ("work_arrangement", ""),
+    "opportunity_type_norm": ("opportunity_type", "job"),
+    "company_size_norm": ("company_size", ""),
+    "experience_level_norm": ("experience_level", "entry"),
+}
+
+# Source columns whose changes trigger a recompute
+SOURCE_COLUMNS = tuple(source for source, _ in NORMALIZED_COLUMNS.values()) + (
+    "description", "required_skills", "preferred_skills", "is_remote",
+)
+
+
+def normalize(value: Optional[str], default: str = "") -> str:
+    """Lowercased value, as the matching rules compare it."""
+    return (value or default).lower()
+
+
+def normalized(opportunity: dict, field: str) -> str:
+    """
+    Normalized value of `field` (e.g. "location") from an opportunity dict:
+    the stored `<field>_norm` when present, derived otherwise.
+    """
+    stored = opportunity.get(f"{field}_norm")
+    if stored is not None:
+        return stored
+    return normalize(opportunity.get(field), NORMALIZED_COLUMNS[f"{field}_norm"][1])
+
+
+def skills_text(required: Optional[Sequence[str]], preferred: Optional[Sequence[str]]) -> str:
+    """Lowercased distinct skill names, comma-separated (required first)."""
+    names = (str(s).strip().lower() for s in list(required or []) + list(preferred or []))
+    return ", ".join(dict.fromkeys(name for name in names if name))
+
+
+def derive_opportunity_features(opportunity: Opportunity) -> dict:
+    """Derived column values of an opportunity, from its raw columns."""
+    features = {
+        column: normalize(getattr(opportunity, source), default)
+        for column, (source, default) in NORMALIZED_COLUMNS.items()
+    }
+    description = opportunity.description
+    features["description_excerpt"] = description[:DESCRIPTION_CHARS] if description is not None else None
+    features["skills_text"] = skills_text(opportunity.required_skills, opportunity.preferred_skills)
+    features["is_remote"] = bool(opportunity.is_remote)
+    return features
+
+
+def assign_opportunity_features(opportunity: Opportunity) -> bool:
+    """
+    Store an opportunity's derived columns.
+
+    Returns:
+        Whether any value changed
+    """
+    changed = False
+    for column, value in derive_opportunity_features(opportunity).items():
+        if getattr(opportunity, column) != value:
+            setattr(opportunity, column, value)
+            changed = True
+    return changed
+
+
+@event.listens_for(Opportunity, "before_insert")
+def _features_on_insert(mapper, connection, target):
+    # Column defaults are only applied by the INSERT itself; derive from
+    # the values that will actually be stored
+    for column in SOURCE_COLUMNS:
+        default = Opportunity.__table__.c[column].default
+        if getattr(target, column) is None and default is not None and default.is_scalar:
+            setattr(target, column, default.arg)
+    assign_opportunity_features(target)
+
+
+@event.listens_for(Opportunity, "before_update")
+def _features_on_update(mapper, connection, target):
+    state = inspect(target)
+    if target.location_norm is None or any(
+        getattr(state.attrs, column).history.has_changes() for column in SOURCE_COLUMNS
+    ):
+        assign_opportunity_features(target)
+
+
+def backfill_opportunity_features(db, batch_size: int = 500) -> int:
+    """
+    Recompute the derived columns of every opportunity.
+
+    Returns:
+        Number of opportunities updated
+    """
+    updated = 0
+    last_id = 0
+    while True:
+        batch = db.query(Opportunity).filter(Opportunity.id > last_id).order_by(Opportunity.id).limit(batch_size).all()
+        if not batch:
+            break
+        for opp in batch:
+            updated += assign_opportunity_features(opp)
+        db.commit()
+        last_id = batch[-1].id
+    return updated
+
+
+if __name__ == "__main__":
+    from app.database import SessionLocal
+    from app.services import skill_vocabulary  # noqa: F401 (registers skill-id listeners)
+
+    logging.basicConfig(level=logging.INFO)
+    db = SessionLocal()
+    try:
+        count = backfill_opportunity_features(db)
+        print(f"Updated derived features on {count} opportunities")
+    finally:
+        db.close()
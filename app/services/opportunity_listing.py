@@ -0,0 +1,135 @@
+"""
+Opportunity Listing - Queries behind the opportunity listing and swipe feed
+
+`GET /opportunities` and `GET /opportunities/feed` build their queries
+here, so the endpoints and the query-plan audit (query_audit) issue the
+same SQL.
+"""
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy import desc, func, or_
+from sqlalchemy.orm import Query, Session, load_only
+
+from app.models.opportunity import Opportunity
+from app.schemas.opportunity import OpportunityResponse
+
+# Columns serialized by OpportunityResponse (skips skill ids and derived columns)
+RESPONSE_COLUMNS = tuple(
+    getattr(Opportunity, name) for name in Opportunity.__mapper__.column_attrs.keys()
+    if name in OpportunityResponse.model_fields
+)
+
+
+def listing_query(
+    db: Session,
+    search: Optional[str] = None,
+    source: Optional[str] = None,
+    location: Optional[str] = None,
+    job_type: Optional[str] = None,
+    remote: Optional[bool] = None,
+    include_stale: bool = False,
+    min_salary: Optional[int] = None,
+    max_salary: Optional[int] = None,
+) -> Query:
+    """Opportunities matching the listing filters (unordered)."""
+    query = db.query(Opportunity)
+
+    # Exclude stale by default
+    if not include_stale:
+        query = query.filter(Opportunity.is_stale == False)
+
+    if search:
+        search_term = f"%{search}%"
+        query = query.filter(
+            or_(
+                Opportunity.title.ilike(search_term),
+                Opportunity.description.ilike(search_term),
+                Opportunity.company_name.ilike(search_term),
+                Opportunity.company.ilike(search_term),
+                # Stored lowercase (see opportunity_features)
+                Opportunity.skills_text.like(f"%{search.lower()}%"),
+            )
+        )
+
+    if source:
+        query = query.filter(Opportunity.source == source)
+
+    if location:
+        query = query.filter(Opportunity.location.ilike(f"%{location}%"))
+
+    if job_type:
+        query = query.filter(Opportunity.job_type == job_type)
+
+    if remote is not None:
+        query = query.filter(Opportunity.is_remote == remote)
+
+    if min_salary is not None:
+        query = query.filter(
+            or_(
+                Opportunity.salary_min >= min_salary,
+                Opportunity.salary_max >= min_salary
+            )
+        )
+
+    if max_salary is not None:
+        query = query.filter(
+            or_(
+                Opportunity.salary_max <= max_salary,
+                Opportunity.salary_min <= max_salary
+            )
+        )
+
+    return query
+
+
+def listing_page(db: Session, page: int = 1, per_page: int = 20, **filters) -> Tuple[int, List[Opportunity]]:
+    """
+    One page of the listing, most recent first.
+
+    Args:
+        filters: `listing_query` filters
+
+    Returns:
+        (total matching, opportunities on the page)
+    """
+    query = listing_query(db, **filters)
+
+    # Get total count (without selecting the rows)
+    total = query.with_entities(func.count(Opportunity.id)).scalar()
+
+    offset = (page - 1) * per_page
+    opportunities = query.order_by(desc(Opportunity.created_at)).options(
+        load_only(*RESPONSE_COLUMNS)
+    ).offset(offset).limit(per_page).all()
+    return total, opportunities
+
+
+def swipe_feed(
+    db: Session,
+    limit: int = 20,
+    exclude_ids: Sequence[int] = (),
+    locations: Sequence[str] = (),
+    job_types: Sequence[str] = (),
+    remote_preferred: Optional[bool] = None,
+) -> List[Opportunity]:
+    """Freshest non-stale opportunities for the swipe feed."""
+    query = db.query(Opportunity).filter(Opportunity.is_stale == False)
+
+    # Exclude already-seen jobs
+    if exclude_ids:
+        query = query.filter(~Opportunity.id.in_(exclude_ids))
+
+    # Apply preferences (simple filtering for MVP)
+    if locations:
+        query = query.filter(or_(*(Opportunity.location.ilike(f"%{loc}%") for loc in locations)))
+
+    if job_types:
+        query = query.filter(Opportunity.job_type.in_(job_types))
+
+    if remote_preferred is True:
+        query = query.filter(Opportunity.is_remote == True)
+
+    # Order by freshness
+    query = query.order_by(desc(Opportunity.refreshed_at))
+
+    return query.options(load_only(*RESPONSE_COLUMNS)).limit(limit).all()
@@ -0,0 +1,118 @@
+"""
+Preference Filters - "Must-have" preferences compiled into SQL
+
+By default every preference only adjusts the preferences score, so a
+wrong-type or under-paid opportunity still reaches the scorer and merely
+ranks lower. A user can mark some preferences as must-haves; those become
+`WHERE` clauses on indexed opportunity columns, so excluded opportunities
+are never loaded:
+
+- must_have_opportunity_types: opportunity_type_norm IN (...)
+- must_have_work_arrangements: work_arrangement_norm IN (...), or a remote
+  opportunity when "remote" is accepted
+- must_have_salary: best known salary (max, else min) >= salary_min;
+  opportunities without salary information (NULL or 0) are kept
+- must_have_countries: country_norm IN (countries of preferred_locations);
+  remote opportunities are kept
+
+Types, arrangements and countries compare the stored lowercase `*_norm`
+columns (app/services/opportunity_features.py), the values the scorer
+matches on, so "Internship" passes an "internship" must-have. A must-have flag whose
+preference list is empty is ignored. `must_have_mask` applies the same
+rules to the in-memory opportunity catalog.
+"""
+from typing import List, Optional
+
+import numpy as np
+from sqlalchemy import and_, or_
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.models.opportunity import Opportunity
+
+def _lowercase(values) -> List[str]:
+    return sorted({str(v).strip().lower() for v in values or [] if v and str(v).strip()})
+
+
+def preferred_countries(user_preferences: dict) -> List[str]:
+    """Country names from `preferred_locations` (dict entries only)."""
+    return [
+        loc.get("country") for loc in user_preferences.get("preferred_locations") or []
+        if isinstance(loc, dict) and loc.get("country")
+    ]
+
+
+def must_have_clauses(user_preferences: Optional[dict]) -> List[ColumnElement]:
+    """
+    SQL conditions for the user's must-have preferences.
+
+    Args:
+        user_preferences: Preferences dictionary (see `preferences_to_dict`)
+
+    Returns:
+        Conditions to AND onto an Opportunity query (empty if none apply)
+    """
+    prefs = user_preferences or {}
+    clauses = []
+
+    types = _lowercase(prefs.get("opportunity_types"))
+    if prefs.get("must_have_opportunity_types") and types:
+        clauses.append(Opportunity.opportunity_type_norm.in_(types))
+
+    arrangements = _lowercase(prefs.get("work_arrangements"))
+    if prefs.get("must_have_work_arrangements") and arrangements:
+        clause = Opportunity.work_arrangement_norm.in_(arrangements)
+        if "remote" in arrangements:
+            clause = or_(clause, Opportunity.is_remote == True)
+        clauses.append(clause)
+
+    salary_min = prefs.get("salary_min")
+    if prefs.get("must_have_salary") and salary_min:
+        # 0 means "not given", as in calculate_preferences_score
+        no_max = or_(Opportunity.salary_max.is_(None), Opportunity.salary_max == 0)
+        no_min = or_(Opportunity.salary_min.is_(None), Opportunity.salary_min == 0)
+        clauses.append(or_(
+            Opportunity.salary_max >= salary_min,
+            and_(no_max, Opportunity.salary_min >= salary_min),
+            and_(no_max, no_min),
+        ))
+
+    countries = _lowercase(preferred_countries(prefs))
+    if prefs.get("must_have_countries") and countries:
+        clauses.append(or_(Opportunity.country_norm.in_(countries), Opportunity.is_remote == True))
+
+    return clauses
+
+
+def must_have_mask(catalog, user_preferences: Optional[dict]) -> np.ndarray:
+    """
+    `must_have_clauses` evaluated over an in-memory `OpportunityCatalog`.
+
+    Returns:
+        Boolean mask of catalog rows that satisfy every must-have
+    """
+    prefs = user_preferences or {}
+    mask = np.ones(len(catalog), dtype=bool)
+
+    types = _lowercase(prefs.get("opportunity_types"))
+    if prefs.get("must_have_opportunity_types") and types:
+        mask &= catalog.in_values(catalog.type_codes, catalog.types, types)
+
+    arrangements = _lowercase(prefs.get("work_arrangements"))
+    if prefs.get("must_have_work_arrangements") and arrangements:
+        allowed = catalog.in_values(catalog.arrangement_codes, catalog.arrangements, arrangements)
+        if "remote" in arrangements:
+            allowed |= catalog.is_remote
+        mask &= allowed
+
+    salary_min = prefs.get("salary_min")
+    if prefs.get("must_have_salary") and salary_min:
+        no_max = np.isnan(catalog.salary_max) | (catalog.salary_max == 0)
+        no_min = np.isnan(catalog.salary_min) | (catalog.salary_min == 0)
+        # NaN comparisons are False, like NULL in SQL
+        mask &= (catalog.salary_max >= salary_min) | (no_max & (catalog.salary_min >= salary_min)) | (no_max & no_min)
+
+    countries = _lowercase(preferred_countries(prefs))
+    if prefs.get("must_have_countries") and countries:
+        mask &= catalog.in_values(catalog.country_codes, catalog.countries, countries) | catalog.is_remote
+
+    return mask
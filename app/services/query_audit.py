@@ -0,0 +1,155 @@
+"""
+Query Audit - EXPLAIN the hot queries and flag full table scans
+
+Runs the project's hot read paths (opportunity listing and swipe feed, the
+daily swipe limit, swipe history, the catalog version and the AI feed
+candidate filter) against a database, captures every SELECT they issue and
+asks the planner how it would execute it:
+
+- SQLite: `EXPLAIN QUERY PLAN`; a `SCAN <table>` step is a full scan.
+- PostgreSQL: `EXPLAIN` with sequential scans disabled, so a `Seq Scan`
+  means no usable index exists (small tables are otherwise always
+  seq-scanned).
+
+The per-user queries run for `--user-id` (default 1; the user does not
+need to exist for the plan to be meaningful).
+
+Exits non-zero if any hot query scans a whole table:
+    python -m app.services.query_audit           # configured DATABASE_URL
+    python -m app.services.query_audit --fresh   # empty SQLite from the models
+"""
+import argparse
+import re
+import sys
+from typing import Callable, Dict, List, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.database import Base
+from app.models.opportunity import Opportunity
+from app.services.feed_snapshot import catalog_version
+from app.services.opportunity_listing import listing_page, swipe_feed
+from app.services.swipe_history import swipe_history
+from app.services.user_counters import get_user_counters, swipes_used_today
+
+# Name -> callable(db, user_id) issuing the query through the code that serves it
+HOT_QUERIES: Dict[str, Callable[[Session, int], object]] = {
+    "opportunity listing": lambda db, user_id: listing_page(db),
+    "swipe feed": lambda db, user_id: swipe_feed(db),
+    "daily swipe limit": lambda db, user_id: swipes_used_today(get_user_counters(db, user_id)),
+    "swipe history": lambda db, user_id: swipe_history(db, user_id),
+    "catalog version": lambda db, user_id: catalog_version(db),
+    # Typed AI feed candidates (`_rank_ai_feed`)
+    "feed candidates by type": lambda db, user_id: db.query(Opportunity.id).filter(
+        Opportunity.is_active == True,
+        Opportunity.is_stale == False,
+        Opportunity.opportunity_type_norm == "internship",
+    ).all(),
+}
+
+_SQLITE_SCAN = re.compile(r"^SCAN (\w+)")
+_POSTGRES_SCAN = re.compile(r"Seq Scan on (\w+)")
+
+
+def capture_selects(db: Session, run: Callable[[Session], object]) -> List[Tuple[str, object]]:
+    """SELECT statements (with parameters) issued by `run(db)`."""
+    statements = []
+
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", _capture)
+    try:
+        run(db)
+    finally:
+        event.remove(engine, "before_cursor_execute", _capture)
+        db.rollback()
+    return statements
+
+
+def explain(db: Session, statement: str, parameters) -> Tuple[List[str], List[str]]:
+    """
+    Query plan of one statement.
+
+    Returns:
+        (plan lines, tables scanned in full)
+    """
+    connection = db.connection()
+    tables = Base.metadata.tables
+    if connection.dialect.name == "sqlite":
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+        lines = [row[-1] for row in rows]
+        matches = (_SQLITE_SCAN.match(line) for line in lines)
+    else:
+        connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        lines = [row[0] for row in connection.exec_driver_sql(f"EXPLAIN {statement}", parameters).all()]
+        matches = (_POSTGRES_SCAN.search(line) for line in lines)
+    # Strip SQLAlchemy alias suffixes ("opportunities_1"); subqueries are not tables
+    scanned = [m.group(1) for m in matches if m and re.sub(r"_\d+$", "", m.group(1)) in tables]
+    db.rollback()
+    return lines, scanned
+
+
+def audit_hot_queries(db: Session, user_id: int = 1) -> Dict[str, List[dict]]:
+    """
+    Plans of every hot query.
+
+    Args:
+        user_id: User the per-user queries run for
+
+    Returns:
+        Query name -> [{"statement", "plan", "full_scans"}] per SELECT issued
+    """
+    report = {}
+    for name, run in HOT_QUERIES.items():
+        report[name] = []
+        for statement, parameters in capture_selects(db, lambda session: run(session, user_id)):
+            plan, scanned = explain(db, statement, parameters)
+            report[name].append({"statement": statement, "plan": plan, "full_scans": scanned})
+    return report
+
+
+def full_scans(report: Dict[str, List[dict]]) -> List[Tuple[str, str]]:
+    """(query name, table) for every full table scan in `report`."""
+    return [(name, table) for name, plans in report.items() for entry in plans for table in entry["full_scans"]]
+
+
+if __name__ == "__main__":
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+
+    from app.database import SessionLocal
+    from app.models import application, conversation, document, embedding, match_score, preferences, skill, swipe  # noqa: F401
+
+    parser = argparse.ArgumentParser(description="EXPLAIN the hot queries and fail on full table scans")
+    parser.add_argument("--fresh", action="store_true", help="Audit an empty in-memory SQLite built from the models")
+    parser.add_argument("--user-id", type=int, default=1, help="User the per-user queries run for")
+    parser.add_argument("--verbose", action="store_true", help="Print the SQL of each statement")
+    args = parser.parse_args()
+
+    if args.fresh:
+        fresh = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+        Base.metadata.create_all(bind=fresh)
+        db = sessionmaker(bind=fresh)()
+    else:
+        db = SessionLocal()
+    try:
+        report = audit_hot_queries(db, args.user_id)
+    finally:
+        db.close()
+
+    for name, plans in report.items():
+        for entry in plans:
+            status = f"FULL SCAN of {', '.join(entry['full_scans'])}" if entry["full_scans"] else "ok"
+            print(f"{name}: {status}")
+            if args.verbose:
+                print("    " + " ".join(entry["statement"].split()))
+            for line in entry["plan"]:
+                print(f"    {line}")
+    problems = full_scans(report)
+    print(f"\n{sum(len(plans) for plans in report.values())} statements, {len(problems)} full table scans")
+    sys.exit(1 if problems else 0)
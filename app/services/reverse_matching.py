@@ -0,0 +1,362 @@
+"""
+Reverse Matching - Rank screened users for one opportunity
+
+`MatchingService` scores one user against many opportunities. Recruiters
+need the transpose: every screened user against one opportunity. Doing
+that with `match_opportunity` per user means one embedding lookup and one
+pass of the scalar rules per user. Instead a `UserPool` holds the user side
+column-encoded, built once per process:
+
+- A row-normalised float32 matrix of profile embeddings (read from
+  `user_embeddings`, encoding only missing or outdated profiles), so the
+  semantic component of all users is one matrix-vector product.
+- Each user's canonical skill ids in CSR form, estimated experience level,
+  and preference lists (locations, arrangements, types, company sizes) as
+  codes over their distinct values. The preference rules then run once per
+  distinct value and are spread to users with `bincount`.
+
+`UserPool.score` reproduces the skills, preferences and experience rules
+of `calculate_*_score` (and `MatchingService.blend`) for every user at
+once.
+
+The pool is rebuilt when screened users are added or edited, at most once
+every USER_POOL_REFRESH_SECONDS, and unconditionally after
+USER_POOL_MAX_AGE_SECONDS (preference rows carry no timestamp).
+"""
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app.models.preferences import UserPreferences
+from app.models.user import User
+from app.services.batch_matching import _normalize_rows
+from app.services.embedding_store import load_user_embeddings
+from app.services.feature_matrix import LEVEL_ORDER, RELOCATE_SCORES, UserContext, round3, top_k
+from app.services.matching import MatchingService, preferences_to_dict, user_to_dict
+from app.services.opportunity_features import normalized
+from app.services.skill_vocabulary import TemporaryIds, get_skill_vocabulary
+
+logger = logging.getLogger(__name__)
+
+# Minimum seconds between rebuilds (profile edits show up within this delay)
+USER_POOL_REFRESH_SECONDS = int(os.getenv("USER_POOL_REFRESH_SECONDS", "60"))
+# Rebuild after this many seconds even without detected changes
+USER_POOL_MAX_AGE_SECONDS = int(os.getenv("USER_POOL_MAX_AGE_SECONDS", "900"))
+
+
+def _encode_lists(lists: Sequence[Sequence[str]]) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    """Dictionary-encode per-user string lists into (codes, owner rows, distinct values)."""
+    lookup: Dict[str, int] = {}
+    codes, owner = [], []
+    for row, values in enumerate(lists):
+        for value in values:
+            codes.append(lookup.setdefault(value, len(lookup)))
+            owner.append(row)
+    return np.array(codes, dtype=np.int32), np.array(owner, dtype=np.int32), list(lookup)
+
+
+class EncodedLists:
+    """Per-user string lists, for "does the user's list contain X" over all users."""
+
+    def __init__(self, lists: Sequence[Sequence[str]]):
+        self.size = len(lists)
+        self.codes, self.owner, self.values = _encode_lists(lists)
+        self.non_empty = np.bincount(self.owner, minlength=self.size) > 0
+
+    def any_of(self, matches: np.ndarray) -> np.ndarray:
+        """Users with at least one value for which `matches[code]` is True."""
+        if not len(self.codes):
+            return np.zeros(self.size, dtype=bool)
+        return np.bincount(self.owner[matches[self.codes]], minlength=self.size) > 0
+
+    def contains(self, value: str) -> np.ndarray:
+        """Users whose list contains `value` exactly."""
+        return self.any_of(np.array([v == value for v in self.values], dtype=bool))
+
+
+class UserScores:
+    """Component scores of every user in a pool for one opportunity."""
+
+    def __init__(self, skills: np.ndarray, preferences: np.ndarray, experience: np.ndarray,
+                 semantic: np.ndarray, overall: np.ndarray, opportunity_skill_ids: set):
+        self.skills = skills
+        self.preferences = preferences
+        self.experience = experience
+        self.semantic = semantic
+        self.overall = overall
+        self.opportunity_skill_ids = opportunity_skill_ids
+
+
+class UserPool:
+    """
+    Column-encoded matching inputs of a set of users (see module docstring).
+    """
+
+    def __init__(
+        self,
+        users: Sequence[Tuple[dict, Optional[dict]]],
+        vectors: np.ndarray,
+        version: Optional[tuple] = None,
+    ):
+        self.version = version
+        self.built_at = time.monotonic()
+        n = len(users)
+        self.size = n
+        contexts = [UserContext(user_data, prefs) for user_data, prefs in users]
+
+        self.ids = np.array([user_data["id"] for user_data, _ in users], dtype=np.int64)
+        self.names = [user_data.get("name") for user_data, _ in users]
+        self.skills = [context.skills for context in contexts]
+        self.vectors = _normalize_rows(vectors) if n else np.zeros((0, vectors.shape[1]), dtype=np.float32)
+
+        # Canonical skill ids in CSR form (one entry per distinct user skill)
+        self.vocabulary = get_skill_vocabulary()
+        self.temporary_ids = TemporaryIds(self.vocabulary.next_id)
+        skill_ids, owner = [], []
+        for row, context in enumerate(contexts):
+            ids = {sid for sid in (self.skill_id(s) for s in context.skill_set) if sid is not None}
+            skill_ids.extend(ids)
+            owner.extend([row] * len(ids))
+        self.skill_ids = np.array(skill_ids, dtype=np.int64)
+        self.skill_owner = np.array(owner, dtype=np.int32)
+
+        self.level_index = np.array([context.level_index for context in contexts], dtype=np.int32)
+
+        self.has_preferences = np.array([context.has_preferences for context in contexts], dtype=bool)
+        self.locations = EncodedLists([context.locations for context in contexts])
+        self.relocate_fallback = np.array(
+            [RELOCATE_SCORES.get(context.willing_to_relocate, 0.2) for context in contexts], dtype=np.float64
+        )
+        self.salary_min = np.array(
+            [np.nan if context.salary_min is None else context.salary_min for context in contexts],
+            dtype=np.float64,
+        )
+        self.arrangements = EncodedLists([context.work_arrangements for context in contexts])
+        self.wants_remote = np.array([context.wants_remote for context in contexts], dtype=bool)
+        self.types = EncodedLists([context.opportunity_types for context in contexts])
+        self.sizes = EncodedLists([context.company_sizes for context in contexts])
+
+    def __len__(self) -> int:
+        return self.size
+
+    def skill_id(self, name: str) -> Optional[int]:
+        """Vocabulary id of a skill name in this pool's id space."""
+        return self.vocabulary.id_or_temporary(name, self.temporary_ids)
+
+    def _opportunity_skill_ids(self, opportunity: dict, field: str) -> List[int]:
+        """Same id set as `CandidateFeatures._skill_sets`, in this pool's id space."""
+        stored = opportunity.get(field[:-1] + "_ids")
+        if stored is not None and all(sid < self.temporary_ids.base for sid in stored):
+            return list(stored)
+        return list({sid for sid in (self.skill_id(s) for s in opportunity.get(field) or []) if sid is not None})
+
+    def has_skills(self, names: Sequence[str]) -> np.ndarray:
+        """Users who list every one of `names`."""
+        mask = np.ones(self.size, dtype=bool)
+        for name in names:
+            sid = self.skill_id(name)
+            if sid is None:
+                continue
+            mask &= np.bincount(self.skill_owner[self.skill_ids == sid], minlength=self.size) > 0
+        return mask
+
+    def _skills_scores(self, required: List[int], preferred: List[int]) -> np.ndarray:
+        n = self.size
+        if not required and not preferred:
+            return np.ones(n)
+        id_space = max([self.temporary_ids.base + len(self.temporary_ids)] + [sid + 1 for sid in required + preferred])
+        in_required = np.zeros(id_space)
+        in_required[required] = 1.0
+        in_preferred = np.zeros(id_space)
+        in_preferred[preferred] = 1.0
+        ids = self.skill_ids[self.skill_ids < id_space]
+        owner = self.skill_owner[self.skill_ids < id_space]
+        required_hits = np.bincount(owner, weights=in_required[ids], minlength=n)
+        preferred_hits = np.bincount(owner, weights=in_preferred[ids], minlength=n)
+
+        required_score = required_hits / len(required) if required else np.ones(n)
+        preferred_score = preferred_hits / len(preferred) if preferred else np.ones(n)
+        # Weight: 70% required, 30% preferred
+        return round3(0.7 * required_score + 0.3 * preferred_score)
+
+    def _preferences_scores(self, opportunity: dict) -> np.ndarray:
+        n = self.size
+        remote_ok = bool(opportunity.get("is_remote", False)) & self.wants_remote
+
+        # Location
+        opp_location = normalized(opportunity, "location")
+        location_match = self.locations.any_of(np.array(
+            [loc in opp_location or opp_location in loc for loc in self.locations.values], dtype=bool
+        ))
+        location = np.where(
+            self.locations.non_empty, np.where(location_match | remote_ok, 1.0, self.relocate_fallback), 0.5
+        )
+
+        # Salary
+        has_salary = opportunity.get("salary_min") is not None or opportunity.get("salary_max") is not None
+        salary = float(opportunity.get("salary_max") or opportunity.get("salary_min") or 0)
+        user_min = self.salary_min
+        if has_salary:
+            # NaN (no minimum) compares False and falls through to the default
+            salary_score = np.select(
+                [salary >= user_min, salary >= user_min * 0.9, salary >= user_min * 0.8],
+                [1.0, 0.8, 0.6],
+                0.3,
+            )
+            salary_score[np.isnan(user_min)] = 0.5
+        else:
+            salary_score = np.full(n, 0.5)
+
+        # Work arrangement
+        arrangement_match = self.arrangements.contains(normalized(opportunity, "work_arrangement"))
+        arrangement = np.where(
+            self.arrangements.non_empty, np.where(arrangement_match | remote_ok, 1.0, 0.3), 0.5
+        )
+
+        # Opportunity type
+        type_match = self.types.contains(normalized(opportunity, "opportunity_type"))
+        opp_type = np.where(self.types.non_empty, np.where(type_match, 1.0, 0.2), 0.5)
+
+        # Same left-to-right summation as sum(scores) / len(scores)
+        total = location + salary_score
+        total = total + arrangement
+        total = total + opp_type
+
+        # Company size only counts when both sides specify it
+        opp_size = normalized(opportunity, "company_size")
+        if opp_size:
+            size_score = np.where(self.sizes.contains(opp_size), 1.0, 0.5)
+            final = np.where(self.sizes.non_empty, (total + size_score) / 5, total / 4)
+        else:
+            final = total / 4
+        return np.where(self.has_preferences, round3(final), 0.5) if n else np.zeros(0)
+
+    def _experience_scores(self, opportunity: dict) -> np.ndarray:
+        level = normalized(opportunity, "experience_level")
+        if level not in LEVEL_ORDER:
+            return np.full(self.size, 0.5)
+        diff = np.abs(self.level_index - LEVEL_ORDER.index(level))
+        return np.select([diff == 0, diff == 1, diff == 2], [1.0, 0.7, 0.4], 0.2)
+
+    def score(
+        self,
+        opportunity: dict,
+        opportunity_vector: Sequence[float],
+        service: Optional[MatchingService] = None,
+    ) -> UserScores:
+        """
+        Score every user in the pool against one opportunity.
+
+        Args:
+            opportunity: Opportunity dictionary (see `opportunity_to_dict`)
+            opportunity_vector: The opportunity's embedding
+            service: Supplies the component weights (default: a fresh service)
+        """
+        service = service or MatchingService()
+        required = self._opportunity_skill_ids(opportunity, "required_skills")
+        preferred = self._opportunity_skill_ids(opportunity, "preferred_skills")
+
+        query = _normalize_rows(np.asarray(opportunity_vector, dtype=np.float32)[None, :])[0]
+        semantic = (self.vectors @ query).astype(np.float64)
+        semantic = (semantic + 1) / 2
+
+        scores = UserScores(
+            skills=self._skills_scores(required, preferred),
+            preferences=self._preferences_scores(opportunity),
+            experience=self._experience_scores(opportunity),
+            semantic=semantic,
+            overall=None,
+            opportunity_skill_ids=set(required) | set(preferred),
+        )
+        scores.overall = service.blend(semantic, scores)
+        return scores
+
+    def matched_skills(self, row: int, scores: UserScores) -> List[str]:
+        """User skills (original case) found in the opportunity's skills."""
+        return [s for s in self.skills[row] if self.skill_id(s) in scores.opportunity_skill_ids]
+
+    def rank(
+        self,
+        scores: UserScores,
+        mask: Optional[np.ndarray] = None,
+        skip: int = 0,
+        limit: int = 20,
+    ) -> Tuple[np.ndarray, int]:
+        """
+        Rows of one page of users by overall score (ties keep user order).
+
+        Returns:
+            (rows of the page, number of users passing `mask`)
+        """
+        if mask is None:
+            candidates = np.arange(self.size)
+        else:
+            candidates = np.flatnonzero(mask)
+        order = top_k(scores.overall[candidates], skip + limit)
+        return candidates[order[skip:skip + limit]], len(candidates)
+
+
+def user_pool_version(db: Session) -> tuple:
+    """Changes when screened users are added, removed or edited."""
+    count, max_id, last_update = db.query(
+        func.count(User.id), func.max(User.id), func.max(User.updated_at)
+    ).filter(User.screening_completed == True, User.is_active == True).one()
+    preferences = db.query(func.count(UserPreferences.id)).scalar()
+    return count, max_id, str(last_update), preferences
+
+
+def build_user_pool(db: Session, version: Optional[tuple] = None) -> UserPool:
+    """Encode every active, screened user."""
+    started = time.perf_counter()
+    version = version or user_pool_version(db)
+    users = db.query(User).filter(
+        User.screening_completed == True, User.is_active == True
+    ).order_by(User.id).all()
+    prefs = {p.user_id: p for p in db.query(UserPreferences).all()}
+    rows = [(user_to_dict(user), preferences_to_dict(prefs.get(user.id))) for user in users]
+
+    # Stored skill ids must resolve against an up-to-date vocabulary
+    get_skill_vocabulary(db)
+    vectors = load_user_embeddings(db, [user_data for user_data, _ in rows])
+    pool = UserPool(rows, vectors, version)
+    logger.info(f"Built user pool: {len(pool)} users in {time.perf_counter() - started:.2f}s")
+    return pool
+
+
+# ============================================================================
+# Process-wide pool
+# ============================================================================
+
+_pool: Optional[UserPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_user_pool(db: Session) -> UserPool:
+    """Current pool, rebuilt as described in the module docstring."""
+    global _pool
+    with _pool_lock:
+        pool = _pool
+        if pool is not None:
+            age = time.monotonic() - pool.built_at
+            if age < USER_POOL_REFRESH_SECONDS:
+                return pool
+            version = user_pool_version(db)
+            if version == pool.version and age < USER_POOL_MAX_AGE_SECONDS:
+                return pool
+        else:
+            version = user_pool_version(db)
+        _pool = build_user_pool(db, version)
+        return _pool
+
+
+def reset_user_pool() -> None:
+    """Drop the pool (the next request rebuilds it)."""
+    global _pool
+    with _pool_lock:
+        _pool = None
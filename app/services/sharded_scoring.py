@@ -0,0 +1,291 @@
+"""
+Sharded Scoring - Multi-core candidate scoring for very large candidate sets
+
+`score_candidates` is vectorized but runs on one core, and the request
+thread is busy meanwhile. With SHARDED_SCORING=1, `match_opportunities_batch`
+hands candidate sets of at least SHARDED_SCORING_MIN_CANDIDATES to a
+persistent process pool instead:
+
+1. The `CandidateFeatures` arrays are copied once into a shared-memory
+   segment, kept for as long as the features object lives. Candidates
+   taken from a larger encoding (`CandidateFeatures.take`, e.g. the feed's
+   eligible rows of the catalog) export that full encoding instead, so the
+   catalog is exported once however many users and filters score it. The
+   distinct-value tables travel in the same segment, pickled.
+2. Per call, a second, short-lived segment carries the candidates' rows in
+   the exported encoding (for a taken subset) and the normalised semantic
+   scores (when already known).
+3. Each worker attaches to the segments, scores one contiguous shard of
+   the candidates and returns only its local top m rows and their ranking
+   key.
+4. The parent merges the per-shard heads into the global top m. Ties
+   break by row, as in `top_k`, so the selected rows are exactly those the
+   single-process ranking would pick.
+
+The threshold should be set from a measurement of this machine's overhead
+(segment export, pickling the user context, process round trips):
+
+    python -m benchmarks.bench_sharded_scoring
+"""
+import logging
+import os
+import pickle
+import threading
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.feature_matrix import CandidateFeatures, UserContext, score_candidates, top_k
+
+logger = logging.getLogger(__name__)
+
+# Score large candidate sets on a process pool (see module docstring)
+SHARDED_SCORING = os.getenv("SHARDED_SCORING", "0") == "1"
+SHARDED_SCORING_WORKERS = int(os.getenv("SHARDED_SCORING_WORKERS", str(os.cpu_count() or 1)))
+# Smaller candidate sets are scored in-process (below this, the overhead wins)
+SHARDED_SCORING_MIN_CANDIDATES = int(os.getenv("SHARDED_SCORING_MIN_CANDIDATES", "50000"))
+
+# Segments each worker keeps attached (the most recently used ones)
+WORKER_ATTACHED_SEGMENTS = 4
+
+# (name, dtype, shape, byte offset) of each array in a segment
+Layout = List[Tuple[str, str, tuple, int]]
+
+
+def should_shard(size: int, workers: Optional[int] = None) -> bool:
+    """Whether a candidate set of `size` rows is scored on the process pool."""
+    workers = SHARDED_SCORING_WORKERS if workers is None else workers
+    return SHARDED_SCORING and workers > 1 and size >= SHARDED_SCORING_MIN_CANDIDATES
+
+
+# ============================================================================
+# Shared-memory segments
+# ============================================================================
+
+class SharedArrays:
+    """Named arrays copied into one shared-memory segment."""
+
+    def __init__(self, arrays: Dict[str, np.ndarray]):
+        self.layout: Layout = []
+        offset = 0
+        for name, array in arrays.items():
+            offset = (offset + 63) // 64 * 64  # keep every array cache-line aligned
+            self.layout.append((name, array.dtype.str, array.shape, offset))
+            offset += array.nbytes
+        self.nbytes = offset
+        self.segment = SharedMemory(create=True, size=max(offset, 1))
+        for name, dtype, shape, start in self.layout:
+            view = np.ndarray(shape, dtype=dtype, buffer=self.segment.buf, offset=start)
+            view[...] = arrays[name]
+
+    @property
+    def name(self) -> str:
+        return self.segment.name
+
+    def release(self) -> None:
+        """Unlink the segment (workers' existing mappings stay valid)."""
+        self.segment.close()
+        try:
+            self.segment.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def attach_arrays(segment: SharedMemory, layout: Layout) -> Dict[str, np.ndarray]:
+    """Read-only views of the arrays described by `layout`."""
+    arrays = {}
+    for name, dtype, shape, start in layout:
+        view = np.ndarray(shape, dtype=dtype, buffer=segment.buf, offset=start)
+        view.flags.writeable = False
+        arrays[name] = view
+    return arrays
+
+
+def export_features(features: CandidateFeatures) -> SharedArrays:
+    """Copy an encoding into shared memory (value tables as pickled bytes)."""
+    arrays = {name: np.ascontiguousarray(getattr(features, name)) for name in CandidateFeatures.ARRAY_COLUMNS}
+    tables = {name: getattr(features, name) for name in CandidateFeatures.TABLE_COLUMNS}
+    arrays["tables"] = np.frombuffer(pickle.dumps(tables, protocol=pickle.HIGHEST_PROTOCOL), dtype=np.uint8)
+    return SharedArrays(arrays)
+
+
+# Exports of live features objects, released when the object is collected
+_exports: "weakref.WeakKeyDictionary[CandidateFeatures, SharedArrays]" = weakref.WeakKeyDictionary()
+_exports_lock = threading.Lock()
+
+
+def shared_features(features: CandidateFeatures) -> SharedArrays:
+    """The shared-memory export of `features`, created on first use."""
+    with _exports_lock:
+        shared = _exports.get(features)
+        if shared is None:
+            shared = export_features(features)
+            _exports[features] = shared
+            weakref.finalize(features, shared.release)
+        return shared
+
+
+# ============================================================================
+# Worker side
+# ============================================================================
+
+# Segment name -> (segment, feature arrays, value tables); worker process only
+_attached: "OrderedDict[str, Tuple[SharedMemory, Dict[str, np.ndarray], dict]]" = OrderedDict()
+
+
+def _attach_features(name: str, layout: Layout) -> Tuple[Dict[str, np.ndarray], dict]:
+    entry = _attached.get(name)
+    if entry is None:
+        segment = SharedMemory(name=name)
+        arrays = attach_arrays(segment, layout)
+        entry = (segment, arrays, pickle.loads(arrays.pop("tables").tobytes()))
+        _attached[name] = entry
+        while len(_attached) > WORKER_ATTACHED_SEGMENTS:
+            old = _attached.popitem(last=False)[1][0]
+            old.close()
+    else:
+        _attached.move_to_end(name)
+    return entry[1], entry[2]
+
+
+def _score_shard(
+    features_segment: Tuple[str, Layout],
+    call_segment: Optional[Tuple[str, Layout]],
+    start: int,
+    stop: int,
+    context: UserContext,
+    skill_ids: Dict[str, Optional[int]],
+    id_space: int,
+    weights: Dict[str, float],
+    m: int,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Top m of candidates `start:stop` by blended score (semantic given) or
+    by skills, preferences and experience alone.
+
+    Candidates are rows of the exported encoding, or the per-call "rows"
+    of it when the call segment has them.
+
+    Returns:
+        (candidate numbers best first, their ranking key)
+    """
+    from app.services.matching import MatchingService
+
+    service = MatchingService(weights)
+    arrays, tables = _attach_features(*features_segment)
+    features = CandidateFeatures.from_columns(arrays, tables, id_space, skill_ids)
+
+    segment = SharedMemory(name=call_segment[0]) if call_segment is not None else None
+    try:
+        call = attach_arrays(segment, call_segment[1]) if segment is not None else {}
+        if "rows" in call:
+            features = features.take(np.array(call["rows"][start:stop]))
+        else:
+            features = features.slice(start, stop)
+        scores = score_candidates(context, features)
+        if "semantic" in call:
+            key = service.blend(call["semantic"][start:stop], scores)
+        else:
+            key = service.cheap_scores(scores)
+        del call
+    finally:
+        if segment is not None:
+            segment.close()
+    local = top_k(key, m)
+    return local + start, key[local]
+
+
+# ============================================================================
+# Parent side
+# ============================================================================
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_shard_executor() -> ProcessPoolExecutor:
+    """The persistent scoring pool (spawned on first use)."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # spawn: forking a threaded server process is unsafe
+            _executor = ProcessPoolExecutor(
+                max_workers=SHARDED_SCORING_WORKERS, mp_context=get_context("spawn")
+            )
+            logger.info(f"Started sharded scoring pool with {SHARDED_SCORING_WORKERS} workers")
+        return _executor
+
+
+def shutdown_shard_executor() -> None:
+    """Stop the scoring pool (the next sharded call starts a new one)."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def sharded_top_rows(
+    features: CandidateFeatures,
+    context: UserContext,
+    weights: Dict[str, float],
+    m: int,
+    semantic: Optional[np.ndarray] = None,
+    workers: Optional[int] = None,
+) -> np.ndarray:
+    """
+    Rows (ascending) of the m best candidates, scored on the process pool.
+
+    With `semantic` (normalised scores of every candidate) candidates are
+    ranked by the weighted overall score; without, by the weighted
+    skills, preferences and experience scores (the two-stage shortlist).
+
+    Args:
+        features: Encoded candidates
+        context: The user's scoring inputs
+        weights: Component weights of the calling service
+        m: Rows to select
+        semantic: Normalised semantic scores row-aligned with `features`
+        workers: Shards (default: SHARDED_SCORING_WORKERS)
+    """
+    n = len(features)
+    shards = max(1, min(workers or SHARDED_SCORING_WORKERS, n))
+    bounds = np.linspace(0, n, shards + 1).astype(int).tolist()
+
+    # Resolve the user's skills in the parent, where the vocabulary lives
+    skill_ids = {name: features.skill_id(name) for name in set(context.skills) | context.skill_set}
+
+    # A taken subset is scored from its full encoding (exported once)
+    exported = shared_features(features if features.source is None else features.source)
+    call_arrays = {}
+    if features.source is not None:
+        call_arrays["rows"] = features.source_rows
+    if semantic is not None:
+        call_arrays["semantic"] = np.asarray(semantic, dtype=np.float64)
+    per_call = SharedArrays(call_arrays) if call_arrays else None
+    try:
+        executor = get_shard_executor()
+        futures = [
+            executor.submit(
+                _score_shard,
+                (exported.name, exported.layout),
+                (per_call.name, per_call.layout) if per_call is not None else None,
+                start, stop, context, skill_ids, features.id_space, weights, m,
+            )
+            for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start
+        ]
+        heads = [future.result() for future in futures]
+    finally:
+        if per_call is not None:
+            per_call.release()
+
+    # Shards are in row order and each head breaks ties by row, so ties in
+    # the merged top m still go to the lower row
+    rows = np.concatenate([rows for rows, _ in heads])
+    keys = np.concatenate([keys for _, keys in heads])
+    return np.sort(rows[top_k(keys, m)])
@@ -0,0 +1,325 @@
+"""
+Skill Vocabulary - Canonical skill names interned to integer ids
+
+Skills arrive as free-form strings ("JS", "React.js", "Machine Learning ").
+`canonical_skill` folds case, whitespace and known aliases onto one name,
+and the `skills` table assigns each canonical name a stable integer id.
+
+Opportunities store their skills as sorted id arrays
+(`required_skill_ids`, `preferred_skill_ids`), filled in automatically on
+insert and update. Matching turns id sets into Python-int bitsets so overlap
+and union sizes are single `&` / `|` / `bit_count()` operations.
+
+Backfill existing rows with:
+    python -m app.services.skill_vocabulary
+"""
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional, Sequence
+from weakref import WeakKeyDictionary
+
+from sqlalchemy import event, func, insert, inspect, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, object_session
+
+from app.models.opportunity import Opportunity
+from app.models.skill import Skill
+
+logger = logging.getLogger(__name__)
+
+# Alias -> canonical name (keys and values already lowercase)
+SKILL_ALIASES = {
+    "js": "javascript",
+    "ecmascript": "javascript",
+    "ts": "typescript",
+    "py": "python",
+    "python3": "python",
+    "node": "node.js",
+    "nodejs": "node.js",
+    "reactjs": "react",
+    "react.js": "react",
+    "vuejs": "vue",
+    "vue.js": "vue",
+    "angularjs": "angular",
+    "golang": "go",
+    "postgres": "postgresql",
+    "psql": "postgresql",
+    "mongo": "mongodb",
+    "k8s": "kubernetes",
+    "gcp": "google cloud",
+    "amazon web services": "aws",
+    "ml": "machine learning",
+    "dl": "deep learning",
+    "ai": "artificial intelligence",
+    "nlp": "natural language processing",
+    "c sharp": "c#",
+    "csharp": "c#",
+    "cpp": "c++",
+    "ms excel": "excel",
+    "microsoft excel": "excel",
+    "ms word": "word",
+    "microsoft word": "word",
+    "ux": "user experience",
+    "ui": "user interface",
+}
+
+
+def canonical_skill(name: str) -> str:
+    """Lowercase, collapse whitespace and resolve aliases."""
+    key = " ".join(str(name).lower().split())
+    return SKILL_ALIASES.get(key, key)
+
+
+def bitset_from_ids(ids: Optional[Iterable[int]]) -> int:
+    """Bitset with bit `id` set for each skill id."""
+    bits = 0
+    for sid in ids or ():
+        bits |= 1 << sid
+    return bits
+
+
+class TemporaryIds:
+    """Call-local ids for names that are not in the vocabulary, starting at `base`."""
+
+    def __init__(self, base: int):
+        self.base = base
+        self._ids: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def get(self, name: str) -> int:
+        return self._ids.setdefault(name, self.base + len(self._ids))
+
+
+class SkillVocabulary:
+    """
+    In-process mirror of the `skills` table (canonical name <-> id).
+
+    Ids learned inside a transaction (inserted, or read where they may be
+    its own uncommitted inserts) are kept per Session and only join the
+    shared mirror after that Session commits; a rollback drops them.
+    """
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._names: Dict[int, str] = {}
+        self._max_id = 0
+        # Re-entrant: savepoint rollbacks inside `intern` fire `_discard`
+        self._lock = threading.RLock()
+        self._pending: "WeakKeyDictionary[Session, Dict[str, int]]" = WeakKeyDictionary()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    @property
+    def next_id(self) -> int:
+        """First id above every known id (also the base for temporary ids)."""
+        return self._max_id + 1
+
+    def lookup(self, name: str) -> Optional[int]:
+        """Id of a skill name, or None if it has not been interned."""
+        return self._ids.get(canonical_skill(name))
+
+    def name(self, skill_id: int) -> Optional[str]:
+        return self._names.get(skill_id)
+
+    def _remember(self, name: str, skill_id: int) -> None:
+        self._ids[name] = skill_id
+        self._names[skill_id] = name
+        self._max_id = max(self._max_id, skill_id)
+
+    def _pending_for(self, session: Session) -> Dict[str, int]:
+        """Uncommitted ids of `session` (call with the lock held)."""
+        pending = self._pending.get(session)
+        if pending is None:
+            pending = self._pending[session] = {}
+            event.listen(session, "after_commit", self._publish)
+            event.listen(session, "after_soft_rollback", self._discard)
+        return pending
+
+    def _publish(self, session: Session) -> None:
+        # Releasing a savepoint is not a commit
+        if session.in_nested_transaction():
+            return
+        with self._lock:
+            pending = self._pending.get(session, {})
+            for name, skill_id in pending.items():
+                self._remember(name, skill_id)
+            pending.clear()
+
+    def _discard(self, session: Session, previous_transaction) -> None:
+        with self._lock:
+            self._pending.get(session, {}).clear()
+
+    def load(self, connection) -> None:
+        """(Re)load every interned skill (except ones `connection` has not committed)."""
+        rows = connection.execute(select(Skill.id, Skill.name)).all()
+        with self._lock:
+            pending = self._pending.get(connection, {})
+            for skill_id, name in rows:
+                if name not in pending:
+                    self._remember(name, skill_id)
+
+    def refresh(self, connection) -> None:
+        """Reload if another process has interned skills this one has not seen."""
+        max_id = connection.execute(select(func.max(Skill.id))).scalar() or 0
+        if max_id > self._max_id:
+            self.load(connection)
+
+    def intern(self, connection, names: Optional[Iterable[str]], session: Optional[Session] = None) -> List[int]:
+        """
+        Sorted, de-duplicated ids for skill names, inserting unseen names.
+
+        Args:
+            connection: SQLAlchemy Connection or Session
+            names: Free-form skill names
+            session: Session whose commit publishes new ids (default:
+                `connection` if it is one; without a Session they are not cached)
+        """
+        if session is None and isinstance(connection, Session):
+            session = connection
+        canonical = {canonical_skill(n) for n in (names or []) if n and str(n).strip()}
+        pending = self._pending.get(session, {}) if session is not None else {}
+        ids = {n: self._ids.get(n, pending.get(n)) for n in canonical}
+        missing = [n for n, skill_id in ids.items() if skill_id is None]
+        if missing:
+            with self._lock:
+                pending = self._pending_for(session) if session is not None else {}
+                found = connection.execute(
+                    select(Skill.id, Skill.name).where(Skill.name.in_(missing))
+                ).all()
+                for skill_id, name in found:
+                    ids[name] = pending[name] = skill_id
+
+                for name in missing:
+                    if ids[name] is not None:
+                        continue
+                    try:
+                        # Savepoint: a concurrent insert of the same name must
+                        # not abort the caller's transaction
+                        with connection.begin_nested():
+                            skill_id = connection.execute(
+                                insert(Skill).values(name=name)
+                            ).inserted_primary_key[0]
+                    except IntegrityError:
+                        skill_id = connection.execute(
+                            select(Skill.id).where(Skill.name == name)
+                        ).scalar_one()
+                    ids[name] = pending[name] = skill_id
+
+        return sorted(ids.values())
+
+    def id_or_temporary(self, name: str, temporary: "TemporaryIds") -> Optional[int]:
+        """
+        Id of a skill name; names not interned yet get an id from
+        `temporary` (above every real id) so they still match each other.
+        Names interned after `temporary` was created are treated the same,
+        so a long-lived id space never mixes the two. None for blank names.
+        """
+        key = canonical_skill(name)
+        if not key:
+            return None
+        skill_id = self._ids.get(key)
+        if skill_id is None or skill_id >= temporary.base:
+            skill_id = temporary.get(key)
+        return skill_id
+
+    def skill_bits(self, *name_lists: Optional[Sequence[str]]) -> List[List[int]]:
+        """
+        Single-bit masks for every name in each list (0 for blank names),
+        over one id space shared by the lists of this call.
+        """
+        temporary = TemporaryIds(self.next_id)
+        result = []
+        for names in name_lists:
+            bits = []
+            for name in names or []:
+                skill_id = self.id_or_temporary(name, temporary)
+                bits.append(0 if skill_id is None else 1 << skill_id)
+            result.append(bits)
+        return result
+
+
+# ============================================================================
+# Process-wide vocabulary
+# ============================================================================
+
+_vocabulary = SkillVocabulary()
+
+
+def get_skill_vocabulary(db=None) -> SkillVocabulary:
+    """
+    Get the shared vocabulary, refreshed against `db` when one is given
+    (so stored ids written by other workers resolve to names).
+    """
+    if db is not None:
+        _vocabulary.refresh(db)
+    return _vocabulary
+
+
+def reset_skill_vocabulary() -> None:
+    """Forget all cached ids (the next use reloads from the database)."""
+    global _vocabulary
+    _vocabulary = SkillVocabulary()
+
+
+def assign_skill_ids(connection, opportunity: Opportunity) -> None:
+    """Fill an opportunity's sorted skill-id arrays from its skill names."""
+    vocabulary = get_skill_vocabulary()
+    session = object_session(opportunity)
+    opportunity.required_skill_ids = vocabulary.intern(connection, opportunity.required_skills, session)
+    opportunity.preferred_skill_ids = vocabulary.intern(connection, opportunity.preferred_skills, session)
+
+
+@event.listens_for(Opportunity, "before_insert")
+def _skill_ids_on_insert(mapper, connection, target):
+    assign_skill_ids(connection, target)
+
+
+@event.listens_for(Opportunity, "before_update")
+def _skill_ids_on_update(mapper, connection, target):
+    state = inspect(target)
+    if (
+        state.attrs.required_skills.history.has_changes()
+        or state.attrs.preferred_skills.history.has_changes()
+        or target.required_skill_ids is None
+    ):
+        assign_skill_ids(connection, target)
+
+
+def backfill_skill_ids(db, batch_size: int = 500) -> int:
+    """
+    Recompute skill ids for every opportunity (e.g. after adding aliases).
+
+    Returns:
+        Number of opportunities updated
+    """
+    updated = 0
+    last_id = 0
+    while True:
+        batch = db.query(Opportunity).filter(Opportunity.id > last_id).order_by(Opportunity.id).limit(batch_size).all()
+        if not batch:
+            break
+        for opp in batch:
+            required = get_skill_vocabulary().intern(db, opp.required_skills)
+            preferred = get_skill_vocabulary().intern(db, opp.preferred_skills)
+            if required != opp.required_skill_ids or preferred != opp.preferred_skill_ids:
+                opp.required_skill_ids = required
+                opp.preferred_skill_ids = preferred
+                updated += 1
+        db.commit()
+        last_id = batch[-1].id
+    return updated
+
+
+if __name__ == "__main__":
+    from app.database import SessionLocal
+
+    logging.basicConfig(level=logging.INFO)
+    db = SessionLocal()
+    try:
+        count = backfill_skill_ids(db)
+        print(f"Updated skill ids on {count} opportunities ({len(get_skill_vocabulary())} skills)")
+    finally:
+        db.close()
@@ -0,0 +1,27 @@
+"""
+Swipe History - A user's swipes, newest first
+
+Backs `GET /swipes` and its saved/liked views, and is audited by
+query_audit.
+"""
+from typing import List, Optional
+
+from sqlalchemy.orm import Session
+
+from app.models.swipe import UserSwipe
+
+
+def swipe_history(
+    db: Session,
+    user_id: int,
+    action: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 50,
+) -> List[UserSwipe]:
+    """A page of the user's swipes, optionally only those with `action`."""
+    query = db.query(UserSwipe).filter(UserSwipe.user_id == user_id)
+
+    if action:
+        query = query.filter(UserSwipe.action == action)
+
+    return query.order_by(UserSwipe.created_at.desc()).offset(skip).limit(limit).all()
@@ -0,0 +1,264 @@
+"""
+Swiped Sets - Per-user compressed bitmaps of swiped opportunity ids
+
+Every feed request has to leave out what the user already swiped. Loading
+all those ids into a list and sending them back as `NOT IN (...)` grows
+with the user's history and runs into SQLite's parameter limit for heavy
+swipers. Instead each process keeps a `SwipedBitmap` per active user:
+
+- Ids are grouped into chunks of 65536. A chunk stores a sorted uint16
+  array while it holds at most ARRAY_MAX ids and a packed 8 KiB bitmap
+  beyond that (the roaring-bitmap layout), so a handful of swipes costs a
+  few bytes and a dense history at most one bit per id.
+- `contains` answers membership for a whole id array at once, which is
+  how the catalog and the ANN search exclude swiped cards.
+- Where SQL still filters (the basic feed), `not_swiped_clause` is a
+  `NOT EXISTS` anti-join instead of an id list.
+- `record_swipe` / `delete_swipe` update the cached bitmap in place.
+  Each bitmap is tagged with the (count, max id) of the user's swipe rows;
+  one aggregate query per request detects writes made by other workers
+  and reloads the bitmap.
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import exists, func
+from sqlalchemy.orm import Session
+
+from app.models.opportunity import Opportunity
+from app.models.swipe import UserSwipe
+
+SWIPED_SET_MAX_USERS = int(os.getenv("SWIPED_SET_MAX_USERS", "10000"))
+
+CHUNK_BITS = 16
+LOW_MASK = (1 << CHUNK_BITS) - 1
+# Above this many ids a chunk is stored as a bitmap (both forms are 8 KiB here)
+ARRAY_MAX = 4096
+
+
+def _to_bitmap(lows: np.ndarray) -> np.ndarray:
+    bits = np.zeros(1 << CHUNK_BITS, dtype=bool)
+    bits[lows] = True
+    return np.packbits(bits, bitorder="little")
+
+
+def _to_array(bitmap: np.ndarray) -> np.ndarray:
+    return np.flatnonzero(np.unpackbits(bitmap, bitorder="little")).astype(np.uint16)
+
+
+def _is_bitmap(container: np.ndarray) -> bool:
+    return container.dtype == np.uint8
+
+
+def _container(lows: np.ndarray) -> np.ndarray:
+    """Smallest container for sorted, distinct low bits."""
+    return _to_bitmap(lows) if len(lows) > ARRAY_MAX else lows.astype(np.uint16)
+
+
+def _test(container: np.ndarray, lows: np.ndarray) -> np.ndarray:
+    """Membership of each of `lows` in one container."""
+    if _is_bitmap(container):
+        return ((container[lows >> 3] >> (lows & 7)) & 1).astype(bool)
+    positions = np.minimum(np.searchsorted(container, lows), len(container) - 1)
+    return container[positions] == lows
+
+
+class SwipedBitmap:
+    """
+    Compressed set of opportunity ids (see module docstring).
+    """
+
+    __slots__ = ("_chunks", "_size", "version")
+
+    def __init__(self, ids: Iterable[int] = (), version: Optional[Tuple[int, Optional[int]]] = None):
+        self._chunks: Dict[int, np.ndarray] = {}
+        self._size = 0
+        # (count, max id) of the swipe rows this bitmap was built from
+        self.version = version
+        ids = np.unique(np.fromiter(ids, dtype=np.int64))
+        if len(ids):
+            high = ids >> CHUNK_BITS
+            for part in np.split(ids, np.flatnonzero(np.diff(high)) + 1):
+                self._chunks[int(part[0]) >> CHUNK_BITS] = _container(part & LOW_MASK)
+            self._size = len(ids)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, opportunity_id: int) -> bool:
+        container = self._chunks.get(opportunity_id >> CHUNK_BITS)
+        if container is None:
+            return False
+        return bool(_test(container, np.array([opportunity_id & LOW_MASK]))[0])
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.to_array().tolist())
+
+    @property
+    def nbytes(self) -> int:
+        return sum(container.nbytes for container in self._chunks.values())
+
+    def contains(self, ids: np.ndarray) -> np.ndarray:
+        """Boolean mask: which of `ids` are in the set."""
+        ids = np.asarray(ids, dtype=np.int64)
+        mask = np.zeros(len(ids), dtype=bool)
+        if not self._chunks or not len(ids):
+            return mask
+        high = ids >> CHUNK_BITS
+        for chunk, container in self._chunks.items():
+            rows = np.flatnonzero(high == chunk)
+            if len(rows):
+                mask[rows] = _test(container, ids[rows] & LOW_MASK)
+        return mask
+
+    def to_array(self) -> np.ndarray:
+        """All ids, ascending."""
+        parts = [
+            (chunk << CHUNK_BITS) + (_to_array(container) if _is_bitmap(container) else container).astype(np.int64)
+            for chunk, container in sorted(self._chunks.items())
+        ]
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+
+    def add(self, opportunity_id: int) -> None:
+        if opportunity_id in self:
+            return
+        chunk, low = opportunity_id >> CHUNK_BITS, opportunity_id & LOW_MASK
+        container = self._chunks.get(chunk)
+        if container is None:
+            self._chunks[chunk] = np.array([low], dtype=np.uint16)
+        elif _is_bitmap(container):
+            container[low >> 3] |= np.uint8(1 << (low & 7))
+        else:
+            container = np.insert(container, np.searchsorted(container, low), low)
+            self._chunks[chunk] = _container(container)
+        self._size += 1
+
+    def remove(self, opportunity_id: int) -> None:
+        if opportunity_id not in self:
+            return
+        chunk, low = opportunity_id >> CHUNK_BITS, opportunity_id & LOW_MASK
+        container = self._chunks[chunk]
+        if _is_bitmap(container):
+            container[low >> 3] &= np.uint8(~(1 << (low & 7)) & 0xFF)
+            lows = _to_array(container)
+            if len(lows) <= ARRAY_MAX:
+                self._chunks[chunk] = lows
+        else:
+            container = container[container != low]
+            if len(container):
+                self._chunks[chunk] = container
+            else:
+                del self._chunks[chunk]
+        self._size -= 1
+
+
+def swipe_version(db: Session, user_id: int) -> Tuple[int, Optional[int]]:
+    """(count, max id) of a user's swipe rows; changes on every insert or delete."""
+    count, max_id = db.query(func.count(UserSwipe.id), func.max(UserSwipe.id)).filter(
+        UserSwipe.user_id == user_id
+    ).one()
+    return count, max_id
+
+
+def not_swiped_clause(user_id: int):
+    """SQL anti-join keeping opportunities the user has not swiped."""
+    return ~exists().where(UserSwipe.user_id == user_id, UserSwipe.opportunity_id == Opportunity.id)
+
+
+class SwipedSetCache:
+    """
+    Per-user swiped bitmaps with an LRU bound on the number of users.
+    """
+
+    def __init__(self, max_users: int = SWIPED_SET_MAX_USERS):
+        self.max_users = max_users
+        self._sets: "OrderedDict[int, SwipedBitmap]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._sets)
+
+    def get(self, db: Session, user_id: int) -> SwipedBitmap:
+        """The user's swiped ids, reloaded if the swipe rows have changed."""
+        version = swipe_version(db, user_id)
+        with self._lock:
+            swiped = self._sets.get(user_id)
+            if swiped is not None and swiped.version == version:
+                self._sets.move_to_end(user_id)
+                self.hits += 1
+                return swiped
+            self.misses += 1
+
+        ids = db.query(UserSwipe.opportunity_id).filter(UserSwipe.user_id == user_id).all()
+        swiped = SwipedBitmap((row[0] for row in ids), version)
+        with self._lock:
+            self._sets[user_id] = swiped
+            self._sets.move_to_end(user_id)
+            while len(self._sets) > self.max_users:
+                self._sets.popitem(last=False)
+        return swiped
+
+    def add(self, user_id: int, opportunity_id: int, swipe_id: int) -> None:
+        """Record a newly inserted swipe row in the cached bitmap (if any)."""
+        with self._lock:
+            swiped = self._sets.get(user_id)
+            if swiped is None or swiped.version is None:
+                return
+            count, max_id = swiped.version
+            swiped.add(opportunity_id)
+            swiped.version = (count + 1, max(max_id or 0, swipe_id))
+
+    def remove(self, user_id: int, opportunity_id: int, swipe_id: int) -> None:
+        """Drop a deleted swipe row from the cached bitmap (if any)."""
+        with self._lock:
+            swiped = self._sets.get(user_id)
+            if swiped is None or swiped.version is None:
+                return
+            count, max_id = swiped.version
+            if swipe_id == max_id:
+                # The new max id is unknown; reload on next use
+                del self._sets[user_id]
+                return
+            swiped.remove(opportunity_id)
+            swiped.version = (count - 1, max_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._sets.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "users": len(self._sets),
+                "bytes": sum(swiped.nbytes for swiped in self._sets.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+# ============================================================================
+# Process-wide cache
+# ============================================================================
+
+_cache: Optional[SwipedSetCache] = None
+
+
+def get_swiped_sets() -> SwipedSetCache:
+    """Get or create the process-wide swiped-set cache."""
+    global _cache
+    if _cache is None:
+        _cache = SwipedSetCache()
+    return _cache
+
+
+def reset_swiped_sets() -> None:
+    """Drop every cached bitmap."""
+    global _cache
+    _cache = None
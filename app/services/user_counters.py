@@ -0,0 +1,122 @@
+"""
+User Counters - Per-user swipe and application tallies
+
+`/applications/stats` used to run eight `COUNT` queries, `/swipes/stats`
+three, and every new swipe counted today's swipes for the daily limit.
+Each user now has one `user_counters` row (app/models/user_counters.py,
+created with the user and kept in sync on flush) and those endpoints read
+it by primary key. Reads never write: a user without a row yet, from
+before the table existed, is answered from two conditional-aggregation
+`GROUP BY` queries until the backfill creates it.
+
+Backfill or repair every row (also run by migrate_db.py) with:
+    python -m app.services.user_counters
+"""
+import logging
+from datetime import date
+from typing import Dict, Optional
+
+from sqlalchemy import case, func, insert
+from sqlalchemy.orm import Session
+
+from app.models.application import Application
+from app.models.swipe import UserSwipe
+from app.models.user import User
+from app.models.user_counters import APPLICATION_STATUSES, SWIPE_COLUMNS, UserCounters, zero_counts
+
+
+def _tally(condition):
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+
+def aggregate_counts(db: Session, today: date, user_id: Optional[int] = None) -> Dict[int, dict]:
+    """
+    Count columns computed from the swipe and application rows.
+
+    Returns:
+        user_id -> count column values, for users with any swipe or application
+        (all users, or only `user_id`)
+    """
+    swipes = db.query(
+        UserSwipe.user_id,
+        *(_tally(UserSwipe.action == action).label(column) for action, column in SWIPE_COLUMNS.items()),
+        _tally(UserSwipe.swipe_date == today).label("swipes_today"),
+    ).group_by(UserSwipe.user_id)
+    applications = db.query(
+        Application.user_id,
+        func.count(Application.id).label("applications_total"),
+        *(_tally(Application.status == status).label(f"applications_{status}") for status in APPLICATION_STATUSES),
+    ).group_by(Application.user_id)
+    if user_id is not None:
+        swipes = swipes.filter(UserSwipe.user_id == user_id)
+        applications = applications.filter(Application.user_id == user_id)
+
+    counts = {}
+    for row in list(swipes) + list(applications):
+        values = row._asdict()
+        counts.setdefault(values.pop("user_id"), zero_counts()).update(values)
+    return counts
+
+
+def aggregate_user_counters(db: Session, user_id: int, today: Optional[date] = None) -> UserCounters:
+    """Counters computed from the user's rows (not added to the session)."""
+    today = today or date.today()
+    counts = aggregate_counts(db, today, user_id).get(user_id, zero_counts())
+    return UserCounters(user_id=user_id, swipes_date=today, **counts)
+
+
+def get_user_counters(db: Session, user_id: int) -> UserCounters:
+    """Counters row of a user; computed (and not stored) if the user has none yet."""
+    return db.get(UserCounters, user_id) or aggregate_user_counters(db, user_id)
+
+
+def rebuild_user_counters(db: Session) -> int:
+    """
+    Recompute every user's counters row from the swipe and application rows.
+
+    Run with writes stopped (migration, maintenance); the caller commits.
+
+    Returns:
+        Number of rows written
+    """
+    today = date.today()
+    counts = aggregate_counts(db, today)
+    rows = [
+        {"user_id": user_id, "swipes_date": today, **counts.get(user_id, zero_counts())}
+        for (user_id,) in db.query(User.id)
+    ]
+    db.query(UserCounters).delete()
+    if rows:
+        db.execute(insert(UserCounters), rows)
+    return len(rows)
+
+
+def swipes_used_today(counters: UserCounters, today: Optional[date] = None) -> int:
+    return counters.swipes_today if counters.swipes_date == (today or date.today()) else 0
+
+
+def swipe_stats(counters: UserCounters) -> Dict[str, int]:
+    """Response of /swipes/stats."""
+    stats = {"likes": counters.likes, "dislikes": counters.dislikes, "saves": counters.saves}
+    stats["total"] = sum(stats.values())
+    return stats
+
+
+def application_stats(counters: UserCounters) -> Dict[str, int]:
+    """Response of /applications/stats."""
+    stats = {"total": counters.applications_total}
+    stats.update({status: getattr(counters, f"applications_{status}") for status in APPLICATION_STATUSES})
+    return stats
+
+
+if __name__ == "__main__":
+    from app.database import SessionLocal
+
+    logging.basicConfig(level=logging.INFO)
+    db = SessionLocal()
+    try:
+        count = rebuild_user_counters(db)
+        db.commit()
+        print(f"Rebuilt counters for {count} users")
+    finally:
+        db.close()
@@ -0,0 +1,283 @@
+"""
+Vector Matrix - Quantized, memory-mapped opportunity embedding matrix
+
+Opportunity vectors are exported into a row-aligned, pre-normalised matrix
+on disk and opened read-only with `mmap`, so every uvicorn worker shares a
+single page-cached copy instead of holding its own float64 arrays.
+
+Each build is written to a new version directory under the matrix path
+`P`, and `P/CURRENT` (replaced atomically) names the live one, so readers
+never see files from two different builds:
+    P/CURRENT                  name of the live version directory
+    P/<version>/ids.npy        int64   opportunity ids, sorted ascending (row order)
+    P/<version>/hashes.npy     uint64  prefix of the embedded-text hash per row
+    P/<version>/vectors.npy    float32 | float16 | int8 unit-norm rows
+    P/<version>/scales.npy     float32 per-row scale (int8 only)
+
+The previous version is kept for readers that resolved `CURRENT` just
+before a swap; older ones are removed.
+
+Storage per row at 384 dims: float32 1.5 KB, float16 768 B, int8 388 B.
+
+Build or refresh the file with:
+    python -m app.services.vector_matrix --dtype int8
+"""
+import argparse
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.config import BASE_DIR
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_DTYPES = ("float32", "float16", "int8")
+
+EMBEDDING_MATRIX_PATH = os.getenv(
+    "EMBEDDING_MATRIX_PATH", os.path.join(BASE_DIR, "data", "opportunity_vectors")
+)
+EMBEDDING_MATRIX_DTYPE = os.getenv("EMBEDDING_MATRIX_DTYPE", "float16")
+
+# Rows dequantized per block in the dot kernel (bounds temporary memory)
+DOT_BLOCK_ROWS = 65536
+
+
+def hash_prefix(text_hash: str) -> int:
+    """Compress a sha256 hex digest to the uint64 stored alongside each row."""
+    return int(text_hash[:16], 16)
+
+
+# Version directories kept besides the live one
+KEPT_VERSIONS = 1
+
+
+def _current_path(path: str) -> str:
+    return os.path.join(path, "CURRENT")
+
+
+def _paths(directory: str) -> dict:
+    return {part: os.path.join(directory, f"{part}.npy") for part in ("ids", "hashes", "vectors", "scales")}
+
+
+def _current_stamp(path: str) -> Optional[tuple]:
+    """Changes whenever `CURRENT` is replaced; None if nothing was built yet."""
+    try:
+        stat = os.stat(_current_path(path))
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns
+
+
+def _prune_versions(path: str, live: str) -> None:
+    versions = sorted(
+        (entry for entry in os.scandir(path) if entry.is_dir() and entry.name != live),
+        key=lambda entry: entry.stat().st_mtime_ns,
+    )
+    for entry in versions[:max(len(versions) - KEPT_VERSIONS, 0)]:
+        shutil.rmtree(entry.path, ignore_errors=True)
+
+
+def quantize(vectors: np.ndarray, dtype: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Normalise rows and convert to the storage dtype.
+
+    Returns:
+        Tuple of (stored_rows, per_row_scales or None)
+    """
+    if dtype not in SUPPORTED_DTYPES:
+        raise ValueError(f"Unsupported dtype '{dtype}'. Valid: {SUPPORTED_DTYPES}")
+
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    unit = vectors / norms
+
+    if dtype != "int8":
+        return unit.astype(dtype), None
+
+    # Symmetric scalar quantisation with one scale per row
+    scales = np.abs(unit).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    stored = np.clip(np.rint(unit / scales[:, np.newaxis]), -127, 127).astype(np.int8)
+    return stored, scales.astype(np.float32)
+
+
+def write_embedding_matrix(
+    path: str,
+    ids: Sequence[int],
+    vectors: np.ndarray,
+    text_hashes: Sequence[str],
+    dtype: str = EMBEDDING_MATRIX_DTYPE,
+) -> None:
+    """
+    Write a new matrix version and make it live with one atomic replace of
+    `CURRENT`.
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    order = np.argsort(ids, kind="stable")
+    stored, scales = quantize(np.asarray(vectors)[order], dtype)
+    hashes = np.array([hash_prefix(h) for h in text_hashes], dtype=np.uint64)[order]
+
+    os.makedirs(path, exist_ok=True)
+    directory = tempfile.mkdtemp(prefix="v", dir=path)
+    paths = _paths(directory)
+    np.save(paths["ids"], ids[order])
+    np.save(paths["hashes"], hashes)
+    np.save(paths["vectors"], stored)
+    if scales is not None:
+        np.save(paths["scales"], scales)
+
+    current = _current_path(path)
+    with open(f"{current}.tmp", "w") as f:
+        f.write(os.path.basename(directory))
+    os.replace(f"{current}.tmp", current)
+    _prune_versions(path, os.path.basename(directory))
+
+
+class EmbeddingMatrix:
+    """
+    Read-only, memory-mapped view over a matrix written by `write_embedding_matrix`.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.stamp = _current_stamp(path)
+        with open(_current_path(path)) as f:
+            self.directory = os.path.join(path, f.read().strip())
+        paths = _paths(self.directory)
+        self.ids = np.load(paths["ids"], mmap_mode="r")
+        self.hashes = np.load(paths["hashes"], mmap_mode="r")
+        self.vectors = np.load(paths["vectors"], mmap_mode="r")
+        self.scales = (
+            np.load(paths["scales"], mmap_mode="r")
+            if self.vectors.dtype == np.int8 else None
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def dim(self) -> int:
+        return self.vectors.shape[1]
+
+    @property
+    def dtype(self) -> str:
+        return str(self.vectors.dtype)
+
+    def rows_for(self, opportunity_ids: Sequence[int]) -> np.ndarray:
+        """Row index per id, or -1 where the id is not in the matrix."""
+        wanted = np.asarray(opportunity_ids, dtype=np.int64)
+        if len(self.ids) == 0:
+            return np.full(len(wanted), -1, dtype=np.int64)
+        rows = np.searchsorted(self.ids, wanted)
+        rows = np.minimum(rows, len(self.ids) - 1)
+        return np.where(self.ids[rows] == wanted, rows, -1)
+
+    def dot(self, query: Sequence[float], rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Cosine similarity of `query` against stored rows (all rows by default).
+
+        Works block-wise on the stored dtype; int8 blocks are rescaled after
+        the dot product, so only one float32 block is materialised at a time.
+        """
+        q = np.asarray(query, dtype=np.float32)
+        norm = np.linalg.norm(q)
+        if norm == 0:
+            return np.zeros(len(self) if rows is None else len(rows), dtype=np.float32)
+        q = q / norm
+
+        full_scan = rows is None
+        n_rows = len(self) if full_scan else len(rows)
+        out = np.empty(n_rows, dtype=np.float32)
+        for start in range(0, n_rows, DOT_BLOCK_ROWS):
+            # Contiguous slices for full scans, gathers for candidate subsets
+            selector = slice(start, start + DOT_BLOCK_ROWS) if full_scan else rows[start:start + DOT_BLOCK_ROWS]
+            scores = self.vectors[selector].astype(np.float32, copy=False) @ q
+            if self.scales is not None:
+                scores *= self.scales[selector]
+            out[start:start + len(scores)] = scores
+        return out
+
+
+# ============================================================================
+# Process-wide matrix
+# ============================================================================
+
+_matrix: Optional[EmbeddingMatrix] = None
+_matrix_lock = threading.Lock()
+
+
+def get_embedding_matrix(path: str = EMBEDDING_MATRIX_PATH) -> Optional[EmbeddingMatrix]:
+    """Open (or reopen after a rebuild) the shared matrix; None if not built yet."""
+    global _matrix
+    stamp = _current_stamp(path)
+    if stamp is None:
+        return None
+    with _matrix_lock:
+        if _matrix is None or _matrix.path != path or stamp != _matrix.stamp:
+            _matrix = EmbeddingMatrix(path)
+            logger.info(f"Opened {_matrix.dtype} embedding matrix with {len(_matrix)} rows")
+        return _matrix
+
+
+def build_embedding_matrix(
+    db: Session,
+    path: str = EMBEDDING_MATRIX_PATH,
+    dtype: str = EMBEDDING_MATRIX_DTYPE,
+) -> int:
+    """
+    Export stored embeddings of active, non-stale opportunities to the matrix file.
+
+    Returns:
+        Number of rows written
+    """
+    from app.models.embedding import OpportunityEmbedding
+    from app.models.opportunity import Opportunity
+    from app.services.embedding import EMBEDDING_DIM, MODEL_NAME
+
+    rows = db.query(
+        OpportunityEmbedding.opportunity_id,
+        OpportunityEmbedding.text_hash,
+        OpportunityEmbedding.vector,
+    ).join(
+        Opportunity, Opportunity.id == OpportunityEmbedding.opportunity_id
+    ).filter(
+        Opportunity.is_active == True,
+        Opportunity.is_stale == False,
+        OpportunityEmbedding.model_name == MODEL_NAME,
+    ).all()
+
+    vectors = np.frombuffer(b"".join(row[2] for row in rows), dtype="<f4")
+    write_embedding_matrix(
+        path,
+        ids=[row[0] for row in rows],
+        vectors=vectors.reshape(len(rows), EMBEDDING_DIM),
+        text_hashes=[row[1] for row in rows],
+        dtype=dtype,
+    )
+    logger.info(f"Wrote {len(rows)} rows to {dtype} embedding matrix at {path}")
+    return len(rows)
+
+
+if __name__ == "__main__":
+    from app.database import SessionLocal
+    from app.models import opportunity, embedding  # noqa: F401 (register tables)
+
+    parser = argparse.ArgumentParser(description="Export opportunity embeddings to a memory-mapped matrix")
+    parser.add_argument("--path", default=EMBEDDING_MATRIX_PATH)
+    parser.add_argument("--dtype", default=EMBEDDING_MATRIX_DTYPE, choices=SUPPORTED_DTYPES)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    db = SessionLocal()
+    try:
+        count = build_embedding_matrix(db, args.path, args.dtype)
+        print(f"Wrote {count} opportunity vectors ({args.dtype}) to {args.path}")
+    finally:
+        db.close()
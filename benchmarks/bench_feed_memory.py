@@ -0,0 +1,148 @@
+"""
+Benchmark: per-request peak memory of the feed and list endpoints
+
+Seeds N opportunities with realistic description sizes (~3 KB) into a
+temporary SQLite file and calls each endpoint function directly, after one
+warm-up call. Reports the tracemalloc peak (Python allocations during the
+request) and the mean wall time of untraced calls:
+
+    basic feed    /match/feed (skill-overlap ranking over every candidate)
+    ai feed       /match/ai/feed with the in-memory catalog off, so
+                  candidates are read from the database; snapshot cache
+                  cleared before every call
+    ai feed all   the same, scoring every candidate (no ANN shortlist)
+    list          /opportunities (page of 20, total count)
+    pending       /swipes/pending (page of 50 out of 1,000 pending likes)
+
+Run with: python -m benchmarks.bench_feed_memory [--size 10000]
+"""
+import argparse
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from unittest.mock import patch
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.api import match, opportunities, swipes
+from app.database import Base
+from app.models import application, conversation, document, embedding, match_score, preferences, skill  # noqa: F401
+from app.models.opportunity import Opportunity
+from app.models.swipe import UserSwipe
+from app.models.user import User
+from app.services import embedding_store, feed_snapshot, opportunity_features, skill_vocabulary  # noqa: F401
+from tests.test_embedding_store import fake_embeddings
+from tests.test_feature_matrix import random_opportunities
+
+WORDS = ("build maintain data pipelines services stakeholders analytics reporting cloud "
+         "customers design review deliver mentor teams product quality metrics").split()
+
+
+def seed(db, size, pending):
+    rng = random.Random(0)
+    for item in random_opportunities(size, seed=5):
+        fields = {k: v for k, v in item.items() if k != "id"}
+        fields["title"] = fields["title"] or "Untitled"
+        fields["description"] = " ".join(rng.choice(WORDS) for _ in range(450))
+        fields["benefits"] = ["health_insurance", "pension", "remote_work", "learning_budget"]
+        fields["eligibility_criteria"] = ["Graduate degree or equivalent experience"] * 3
+        db.add(Opportunity(**fields))
+    db.commit()
+    embedding_store.refresh_opportunity_embeddings(db, db.query(Opportunity).all())
+    user = User(email="bench@example.com", hashed_password="x", name="Bench User",
+                skills=["python", "sql", "excel", "communication"], screening_completed=True)
+    db.add(user)
+    db.commit()
+    db.add_all(
+        UserSwipe(user_id=user.id, opportunity_id=opportunity_id, action="like", status="pending",
+                  preview_data={"cover_letter": " ".join(rng.choice(WORDS) for _ in range(200))})
+        for opportunity_id in range(1, pending + 1)
+    )
+    db.commit()
+    return user.id
+
+
+def run_once(session_factory, user_id, call, traced):
+    """Seconds (untraced) or tracemalloc peak bytes (traced) of one call."""
+    db = session_factory()
+    user = db.get(User, user_id)
+    feed_snapshot.reset_feed_snapshots()
+    if traced:
+        tracemalloc.start()
+    started = time.perf_counter()
+    call(db, user)
+    elapsed = time.perf_counter() - started
+    if traced:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    db.close()
+    return peak if traced else elapsed
+
+
+def measure(session_factory, user_id, call, repeat):
+    """(peak MiB, mean ms) of `call(db, user)`, each run in a fresh session."""
+    run_once(session_factory, user_id, call, traced=False)  # warms caches (vocabulary, embeddings, ANN index)
+    peaks = [run_once(session_factory, user_id, call, traced=True) for _ in range(repeat)]
+    times = [run_once(session_factory, user_id, call, traced=False) for _ in range(repeat)]
+    return max(peaks) / 2 ** 20, sum(times) / len(times) * 1000
+
+
+def ai_feed(db, user):
+    return match.get_ai_powered_feed(
+        limit=10, opportunity_type=None, use_preferences=True, cursor=None, current_user=user, db=db
+    )
+
+
+def ai_feed_all(db, user):
+    with patch.object(match, "ANN_CANDIDATE_POOL", 10 ** 9):
+        return ai_feed(db, user)
+
+
+ENDPOINTS = {
+    "basic feed": lambda db, user: match.get_opportunity_feed(
+        limit=10, opportunity_type=None, current_user=user, db=db
+    ),
+    "ai feed": ai_feed,
+    "ai feed all": ai_feed_all,
+    "list": lambda db, user: opportunities.list_opportunities(
+        page=1, per_page=20, search=None, source=None, location=None, job_type=None,
+        remote=None, include_stale=False, min_salary=None, max_salary=None, db=db,
+    ),
+    "pending": lambda db, user: swipes.get_pending_swipes(skip=0, limit=50, current_user=user, db=db),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench_feed_memory_"))
+    engine = create_engine(f"sqlite:///{workdir / 'bench.db'}", connect_args={"check_same_thread": False})
+    try:
+        with patch.object(embedding_store, "generate_embeddings_batch", side_effect=fake_embeddings), \
+                patch.object(embedding_store, "generate_embedding", side_effect=lambda t: fake_embeddings([t])[0]), \
+                patch.object(match, "OPPORTUNITY_CATALOG", False):
+            Base.metadata.create_all(bind=engine)
+            session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+            db = session_factory()
+            user_id = seed(db, args.size, pending=min(1000, args.size))
+            db.close()
+
+            print(f"{args.size} opportunities, worst of {args.repeat} after warm-up")
+            print(f"{'endpoint':<11}  {'peak MiB':>8}  {'mean ms':>8}")
+            for name, call in ENDPOINTS.items():
+                peak, mean = measure(session_factory, user_id, call, args.repeat)
+                print(f"{name:<11}  {peak:>8.1f}  {mean:>8.1f}")
+    finally:
+        engine.dispose()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark: rank a user pool for one opportunity
+
+Builds a `UserPool` of N synthetic users (profiles cycled from the test
+fixtures with varied skills and preferences, random unit vectors) and times
+`pool.score` plus one `pool.rank` page per opportunity. Pool construction
+is a one-off per process and is reported separately.
+
+Run with: python -m benchmarks.bench_reverse_matching [--sizes 10000,100000]
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+from app.services.matching import MatchingService
+from app.services.reverse_matching import UserPool
+from benchmarks.bench_two_stage import best_of
+from tests.test_feature_matrix import ARRANGEMENTS, LOCATIONS, SKILLS, USERS, random_opportunities
+
+DIM = 384
+PLACES = [loc for loc in LOCATIONS if loc]
+WORK_MODES = [mode for mode in ARRANGEMENTS if mode]
+
+
+def random_users(n, seed=0):
+    rng = random.Random(seed)
+    users = []
+    for i in range(n):
+        user_data, prefs = USERS[i % len(USERS)]
+        user_data = dict(user_data, id=i + 1, name=f"User {i}",
+                         skills=rng.sample(SKILLS + ["python", "sql"], rng.randint(0, 6)))
+        if prefs:
+            prefs = dict(prefs, preferred_locations=rng.sample(PLACES, rng.randint(0, 2)),
+                         work_arrangements=rng.sample(WORK_MODES, rng.randint(0, 2)),
+                         salary_min=rng.choice([None, rng.randint(20000, 120000)]))
+        users.append((user_data, prefs))
+    return users
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="10000,100000")
+    parser.add_argument("--opportunities", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    service = MatchingService()
+    rng = np.random.default_rng(0)
+    opportunities = random_opportunities(args.opportunities, seed=1)
+
+    print(f"{args.opportunities} opportunities, best of {args.repeat}")
+    print(f"{'users':>7}  {'build s':>8}  {'score+rank ms':>13}  {'worst ms':>9}  {'pool MB':>8}")
+
+    for n in [int(size) for size in args.sizes.split(",")]:
+        users = random_users(n, seed=n)
+        vectors = rng.standard_normal((n, DIM)).astype(np.float32)
+
+        started = time.perf_counter()
+        pool = UserPool(users, vectors)
+        build = time.perf_counter() - started
+
+        timings = []
+        for opp in opportunities:
+            opp_vector = rng.standard_normal(DIM)
+            elapsed, _ = best_of(lambda: pool.rank(pool.score(opp, opp_vector, service), limit=20),
+                                 args.repeat)
+            timings.append(elapsed)
+
+        size_mb = (pool.vectors.nbytes + pool.skill_ids.nbytes + pool.skill_owner.nbytes) / 2 ** 20
+        print(f"{n:>7}  {build:>8.2f}  {np.mean(timings) * 1000:>13.1f}  "
+              f"{max(timings) * 1000:>9.1f}  {size_mb:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
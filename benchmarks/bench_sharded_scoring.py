@@ -0,0 +1,100 @@
+"""
+Benchmark: in-process vs sharded scoring
+
+Times `match_opportunities_batch` (top 50, precomputed similarities) with
+sharded scoring forced off and on. The sharded timing excludes pool start-up
+and the one-off shared-memory export of the features (reported separately),
+which is what a long-lived catalog encoding pays. "Subset" scores a fresh
+`take()` of every other row per call, as the feed does with the catalog's
+eligible rows: only the row numbers are shipped, the full export is reused.
+"Round trip" is the fixed cost of one sharded call over 1,000 candidates.
+
+Use the smallest size where sharding wins as SHARDED_SCORING_MIN_CANDIDATES.
+
+Run with: python -m benchmarks.bench_sharded_scoring [--workers 4] [--sizes 20000,50000,100000]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.services import sharded_scoring
+from app.services.feature_matrix import CandidateFeatures
+from app.services.matching import MatchingService
+from app.services.sharded_scoring import get_shard_executor, shared_features, shutdown_shard_executor
+from benchmarks.bench_two_stage import best_of
+from tests.test_feature_matrix import USERS, random_opportunities
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="20000,50000,100000,200000")
+    parser.add_argument("--workers", type=int, default=sharded_scoring.SHARDED_SCORING_WORKERS)
+    parser.add_argument("--budget", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    sharded_scoring.SHARDED_SCORING_WORKERS = args.workers
+    service = MatchingService(semantic_budget=args.budget)
+    rng = np.random.default_rng(0)
+
+    started = time.perf_counter()
+    executor = get_shard_executor()
+    list(executor.map(abs, range(args.workers)))
+    print(f"{args.workers} workers, budget {args.budget}, best of {args.repeat}; "
+          f"pool start {time.perf_counter() - started:.2f}s")
+
+    small = random_opportunities(1000, seed=1)
+    small_features = CandidateFeatures(small)
+    small_similarities = rng.uniform(-1, 1, len(small))
+    user_data, user_preferences = USERS[0]
+    service.match_opportunities_batch(user_data, user_preferences, small, semantic_similarities=small_similarities,
+                                      features=small_features, top_k=50, sharded=True)
+    round_trip, _ = best_of(lambda: service.match_opportunities_batch(
+        user_data, user_preferences, small, semantic_similarities=small_similarities,
+        features=small_features, top_k=50, sharded=True
+    ), args.repeat)
+    print(f"round trip (1000 candidates): {round_trip * 1000:.1f} ms")
+
+    print(f"{'N':>7}  {'export ms':>9}  {'in-process ms':>13}  {'sharded ms':>10}  {'speed-up':>8}  {'subset ms':>9}")
+    try:
+        for n in [int(size) for size in args.sizes.split(",")]:
+            opportunities = random_opportunities(n, seed=n)
+            features = CandidateFeatures(opportunities)
+            similarities = rng.uniform(-1, 1, n)
+
+            started = time.perf_counter()
+            shared_features(features)
+            export = time.perf_counter() - started
+
+            local_total = sharded_total = 0.0
+            for user_data, user_preferences in USERS:
+                for sharded in (False, True):
+                    elapsed, _ = best_of(lambda: service.match_opportunities_batch(
+                        user_data, user_preferences, opportunities, semantic_similarities=similarities,
+                        features=features, top_k=50, sharded=sharded
+                    ), args.repeat)
+                    if sharded:
+                        sharded_total += elapsed
+                    else:
+                        local_total += elapsed
+
+            half = np.arange(0, n, 2)
+            subset_total = 0.0
+            for user_data, user_preferences in USERS:
+                elapsed, _ = best_of(lambda: service.match_opportunities_batch(
+                    user_data, user_preferences, opportunities[::2], semantic_similarities=similarities[half],
+                    features=features.take(half), top_k=50, sharded=True
+                ), args.repeat)
+                subset_total += elapsed
+
+            users = len(USERS)
+            print(f"{n:>7}  {export * 1000:>9.1f}  {local_total / users * 1000:>13.1f}  "
+                  f"{sharded_total / users * 1000:>10.1f}  {local_total / sharded_total:>7.2f}x  "
+                  f"{subset_total / users * 1000:>9.1f}")
+    finally:
+        shutdown_shard_executor()
+
+
+if __name__ == "__main__":
+    main()
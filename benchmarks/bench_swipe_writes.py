@@ -0,0 +1,142 @@
+"""
+Benchmark: swipe-write throughput per database backend
+
+Seeds users and opportunities into a fresh database, then has T threads
+record swipes through the `record_swipe` endpoint function, one session and
+one commit per swipe as a request would. Reports swipes per second, p95
+latency and failed writes ("database is locked") per backend and thread
+count:
+
+    sqlite-journal  the previous configuration (rollback journal,
+                    synchronous=FULL, no mmap)
+    sqlite-wal      the configured SQLite pragmas (WAL, synchronous=NORMAL)
+    postgresql      --postgres-url, if given (its tables are dropped and
+                    recreated)
+
+Run with: python -m benchmarks.bench_swipe_writes [--threads 1,4,16] [--postgres-url postgresql://...]
+"""
+import argparse
+import shutil
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+from sqlalchemy.orm import sessionmaker
+
+from app.api.swipes import record_swipe
+from app.database import Base, create_database_engine, sqlite_pragmas
+from app.models import application, conversation, document, embedding, match_score, preferences, skill  # noqa: F401
+from app.models.opportunity import Opportunity
+from app.models.user import User
+from app.schemas.swipe import SwipeAction, SwipeCreate
+from app.services import opportunity_features, skill_vocabulary  # noqa: F401 (registers listeners)
+from app.services.swiped_sets import reset_swiped_sets
+from tests.test_feature_matrix import random_opportunities
+
+ACTIONS = [SwipeAction.DISLIKE] * 3 + [SwipeAction.SAVE]
+
+
+def seed(session_factory, users, opportunities):
+    db = session_factory()
+    try:
+        db.add_all(
+            User(email=f"user{i}@example.com", hashed_password="x", name=f"User {i}", daily_swipe_limit=10 ** 6)
+            for i in range(users)
+        )
+        for item in random_opportunities(opportunities, seed=3):
+            fields = {k: v for k, v in item.items() if k != "id"}
+            db.add(Opportunity(**{**fields, "title": fields["title"] or "Untitled"}))
+        db.commit()
+        user_ids = [row.id for row in db.query(User.id).order_by(User.id)]
+        opportunity_ids = [row.id for row in db.query(Opportunity.id).order_by(Opportunity.id)]
+    finally:
+        db.close()
+    return user_ids, opportunity_ids
+
+
+def swipe_worker(session_factory, user_ids, opportunity_ids, swipes, latencies, errors):
+    for n in range(swipes):
+        user_id = user_ids[n % len(user_ids)]
+        payload = SwipeCreate(opportunity_id=opportunity_ids[n // len(user_ids)], action=ACTIONS[n % len(ACTIONS)])
+        started = time.perf_counter()
+        db = session_factory()
+        try:
+            record_swipe(payload, db.get(User, user_id), db)
+        except Exception:
+            errors.append(1)
+            db.rollback()
+        finally:
+            db.close()
+        latencies.append(time.perf_counter() - started)
+
+
+def run(engine, threads, swipes_per_thread, opportunities):
+    Base.metadata.create_all(bind=engine)
+    reset_swiped_sets()
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    user_ids, opportunity_ids = seed(session_factory, threads * 4, opportunities)
+
+    latencies, errors = [], []
+    workers = [
+        threading.Thread(target=swipe_worker, args=(
+            session_factory, user_ids[t::threads], opportunity_ids, swipes_per_thread, latencies, errors
+        ))
+        for t in range(threads)
+    ]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    return {
+        "rate": (len(latencies) - len(errors)) / elapsed,
+        "p95": float(np.percentile(latencies, 95)) * 1000,
+        "errors": len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--threads", default="1,4,16")
+    parser.add_argument("--swipes", type=int, default=400, help="Swipes per thread")
+    parser.add_argument("--opportunities", type=int, default=500)
+    parser.add_argument("--postgres-url", default=None)
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench_swipes_"))
+    backends = {
+        "sqlite-journal": lambda threads: create_database_engine(
+            f"sqlite:///{workdir / f'journal-{threads}.db'}", pragmas={"journal_mode": "DELETE", "synchronous": "FULL"}
+        ),
+        "sqlite-wal": lambda threads: create_database_engine(
+            f"sqlite:///{workdir / f'wal-{threads}.db'}", pragmas=sqlite_pragmas()
+        ),
+    }
+    if args.postgres_url:
+        backends["postgresql"] = lambda threads: create_database_engine(args.postgres_url)
+
+    try:
+        print(f"{args.swipes} swipes per thread, {args.opportunities} opportunities")
+        print(f"{'backend':<15}  {'threads':>7}  {'swipes/s':>9}  {'p95 ms':>7}  {'failed':>6}")
+        for name, make_engine in backends.items():
+            for threads in [int(t) for t in args.threads.split(",")]:
+                engine = make_engine(threads)
+                try:
+                    if name == "postgresql":
+                        Base.metadata.drop_all(bind=engine)
+                    result = run(engine, threads, args.swipes, args.opportunities)
+                    if name == "postgresql":
+                        Base.metadata.drop_all(bind=engine)
+                finally:
+                    engine.dispose()
+                print(f"{name:<15}  {threads:>7}  {result['rate']:>9.0f}  {result['p95']:>7.1f}  {result['errors']:>6}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark: single-stage vs two-stage ranking
+
+The semantic stage is modelled on the stored-blob path of
+`opportunity_similarities`: each candidate's float32 vector is decoded from
+bytes and dotted with the user vector. Single-stage ranking does that for
+all N candidates; two-stage ranking ranks everyone by skills, preferences
+and experience first and decodes only the best M.
+
+Agreement compares the two rankings' heads: overlap@k is the share of the
+single-stage top k that two-stage also returns in its top k, and
+"identical top-k" counts users whose top k match exactly (same order).
+
+Run with: python -m benchmarks.bench_two_stage [--budget 300] [--sizes 1000,5000,20000]
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.services.feature_matrix import CandidateFeatures
+from app.services.matching import MatchingService
+from tests.test_feature_matrix import USERS, random_opportunities
+
+DIM = 384
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def blob_similarity_fn(user_vector, blobs):
+    """Raw cosine similarities decoded one stored blob at a time."""
+    def similarities(opportunities):
+        return [
+            float(np.frombuffer(blobs[opp["id"]], dtype="<f4") @ user_vector)
+            for opp in opportunities
+        ]
+    return similarities
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", default="1000,5000,20000,50000")
+    parser.add_argument("--budget", type=int, default=300)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    single = MatchingService(semantic_budget=0)
+    two_stage = MatchingService(semantic_budget=args.budget)
+    rng = np.random.default_rng(0)
+    k = args.top_k
+
+    print(f"budget M = {args.budget}, top-{k}, {len(USERS)} users, best of {args.repeat}")
+    print(f"{'N':>7}  {'single ms':>10}  {'two-stage ms':>12}  {'speed-up':>8}  "
+          f"{'overlap@' + str(k):>10}  {'overlap@50':>10}  {'identical top-' + str(k):>16}")
+
+    for n in [int(size) for size in args.sizes.split(",")]:
+        opportunities = random_opportunities(n, seed=n)
+        features = CandidateFeatures(opportunities)
+        vectors = rng.standard_normal((n, DIM)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        blobs = {opp["id"]: vectors[i].tobytes() for i, opp in enumerate(opportunities)}
+
+        single_total = two_total = 0.0
+        overlap_k = overlap_50 = identical = 0
+        for user_data, user_preferences in USERS:
+            user_vector = rng.standard_normal(DIM).astype(np.float32)
+            user_vector /= np.linalg.norm(user_vector)
+            similarity_fn = blob_similarity_fn(user_vector, blobs)
+
+            single_time, reference = best_of(lambda: single.match_opportunities_batch(
+                user_data, user_preferences, opportunities, features=features,
+                similarity_fn=similarity_fn, top_k=50
+            ), args.repeat)
+            two_time, shortlisted = best_of(lambda: two_stage.match_opportunities_batch(
+                user_data, user_preferences, opportunities, features=features,
+                similarity_fn=similarity_fn, top_k=50
+            ), args.repeat)
+            single_total += single_time
+            two_total += two_time
+
+            expected = [r.opportunity_id for r in reference]
+            actual = [r.opportunity_id for r in shortlisted]
+            overlap_k += len(set(expected[:k]) & set(actual[:k])) / k
+            overlap_50 += len(set(expected) & set(actual)) / len(expected)
+            identical += expected[:k] == actual[:k]
+
+        users = len(USERS)
+        print(f"{n:>7}  {single_total / users * 1000:>10.1f}  {two_total / users * 1000:>12.1f}  "
+              f"{single_total / two_total:>7.1f}x  {overlap_k / users:>10.2f}  {overlap_50 / users:>10.2f}  "
+              f"{identical:>13d}/{users}")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,16 +7,61 @@ Usage:
 
 Note: This script will add new columns to existing tables. 
 For production, consider using Alembic for proper migrations.
+It migrates the SQLite file named by DATABASE_URL (default: app.db); other
+backends get their schema from SQLAlchemy's create_all on startup.
 """
 import sqlite3
 import os
 from pathlib import Path
 
+from sqlalchemy.engine import make_url
+
 # Database path
-DB_PATH = Path(__file__).parent / "app.db"
+DATABASE_URL = make_url(os.getenv("DATABASE_URL", "sqlite:///./app.db"))
+DB_PATH = Path(DATABASE_URL.database or "") if DATABASE_URL.get_backend_name() == "sqlite" else None
+if DB_PATH is not None and not DB_PATH.is_absolute():
+    DB_PATH = Path(__file__).parent / DB_PATH
+
+def backfill_country_norm(cursor):
+    """Fill country_norm (the must-have country filter) on rows written before it existed."""
+    from app.services.opportunity_features import normalize
+
+    # Lowercased in Python: SQLite's lower() only folds ASCII ("CÔTE D'IVOIRE")
+    rows = cursor.execute("SELECT id, country FROM opportunities WHERE country_norm IS NULL").fetchall()
+    cursor.executemany(
+        "UPDATE opportunities SET country_norm = ? WHERE id = ?",
+        [(normalize(country), opportunity_id) for opportunity_id, country in rows],
+    )
+    if rows:
+        print(f"Filled country_norm on {len(rows)} opportunities")
+
+
+def migrate_user_counters(url):
+    """Create user_counters if missing and recompute every row from the swipes and applications."""
+    from sqlalchemy.orm import Session
+
+    from app.database import create_database_engine
+    from app.models.user_counters import UserCounters
+    from app.services.user_counters import rebuild_user_counters
+
+    engine = create_database_engine(url)
+    try:
+        UserCounters.__table__.create(bind=engine, checkfirst=True)
+        with Session(engine) as db:
+            count = rebuild_user_counters(db)
+            db.commit()
+    finally:
+        engine.dispose()
+    print(f"Rebuilt user_counters for {count} users")
+
 
 def migrate():
     """Add new columns to user_swipes, users, and opportunities tables."""
+    if DB_PATH is None:
+        print(f"{DATABASE_URL.get_backend_name()} database: no columns to migrate (tables are created on startup)")
+        migrate_user_counters(DATABASE_URL.render_as_string(hide_password=False))
+        return
+
     if not DB_PATH.exists():
         print(f"Database not found at {DB_PATH}")
         print("Creating new database...")
@@ -37,6 +82,9 @@ def migrate():
         cursor.execute("PRAGMA table_info(opportunities)")
         opp_columns = [col[1] for col in cursor.fetchall()]
 
+        cursor.execute("PRAGMA table_info(user_preferences)")
+        pref_columns = [col[1] for col in cursor.fetchall()]
+
         # Add columns to user_swipes table
         if 'status' not in swipe_columns:
             print("Adding 'status' column to user_swipes...")
@@ -112,6 +160,49 @@ def migrate():
         if 'company' not in opp_columns:
             print("Adding 'company' column to opportunities...")
             cursor.execute("ALTER TABLE opportunities ADD COLUMN company TEXT")
+        if 'required_skill_ids' not in opp_columns:
+            print("Adding 'required_skill_ids' column to opportunities...")
+            cursor.execute("ALTER TABLE opportunities ADD COLUMN required_skill_ids JSON")
+        if 'preferred_skill_ids' not in opp_columns:
+            print("Adding 'preferred_skill_ids' column to opportunities...")
+            cursor.execute("ALTER TABLE opportunities ADD COLUMN preferred_skill_ids JSON")
+
+        # Derived matching inputs (see app/services/opportunity_features.py)
+        for column in ("location_norm", "country_norm", "work_arrangement_norm", "opportunity_type_norm",
+                       "company_size_norm", "experience_level_norm", "description_excerpt", "skills_text"):
+            if column not in opp_columns:
+                print(f"Adding '{column}' column to opportunities...")
+                cursor.execute(f"ALTER TABLE opportunities ADD COLUMN {column} TEXT")
+        backfill_country_norm(cursor)
+
+        # Must-have preference flags
+        for flag in ("must_have_opportunity_types", "must_have_work_arrangements",
+                     "must_have_salary", "must_have_countries"):
+            if pref_columns and flag not in pref_columns:
+                print(f"Adding '{flag}' column to user_preferences...")
+                cursor.execute(f"ALTER TABLE user_preferences ADD COLUMN {flag} BOOLEAN DEFAULT 0")
+
+        # Indexes used by must-have preference filters
+        for column in ("opportunity_type_norm", "work_arrangement_norm", "country_norm", "salary_min", "salary_max"):
+            cursor.execute(
+                f"CREATE INDEX IF NOT EXISTS ix_opportunities_{column} ON opportunities({column})"
+            )
+
+        # Composite indexes for the hot queries (checked by app/services/query_audit.py)
+        composite_indexes = {
+            "ix_opportunities_live_type_norm": "opportunities(is_active, is_stale, opportunity_type_norm)",
+            "ix_opportunities_live_updated": "opportunities(is_active, is_stale, updated_at)",
+            "ix_opportunities_stale_refreshed": "opportunities(is_stale, refreshed_at)",
+            "ix_opportunities_stale_created": "opportunities(is_stale, created_at)",
+            "ix_user_swipes_user_date": "user_swipes(user_id, swipe_date)",
+            "ix_user_swipes_user_created": "user_swipes(user_id, created_at)",
+        }
+        for name, columns in composite_indexes.items():
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {columns}")
+        # Replaced by the *_norm indexes (type and arrangement filters use the normalized columns)
+        for name in ("ix_opportunities_live_type", "ix_opportunities_opportunity_type",
+                     "ix_opportunities_work_arrangement"):
+            cursor.execute(f"DROP INDEX IF EXISTS {name}")
 
         # Unique index for source + external_id (ignores NULL external_id rows)
         print("Ensuring unique index on opportunities(source, external_id)...")
@@ -122,11 +213,20 @@ def migrate():
         )
 
         conn.commit()
+        migrate_user_counters(f"sqlite:///{DB_PATH}")
         print("\nMigration completed successfully!")
         print("\nNew columns added:")
         print("  user_swipes: status, preview_data, edited_data, swipe_date")
         print("  users: daily_swipe_limit, age, location, preferred_countries, screening_completed, screening_completed_at, consent_share_documents")
-        print("  opportunities: source, external_id, external_url, refreshed_at, is_stale, location, job_type, url, created_at, company")
+        print("  opportunities: source, external_id, external_url, refreshed_at, is_stale, location, job_type, url, created_at, company, required_skill_ids, preferred_skill_ids, "
+              "location_norm, country_norm, work_arrangement_norm, opportunity_type_norm, company_size_norm, "
+              "experience_level_norm, description_excerpt, skills_text")
+        print("  user_preferences: must_have_opportunity_types, must_have_work_arrangements, must_have_salary, must_have_countries")
+        print("\nComposite indexes: " + ", ".join(composite_indexes))
+        print("user_counters: created and rebuilt (`python -m app.services.user_counters` to repair)")
+        print("\nRun `python -m app.services.skill_vocabulary` to fill the skill id columns.")
+        print("Run `python -m app.services.opportunity_features` to fill the derived opportunity columns.")
+        print("Run `python -m app.services.query_audit` to check the hot query plans.")
 
     except sqlite3.Error as e:
         conn.rollback()
@@ -0,0 +1,136 @@
+"""
+Tests for the IVF-flat ANN index
+
+Run with: pytest tests/test_ann_index.py -v -s   (-s prints the recall report)
+"""
+import numpy as np
+import pytest
+
+from app.services.ann_index import IVFFlatIndex, _normalize
+
+
+def clustered_vectors(n, dim, n_clusters, seed=0):
+    """Synthetic embeddings that cluster the way real job vectors do."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_clusters, dim))
+    labels = rng.integers(0, n_clusters, n)
+    return (centers[labels] + 0.4 * rng.standard_normal((n, dim))).astype(np.float32)
+
+
+def brute_force_top_k(vectors, query, k):
+    scores = _normalize(vectors) @ _normalize(query)[0]
+    return set(np.argsort(-scores)[:k].tolist())
+
+
+class TestRecall:
+    """Recall@k of the IVF index against exact search."""
+
+    def test_recall_at_k_vs_brute_force(self):
+        n, dim, k = 20000, 64, 10
+        vectors = clustered_vectors(n, dim, n_clusters=100)
+        queries = clustered_vectors(50, dim, n_clusters=100, seed=1)
+
+        index = IVFFlatIndex(dim=dim)
+        index.build(list(range(n)), vectors)
+        assert index.is_trained
+
+        hits = 0
+        for query in queries:
+            approx, _ = index.search(query, k)
+            hits += len(set(approx) & brute_force_top_k(vectors, query, k))
+        recall = hits / (k * len(queries))
+
+        print(f"\nIVF-flat recall@{k} vs brute force: {recall:.3f} "
+              f"(n={n}, lists={len(index._lists)}, n_probe={index.n_probe})")
+        assert recall >= 0.9
+
+
+class TestIVFFlatIndex:
+    """Behavioural tests for building, updating and searching."""
+
+    @pytest.fixture
+    def vectors(self):
+        return clustered_vectors(2000, 32, n_clusters=20)
+
+    def test_small_index_is_exact(self):
+        vectors = clustered_vectors(100, 16, n_clusters=5)
+        index = IVFFlatIndex(dim=16)
+        index.build(list(range(100)), vectors)
+
+        assert not index.is_trained
+        ids, scores = index.search(vectors[7], k=5)
+        assert set(ids) == brute_force_top_k(vectors, vectors[7], 5)
+        assert ids[0] == 7
+        assert scores[0] == pytest.approx(1.0, abs=1e-5)
+        assert scores == sorted(scores, reverse=True)
+
+    def test_remove_hides_ids(self, vectors):
+        index = IVFFlatIndex(dim=32)
+        index.build(list(range(len(vectors))), vectors)
+
+        assert index.remove([3, 4, 99999]) == 2
+        assert 3 not in index
+        ids, _ = index.search(vectors[3], k=20)
+        assert 3 not in ids and 4 not in ids
+        assert len(index) == len(vectors) - 2
+
+    def test_add_after_training_is_searchable(self, vectors):
+        index = IVFFlatIndex(dim=32)
+        index.build(list(range(len(vectors))), vectors)
+
+        new_vector = clustered_vectors(1, 32, n_clusters=20, seed=5)
+        index.add([50000], new_vector)
+
+        ids, _ = index.search(new_vector[0], k=1)
+        assert ids == [50000]
+
+    def test_add_replaces_existing_id(self, vectors):
+        index = IVFFlatIndex(dim=32)
+        index.build(list(range(len(vectors))), vectors)
+
+        index.add([0], vectors[1:2])
+        assert len(index) == len(vectors)
+        ids, _ = index.search(vectors[1], k=2)
+        assert set(ids) == {0, 1}
+
+    def test_exclude_and_allowed_filters(self, vectors):
+        index = IVFFlatIndex(dim=32)
+        index.build(list(range(len(vectors))), vectors)
+
+        ids, _ = index.search(vectors[10], k=5, exclude={10})
+        assert 10 not in ids
+
+        ids, _ = index.search(vectors[10], k=5, allowed={1, 2, 3})
+        assert set(ids) <= {1, 2, 3}
+
+    def test_filtered_search_probes_until_k_found(self, vectors):
+        index = IVFFlatIndex(dim=32)
+        index.build(list(range(len(vectors))), vectors)
+        allowed = set(range(0, len(vectors), 10))
+
+        ids, _ = index.search(vectors[10], k=40, allowed=allowed, exclude={10, 20})
+        assert len(ids) == 40
+        assert set(ids) <= allowed - {10, 20}
+
+        ids, _ = index.search(vectors[10], k=1000)
+        assert len(ids) == 1000
+
+    def test_small_allowed_set_is_exact(self, vectors):
+        index = IVFFlatIndex(dim=32)
+        index.build(list(range(len(vectors))), vectors)
+        allowed = list(range(0, len(vectors), 50))
+
+        ids, _ = index.search(vectors[7], k=10, allowed=set(allowed))
+        expected = brute_force_top_k(vectors[allowed], vectors[7], 10)
+        assert set(ids) == {allowed[i] for i in expected}
+
+    def test_compaction_keeps_results(self, vectors):
+        index = IVFFlatIndex(dim=32)
+        index.build(list(range(len(vectors))), vectors)
+
+        # Replace every vector twice to force dead rows past the compaction threshold
+        for _ in range(2):
+            index.add(list(range(len(vectors))), vectors)
+        assert len(index) == len(vectors)
+        ids, _ = index.search(vectors[42], k=1)
+        assert ids == [42]
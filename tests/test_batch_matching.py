@@ -0,0 +1,211 @@
+"""
+Tests for the offline batch matching job
+
+Run with: pytest tests/test_batch_matching.py -v
+"""
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.api import match
+from app.database import Base
+from app.models.match_score import UserMatchScore
+from app.models.opportunity import Opportunity
+from app.models.preferences import UserPreferences
+from app.models.swipe import UserSwipe
+from app.models.user import User
+from app.services import embedding_store, feed_snapshot
+from app.services.batch_matching import precomputed_candidate_ids, run_batch_matching
+from app.services.catalog import reset_opportunity_catalog
+from app.services.embedding_store import get_cached_user_embedding, load_opportunity_embeddings
+from app.services.feed_snapshot import FeedSnapshotCache, reset_feed_snapshots
+from app.services.matching import MatchingService, opportunity_to_dict, preferences_to_dict, user_to_dict
+from app.services.skill_vocabulary import reset_skill_vocabulary
+from app.services.swiped_sets import reset_swiped_sets
+from tests.test_embedding_store import fake_embeddings
+from tests.test_feature_matrix import random_opportunities
+from tests.test_feed_snapshot import feed_ids
+
+
+@pytest.fixture
+def db():
+    """Isolated in-memory database with fresh process-wide caches."""
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    reset_feed_snapshots()
+    reset_opportunity_catalog()
+    reset_skill_vocabulary()
+    reset_swiped_sets()
+    embedding_store.user_embedding_cache.clear()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+        reset_feed_snapshots()
+        reset_opportunity_catalog()
+        reset_skill_vocabulary()
+        reset_swiped_sets()
+        embedding_store.user_embedding_cache.clear()
+
+
+@pytest.fixture
+def encoder():
+    with patch.object(embedding_store, "generate_embeddings_batch", side_effect=fake_embeddings), \
+            patch.object(embedding_store, "generate_embedding", side_effect=lambda t: fake_embeddings([t])[0]):
+        yield
+
+
+@pytest.fixture
+def catalog(db):
+    """Three users (two screened) and 40 random opportunities."""
+    for opp in random_opportunities(40, seed=4):
+        opp.pop("id")
+        db.add(Opportunity(description=f"Work on {opp['title']}", **opp))
+    users = [
+        User(email="a@example.com", hashed_password="x", name="A", skills=["Python", "SQL"],
+             headline="Backend developer", screening_completed=True),
+        User(email="b@example.com", hashed_password="x", name="B", skills=["Figma"],
+             headline="Designer", screening_completed=True),
+        User(email="c@example.com", hashed_password="x", name="C", skills=["Go"]),
+    ]
+    db.add_all(users)
+    db.commit()
+    db.add(UserPreferences(user_id=users[0].id, work_arrangements=["remote"], salary_min=50000))
+    db.add(UserSwipe(user_id=users[0].id, opportunity_id=1, action="like"))
+    db.commit()
+    return users
+
+
+def online_ranking(db, user, top_n):
+    """What the online batch path returns for the same inputs."""
+    opps = [opportunity_to_dict(o) for o in db.query(Opportunity).order_by(Opportunity.id)]
+    vectors = load_opportunity_embeddings(db, opps)
+    vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    user_vector = get_cached_user_embedding(db, user_to_dict(user))
+    similarities = vectors @ (user_vector / np.linalg.norm(user_vector))
+    prefs = db.query(UserPreferences).filter(UserPreferences.user_id == user.id).first()
+    results = MatchingService().match_opportunities_batch(
+        user_to_dict(user), preferences_to_dict(prefs), opps, semantic_similarities=similarities
+    )
+    swiped = {s.opportunity_id for s in db.query(UserSwipe).filter(UserSwipe.user_id == user.id)}
+    return [(r.opportunity_id, r.overall_score) for r in results if r.opportunity_id not in swiped][:top_n]
+
+
+def stored(db, user):
+    rows = db.query(UserMatchScore).filter(UserMatchScore.user_id == user.id).order_by(UserMatchScore.rank)
+    return [(r.opportunity_id, r.overall_score) for r in rows]
+
+
+class TestRunBatchMatching:
+    """Tests for the offline job."""
+
+    def test_stores_top_n_for_screened_users(self, db, encoder, catalog):
+        summary = run_batch_matching(db, top_n=10, workers=1)
+
+        assert summary["users"] == 2
+        assert summary["rows"] == 20
+        assert stored(db, catalog[2]) == []
+        assert 1 not in precomputed_candidate_ids(db, catalog[0].id)
+
+    def test_matches_online_ranking(self, db, encoder, catalog):
+        run_batch_matching(db, top_n=10, workers=1)
+
+        for user in catalog[:2]:
+            assert stored(db, user) == online_ranking(db, user, 10)
+
+    def test_rerun_replaces_rows(self, db, encoder, catalog):
+        run_batch_matching(db, top_n=10, workers=1)
+        run_batch_matching(db, top_n=5, workers=1)
+        assert len(stored(db, catalog[0])) == 5
+
+    def test_process_pool_matches_inline(self, db, encoder, catalog):
+        run_batch_matching(db, top_n=10, block_size=1, workers=1)
+        inline = [stored(db, user) for user in catalog]
+
+        run_batch_matching(db, top_n=10, block_size=1, workers=2)
+        assert [stored(db, user) for user in catalog] == inline
+
+    def test_user_profiles_encoded_in_one_batch(self, db, catalog):
+        with patch.object(embedding_store, "generate_embeddings_batch", side_effect=fake_embeddings) as batch, \
+                patch.object(embedding_store, "generate_embedding") as single:
+            load_opportunity_embeddings(db, [opportunity_to_dict(o) for o in db.query(Opportunity)])
+            batch.reset_mock()
+            run_batch_matching(db, top_n=10, workers=1)
+
+        single.assert_not_called()
+        assert [len(call.args[0]) for call in batch.call_args_list] == [2]
+
+
+class TestPrecomputedFeed:
+    """The AI feed can start from the stored candidates."""
+
+    @pytest.fixture
+    def feed(self, db, encoder, monkeypatch):
+        """AI feed pages of three, snapshots three deep, precomputed candidates on."""
+        monkeypatch.setattr(match, "FEED_PRECOMPUTED_CANDIDATES", True)
+        monkeypatch.setattr(feed_snapshot, "_cache", FeedSnapshotCache(depth=3))
+
+        def get_page(user, cursor=None):
+            return match.get_ai_powered_feed(
+                limit=3, opportunity_type=None, use_preferences=True, cursor=cursor,
+                current_user=user, db=db
+            )
+        return get_page
+
+    @pytest.fixture
+    def scored(self, monkeypatch):
+        """Ids of the candidates scored by each ranking."""
+        calls = []
+        original = MatchingService.match_opportunities_batch
+
+        def spy(self, *args, **kwargs):
+            calls.append({opp["id"] for opp in kwargs["opportunities"]})
+            return original(self, *args, **kwargs)
+
+        monkeypatch.setattr(MatchingService, "match_opportunities_batch", spy)
+        return calls
+
+    @pytest.mark.parametrize("use_catalog", [True, False])
+    def test_feed_scores_precomputed_candidates(self, db, catalog, feed, monkeypatch, use_catalog):
+        monkeypatch.setattr(match, "OPPORTUNITY_CATALOG", use_catalog)
+        run_batch_matching(db, top_n=3, workers=1)
+
+        assert feed_ids(feed(catalog[0])) == precomputed_candidate_ids(db, catalog[0].id)
+
+    @pytest.mark.parametrize("use_catalog", [True, False])
+    def test_opportunities_added_after_run_are_scored(self, db, catalog, feed, scored, monkeypatch, use_catalog):
+        monkeypatch.setattr(match, "OPPORTUNITY_CATALOG", use_catalog)
+        run_batch_matching(db, top_n=3, workers=1)
+        added = Opportunity(title="Backend Developer", description="Python and SQL", required_skills=["Python"])
+        db.add(added)
+        db.commit()
+
+        feed(catalog[0])
+        assert scored[-1] == set(precomputed_candidate_ids(db, catalog[0].id)) | {added.id}
+
+    @pytest.mark.parametrize("use_catalog", [True, False])
+    def test_feed_continues_past_stored_candidates(self, db, catalog, feed, monkeypatch, use_catalog):
+        monkeypatch.setattr(match, "OPPORTUNITY_CATALOG", use_catalog)
+        run_batch_matching(db, top_n=3, workers=1)
+
+        pages, cursor, total = [], None, None
+        while True:
+            response = feed(catalog[0], cursor)
+            total = response["total_available"] if total is None else total
+            pages.extend(feed_ids(response))
+            cursor = response["next_cursor"]
+            if cursor is None:
+                break
+
+        assert pages[:3] == precomputed_candidate_ids(db, catalog[0].id)
+        assert len(pages) == len(set(pages)) == total == 39
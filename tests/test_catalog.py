@@ -0,0 +1,214 @@
+"""
+Tests for the in-memory opportunity catalog
+
+Run with: pytest tests/test_catalog.py -v
+"""
+import random
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine, event, update
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.api import match
+from app.database import Base
+from app.models.opportunity import Opportunity
+from app.models.preferences import UserPreferences
+from app.models.user import User
+from app.services import catalog, embedding_store, feed_snapshot, skill_vocabulary, swiped_sets
+from app.services.catalog import build_catalog, get_opportunity_catalog
+from app.services.feature_matrix import CandidateFeatures
+from app.services.matching import MatchingService
+from app.services.preference_filters import must_have_clauses
+from tests.test_embedding_store import fake_embeddings
+from tests.test_feature_matrix import USERS, random_opportunities
+from tests.test_feed_snapshot import feed_ids, get_feed
+
+COUNTRIES = ["Ghana", "ghana", "Nigeria", "Kenya", "Côte d'Ivoire", "CÔTE D'IVOIRE", None]
+
+MUST_HAVES = [
+    {"opportunity_types": ["Job", "grant"], "must_have_opportunity_types": True},
+    {"work_arrangements": ["remote"], "must_have_work_arrangements": True},
+    {"work_arrangements": ["onsite", "hybrid"], "must_have_work_arrangements": True},
+    {"salary_min": 50000, "must_have_salary": True},
+    {"preferred_locations": [{"country": "ghana"}], "must_have_countries": True},
+    {"preferred_locations": [{"country": "côte d'ivoire"}], "must_have_countries": True},
+    {"salary_min": 40000, "must_have_salary": True, "opportunity_types": ["job"],
+     "must_have_opportunity_types": True, "preferred_locations": [{"country": "Kenya"}],
+     "must_have_countries": True},
+    {"opportunity_types": ["job"]},
+]
+
+
+@pytest.fixture
+def db():
+    """Isolated in-memory database with fresh process-wide caches."""
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    catalog.reset_opportunity_catalog()
+    feed_snapshot.reset_feed_snapshots()
+    skill_vocabulary.reset_skill_vocabulary()
+    swiped_sets.reset_swiped_sets()
+    embedding_store.user_embedding_cache.clear()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+        catalog.reset_opportunity_catalog()
+        feed_snapshot.reset_feed_snapshots()
+        skill_vocabulary.reset_skill_vocabulary()
+        swiped_sets.reset_swiped_sets()
+        embedding_store.user_embedding_cache.clear()
+
+
+def add_opportunities(db, n, seed=0):
+    rng = random.Random(seed)
+    rows = []
+    for opp in random_opportunities(n, seed):
+        opp.pop("id")
+        rows.append(Opportunity(description="Work " * rng.randint(0, 200), country=rng.choice(COUNTRIES), **opp))
+    db.add_all(rows)
+    db.commit()
+    return rows
+
+
+class TestCatalogFeatures:
+    """The catalog scores exactly like freshly loaded rows."""
+
+    @pytest.mark.parametrize("user_data, prefs", USERS)
+    def test_take_matches_fresh_encoding(self, db, user_data, prefs):
+        add_opportunities(db, 60)
+        snapshot = build_catalog(db)
+        rows = np.array([40, 3, 17, 8, 59, 0])
+        records, features = snapshot.take(rows)
+
+        service = MatchingService()
+        semantic = np.linspace(-1, 1, len(rows))
+        fresh = service.match_opportunities_batch(
+            user_data, prefs, records, semantic_similarities=semantic,
+            features=CandidateFeatures(records)
+        )
+        taken = service.match_opportunities_batch(
+            user_data, prefs, records, semantic_similarities=semantic, features=features
+        )
+        assert taken == fresh
+
+    def test_text_hash_matches_full_row(self, db):
+        opportunities = add_opportunities(db, 10)
+        snapshot = build_catalog(db)
+        for record, opp in zip(snapshot.records, opportunities):
+            full = embedding_store.opportunity_text_fields(opp)
+            assert record["text_hash"] == embedding_store.opportunity_text_hash(full)
+
+
+class TestCatalogFilters:
+    """Boolean masks select the same rows as the SQL filters."""
+
+    @pytest.mark.parametrize("prefs", MUST_HAVES)
+    def test_must_have_mask_matches_sql(self, db, prefs):
+        add_opportunities(db, 200)
+        snapshot = build_catalog(db)
+
+        expected = {opp.id for opp in db.query(Opportunity).filter(*must_have_clauses(prefs)).all()}
+        assert set(snapshot.ids[snapshot.eligible(user_preferences=prefs)].tolist()) == expected
+
+    def test_type_filter_and_rows_for(self, db):
+        add_opportunities(db, 50)
+        snapshot = build_catalog(db)
+        expected = [opp.id for opp in db.query(Opportunity).filter(Opportunity.opportunity_type == "job")]
+
+        assert snapshot.ids[snapshot.eligible("job")].tolist() == sorted(expected)
+        assert snapshot.rows_for([9999, 5, 2, 5]).tolist() == [1, 4]
+
+
+class TestCatalogRefresh:
+    """The process-wide catalog follows writes incrementally."""
+
+    def test_refresh_after_add_edit_and_stale(self, db):
+        opportunities = add_opportunities(db, 20)
+        first = get_opportunity_catalog(db)
+        assert get_opportunity_catalog(db) is first
+
+        edited, staled = opportunities[3], opportunities[7]
+        edited.title = "Renamed"
+        edited.updated_at = datetime.utcnow() + timedelta(seconds=1)
+        staled.is_stale = True
+        added = Opportunity(title="Added", required_skills=["python"])
+        db.add(added)
+        db.commit()
+
+        second = get_opportunity_catalog(db)
+        assert second is not first
+        ids = second.ids.tolist()
+        assert added.id in ids and staled.id not in ids
+        assert second.records[ids.index(edited.id)]["title"] == "Renamed"
+        # Unchanged rows are carried over rather than re-read
+        unchanged = opportunities[0].id
+        assert second.records[ids.index(unchanged)] is first.records[first.ids.tolist().index(unchanged)]
+        assert second.ids.tolist() == sorted(
+            opp.id for opp in db.query(Opportunity).filter(Opportunity.is_stale == False)
+        )
+
+    def test_refresh_statements_do_not_list_the_catalog(self, db):
+        opportunities = add_opportunities(db, 50)
+        first = get_opportunity_catalog(db)
+        returning = opportunities[5]
+        db.query(Opportunity).filter(Opportunity.id == returning.id).update({"is_stale": True})
+        db.commit()
+        get_opportunity_catalog(db)
+
+        # A bulk UPDATE that leaves updated_at alone brings an older row back
+        db.execute(update(Opportunity).where(Opportunity.id == returning.id).values(
+            is_stale=False, updated_at=first.last_update - timedelta(days=1)
+        ))
+        db.add(Opportunity(title="Added", required_skills=["python"]))
+        db.commit()
+        statements = []
+        listener = lambda conn, cursor, statement, parameters, context, executemany: statements.append(
+            (statement, parameters)
+        )
+        event.listen(db.get_bind(), "before_cursor_execute", listener)
+        try:
+            refreshed = get_opportunity_catalog(db)
+        finally:
+            event.remove(db.get_bind(), "before_cursor_execute", listener)
+
+        assert returning.id in refreshed.ids.tolist()
+        assert len(refreshed) == len(first) + 1
+        assert not any("NOT IN" in statement for statement, _ in statements)
+        assert max(len(parameters) for _, parameters in statements) < 10
+
+
+class TestCatalogFeed:
+    """The AI feed ranks the same from the catalog as from SQL."""
+
+    @pytest.mark.parametrize("prefs", [{}, MUST_HAVES[5]])
+    def test_feed_matches_sql_path(self, db, prefs, monkeypatch):
+        add_opportunities(db, 40)
+        user = User(email="catalog@example.com", hashed_password="x", name="Catalog User",
+                    skills=["python", "sql"], screening_completed=True)
+        db.add(user)
+        db.commit()
+        if prefs:
+            db.add(UserPreferences(user_id=user.id, **prefs))
+            db.commit()
+
+        with patch.object(embedding_store, "generate_embeddings_batch", side_effect=fake_embeddings), \
+                patch.object(embedding_store, "generate_embedding", side_effect=lambda t: fake_embeddings([t])[0]):
+            from_catalog = get_feed(db, user, limit=20)
+            feed_snapshot.reset_feed_snapshots()
+            monkeypatch.setattr(match, "OPPORTUNITY_CATALOG", False)
+            from_sql = get_feed(db, user, limit=20)
+
+        assert feed_ids(from_catalog) == feed_ids(from_sql)
+        assert from_catalog["total_available"] == from_sql["total_available"]
+        assert [item["match"] for item in from_catalog["feed"]] == [item["match"] for item in from_sql["feed"]]
@@ -0,0 +1,88 @@
+"""
+Tests for database engine configuration
+
+Run with: pytest tests/test_database.py -v
+"""
+import pytest
+from sqlalchemy import text
+
+from app import database
+from app.database import create_database_engine, engine_options, sqlite_pragmas
+
+
+@pytest.fixture
+def file_engine(tmp_path):
+    """Tuned engine on a temporary SQLite file."""
+    engine = create_database_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    try:
+        yield engine
+    finally:
+        engine.dispose()
+
+
+def pragma(connection, name):
+    return connection.execute(text(f"PRAGMA {name}")).scalar()
+
+
+class TestSqlitePragmas:
+    """Every SQLite connection is tuned on connect."""
+
+    def test_pragmas_applied(self, file_engine):
+        with file_engine.connect() as connection:
+            assert pragma(connection, "journal_mode") == "wal"
+            assert pragma(connection, "synchronous") == 1  # NORMAL
+            assert pragma(connection, "mmap_size") == database.SQLITE_MMAP_SIZE
+            assert pragma(connection, "busy_timeout") == database.SQLITE_BUSY_TIMEOUT_MS
+
+    def test_pragmas_overridable(self, tmp_path):
+        engine = create_database_engine(
+            f"sqlite:///{tmp_path / 'journal.db'}",
+            pragmas=sqlite_pragmas(journal_mode="DELETE", synchronous="FULL"),
+        )
+        with engine.connect() as connection:
+            assert pragma(connection, "journal_mode") == "delete"
+            assert pragma(connection, "synchronous") == 2  # FULL
+        engine.dispose()
+
+    def test_writer_not_blocked_by_reader(self, file_engine):
+        with file_engine.begin() as connection:
+            connection.execute(text("CREATE TABLE swipes (id INTEGER PRIMARY KEY)"))
+            connection.execute(text("INSERT INTO swipes VALUES (1)"))
+
+        with file_engine.connect() as reader, file_engine.connect() as writer:
+            reader.execute(text("BEGIN"))
+            assert reader.execute(text("SELECT count(*) FROM swipes")).scalar() == 1
+            # Under the rollback journal this commit waits for the reader
+            writer.execute(text("BEGIN IMMEDIATE"))
+            writer.execute(text("INSERT INTO swipes VALUES (2)"))
+            writer.execute(text("COMMIT"))
+
+            assert reader.execute(text("SELECT count(*) FROM swipes")).scalar() == 1  # snapshot
+            reader.execute(text("COMMIT"))
+            assert reader.execute(text("SELECT count(*) FROM swipes")).scalar() == 2
+
+
+class TestEngineOptions:
+    """Pool settings per backend."""
+
+    def test_postgres_pool(self, monkeypatch):
+        monkeypatch.setattr(database, "DB_POOL_SIZE", 7)
+        monkeypatch.setattr(database, "DB_MAX_OVERFLOW", 3)
+        monkeypatch.setattr(database, "DB_POOL_RECYCLE", 600)
+
+        options = engine_options("postgresql://app:secret@db/tender")
+        assert (options["pool_size"], options["max_overflow"], options["pool_recycle"]) == (7, 3, 600)
+        assert options["pool_pre_ping"]
+        assert "connect_args" not in options
+
+    def test_sqlite_file_pool(self):
+        options = engine_options("sqlite:///./app.db")
+        assert options["connect_args"] == {"check_same_thread": False}
+        assert options["pool_size"] == database.DB_POOL_SIZE
+
+    @pytest.mark.parametrize("url", ["sqlite://", "sqlite:///:memory:"])
+    def test_memory_sqlite_keeps_default_pool(self, url):
+        options = engine_options(url)
+        assert "pool_size" not in options
+        with create_database_engine(url).connect() as connection:
+            assert connection.execute(text("SELECT 1")).scalar() == 1
@@ -0,0 +1,104 @@
+"""
+Tests for embedding backends, warm-up and readiness
+
+Backend parity tests need sentence-transformers (and onnxruntime for the
+ONNX backend) and are skipped when those are not installed.
+
+Run with: pytest tests/test_embedding_backends.py -v
+"""
+import numpy as np
+import pytest
+from unittest.mock import MagicMock, patch
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import embedding
+
+PARITY_TEXTS = [
+    "Title: Python Developer Company: Acme Required Skills: python, fastapi",
+    "Name: Ada Skills: machine learning, statistics, sql",
+    "Graduate internship in civil engineering based in Accra",
+]
+
+
+@pytest.fixture
+def no_model():
+    """Start each test without a loaded model or warm-up error."""
+    with patch.object(embedding, "_model", None), patch.object(embedding, "_warmup_error", None):
+        yield
+
+
+class TestWarmUp:
+    """Tests for startup loading and the readiness endpoint."""
+
+    def test_warm_up_loads_and_encodes_dummy_batch(self, no_model):
+        model = MagicMock()
+        with patch.object(embedding, "load_model", return_value=model):
+            embedding.warm_up_model()
+
+        assert embedding.is_model_loaded()
+        texts = model.encode.call_args[0][0]
+        assert len(texts) == embedding.WARMUP_BATCH_SIZE
+
+    def test_ready_waits_for_model_when_warm_up_enabled(self, no_model):
+        client = TestClient(app)
+        with patch.object(embedding, "EMBEDDING_WARMUP", True):
+            response = client.get("/health/ready")
+            assert response.status_code == 503
+            assert response.json()["model_loaded"] is False
+
+            with patch.object(embedding, "load_model", return_value=MagicMock()):
+                embedding.warm_up_model()
+            assert client.get("/health/ready").status_code == 200
+
+        # Liveness is unaffected
+        assert client.get("/health").json() == {"status": "healthy"}
+
+    def test_ready_reports_warm_up_failure(self, no_model):
+        with patch.object(embedding, "EMBEDDING_WARMUP", True), \
+                patch.object(embedding, "load_model", side_effect=RuntimeError("no weights")):
+            with pytest.raises(RuntimeError):
+                embedding.warm_up_model()
+            response = TestClient(app).get("/health/ready")
+
+        assert response.status_code == 503
+        assert response.json()["error"] == "no weights"
+
+    def test_lazy_mode_is_ready_without_model(self, no_model):
+        with patch.object(embedding, "EMBEDDING_WARMUP", False):
+            assert TestClient(app).get("/health/ready").status_code == 200
+
+    def test_unknown_backend(self):
+        with pytest.raises(ValueError):
+            embedding.load_model("tensorrt")
+
+
+class TestBackendParity:
+    """Optimised CPU backends must produce vectors close to the stock model."""
+
+    @pytest.fixture(scope="class")
+    def reference(self):
+        pytest.importorskip("sentence_transformers")
+        model = embedding.load_model("sentence-transformers")
+        return model.encode(PARITY_TEXTS, convert_to_numpy=True)
+
+    @staticmethod
+    def row_cosines(a, b):
+        a = a / np.linalg.norm(a, axis=1, keepdims=True)
+        b = b / np.linalg.norm(b, axis=1, keepdims=True)
+        return (a * b).sum(axis=1)
+
+    def test_torch_quantized_parity(self, reference):
+        pytest.importorskip("torch")
+        vectors = embedding.load_model("torch-quantized").encode(PARITY_TEXTS, convert_to_numpy=True)
+
+        assert vectors.shape == reference.shape
+        assert self.row_cosines(vectors, reference).min() > 0.98
+
+    def test_onnx_parity(self, reference, tmp_path):
+        pytest.importorskip("onnxruntime")
+        path = embedding.export_onnx_model(str(tmp_path / "onnx"))
+        vectors = embedding.OnnxEmbeddingModel(path).encode(PARITY_TEXTS)
+
+        assert vectors.shape == reference.shape
+        assert self.row_cosines(vectors, reference).min() > 0.999
@@ -0,0 +1,319 @@
+"""
+Tests for the persistent opportunity embedding store
+
+Run with: pytest tests/test_embedding_store.py -v
+"""
+import asyncio
+import hashlib
+import inspect
+import threading
+
+import numpy as np
+import pytest
+from unittest.mock import patch
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.api import opportunities as opportunities_api
+from app.database import Base
+from app.models.opportunity import Opportunity
+from app.models.user import User
+from app.models.embedding import OpportunityEmbedding, UserEmbedding
+from app.schemas.opportunity import OpportunityCreate
+from app.services import ann_index, embedding_store
+from app.services.embedding_store import (
+    LRUEmbeddingCache,
+    blob_to_vector,
+    get_cached_user_embedding,
+    invalidate_user_embedding,
+    load_opportunity_embeddings,
+    opportunity_text_fields,
+    refresh_opportunity_embeddings,
+    vector_to_blob,
+)
+from app.services.job_sync import JobSyncService
+from app.services.matching import MatchingService
+
+
+def fake_embeddings(texts):
+    """Deterministic 384-d vectors derived from the text hash."""
+    vectors = []
+    for text in texts:
+        seed = int(hashlib.md5(text.encode()).hexdigest()[:8], 16)
+        vectors.append(np.random.default_rng(seed).standard_normal(384).tolist())
+    return vectors
+
+
+@pytest.fixture
+def db():
+    """Isolated in-memory database session."""
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+
+
+@pytest.fixture
+def encoder():
+    """Patch the model call so tests never load sentence-transformers."""
+    with patch.object(embedding_store, "generate_embeddings_batch", side_effect=fake_embeddings) as mock:
+        yield mock
+
+
+@pytest.fixture
+def opportunities(db):
+    rows = [
+        Opportunity(title="Python Developer", description="Build APIs", required_skills=["python"]),
+        Opportunity(title="Data Analyst", description="Dashboards", required_skills=["sql"]),
+    ]
+    db.add_all(rows)
+    db.commit()
+    return rows
+
+
+class TestBlobEncoding:
+    """Tests for float32 blob serialization."""
+
+    def test_roundtrip(self):
+        vector = np.linspace(-1, 1, 384)
+        blob = vector_to_blob(vector)
+        assert len(blob) == 384 * 4
+        np.testing.assert_allclose(blob_to_vector(blob), vector, rtol=1e-6)
+
+
+class TestRefreshOpportunityEmbeddings:
+    """Tests for ingest-time embedding computation."""
+
+    def test_stores_one_row_per_opportunity(self, db, encoder, opportunities):
+        assert refresh_opportunity_embeddings(db, opportunities) == 2
+        assert db.query(OpportunityEmbedding).count() == 2
+
+    def test_unchanged_text_is_not_reencoded(self, db, encoder, opportunities):
+        refresh_opportunity_embeddings(db, opportunities)
+        encoder.reset_mock()
+
+        assert refresh_opportunity_embeddings(db, opportunities) == 0
+        encoder.assert_not_called()
+
+    def test_changed_text_is_reencoded(self, db, encoder, opportunities):
+        refresh_opportunity_embeddings(db, opportunities)
+        opportunities[0].description = "Build APIs and data pipelines"
+        db.commit()
+
+        assert refresh_opportunity_embeddings(db, opportunities) == 1
+        assert db.query(OpportunityEmbedding).count() == 2
+
+    def test_keeps_built_ann_index_in_step(self, db, encoder, opportunities):
+        index = ann_index.get_opportunity_index(db)
+        try:
+            refresh_opportunity_embeddings(db, opportunities)
+            assert opportunities[0].id in index and opportunities[1].id in index
+
+            opportunities[1].mark_stale()
+            db.commit()
+            refresh_opportunity_embeddings(db, opportunities)
+            assert opportunities[1].id not in index
+        finally:
+            ann_index.reset_opportunity_index()
+
+    def test_model_failure_is_logged_not_raised(self, db, opportunities):
+        with patch.object(embedding_store, "generate_embeddings_batch", side_effect=RuntimeError("no model")):
+            assert refresh_opportunity_embeddings(db, opportunities) == 0
+        assert db.query(OpportunityEmbedding).count() == 0
+
+
+class TestWriteEndpoints:
+    """Opportunity writes return before encoding; a background task stores the vectors."""
+
+    @pytest.fixture
+    def client(self, db):
+        app = FastAPI()
+        app.include_router(opportunities_api.router)
+        app.dependency_overrides[opportunities_api.get_db] = lambda: db
+        factory = sessionmaker(autocommit=False, autoflush=False, bind=db.get_bind())
+        with patch.object(embedding_store, "SessionLocal", factory):
+            yield TestClient(app)
+
+    def test_update_queues_encoding(self, db, client, opportunities):
+        opportunity_id = opportunities[0].id
+        with patch.object(embedding_store, "generate_embeddings_batch", side_effect=fake_embeddings) as encoder, \
+                patch.object(opportunities_api, "refresh_embeddings_in_background",
+                             wraps=embedding_store.refresh_embeddings_in_background) as task:
+            response = client.patch(f"/opportunities/{opportunity_id}", json={"description": "APIs and pipelines"})
+
+        assert response.status_code == 200, response.text
+        task.assert_called_once_with([opportunity_id])
+        assert encoder.call_count == 1
+        assert db.query(OpportunityEmbedding).count() == 1
+
+    def test_csv_import_runs_in_threadpool(self, db, client):
+        assert not inspect.iscoroutinefunction(opportunities_api.bulk_import_csv)
+        csv_body = "title,company\nData Analyst,DataCo\nDesigner,Studio\n"
+        with patch.object(embedding_store, "generate_embeddings_batch", side_effect=fake_embeddings):
+            response = client.post("/opportunities/bulk/csv", files={"file": ("jobs.csv", csv_body, "text/csv")})
+
+        assert response.json()["inserted"] == 2, response.text
+        assert db.query(OpportunityEmbedding).count() == 2
+
+    def test_job_sync_encodes_off_event_loop(self, db):
+        jobs = [OpportunityCreate(title="Backend Engineer", company="Acme", description="APIs",
+                                  source="jooble", external_id="sync-1")]
+        threads = []
+
+        def encode(texts):
+            threads.append(threading.current_thread())
+            return fake_embeddings(texts)
+
+        with patch.object(embedding_store, "generate_embeddings_batch", side_effect=encode):
+            assert asyncio.run(JobSyncService(db)._save_jobs(jobs)) == (1, 0)
+
+        assert threads and threading.main_thread() not in threads
+        assert db.query(OpportunityEmbedding).count() == 1
+
+    def test_direct_call_leaves_lazy_path(self, db):
+        request = opportunities_api.BulkImportRequest(opportunities=[
+            opportunities_api.BulkImportItem(title="Remote Dev"),
+        ])
+        with patch.object(embedding_store, "generate_embeddings_batch", side_effect=RuntimeError("not on this path")):
+            assert opportunities_api.bulk_import_opportunities(request, db).inserted == 1
+        assert db.query(OpportunityEmbedding).count() == 0
+
+
+class TestLoadOpportunityEmbeddings:
+    """Tests for reading embeddings on the matching path."""
+
+    def test_reads_stored_vectors_without_model(self, db, encoder, opportunities):
+        refresh_opportunity_embeddings(db, opportunities)
+        encoder.reset_mock()
+
+        opp_dicts = [opportunity_text_fields(o) for o in reversed(opportunities)]
+        matrix = load_opportunity_embeddings(db, opp_dicts)
+
+        encoder.assert_not_called()
+        assert matrix.shape == (2, 384)
+        assert matrix.dtype == np.float32
+
+    def test_missing_vectors_are_backfilled(self, db, encoder, opportunities):
+        opp_dicts = [opportunity_text_fields(o) for o in opportunities]
+        first = load_opportunity_embeddings(db, opp_dicts)
+        assert db.query(OpportunityEmbedding).count() == 2
+
+        encoder.reset_mock()
+        second = load_opportunity_embeddings(db, opp_dicts)
+        encoder.assert_not_called()
+        np.testing.assert_array_equal(first, second)
+
+    def test_batch_matching_uses_stored_vectors(self, db, encoder, opportunities):
+        opp_dicts = [opportunity_text_fields(o) for o in opportunities]
+        embeddings = load_opportunity_embeddings(db, opp_dicts)
+        user = {"skills": ["python"], "work_experiences": []}
+
+        with patch("app.services.matching.get_opportunity_embeddings_batch") as batch_encode, \
+                patch("app.services.matching.get_user_embedding", return_value=embeddings[0].tolist()):
+            results = MatchingService().match_opportunities_batch(
+                user, {}, opp_dicts, opportunity_embeddings=embeddings
+            )
+
+        batch_encode.assert_not_called()
+        assert results[0].opportunity_id == opportunities[0].id
+        assert results[0].semantic_score == pytest.approx(1.0, abs=1e-3)
+
+
+class TestUserEmbeddingCache:
+    """Tests for cached, persisted user profile vectors."""
+
+    @pytest.fixture
+    def user_encoder(self):
+        with patch.object(embedding_store, "generate_embedding", side_effect=lambda t: fake_embeddings([t])[0]) as mock:
+            embedding_store.user_embedding_cache.clear()
+            yield mock
+            embedding_store.user_embedding_cache.clear()
+
+    @pytest.fixture
+    def user_data(self, db):
+        user = User(email="cache@example.com", hashed_password="x", name="Cache User")
+        db.add(user)
+        db.commit()
+        return {"id": user.id, "name": "Cache User", "skills": ["python"]}
+
+    def test_unchanged_profile_is_encoded_once(self, db, user_encoder, user_data):
+        first = get_cached_user_embedding(db, user_data)
+        second = get_cached_user_embedding(db, user_data)
+
+        assert user_encoder.call_count == 1
+        np.testing.assert_array_equal(first, second)
+
+    def test_survives_restart_via_table(self, db, user_encoder, user_data):
+        get_cached_user_embedding(db, user_data)
+        embedding_store.user_embedding_cache.clear()  # simulate a new worker
+
+        get_cached_user_embedding(db, user_data)
+        assert user_encoder.call_count == 1
+        assert db.query(UserEmbedding).count() == 1
+
+    def test_profile_change_reencodes(self, db, user_encoder, user_data):
+        get_cached_user_embedding(db, user_data)
+        get_cached_user_embedding(db, {**user_data, "skills": ["python", "sql"]})
+
+        assert user_encoder.call_count == 2
+        assert db.query(UserEmbedding).count() == 1
+
+    def test_invalidate_drops_both_layers(self, db, user_encoder, user_data):
+        get_cached_user_embedding(db, user_data)
+        invalidate_user_embedding(db, user_data["id"])
+        db.commit()
+
+        assert db.query(UserEmbedding).count() == 0
+        assert len(embedding_store.user_embedding_cache) == 0
+        get_cached_user_embedding(db, user_data)
+        assert user_encoder.call_count == 2
+
+    def test_concurrent_first_encode(self, db, user_data):
+        def encode_while_another_request_stores(text):
+            # Another worker stores the same profile while this one encodes
+            with Session(bind=db.get_bind()) as other:
+                other.add(UserEmbedding(
+                    user_id=user_data["id"], text_hash="other", model_name="other", dim=384,
+                    vector=vector_to_blob(np.zeros(384)),
+                ))
+                other.commit()
+            return fake_embeddings([text])[0]
+
+        embedding_store.user_embedding_cache.clear()
+        with patch.object(embedding_store, "generate_embedding", side_effect=encode_while_another_request_stores):
+            vector = get_cached_user_embedding(db, user_data)
+        embedding_store.user_embedding_cache.clear()
+
+        row = db.query(UserEmbedding).one()
+        np.testing.assert_array_equal(blob_to_vector(row.vector), vector)
+        assert row.model_name == embedding_store.MODEL_NAME
+
+    def test_request_session_not_committed(self, db, user_encoder, user_data):
+        with patch.object(db, "commit") as commit:
+            get_cached_user_embedding(db, user_data)
+
+        commit.assert_not_called()
+        assert db.query(UserEmbedding).count() == 1
+
+    def test_lru_evicts_least_recently_used(self):
+        cache = LRUEmbeddingCache(maxsize=2)
+        cache.put(1, "a", np.zeros(2))
+        cache.put(2, "b", np.zeros(2))
+        cache.get(1, "a")  # 1 is now most recent
+        cache.put(3, "c", np.zeros(2))
+
+        assert len(cache) == 2
+        assert cache.get(2, "b") is None
+        assert cache.get(1, "a") is not None
+        assert cache.get(1, "stale-hash") is None
@@ -0,0 +1,106 @@
+"""
+Tests for the batch match-explanation endpoint
+
+Run with: pytest tests/test_explain_batch.py -v
+"""
+from unittest.mock import patch
+
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.api import match
+from app.database import Base
+from app.models.opportunity import Opportunity
+from app.models.preferences import UserPreferences
+from app.models.user import User
+from app.schemas.match import ExplainBatchRequest
+from app.services import embedding_store, skill_vocabulary
+from tests.test_embedding_store import fake_embeddings
+
+
+@pytest.fixture
+def db():
+    """Isolated in-memory database with fresh process-wide caches."""
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    skill_vocabulary.reset_skill_vocabulary()
+    embedding_store.user_embedding_cache.clear()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+        skill_vocabulary.reset_skill_vocabulary()
+        embedding_store.user_embedding_cache.clear()
+
+
+@pytest.fixture
+def user(db):
+    """User with preferences and a handful of varied opportunities."""
+    user = User(email="explain@example.com", hashed_password="x", name="Explain User",
+                skills=["Python", "SQL", "Docker"], work_experiences=[{"is_current": True}])
+    db.add(user)
+    db.add_all([
+        Opportunity(title="Backend Engineer", description="Build APIs", required_skills=["python", "sql"],
+                    work_arrangement="remote", is_remote=True, salary_min=60000, experience_level="mid"),
+        Opportunity(title="Data Intern", required_skills=["excel"], opportunity_type="internship",
+                    experience_level="entry"),
+        Opportunity(title="Platform Lead", required_skills=["docker", "kubernetes"],
+                    preferred_skills=["python"], experience_level="lead", location="Accra"),
+        Opportunity(title="Research Grant", opportunity_type="grant"),
+    ])
+    db.commit()
+    db.add(UserPreferences(user_id=user.id, work_arrangements=["remote"], salary_min=50000,
+                           preferred_locations=["Accra"]))
+    db.commit()
+    return user
+
+
+@pytest.fixture
+def embeddings():
+    """Fake the embedding model."""
+    with patch.object(embedding_store, "generate_embeddings_batch", side_effect=fake_embeddings) as batch, \
+            patch.object(embedding_store, "generate_embedding", side_effect=lambda t: fake_embeddings([t])[0]):
+        yield batch
+
+
+class TestExplainBatch:
+    """One round trip explains a page of cards."""
+
+    def test_matches_single_explanations(self, db, user, embeddings):
+        response = match.explain_matches(ExplainBatchRequest(opportunity_ids=[3, 1, 4, 2]), user, db)
+
+        assert [item["opportunity_id"] for item in response["explanations"]] == [3, 1, 4, 2]
+        for item in response["explanations"]:
+            single = match.explain_match(item["opportunity_id"], user, db)
+            scores = item.pop("scores")
+            assert item == single
+            assert scores["overall"] == pytest.approx(single["match_percentage"] / 100, abs=0.01)
+
+    def test_missing_and_duplicate_ids(self, db, user, embeddings):
+        response = match.explain_matches(ExplainBatchRequest(opportunity_ids=[2, 99, 2]), user, db)
+
+        assert [item["opportunity_id"] for item in response["explanations"]] == [2]
+        assert response["missing"] == [99]
+
+    def test_embeds_each_text_at_most_once(self, db, user, embeddings):
+        match.explain_matches(ExplainBatchRequest(opportunity_ids=[1, 2, 3, 4]), user, db)
+        embedded = [text for call in embeddings.call_args_list for text in call.args[0]]
+        assert len(embedded) == len(set(embedded)) == 4
+
+        embeddings.reset_mock()
+        match.explain_matches(ExplainBatchRequest(opportunity_ids=[1, 2, 3, 4]), user, db)
+        assert embeddings.call_count == 0  # stored vectors are reused
+
+    @pytest.mark.parametrize("ids", [[], list(range(1, 52))])
+    def test_batch_size_is_bounded(self, ids):
+        with pytest.raises(ValidationError):
+            ExplainBatchRequest(opportunity_ids=ids)
@@ -0,0 +1,194 @@
+"""
+Tests for vectorized batch scoring
+
+The batch path must return exactly what `match_opportunity` returns for each
+candidate: same rounded scores, matched skills, reasons and ordering.
+
+Run with: pytest tests/test_feature_matrix.py -v
+"""
+import random
+
+import numpy as np
+import pytest
+
+from app.services.embedding import cosine_similarity
+from app.services.feature_matrix import CandidateFeatures, UserContext, round3, score_candidates, top_k
+from app.services.matching import MatchingService, MatchResult
+
+SKILLS = ["Python", "SQL", "JavaScript", "React", "Docker", "AWS", "Excel", "Go", "Rust", "Figma"]
+LOCATIONS = ["Accra, Ghana", "Lagos, Nigeria", "Remote", "London", "", None, "accra", "Nairobi, Kenya"]
+ARRANGEMENTS = ["remote", "Hybrid", "onsite", "", None]
+TYPES = ["job", "Internship", "scholarship", "grant", None]
+SIZES = ["startup", "SMALL", "enterprise", "", None]
+LEVELS = ["entry", "Mid", "senior", "executive", "lead", None]
+
+
+def random_opportunities(n, seed=0):
+    rng = random.Random(seed)
+    opps = []
+    for i in range(n):
+        salary_min = rng.choice([None, 0, 30000, 50000, rng.randint(20000, 120000)])
+        salary_max = rng.choice([None, 0, (salary_min or 0) + rng.randint(0, 40000)])
+        opps.append({
+            "id": i + 1,
+            "title": f"Opportunity {i}",
+            "required_skills": rng.sample(SKILLS + ["python", "sql"], rng.randint(0, 4)),
+            "preferred_skills": rng.sample(SKILLS, rng.randint(0, 3)),
+            "location": rng.choice(LOCATIONS),
+            "is_remote": rng.choice([True, False, None]),
+            "salary_min": salary_min,
+            "salary_max": salary_max,
+            "work_arrangement": rng.choice(ARRANGEMENTS),
+            "opportunity_type": rng.choice(TYPES),
+            "company_size": rng.choice(SIZES),
+            "experience_level": rng.choice(LEVELS),
+        })
+    return opps
+
+
+USERS = [
+    ({"skills": ["Python", "sql", "Docker"], "work_experiences": [{"is_current": True}]},
+     {"preferred_locations": ["Accra", {"city": "Lagos", "country": "Nigeria"}],
+      "willing_to_relocate": "maybe", "salary_min": 50000,
+      "work_arrangements": ["Remote", "hybrid"], "opportunity_types": ["job", "internship"],
+      "company_sizes": ["startup", "small"]}),
+    ({"skills": [], "work_experiences": [{}] * 5}, {}),
+    ({"skills": ["Rust", "Go", "AWS", "Figma"], "work_experiences": [{"is_current": True}] * 6},
+     {"preferred_locations": ["london"], "willing_to_relocate": "yes", "salary_min": None,
+      "work_arrangements": [], "opportunity_types": [], "company_sizes": []}),
+    ({"skills": ["Excel"], "work_experiences": []}, None),
+]
+
+
+class TestRound3:
+    """Tests for the Python-compatible array rounding."""
+
+    def test_matches_python_round_on_half_way_values(self):
+        values = np.array([0.0005, 0.0015, 0.1235, 0.2345, 0.8125, 0.6665, 1 / 3, 0.7 * 0.5 + 0.3 * 0.5])
+        assert round3(values).tolist() == [round(v, 3) for v in values.tolist()]
+
+    def test_matches_python_round_on_random_values(self):
+        values = np.random.default_rng(0).random(20000)
+        assert round3(values).tolist() == [round(v, 3) for v in values.tolist()]
+
+
+class TestBatchMatchesScalar:
+    """The vectorized batch path reproduces match_opportunity exactly."""
+
+    @pytest.mark.parametrize("user_data,user_preferences", USERS)
+    def test_identical_results(self, user_data, user_preferences):
+        service = MatchingService()
+        opps = random_opportunities(600, seed=len(user_data["skills"]))
+        rng = np.random.default_rng(1)
+        user_vec = rng.standard_normal(8)
+        opp_vecs = rng.standard_normal((len(opps), 8))
+        similarities = [cosine_similarity(user_vec, v) for v in opp_vecs]
+
+        batch = service.match_opportunities_batch(
+            user_data, user_preferences, opps, semantic_similarities=similarities
+        )
+        scalar = [
+            service.match_opportunity(user_data, user_preferences, opp, user_vec.tolist(), opp_vecs[i])
+            for i, opp in enumerate(opps)
+        ]
+        scalar.sort(key=lambda r: r.overall_score, reverse=True)
+
+        assert batch == scalar
+
+    def test_features_can_be_reused_across_users(self):
+        opps = random_opportunities(200)
+        features = CandidateFeatures(opps)
+        for user_data, prefs in USERS:
+            reused = score_candidates(UserContext(user_data, prefs), features)
+            fresh = score_candidates(UserContext(user_data, prefs), CandidateFeatures(opps))
+            np.testing.assert_array_equal(reused.preferences, fresh.preferences)
+            np.testing.assert_array_equal(reused.skills, fresh.skills)
+
+    def test_empty_candidates(self):
+        assert MatchingService().match_opportunities_batch({}, {}, [], semantic_similarities=[]) == []
+
+
+class TestTopK:
+    """Partial selection returns exactly the head of the full ranking."""
+
+    @pytest.mark.parametrize("k", [1, 10, 50, 600, 1000])
+    def test_top_k_matches_full_sort_prefix(self, k):
+        # Few distinct values, so many ties straddle the cut-off
+        overall = np.round(np.random.default_rng(3).random(600), 1)
+        expected = np.argsort(-overall, kind="stable")[:k]
+        np.testing.assert_array_equal(top_k(overall, k), expected)
+
+    def test_zero(self):
+        assert len(top_k(np.ones(5), 0)) == 0
+
+    @pytest.mark.parametrize("user_data,user_preferences", USERS[:2])
+    def test_batch_top_k_equals_full_prefix(self, user_data, user_preferences):
+        service = MatchingService()
+        opps = random_opportunities(500, seed=7)
+        similarities = np.random.default_rng(2).uniform(-1, 1, len(opps)).round(1).tolist()
+
+        full = service.match_opportunities_batch(
+            user_data, user_preferences, opps, semantic_similarities=similarities
+        )
+        head = service.match_opportunities_batch(
+            user_data, user_preferences, opps, semantic_similarities=similarities, top_k=10
+        )
+        assert head == full[:10]
+
+    def test_match_result_is_slotted(self):
+        result = MatchResult(1, 0.5, 0.5, 0.5, 0.5, 0.5, [], [])
+        assert not hasattr(result, "__dict__")
+
+
+class TestTwoStage:
+    """Semantic scoring limited to a shortlist of M candidates."""
+
+    def test_budget_at_least_n_is_single_stage(self):
+        service = MatchingService()
+        opps = random_opportunities(300, seed=5)
+        similarities = np.random.default_rng(4).uniform(-1, 1, len(opps)).tolist()
+        user_data, user_preferences = USERS[0]
+
+        single = service.match_opportunities_batch(
+            user_data, user_preferences, opps, semantic_similarities=similarities
+        )
+        assert service.match_opportunities_batch(
+            user_data, user_preferences, opps, semantic_similarities=similarities, semantic_budget=300
+        ) == single
+
+    @pytest.mark.parametrize("user_data,user_preferences", USERS)
+    def test_shortlist_keeps_single_stage_scores_and_order(self, user_data, user_preferences):
+        service = MatchingService(semantic_budget=50)
+        opps = random_opportunities(400, seed=6)
+        similarities = np.random.default_rng(5).uniform(-1, 1, len(opps))
+        requested = []
+
+        def similarity_fn(subset):
+            requested.append(len(subset))
+            return similarities[[opp["id"] - 1 for opp in subset]]
+
+        two_stage = service.match_opportunities_batch(
+            user_data, user_preferences, opps, similarity_fn=similarity_fn
+        )
+        single = MatchingService().match_opportunities_batch(
+            user_data, user_preferences, opps, semantic_similarities=similarities
+        )
+
+        assert requested == [50]
+        shortlisted = {r.opportunity_id for r in two_stage}
+        assert two_stage == [r for r in single if r.opportunity_id in shortlisted]
+
+    def test_top_k_within_shortlist(self):
+        service = MatchingService(semantic_budget=40)
+        opps = random_opportunities(200, seed=8)
+        similarities = np.random.default_rng(6).uniform(-1, 1, len(opps)).round(1).tolist()
+        user_data, user_preferences = USERS[0]
+
+        full = service.match_opportunities_batch(
+            user_data, user_preferences, opps, semantic_similarities=similarities
+        )
+        head = service.match_opportunities_batch(
+            user_data, user_preferences, opps, semantic_similarities=similarities, top_k=5
+        )
+        assert len(full) == 40
+        assert head == full[:5]
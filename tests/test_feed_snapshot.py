@@ -0,0 +1,298 @@
+"""
+Tests for materialized per-user feed snapshots
+
+Run with: pytest tests/test_feed_snapshot.py -v
+"""
+import time
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.api import match
+from app.database import Base
+from app.models.opportunity import Opportunity
+from app.models.preferences import UserPreferences
+from app.models.swipe import UserSwipe
+from app.models.user import User
+from app.services import ann_index, catalog, embedding_store, feed_snapshot, skill_vocabulary, swiped_sets
+from app.services.feed_snapshot import (
+    FeedSnapshotCache,
+    catalog_version,
+    decode_cursor,
+    encode_cursor,
+    feed_version,
+)
+from app.services.ann_index import IVFFlatIndex
+from app.services.matching import MatchResult
+from tests.test_embedding_store import fake_embeddings
+
+
+def results(*ids):
+    return [MatchResult(i, 1.0 - i / 100, 0.5, 0.5, 0.5, 0.5, [], []) for i in ids]
+
+
+@pytest.fixture
+def db():
+    """Isolated in-memory database with fresh process-wide caches."""
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    feed_snapshot.reset_feed_snapshots()
+    catalog.reset_opportunity_catalog()
+    skill_vocabulary.reset_skill_vocabulary()
+    swiped_sets.reset_swiped_sets()
+    ann_index.reset_opportunity_index()
+    embedding_store.user_embedding_cache.clear()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+        feed_snapshot.reset_feed_snapshots()
+        catalog.reset_opportunity_catalog()
+        skill_vocabulary.reset_skill_vocabulary()
+        swiped_sets.reset_swiped_sets()
+        ann_index.reset_opportunity_index()
+        embedding_store.user_embedding_cache.clear()
+
+
+@pytest.fixture
+def user(db):
+    """Screened user and five identical-skill opportunities."""
+    user = User(email="feed@example.com", hashed_password="x", name="Feed User",
+                skills=["python"], screening_completed=True)
+    db.add(user)
+    db.add_all([
+        Opportunity(title=f"Role {i}", description="Build APIs", required_skills=["python"])
+        for i in range(5)
+    ])
+    db.commit()
+    return user
+
+
+@pytest.fixture
+def rank():
+    """Fake the embedding model and count full rankings."""
+    with patch.object(embedding_store, "generate_embeddings_batch", side_effect=fake_embeddings), \
+            patch.object(embedding_store, "generate_embedding", side_effect=lambda t: fake_embeddings([t])[0]), \
+            patch.object(match, "_rank_ai_feed", wraps=match._rank_ai_feed) as mock:
+        yield mock
+
+
+def get_feed(db, user, limit=2, cursor=None):
+    return match.get_ai_powered_feed(
+        limit=limit, opportunity_type=None, use_preferences=True, cursor=cursor,
+        current_user=user, db=db
+    )
+
+
+def feed_ids(response):
+    return [item["opportunity"]["id"] for item in response["feed"]]
+
+
+class TestFeedSnapshotCache:
+    """Tests for paging, discards, versioning and bounds."""
+
+    def test_page_skips_discarded_and_excluded(self):
+        cache = FeedSnapshotCache()
+        snapshot = cache.put(1, "v1", results(1, 2, 3, 4, 5), total_available=5)
+        cache.discard(1, 2)
+
+        page, position = snapshot.page(2, exclude={3})
+        assert [r.opportunity_id for r in page] == [1, 4]
+        assert position == 4
+        assert snapshot.remaining == 4
+
+    def test_version_change_is_a_miss(self):
+        cache = FeedSnapshotCache()
+        cache.put(1, "v1", results(1), total_available=1)
+
+        assert cache.get(1, "v1") is not None
+        assert cache.get(1, "v2") is None
+        assert cache.get(1, "v1") is None  # stale snapshot was dropped
+
+    def test_cursor_roundtrip(self):
+        assert decode_cursor(encode_cursor("abc", 7, 42)) == ("abc", 7, 42)
+        assert decode_cursor(encode_cursor("abc", 0, None)) == ("abc", 0, None)
+
+    @pytest.mark.parametrize("cursor", ["", "not-base64!", "e30", encode_cursor("abc", 0, None)[:-3]])
+    def test_malformed_cursor(self, cursor):
+        assert decode_cursor(cursor) is None
+
+    def test_ttl(self):
+        cache = FeedSnapshotCache(ttl_seconds=0.01)
+        cache.put(1, "v1", results(1), total_available=1)
+        time.sleep(0.02)
+        assert cache.get(1, "v1") is None
+
+    def test_lru_bound_and_depth(self):
+        cache = FeedSnapshotCache(max_users=2, depth=3)
+        cache.put(1, "v", results(1, 2, 3, 4), total_available=4)
+        cache.put(2, "v", results(1), total_available=1)
+        cache.get(1, "v")
+        cache.put(3, "v", results(1), total_available=1)
+
+        assert len(cache) == 2
+        assert cache.get(2, "v") is None
+        snapshot = cache.get(1, "v")
+        assert len(snapshot.results) == 3
+        assert not snapshot.exhausted
+
+    def test_total_rows_bound(self):
+        cache = FeedSnapshotCache(max_rows=6)
+        cache.put(1, "v", results(1, 2, 3), total_available=3)
+        cache.put(2, "v", results(1, 2), total_available=2)
+        cache.put(2, "v", results(1, 2, 3), total_available=3)  # replaced, not added
+        assert (len(cache), cache.rows) == (2, 6)
+
+        # A user paging deep evicts the least recently used snapshots
+        cache.put(3, "v", results(*range(1, 6)), total_available=5, depth=5)
+        assert cache.get(1, "v") is None and cache.get(2, "v") is None
+        assert (len(cache), cache.rows) == (1, 5)
+
+        cache.invalidate(3)
+        assert cache.rows == 0
+
+    def test_feed_version_tracks_inputs(self):
+        base = feed_version({"skills": ["python"]}, {"salary_min": 1}, "c1", opportunity_type=None)
+        assert base == feed_version({"skills": ["python"]}, {"salary_min": 1}, "c1", opportunity_type=None)
+        assert base != feed_version({"skills": ["sql"]}, {"salary_min": 1}, "c1", opportunity_type=None)
+        assert base != feed_version({"skills": ["python"]}, {"salary_min": 2}, "c1", opportunity_type=None)
+        assert base != feed_version({"skills": ["python"]}, {"salary_min": 1}, "c2", opportunity_type=None)
+        assert base != feed_version({"skills": ["python"]}, {"salary_min": 1}, "c1", opportunity_type="job")
+
+
+class TestAiFeedSnapshots:
+    """The AI feed re-ranks only when its inputs change."""
+
+    def test_second_request_is_served_from_snapshot(self, db, user, rank):
+        first = get_feed(db, user)
+        second = get_feed(db, user)
+
+        assert rank.call_count == 1
+        assert first["feed"] == second["feed"]
+        assert second["total_available"] == 5
+
+    def test_swipe_drops_card_without_rerank(self, db, user, rank):
+        first = get_feed(db, user)
+        swiped = first["feed"][0]["opportunity"]["id"]
+        db.add(UserSwipe(user_id=user.id, opportunity_id=swiped, action="dislike"))
+        db.commit()
+        feed_snapshot.get_feed_snapshots().discard(user.id, swiped)
+
+        second = get_feed(db, user)
+        assert rank.call_count == 1
+        assert swiped not in feed_ids(second)
+        assert second["feed"][0] == first["feed"][1]
+        assert second["total_available"] == 4
+
+    def test_preferences_change_reranks(self, db, user, rank):
+        get_feed(db, user)
+        db.add(UserPreferences(user_id=user.id, work_arrangements=["remote"]))
+        db.commit()
+
+        get_feed(db, user)
+        assert rank.call_count == 2
+
+    def test_must_have_preferences_exclude_candidates(self, db, user, rank):
+        grant = Opportunity(title="Grant", required_skills=["python"], opportunity_type="grant")
+        db.add(grant)
+        db.add(UserPreferences(user_id=user.id, opportunity_types=["job"], must_have_opportunity_types=True))
+        db.commit()
+
+        response = get_feed(db, user, limit=10)
+        assert grant.id not in feed_ids(response)
+        assert response["total_available"] == 5
+
+    def test_sync_adding_opportunities_reranks(self, db, user, rank):
+        before = catalog_version(db)
+        get_feed(db, user)
+        db.add(Opportunity(title="New Role", required_skills=["python"]))
+        db.commit()
+
+        assert catalog_version(db) != before
+        assert get_feed(db, user)["total_available"] == 6
+        assert rank.call_count == 2
+
+
+class TestAiFeedCursor:
+    """Cursor pagination over the ranked snapshot."""
+
+    def test_pages_cover_ranking_once(self, db, user, rank):
+        full = feed_ids(get_feed(db, user, limit=5))
+        pages, cursor = [], None
+        while True:
+            response = get_feed(db, user, cursor=cursor)
+            pages.extend(feed_ids(response))
+            cursor = response["next_cursor"]
+            if cursor is None:
+                break
+
+        assert pages == full
+        assert rank.call_count == 1
+
+    def test_stale_cursor_serves_fresh_ranking(self, db, user, rank):
+        cursor = get_feed(db, user)["next_cursor"]
+        db.add(Opportunity(title="New Role", required_skills=["python"]))
+        db.commit()
+
+        response = get_feed(db, user, cursor=cursor)
+        assert rank.call_count == 2
+        assert feed_ids(response) == feed_ids(get_feed(db, user))
+
+    def test_malformed_cursor_serves_first_page(self, db, user, rank):
+        assert feed_ids(get_feed(db, user, cursor="garbage")) == feed_ids(get_feed(db, user))
+
+    @pytest.mark.parametrize("use_catalog", [True, False])
+    def test_filtered_feed_pages_to_total(self, db, user, rank, monkeypatch, use_catalog):
+        db.add_all([
+            Opportunity(title=f"Grant {i}" if i % 10 == 0 else f"Job {i}", description="Fund APIs",
+                        required_skills=["python"], opportunity_type="grant" if i % 10 == 0 else "job")
+            for i in range(300)
+        ])
+        db.commit()
+        # A trained index probing few lists: one in ten candidates passes the filter
+        index = IVFFlatIndex(dim=384, n_probe=1, min_train_size=64)
+        ids = [opp_id for (opp_id,) in db.query(Opportunity.id)]
+        index.build(ids, np.array(fake_embeddings([f"opportunity {i}" for i in ids])))
+        assert index.is_trained
+        monkeypatch.setattr(ann_index, "_index", index)
+        monkeypatch.setattr(ann_index, "_index_built_at", time.monotonic())
+        monkeypatch.setattr(match, "ANN_CANDIDATE_POOL", 2)
+        monkeypatch.setattr(match, "OPPORTUNITY_CATALOG", use_catalog)
+        monkeypatch.setattr(feed_snapshot, "_cache", FeedSnapshotCache(depth=4))
+
+        pages, cursor, total = [], None, None
+        while True:
+            response = match.get_ai_powered_feed(
+                limit=3, opportunity_type="grant", use_preferences=True, cursor=cursor,
+                current_user=user, db=db
+            )
+            total = response["total_available"] if total is None else total
+            pages.extend(feed_ids(response))
+            cursor = response["next_cursor"]
+            if cursor is None:
+                break
+
+        assert total == 30
+        assert len(pages) == len(set(pages)) == total
+
+    def test_paging_past_snapshot_depth_ranks_deeper(self, db, user, rank, monkeypatch):
+        full = feed_ids(get_feed(db, user, limit=5))
+        monkeypatch.setattr(feed_snapshot, "_cache", FeedSnapshotCache(depth=2))
+
+        first = get_feed(db, user)
+        second = get_feed(db, user, cursor=first["next_cursor"])
+        third = get_feed(db, user, cursor=second["next_cursor"])
+
+        assert feed_ids(first) + feed_ids(second) + feed_ids(third) == full
+        assert third["next_cursor"] is None
+        assert rank.call_count == 4
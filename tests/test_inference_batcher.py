@@ -0,0 +1,142 @@
+"""
+Tests for the embedding micro-batcher
+
+Run with: pytest tests/test_inference_batcher.py -v
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+from unittest.mock import patch
+
+from app.services import embedding
+from app.services.inference_batcher import MicroBatcher
+
+
+class FakeModel:
+    """Encodes each text as [len(text), index-in-batch] and records batch sizes."""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.batch_sizes = []
+        self.lock = threading.Lock()
+
+    def encode(self, texts):
+        with self.lock:
+            self.batch_sizes.append(len(texts))
+        time.sleep(self.delay)
+        return np.array([[len(t), i] for i, t in enumerate(texts)], dtype=np.float32)
+
+
+@pytest.fixture
+def model():
+    return FakeModel(delay=0.01)
+
+
+class TestMicroBatcher:
+    """Tests for gathering concurrent requests into shared encode calls."""
+
+    def test_concurrent_requests_share_encode_calls(self, model):
+        batcher = MicroBatcher(model.encode, max_batch_size=64, max_wait_ms=20)
+        texts = ["x" * (i + 1) for i in range(32)]
+        try:
+            with ThreadPoolExecutor(max_workers=32) as pool:
+                results = list(pool.map(lambda t: batcher.encode([t], timeout=5), texts))
+        finally:
+            batcher.shutdown()
+
+        # Each caller gets its own row back
+        assert [int(r[0][0]) for r in results] == [len(t) for t in texts]
+        assert sum(model.batch_sizes) == 32
+        assert len(model.batch_sizes) < 32
+
+    def test_respects_max_batch_size(self, model):
+        batcher = MicroBatcher(model.encode, max_batch_size=4, max_wait_ms=50)
+        try:
+            futures = [batcher.submit([f"text {i}"]) for i in range(10)]
+            for future in futures:
+                future.result(timeout=5)
+        finally:
+            batcher.shutdown()
+
+        assert max(model.batch_sizes) <= 4
+        assert sum(model.batch_sizes) == 10
+
+    def test_large_requests_split_across_calls(self, model):
+        batcher = MicroBatcher(model.encode, max_batch_size=4, max_wait_ms=50)
+        try:
+            first = batcher.submit(["a"] * 3)
+            second = batcher.submit(["bb"] * 7)
+            a, b = first.result(timeout=5), second.result(timeout=5)
+        finally:
+            batcher.shutdown()
+
+        assert max(model.batch_sizes) <= 4
+        assert sum(model.batch_sizes) == 10
+        assert a.shape == (3, 2) and b.shape == (7, 2)
+        assert list(a[:, 0]) == [1] * 3 and list(b[:, 0]) == [2] * 7
+
+    def test_multi_text_request_rows_stay_together(self, model):
+        batcher = MicroBatcher(model.encode, max_batch_size=64, max_wait_ms=20)
+        try:
+            first = batcher.submit(["a", "bb"])
+            second = batcher.submit(["ccc"])
+            a, b = first.result(timeout=5), second.result(timeout=5)
+        finally:
+            batcher.shutdown()
+
+        assert a.shape == (2, 2) and b.shape == (1, 2)
+        assert list(a[:, 0]) == [1, 2] and b[0, 0] == 3
+
+    def test_encode_error_reaches_every_caller(self):
+        def broken(texts):
+            raise RuntimeError("model unavailable")
+
+        batcher = MicroBatcher(broken, max_wait_ms=20)
+        try:
+            futures = [batcher.submit(["a"]), batcher.submit(["b"])]
+            for future in futures:
+                with pytest.raises(RuntimeError):
+                    future.result(timeout=5)
+            # Worker survives and keeps serving
+            assert batcher._worker.is_alive()
+        finally:
+            batcher.shutdown()
+
+    def test_metrics(self, model):
+        batcher = MicroBatcher(model.encode, max_batch_size=8, max_wait_ms=5)
+        try:
+            batcher.encode(["a", "b", "c"], timeout=5)
+            metrics = batcher.metrics()
+        finally:
+            batcher.shutdown()
+
+        assert metrics["batches"] == 1
+        assert metrics["texts"] == 3
+        assert metrics["avg_batch_size"] == 3
+        assert metrics["queue_depth"] == 0
+        assert metrics["max_queue_depth"] >= 1
+        assert metrics["max_batch_size"] == 8
+
+
+class TestGenerateEmbeddingRouting:
+    """generate_embedding goes through the shared batcher when enabled."""
+
+    def test_single_text_uses_batcher(self, model):
+        batcher = MicroBatcher(model.encode, max_wait_ms=1)
+        try:
+            with patch.object(embedding, "MICROBATCH_ENABLED", True), \
+                    patch.object(embedding, "get_batcher", return_value=batcher):
+                vector = embedding.generate_embedding("hello")
+        finally:
+            batcher.shutdown()
+
+        assert vector == [5.0, 0.0]
+        assert model.batch_sizes == [1]
+
+    def test_empty_text_skips_model(self, model):
+        with patch.object(embedding, "get_batcher") as get_batcher:
+            assert embedding.generate_embedding("  ") == [0.0] * embedding.EMBEDDING_DIM
+        get_batcher.assert_not_called()
@@ -0,0 +1,145 @@
+"""
+Tests for derived opportunity columns
+
+Run with: pytest tests/test_opportunity_features.py -v
+"""
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import create_engine, update
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.api import opportunities as opportunities_api
+from app.database import Base
+from app.models.opportunity import Opportunity
+from app.schemas.opportunity import BulkImportItem, BulkImportRequest
+from app.services import embedding_store, skill_vocabulary
+from app.services.embedding import build_opportunity_text
+from app.services.embedding_store import opportunity_text_fields
+from app.services.feature_matrix import CandidateFeatures
+from app.services.matching import opportunity_to_dict
+from app.services.opportunity_features import backfill_opportunity_features, normalized
+from tests.test_embedding_store import fake_embeddings
+from tests.test_feature_matrix import random_opportunities
+
+
+@pytest.fixture
+def db():
+    """Isolated in-memory database session."""
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    skill_vocabulary.reset_skill_vocabulary()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+        skill_vocabulary.reset_skill_vocabulary()
+
+
+def make_opportunity(db, **fields):
+    opp = Opportunity(**{"title": "Data Analyst", **fields})
+    db.add(opp)
+    db.commit()
+    return opp
+
+
+class TestDerivedOnWrite:
+    """Derived columns follow the raw columns."""
+
+    def test_set_on_insert(self, db):
+        opp = make_opportunity(db, location="Accra, GHANA", country="CÔTE D'IVOIRE", work_arrangement="Hybrid", opportunity_type=None,
+                               company_size="SMALL", experience_level="Mid", description="x" * 600,
+                               required_skills=["SQL", " Python"], preferred_skills=["python", "Excel"],
+                               is_remote=None)
+
+        assert opp.location_norm == "accra, ghana"
+        assert opp.country_norm == "côte d'ivoire"
+        assert opp.work_arrangement_norm == "hybrid"
+        assert opp.opportunity_type_norm == "job"
+        assert opp.company_size_norm == "small"
+        assert opp.experience_level_norm == "mid"
+        assert opp.description_excerpt == "x" * 500
+        assert opp.skills_text == "sql, python, excel"
+        assert opp.is_remote is False
+
+    def test_recomputed_on_update(self, db):
+        opp = make_opportunity(db, location="Lagos", required_skills=["Go"])
+        opp.location = "Nairobi, Kenya"
+        opp.required_skills = ["Rust"]
+        db.commit()
+
+        assert opp.location_norm == "nairobi, kenya"
+        assert opp.skills_text == "rust"
+
+    def test_bulk_import_path(self, db):
+        request = BulkImportRequest(opportunities=[
+            BulkImportItem(title="Remote Dev", location="REMOTE", remote=True, experience_level="senior"),
+        ])
+        with patch.object(embedding_store, "generate_embeddings_batch", side_effect=fake_embeddings):
+            response = opportunities_api.bulk_import_opportunities(request, db)
+        assert response.inserted == 1, response.errors
+
+        opp = db.query(Opportunity).one()
+        assert (opp.location_norm, opp.experience_level_norm, opp.is_remote) == ("remote", "senior", True)
+
+
+class TestReaders:
+    """Readers see the same values from stored or raw columns."""
+
+    def test_normalized_falls_back_to_raw(self):
+        assert normalized({"location": "Accra"}, "location") == "accra"
+        assert normalized({"opportunity_type": None}, "opportunity_type") == "job"
+        assert normalized({"location": "Accra", "location_norm": "stored"}, "location") == "stored"
+
+    def test_embedding_text_unchanged(self, db):
+        opp = make_opportunity(db, description="Build data pipelines. " * 40, required_skills=["SQL"])
+        raw = opportunity_text_fields(opp)
+        raw.pop("description_excerpt")
+        assert build_opportunity_text(opportunity_text_fields(opp)) == build_opportunity_text(raw)
+
+    def test_features_match_raw_encoding(self, db):
+        for item in random_opportunities(40, seed=11):
+            fields = {k: v for k, v in item.items() if k != "id"}
+            db.add(Opportunity(**{**fields, "title": fields["title"] or "Untitled"}))
+        db.commit()
+        stored = [opportunity_to_dict(opp) for opp in db.query(Opportunity).order_by(Opportunity.id)]
+        raw = [{k: v for k, v in opp.items() if not k.endswith("_norm")} for opp in stored]
+
+        for name in ("locations", "arrangements", "types", "sizes"):
+            assert getattr(CandidateFeatures(stored), name) == getattr(CandidateFeatures(raw), name)
+        assert (CandidateFeatures(stored).level_index == CandidateFeatures(raw).level_index).all()
+
+    def test_search_matches_skills(self, db):
+        make_opportunity(db, title="Analyst", required_skills=["PostgreSQL"])
+        make_opportunity(db, title="Designer", required_skills=["Figma"])
+
+        response = opportunities_api.list_opportunities(
+            page=1, per_page=20, search="postgres", source=None, location=None, job_type=None,
+            remote=None, include_stale=False, min_salary=None, max_salary=None, db=db,
+        )
+        assert [o.title for o in response.opportunities] == ["Analyst"]
+
+
+class TestBackfill:
+    """Rows written before the columns existed are filled in."""
+
+    def test_backfill(self, db):
+        for title in ("One", "Two", "Three"):
+            make_opportunity(db, title=title, location="Accra", description="About")
+        # Simulate rows from before the migration
+        db.execute(update(Opportunity).where(Opportunity.id != 2).values(
+            location_norm=None, description_excerpt=None, skills_text=None
+        ))
+        db.commit()
+        db.expire_all()
+
+        assert backfill_opportunity_features(db, batch_size=2) == 2
+        assert [o.location_norm for o in db.query(Opportunity).order_by(Opportunity.id)] == ["accra"] * 3
+        assert backfill_opportunity_features(db) == 0
@@ -0,0 +1,136 @@
+"""
+Tests for must-have preference filters
+
+Run with: pytest tests/test_preference_filters.py -v
+"""
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import migrate_db
+from app.database import Base
+from app.models.opportunity import Opportunity
+from app.services.preference_filters import must_have_clauses
+
+
+@pytest.fixture
+def db():
+    """Isolated in-memory database with a small mixed catalog."""
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    session.add_all([
+        Opportunity(title="job-accra", opportunity_type="job", work_arrangement="onsite",
+                    country="Ghana", salary_min=40000, salary_max=60000),
+        Opportunity(title="job-remote", opportunity_type="job", work_arrangement="onsite",
+                    is_remote=True, country="USA", salary_min=90000),
+        Opportunity(title="internship-lagos", opportunity_type="internship", work_arrangement="hybrid",
+                    country="Nigeria", salary_min=0, salary_max=0),
+        Opportunity(title="grant", opportunity_type="grant", work_arrangement="onsite",
+                    country="ghana", salary_min=20000, salary_max=30000),
+    ])
+    session.commit()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+
+
+def titles(db, prefs):
+    return sorted(o.title for o in db.query(Opportunity).filter(*must_have_clauses(prefs)).all())
+
+
+ALL = ["grant", "internship-lagos", "job-accra", "job-remote"]
+
+
+class TestMustHaveClauses:
+    """Each flag turns its preference into a hard filter."""
+
+    def test_flags_off_keep_everything(self, db):
+        prefs = {"opportunity_types": ["job"], "work_arrangements": ["remote"], "salary_min": 50000,
+                 "preferred_locations": [{"city": "Accra", "country": "Ghana"}]}
+        assert must_have_clauses(prefs) == []
+        assert titles(db, prefs) == ALL
+        assert titles(db, None) == ALL
+
+    def test_opportunity_types(self, db):
+        prefs = {"opportunity_types": ["Job", "internship"], "must_have_opportunity_types": True}
+        assert titles(db, prefs) == ["internship-lagos", "job-accra", "job-remote"]
+
+    def test_work_arrangements_accept_remote_flag(self, db):
+        prefs = {"work_arrangements": ["remote", "hybrid"], "must_have_work_arrangements": True}
+        assert titles(db, prefs) == ["internship-lagos", "job-remote"]
+
+    def test_salary_keeps_unknown(self, db):
+        prefs = {"salary_min": 50000, "must_have_salary": True}
+        assert titles(db, prefs) == ["internship-lagos", "job-accra", "job-remote"]
+
+    def test_countries_any_case_and_remote(self, db):
+        prefs = {"preferred_locations": [{"city": "Accra", "country": "GHANA"}], "must_have_countries": True}
+        assert titles(db, prefs) == ["grant", "job-accra", "job-remote"]
+
+    @pytest.mark.parametrize("stored,preferred", [
+        ("Côte d'Ivoire", "CÔTE D'IVOIRE"),
+        ("United Kingdom of Great Britain and Northern Ireland", "united kingdom of great britain and northern ireland"),
+        ("GUINEA-BISSAU", "Guinea-Bissau"),
+    ])
+    def test_countries_any_spelling(self, db, stored, preferred):
+        db.add(Opportunity(title="abroad", country=stored))
+        db.commit()
+        prefs = {"preferred_locations": [{"country": preferred}], "must_have_countries": True}
+        assert titles(db, prefs) == ["abroad", "job-remote"]
+
+    def test_empty_preference_is_ignored(self, db):
+        prefs = {"opportunity_types": [], "must_have_opportunity_types": True,
+                 "salary_min": None, "must_have_salary": True}
+        assert titles(db, prefs) == ALL
+
+    def test_combined(self, db):
+        prefs = {"opportunity_types": ["job"], "must_have_opportunity_types": True,
+                 "salary_min": 50000, "must_have_salary": True,
+                 "preferred_locations": [{"country": "Ghana"}], "must_have_countries": True}
+        assert titles(db, prefs) == ["job-accra", "job-remote"]
+
+    def test_stored_case_ignored(self, db):
+        db.add_all([
+            Opportunity(title="Internship-Caps", opportunity_type="Internship", work_arrangement="Remote"),
+        ])
+        db.commit()
+        prefs = {"opportunity_types": ["internship"], "must_have_opportunity_types": True,
+                 "work_arrangements": ["remote"], "must_have_work_arrangements": True}
+        assert titles(db, prefs) == ["Internship-Caps"]
+
+    def test_type_filter_uses_index(self, db):
+        query = db.query(Opportunity.id).filter(
+            *must_have_clauses({"opportunity_types": ["grant"], "must_have_opportunity_types": True})
+        )
+        sql = str(query.statement.compile(compile_kwargs={"literal_binds": True}))
+        plan = " ".join(str(row[-1]) for row in db.execute(text(f"EXPLAIN QUERY PLAN {sql}")))
+        assert "ix_opportunities_opportunity_type_norm" in plan
+
+
+class TestMigration:
+    """migrate_db.py fills country_norm on existing rows."""
+
+    def test_country_norm_backfilled(self, tmp_path, monkeypatch):
+        path = tmp_path / "existing.db"
+        engine = create_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as connection:
+            connection.execute(text("INSERT INTO opportunities (title, country) VALUES ('a', 'CÔTE D''IVOIRE'), ('b', NULL)"))
+
+        monkeypatch.setattr(migrate_db, "DB_PATH", path)
+        migrate_db.migrate()
+
+        with engine.connect() as connection:
+            stored = dict(connection.execute(text("SELECT title, country_norm FROM opportunities")).all())
+            indexes = {row[1] for row in connection.execute(text("PRAGMA index_list(opportunities)"))}
+        assert stored == {"a": "côte d'ivoire", "b": ""}
+        assert "ix_opportunities_country_norm" in indexes
+        engine.dispose()
@@ -0,0 +1,93 @@
+"""
+Tests for the hot-query indexes and the query-plan audit
+
+Run with: pytest tests/test_query_audit.py -v
+"""
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import migrate_db
+from app.database import Base
+from app.models import application, conversation, document, embedding, match_score, preferences, skill  # noqa: F401
+from app.models.opportunity import Opportunity
+from app.models.swipe import UserSwipe
+from app.services.query_audit import HOT_QUERIES, audit_hot_queries, capture_selects, full_scans
+
+COMPOSITE_INDEXES = [
+    index.name
+    for table in (Opportunity.__table__, UserSwipe.__table__)
+    for index in table.indexes
+    if len(index.columns) > 1
+]
+
+
+@pytest.fixture
+def db():
+    """Isolated in-memory database session."""
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+
+
+class TestAudit:
+    """EXPLAIN over the hot queries."""
+
+    def test_no_full_scans(self, db):
+        report = audit_hot_queries(db)
+
+        assert set(report) == set(HOT_QUERIES)
+        assert all(report.values()), "every hot query issues a SELECT"
+        assert full_scans(report) == []
+
+    def test_missing_index_reported(self, db):
+        for name in ("ix_opportunities_stale_created", "ix_opportunities_stale_refreshed"):
+            db.execute(text(f"DROP INDEX {name}"))
+        db.commit()
+
+        scans = full_scans(audit_hot_queries(db))
+        assert ("opportunity listing", "opportunities") in scans
+        assert ("swipe feed", "opportunities") in scans
+
+    def test_per_user_queries_run_for_given_user(self, db):
+        run = HOT_QUERIES["swipe history"]
+        selects = capture_selects(db, lambda session: run(session, 42))
+        assert selects and all(42 in tuple(parameters) for _, parameters in selects)
+
+    def test_independent_of_api_layer(self):
+        code = "import sys, app.services.query_audit; assert not any(m.startswith('app.api') for m in sys.modules)"
+        subprocess.run([sys.executable, "-c", code], check=True, cwd=Path(__file__).resolve().parents[1])
+
+
+class TestMigration:
+    """migrate_db.py adds the composite indexes to existing databases."""
+
+    def test_indexes_created(self, tmp_path, monkeypatch):
+        path = tmp_path / "existing.db"
+        engine = create_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as connection:
+            for name in COMPOSITE_INDEXES:
+                connection.execute(text(f"DROP INDEX {name}"))
+
+        monkeypatch.setattr(migrate_db, "DB_PATH", path)
+        migrate_db.migrate()
+
+        inspector = inspect(engine)
+        created = {index["name"] for table in ("opportunities", "user_swipes") for index in inspector.get_indexes(table)}
+        assert set(COMPOSITE_INDEXES) <= created
+        engine.dispose()
@@ -0,0 +1,115 @@
+"""
+Tests for constant query counts in application, swipe and conversation listings
+
+Each endpoint must issue the same number of queries whatever the page size
+(no per-row lazy loads of opportunities or events).
+
+Run with: pytest tests/test_query_counts.py -v
+"""
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.api import applications, conversations, swipes
+from app.database import Base
+from app.models import document  # noqa: F401
+from app.models.application import Application, ApplicationEvent
+from app.models.conversation import Conversation, ConversationEvent
+from app.models.opportunity import Opportunity
+from app.models.swipe import UserSwipe
+from app.models.user import User
+from app.schemas.application import ApplicationDetail, ApplicationListItem
+from app.schemas.conversation import ConversationDetailOut, ConversationOut
+from app.schemas.swipe import SwipeWithOpportunity
+
+
+def make_session():
+    """Session on a fresh in-memory database."""
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+
+def seed(db, rows):
+    """A user with `rows` applications, pending likes and conversations, each with events."""
+    user = User(email=f"user{rows}@example.com", hashed_password="x", name="Lister")
+    db.add(user)
+    db.flush()
+    for i in range(rows):
+        opp = Opportunity(title=f"Role {i}", company_name="Acme", city="Accra", country="Ghana",
+                          description="About the role")
+        db.add(opp)
+        db.flush()
+        application = Application(user_id=user.id, opportunity_id=opp.id, status="pending")
+        db.add(application)
+        db.flush()
+        conversation = Conversation(user_id=user.id, application_id=application.id, opportunity_id=opp.id)
+        db.add(conversation)
+        db.flush()
+        db.add_all([ApplicationEvent(application_id=application.id, event_type="swiped_right") for _ in range(rows)])
+        db.add_all([ConversationEvent(conversation_id=conversation.id, message="Hi") for _ in range(rows)])
+        db.add(UserSwipe(user_id=user.id, opportunity_id=opp.id, action="like", status="pending"))
+    db.commit()
+    user_id = user.id
+    db.expunge_all()
+    return db.get(User, user_id)
+
+
+def count_queries(db, call):
+    """Result of `call()` and the number of statements it issued (serialization included)."""
+    issued = []
+
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        issued.append(statement)
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", _count)
+    try:
+        result = call()
+    finally:
+        event.remove(engine, "before_cursor_execute", _count)
+    return result, len(issued)
+
+
+ENDPOINTS = {
+    "list applications": lambda db, user, n: [
+        ApplicationListItem.model_validate(item)
+        for item in applications.list_my_applications(status=None, skip=0, limit=n, current_user=user, db=db)
+    ],
+    "application detail": lambda db, user, n: ApplicationDetail.model_validate(
+        applications.get_application(application_id=1, current_user=user, db=db)
+    ),
+    "pending swipes": lambda db, user, n: [
+        SwipeWithOpportunity.model_validate(item)
+        for item in swipes.get_pending_swipes(skip=0, limit=n, current_user=user, db=db)
+    ],
+    "list conversations": lambda db, user, n: [
+        ConversationOut.model_validate(conv)
+        for conv in conversations.list_conversations(conv_type=None, current_user=user, db=db)
+    ],
+    "conversation detail": lambda db, user, n: ConversationDetailOut.model_validate(
+        conversations.get_conversation(conversation_id=1, current_user=user, db=db)
+    ),
+}
+
+
+class TestConstantQueryCount:
+    """Query counts do not grow with the number of rows on the page."""
+
+    @pytest.mark.parametrize("name", list(ENDPOINTS))
+    def test_constant(self, name):
+        results, counts = {}, {}
+        for rows in (2, 12):
+            session = make_session()
+            user = seed(session, rows)
+            results[rows], counts[rows] = count_queries(session, lambda: ENDPOINTS[name](session, user, rows))
+            session.close()
+
+        assert counts[2] == counts[12] <= 2, counts
+        for rows, result in results.items():
+            assert len(result if isinstance(result, list) else result.events) == rows
@@ -0,0 +1,200 @@
+"""
+Tests for reverse matching (screened users ranked for one opportunity)
+
+Run with: pytest tests/test_reverse_matching.py -v
+"""
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.api import match
+from app.database import Base
+from app.models import document  # noqa: F401 (swipes create applications, which reference documents)
+from app.models.opportunity import Opportunity
+from app.models.preferences import UserPreferences
+from app.models.swipe import UserSwipe
+from app.models.user import User
+from app.services import embedding_store, reverse_matching, skill_vocabulary
+from app.services.matching import MatchingService, opportunity_to_dict, preferences_to_dict, user_to_dict
+from app.services.reverse_matching import UserPool, get_user_pool
+from tests.test_embedding_store import fake_embeddings
+from tests.test_feature_matrix import USERS, random_opportunities
+
+
+@pytest.fixture
+def db():
+    """Isolated in-memory database with fresh process-wide caches."""
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    skill_vocabulary.reset_skill_vocabulary()
+    reverse_matching.reset_user_pool()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+        skill_vocabulary.reset_skill_vocabulary()
+        reverse_matching.reset_user_pool()
+
+
+@pytest.fixture
+def embeddings():
+    """Fake the embedding model."""
+    with patch.object(embedding_store, "generate_embeddings_batch", side_effect=fake_embeddings) as batch, \
+            patch.object(embedding_store, "generate_embedding", side_effect=lambda t: fake_embeddings([t])[0]):
+        yield batch
+
+
+@pytest.fixture
+def seeded(db):
+    """An admin, four screened candidates (one unscreened) and one opportunity."""
+    admin = User(email="admin@example.com", hashed_password="x", name="Admin", is_admin=True)
+    candidates = [
+        User(email="senior@example.com", hashed_password="x", name="Senior", screening_completed=True,
+             skills=["Python", "SQL", "Docker"], work_experiences=[{"is_current": True}] * 4),
+        User(email="junior@example.com", hashed_password="x", name="Junior", screening_completed=True,
+             skills=["Python"], work_experiences=[]),
+        User(email="designer@example.com", hashed_password="x", name="Designer", screening_completed=True,
+             skills=["Figma"], work_experiences=[{}] * 2),
+        User(email="analyst@example.com", hashed_password="x", name="Analyst", screening_completed=True,
+             skills=["SQL", "Excel"], work_experiences=[{}]),
+        User(email="new@example.com", hashed_password="x", name="Unscreened", skills=["Python", "SQL"]),
+    ]
+    db.add(admin)
+    db.add_all(candidates)
+    db.add(Opportunity(title="Backend Engineer", description="Build APIs", required_skills=["python", "sql"],
+                       preferred_skills=["docker"], work_arrangement="remote", is_remote=True,
+                       salary_min=60000, experience_level="mid", location="Accra"))
+    db.commit()
+    db.add(UserPreferences(user_id=candidates[0].id, work_arrangements=["remote"], salary_min=50000))
+    db.commit()
+    return admin, candidates
+
+
+def candidates(db, admin, **filters):
+    params = dict(skip=0, limit=20, min_score=0.0, skills=None, experience_level=None, applicants_only=False)
+    params.update(filters)
+    return match.rank_candidates(1, current_user=admin, db=db, **params)
+
+
+class TestUserPool:
+    """Vectorized scores equal per-user match_opportunity."""
+
+    def test_matches_scalar_scores(self):
+        rng = np.random.default_rng(0)
+        users = [(dict(user_data, id=i + 1), prefs) for i, (user_data, prefs) in enumerate(USERS)]
+        vectors = rng.standard_normal((len(users), 384))
+        pool = UserPool(users, vectors)
+        service = MatchingService()
+
+        for opp in random_opportunities(60, seed=3):
+            opp_vector = rng.standard_normal(384)
+            scores = pool.score(opp, opp_vector, service)
+            for row, (user_data, prefs) in enumerate(users):
+                expected = service.match_opportunity(user_data, prefs, opp, vectors[row].tolist(), opp_vector)
+                assert scores.skills[row] == expected.skills_score
+                assert scores.preferences[row] == expected.preferences_score
+                assert scores.experience[row] == expected.experience_score
+                assert scores.overall[row] == pytest.approx(expected.overall_score, abs=0.002)
+
+    def test_rank_pages_by_score(self):
+        users = [({"id": i + 1, "skills": []}, None) for i in range(5)]
+        pool = UserPool(users, np.ones((5, 4)))
+        scores = pool.score({"id": 1}, np.ones(4))
+        scores.overall = np.array([0.2, 0.9, 0.5, 0.9, 0.1])
+
+        rows, total = pool.rank(scores, skip=1, limit=2)
+        assert rows.tolist() == [3, 2]
+        assert total == 5
+        rows, total = pool.rank(scores, mask=scores.overall < 0.6)
+        assert rows.tolist() == [2, 0, 4]
+        assert total == 3
+
+
+class TestCandidatesEndpoint:
+    """Recruiter view over screened users."""
+
+    def test_ranks_screened_users(self, db, seeded, embeddings):
+        admin, users = seeded
+        response = candidates(db, admin)
+
+        names = [item["name"] for item in response["candidates"]]
+        assert sorted(names) == ["Analyst", "Designer", "Junior", "Senior"]
+        assert names[0] == "Senior"
+        assert response["candidates"][0]["matched_skills"] == ["Python", "SQL", "Docker"]
+        overall = [item["scores"]["overall"] for item in response["candidates"]]
+        assert overall == sorted(overall, reverse=True)
+        assert response["total"] == 4
+
+    def test_scores_match_forward_matching(self, db, seeded, embeddings):
+        admin, users = seeded
+        response = candidates(db, admin)
+
+        opp = opportunity_to_dict(db.get(Opportunity, 1))
+        service = match.get_matching_service()
+        for item in response["candidates"]:
+            user = db.get(User, item["user_id"])
+            prefs = db.query(UserPreferences).filter(UserPreferences.user_id == user.id).first()
+            user_data = user_to_dict(user)
+            expected = service.match_opportunity(
+                user_data, preferences_to_dict(prefs), opp,
+                fake_embeddings([embedding_store.build_user_profile_text(user_data)])[0],
+                fake_embeddings([embedding_store.build_opportunity_text(opp)])[0],
+            )
+            assert item["scores"]["skills"] == expected.skills_score
+            assert item["scores"]["overall"] == pytest.approx(expected.overall_score, abs=0.002)
+
+    def test_filters_and_pagination(self, db, seeded, embeddings):
+        admin, users = seeded
+
+        assert [c["name"] for c in candidates(db, admin, skills=["sql"])["candidates"]] == ["Senior", "Analyst"]
+        assert sorted(c["name"] for c in candidates(db, admin, experience_level="Entry")["candidates"]) == ["Analyst", "Junior"]
+        assert all(c["scores"]["overall"] >= 0.6 for c in candidates(db, admin, min_score=0.6)["candidates"])
+
+        everyone = candidates(db, admin)["candidates"]
+        page = candidates(db, admin, skip=1, limit=2)
+        assert [c["user_id"] for c in page["candidates"]] == [c["user_id"] for c in everyone[1:3]]
+        assert page["total"] == 4
+
+        db.add(UserSwipe(user_id=users[2].id, opportunity_id=1, action="like"))
+        db.add(UserSwipe(user_id=users[3].id, opportunity_id=1, action="dislike"))
+        db.commit()
+        assert [c["name"] for c in candidates(db, admin, applicants_only=True)["candidates"]] == ["Designer"]
+
+    def test_rejects_unknown_level_and_opportunity(self, db, seeded, embeddings):
+        admin, _ = seeded
+        with pytest.raises(HTTPException) as exc:
+            candidates(db, admin, experience_level="wizard")
+        assert exc.value.status_code == 400
+        with pytest.raises(HTTPException) as exc:
+            match.rank_candidates(99, 0, 20, 0.0, None, None, False, admin, db)
+        assert exc.value.status_code == 404
+
+    def test_pool_follows_new_users(self, db, seeded, embeddings, monkeypatch):
+        admin, _ = seeded
+        pool = get_user_pool(db)
+        assert get_user_pool(db) is pool  # within the refresh interval
+
+        monkeypatch.setattr(reverse_matching, "USER_POOL_REFRESH_SECONDS", 0)
+        assert get_user_pool(db) is pool  # nothing changed
+        db.add(User(email="late@example.com", hashed_password="x", name="Late", screening_completed=True,
+                    skills=["python"]))
+        db.commit()
+        assert len(get_user_pool(db)) == 5
+
+    def test_reuses_stored_user_embeddings(self, db, seeded, embeddings):
+        get_user_pool(db)
+        embeddings.reset_mock()
+        reverse_matching.reset_user_pool()
+        get_user_pool(db)
+        assert embeddings.call_count == 0
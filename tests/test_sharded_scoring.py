@@ -0,0 +1,143 @@
+"""
+Tests for sharded multi-core scoring
+
+Sharded scoring must select exactly the rows the single-process ranking
+selects, so results are identical whichever path runs.
+
+Run with: pytest tests/test_sharded_scoring.py -v
+"""
+import gc
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+import pytest
+
+from app.services import sharded_scoring
+from app.services.feature_matrix import CandidateFeatures, UserContext, score_candidates, top_k
+from app.services.matching import MatchingService
+from app.services.sharded_scoring import shared_features, sharded_top_rows, should_shard
+from tests.test_feature_matrix import USERS, random_opportunities
+
+
+@pytest.fixture(scope="module")
+def pool():
+    """Two scoring workers, stopped after the module."""
+    original = sharded_scoring.SHARDED_SCORING_WORKERS
+    sharded_scoring.SHARDED_SCORING_WORKERS = 2
+    try:
+        yield
+    finally:
+        sharded_scoring.shutdown_shard_executor()
+        sharded_scoring.SHARDED_SCORING_WORKERS = original
+
+
+@pytest.fixture(scope="module")
+def candidates():
+    opportunities = random_opportunities(3000, seed=7)
+    return opportunities, CandidateFeatures(opportunities)
+
+
+def component_arrays(scores):
+    return scores.skills, scores.preferences, scores.experience
+
+
+class TestColumns:
+    """Encodings rebuilt from their columns score identically."""
+
+    @pytest.mark.parametrize("user_data,user_preferences", USERS)
+    def test_slice_and_from_columns(self, candidates, user_data, user_preferences):
+        _, features = candidates
+        context = UserContext(user_data, user_preferences)
+        skill_ids = {name: features.skill_id(name) for name in set(context.skills) | context.skill_set}
+        rebuilt = CandidateFeatures.from_columns(
+            {name: getattr(features, name) for name in CandidateFeatures.ARRAY_COLUMNS},
+            {name: getattr(features, name) for name in CandidateFeatures.TABLE_COLUMNS},
+            features.id_space,
+            skill_ids,
+        )
+
+        expected = score_candidates(context, features.take(np.arange(1000, 2500)))
+        actual = score_candidates(context, rebuilt.slice(1000, 2500))
+        for left, right in zip(component_arrays(expected), component_arrays(actual)):
+            assert np.array_equal(left, right)
+
+
+class TestShardedTopRows:
+    """The merged per-shard heads are the global head."""
+
+    @pytest.mark.parametrize("user_data,user_preferences", USERS)
+    def test_matches_in_process_selection(self, pool, candidates, user_data, user_preferences):
+        _, features = candidates
+        service = MatchingService()
+        context = UserContext(user_data, user_preferences)
+        scores = score_candidates(context, features)
+        semantic = (np.random.default_rng(0).uniform(-1, 1, len(features)) + 1) / 2
+
+        # Many candidates share scores, so ties decide part of the cut
+        assert np.array_equal(
+            sharded_top_rows(features, context, service.weights, 40),
+            service.shortlist(scores, 40),
+        )
+        assert np.array_equal(
+            sharded_top_rows(features, context, service.weights, 25, semantic),
+            np.sort(top_k(service.blend(semantic, scores), 25)),
+        )
+
+    @pytest.mark.parametrize("user_data,user_preferences", USERS)
+    def test_taken_subset_uses_full_export(self, pool, candidates, user_data, user_preferences):
+        _, features = candidates
+        service = MatchingService()
+        context = UserContext(user_data, user_preferences)
+        subset = features.take(np.arange(len(features) - 1, 0, -3))
+        scores = score_candidates(context, subset)
+        semantic = (np.random.default_rng(2).uniform(-1, 1, len(subset)) + 1) / 2
+
+        assert np.array_equal(
+            sharded_top_rows(subset, context, service.weights, 40),
+            service.shortlist(scores, 40),
+        )
+        assert np.array_equal(
+            sharded_top_rows(subset, context, service.weights, 25, semantic),
+            np.sort(top_k(service.blend(semantic, scores), 25)),
+        )
+        # Only the full encoding was exported
+        assert features in sharded_scoring._exports
+        assert subset not in sharded_scoring._exports
+
+    def test_export_released_with_features(self, pool):
+        features = CandidateFeatures(random_opportunities(50))
+        name = shared_features(features).name
+        assert shared_features(features).name == name  # exported once
+
+        del features
+        gc.collect()
+        with pytest.raises(FileNotFoundError):
+            SharedMemory(name=name)
+
+
+class TestShardedMatching:
+    """match_opportunities_batch returns the same results either way."""
+
+    @pytest.mark.parametrize("budget", [0, 200])
+    def test_identical_results(self, pool, candidates, budget):
+        opportunities, features = candidates
+        service = MatchingService(semantic_budget=budget)
+        similarities = np.random.default_rng(1).uniform(-1, 1, len(opportunities))
+
+        for user_data, user_preferences in USERS:
+            kwargs = dict(semantic_similarities=similarities, features=features, top_k=30)
+            expected = service.match_opportunities_batch(user_data, user_preferences, opportunities,
+                                                         sharded=False, **kwargs)
+            actual = service.match_opportunities_batch(user_data, user_preferences, opportunities,
+                                                       sharded=True, **kwargs)
+            assert actual == expected
+
+    def test_engages_only_above_threshold(self, monkeypatch):
+        monkeypatch.setattr(sharded_scoring, "SHARDED_SCORING", True)
+        monkeypatch.setattr(sharded_scoring, "SHARDED_SCORING_MIN_CANDIDATES", 1000)
+
+        assert should_shard(1000, workers=4)
+        assert not should_shard(999, workers=4)
+        assert not should_shard(5000, workers=1)
+        monkeypatch.setattr(sharded_scoring, "SHARDED_SCORING", False)
+        assert not should_shard(5000, workers=4)
@@ -0,0 +1,201 @@
+"""
+Tests for the interned skill vocabulary and bitset skill matching
+
+Run with: pytest tests/test_skill_vocabulary.py -v
+"""
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.api.match import SkillBitsets, calculate_match_score
+from app.database import Base
+from app.models.opportunity import Opportunity
+from app.models.skill import Skill
+from app.services import skill_vocabulary
+from app.services.feature_matrix import CandidateFeatures, UserContext, score_candidates
+from app.services.matching import MatchingService
+from app.services.skill_vocabulary import (
+    SkillVocabulary,
+    backfill_skill_ids,
+    bitset_from_ids,
+    canonical_skill,
+    get_skill_vocabulary,
+)
+
+
+@pytest.fixture
+def db():
+    """Isolated in-memory database with a fresh process vocabulary."""
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    skill_vocabulary.reset_skill_vocabulary()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+        skill_vocabulary.reset_skill_vocabulary()
+
+
+class TestCanonicalSkill:
+    """Tests for alias and case folding."""
+
+    @pytest.mark.parametrize("raw,expected", [
+        ("JS", "javascript"),
+        ("  React.js ", "react"),
+        ("Machine   Learning", "machine learning"),
+        ("ML", "machine learning"),
+        ("Python", "python"),
+    ])
+    def test_canonical(self, raw, expected):
+        assert canonical_skill(raw) == expected
+
+
+class TestSkillVocabulary:
+    """Tests for interning and persistence."""
+
+    def test_intern_returns_sorted_unique_ids(self, db):
+        vocab = SkillVocabulary()
+        ids = vocab.intern(db, ["SQL", "Python", "python", "JS", "javascript", " "])
+        db.commit()
+
+        assert ids == sorted(set(ids))
+        assert len(ids) == 3
+        assert db.query(Skill).count() == 3
+
+    def test_ids_survive_restart(self, db):
+        first = SkillVocabulary().intern(db, ["Python", "Docker"])
+        db.commit()
+
+        restarted = SkillVocabulary()
+        restarted.load(db)
+        assert restarted.lookup("Python") in first
+        assert restarted.intern(db, ["docker", "PYTHON"]) == first
+
+    def test_refresh_picks_up_other_workers(self, db):
+        mine = SkillVocabulary()
+        mine.intern(db, ["python"])
+        SkillVocabulary().intern(db, ["rust"])  # another process
+        db.commit()
+
+        assert mine.lookup("rust") is None
+        mine.refresh(db)
+        assert mine.lookup("rust") is not None
+
+    def test_ids_published_on_commit(self, db):
+        vocab = get_skill_vocabulary()
+        db.add(Opportunity(title="Dev", required_skills=["Rust"]))
+        db.flush()
+        assert vocab.lookup("rust") is None
+
+        db.commit()
+        assert vocab.lookup("rust") == db.query(Skill.id).filter(Skill.name == "rust").scalar()
+
+    def test_rollback_forgets_ids(self, db):
+        vocab = get_skill_vocabulary()
+        db.add(Opportunity(title="Dev", required_skills=["Rust"]))
+        db.flush()
+        db.rollback()
+
+        # The rolled-back id is reused by another name
+        db.add(Opportunity(title="Ops", required_skills=["Go"]))
+        db.commit()
+        db.add(Opportunity(title="Dev", required_skills=["Rust"]))
+        db.commit()
+
+        stored = dict(db.query(Skill.name, Skill.id).all())
+        assert vocab.lookup("go") == stored["go"]
+        assert vocab.lookup("rust") == stored["rust"]
+        assert db.query(Opportunity).filter(Opportunity.title == "Dev").one().required_skill_ids == [stored["rust"]]
+
+    def test_savepoint_rollback_forgets_ids(self, db):
+        savepoint = db.begin_nested()
+        db.add(Opportunity(title="Dev", required_skills=["Rust"]))
+        db.flush()
+        savepoint.rollback()
+        db.commit()
+
+        assert get_skill_vocabulary().lookup("rust") is None
+        assert db.query(Skill).count() == 0
+
+    def test_opportunity_ids_set_on_write(self, db):
+        opp = Opportunity(title="Dev", required_skills=["JS", "Python"], preferred_skills=["k8s"])
+        db.add(opp)
+        db.commit()
+
+        vocab = get_skill_vocabulary()
+        assert opp.required_skill_ids == sorted([vocab.lookup("javascript"), vocab.lookup("python")])
+        assert opp.preferred_skill_ids == [vocab.lookup("kubernetes")]
+
+        opp.required_skills = ["Go"]
+        db.commit()
+        assert opp.required_skill_ids == [vocab.lookup("golang")]
+
+    def test_backfill_fills_missing_ids(self, db):
+        db.add(Opportunity(title="Dev", required_skills=["Python"]))
+        db.commit()
+        db.query(Opportunity).update({"required_skill_ids": None, "preferred_skill_ids": None})
+        db.commit()
+
+        assert backfill_skill_ids(db) == 1
+        assert db.query(Opportunity).one().required_skill_ids == [get_skill_vocabulary().lookup("python")]
+
+
+class TestBitsetScoring:
+    """Skill scores computed with popcounts."""
+
+    def test_aliases_match(self):
+        score, matched = MatchingService().calculate_skills_score(["JS", "Docker"], ["javascript"], [])
+        assert score == 1.0
+        assert matched == ["JS"]
+
+    def test_partial_overlap(self):
+        score, matched = MatchingService().calculate_skills_score(
+            ["python", "SQL"], ["Python", "Go", "Rust", "sql"], ["Excel"]
+        )
+        assert score == round(0.7 * 2 / 4 + 0.3 * 0, 3)
+        assert matched == ["python", "SQL"]
+
+    def test_no_requirements(self):
+        assert MatchingService().calculate_skills_score(["python"], [], None) == (1.0, [])
+
+    def test_jaccard(self):
+        user = bitset_from_ids([1, 2, 3])
+        assert calculate_match_score(user, bitset_from_ids([2, 3, 4])) == 0.5
+        assert calculate_match_score(user, 0) == 1.0
+
+    def test_feed_bitsets_use_stored_ids(self, db):
+        opp = Opportunity(title="Dev", required_skills=["React.js", "Node"])
+        db.add(opp)
+        db.commit()
+
+        skills = SkillBitsets(db, ["react", "NodeJS", "Figma"])
+        opp_bits = skills.required(opp)
+        assert calculate_match_score(skills.user, opp_bits) == round(2 / 3, 3)
+        assert skills.matched_skills(opp_bits) == ["NodeJS", "react"]
+
+    def test_batch_features_from_stored_ids_match_names(self, db):
+        rows = [
+            Opportunity(title="A", required_skills=["JS", "SQL"], preferred_skills=["Docker"]),
+            Opportunity(title="B", required_skills=["Python"], preferred_skills=[]),
+        ]
+        db.add_all(rows)
+        db.commit()
+        with_ids = [
+            {"id": o.id, "required_skills": o.required_skills, "preferred_skills": o.preferred_skills,
+             "required_skill_ids": o.required_skill_ids, "preferred_skill_ids": o.preferred_skill_ids}
+            for o in rows
+        ]
+        names_only = [{k: v for k, v in d.items() if not k.endswith("_ids")} for d in with_ids]
+        context = UserContext({"skills": ["javascript", "docker"]}, {})
+
+        stored = score_candidates(context, CandidateFeatures(with_ids))
+        derived = score_candidates(context, CandidateFeatures(names_only))
+        assert stored.skills.tolist() == derived.skills.tolist() == [0.65, 0.3]
+        assert stored.matched_skills(0) == ["javascript", "docker"]
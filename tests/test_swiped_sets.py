@@ -0,0 +1,137 @@
+"""
+Tests for per-user swiped bitmaps
+
+Run with: pytest tests/test_swiped_sets.py -v
+"""
+import random
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.api import match, swipes
+from app.database import Base
+from app.models import document  # noqa: F401 (swipes create applications, which reference documents)
+from app.models.opportunity import Opportunity
+from app.models.swipe import UserSwipe
+from app.models.user import User
+from app.schemas.swipe import SwipeAction, SwipeCreate
+from app.services import feed_snapshot, skill_vocabulary, swiped_sets
+from app.services.swiped_sets import ARRAY_MAX, SwipedBitmap, get_swiped_sets, not_swiped_clause
+
+
+@pytest.fixture
+def db():
+    """Isolated in-memory database with fresh process-wide caches."""
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    swiped_sets.reset_swiped_sets()
+    feed_snapshot.reset_feed_snapshots()
+    skill_vocabulary.reset_skill_vocabulary()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+        swiped_sets.reset_swiped_sets()
+        feed_snapshot.reset_feed_snapshots()
+        skill_vocabulary.reset_skill_vocabulary()
+
+
+@pytest.fixture
+def user(db):
+    """Screened user and ten opportunities."""
+    user = User(email="swiper@example.com", hashed_password="x", name="Swiper",
+                skills=["python"], screening_completed=True, daily_swipe_limit=100)
+    db.add(user)
+    db.add_all([Opportunity(title=f"Role {i}", required_skills=["python"]) for i in range(10)])
+    db.commit()
+    return user
+
+
+class TestSwipedBitmap:
+    """The bitmap behaves like a set of ids."""
+
+    def test_matches_python_set(self):
+        rng = random.Random(0)
+        expected = set(rng.sample(range(300_000), 2000))
+        bitmap = SwipedBitmap(expected)
+        for _ in range(2000):
+            opp_id = rng.randrange(300_000)
+            if rng.random() < 0.5:
+                bitmap.add(opp_id)
+                expected.add(opp_id)
+            else:
+                bitmap.remove(opp_id)
+                expected.discard(opp_id)
+
+        assert len(bitmap) == len(expected)
+        assert list(bitmap) == sorted(expected)
+        probe = np.arange(300_000)
+        assert np.flatnonzero(bitmap.contains(probe)).tolist() == sorted(expected)
+        assert all(opp_id in bitmap for opp_id in list(expected)[:100])
+
+    def test_dense_chunk_switches_container(self):
+        bitmap = SwipedBitmap(range(ARRAY_MAX))
+        assert bitmap.nbytes == ARRAY_MAX * 2
+        bitmap.add(ARRAY_MAX)
+        assert bitmap.nbytes == 8192  # one bit per id of the chunk
+        bitmap.remove(0)
+        assert bitmap.nbytes == ARRAY_MAX * 2
+        assert list(bitmap) == list(range(1, ARRAY_MAX + 1))
+
+    def test_sparse_set_is_small(self):
+        bitmap = SwipedBitmap([5, 70_000, 9_000_000])
+        assert bitmap.nbytes == 6
+        assert bitmap.contains(np.array([5, 6, 70_000, 9_000_000])).tolist() == [True, False, True, True]
+
+
+class TestSwipedSetCache:
+    """Cached bitmaps follow swipe writes."""
+
+    def test_swipe_endpoints_update_cached_bitmap(self, db, user):
+        cache = get_swiped_sets()
+        assert len(cache.get(db, user.id)) == 0
+
+        swipe = swipes.record_swipe(SwipeCreate(opportunity_id=3, action=SwipeAction.DISLIKE), user, db)
+        swipes.record_swipe(SwipeCreate(opportunity_id=4, action=SwipeAction.SAVE), user, db)
+        swipes.delete_swipe(swipe.id, user, db)
+
+        swiped = cache.get(db, user.id)
+        assert list(swiped) == [4]
+        assert cache.misses == 1  # kept in step without reloading
+
+    def test_writes_from_other_workers_reload(self, db, user):
+        cache = get_swiped_sets()
+        cache.get(db, user.id)
+        db.add(UserSwipe(user_id=user.id, opportunity_id=7, action="dislike"))
+        db.commit()
+
+        assert 7 in cache.get(db, user.id)
+        assert cache.misses == 2
+
+
+class TestFeedExclusion:
+    """Feeds exclude swiped opportunities without an id list."""
+
+    def test_anti_join_sql(self):
+        sql = str(Opportunity.__table__.select().where(not_swiped_clause(1)).compile(
+            compile_kwargs={"literal_binds": True}
+        ))
+        assert "NOT (EXISTS" in sql
+        assert "IN (" not in sql
+
+    def test_basic_feed_excludes_swiped(self, db, user):
+        for opp_id in (1, 2, 3):
+            swipes.record_swipe(SwipeCreate(opportunity_id=opp_id, action=SwipeAction.DISLIKE), user, db)
+
+        response = match.get_opportunity_feed(limit=20, opportunity_type=None, current_user=user, db=db)
+        assert sorted(item["opportunity"]["id"] for item in response["feed"]) == list(range(4, 11))
+        assert response["already_swiped"] == 3
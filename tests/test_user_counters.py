@@ -0,0 +1,296 @@
+"""
+Tests for per-user swipe and application counters
+
+The counters row must always equal what COUNT queries over the swipe and
+application rows would return, and the stats endpoints read it with a
+single primary-key lookup.
+
+Run with: pytest tests/test_user_counters.py -v
+"""
+import random
+import subprocess
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import migrate_db
+from app.api import applications, swipes
+from app.database import Base
+from app.models import document  # noqa: F401 (swipes create applications, which reference documents)
+from app.models.application import Application
+from app.models.opportunity import Opportunity
+from app.models.swipe import UserSwipe
+from app.models.user import User
+from app.models.user_counters import UserCounters
+from app.schemas.application import ApplicationCreate, ApplicationStatus, ApplicationUpdate
+from app.schemas.swipe import SwipeAction, SwipeCreate
+from app.services import feed_snapshot, swiped_sets
+from app.services.user_counters import APPLICATION_STATUSES, rebuild_user_counters
+
+
+@pytest.fixture
+def db():
+    """Isolated in-memory database with fresh process-wide caches."""
+    engine = create_engine(
+        "sqlite:///:memory:",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    swiped_sets.reset_swiped_sets()
+    feed_snapshot.reset_feed_snapshots()
+    try:
+        yield session
+    finally:
+        session.close()
+        Base.metadata.drop_all(bind=engine)
+        swiped_sets.reset_swiped_sets()
+        feed_snapshot.reset_feed_snapshots()
+
+
+@pytest.fixture
+def user(db):
+    """User and twelve opportunities."""
+    user = User(email="counter@example.com", hashed_password="x", name="Counter", daily_swipe_limit=1000)
+    db.add(user)
+    db.add_all([Opportunity(title=f"Role {i}", company_name="Acme") for i in range(12)])
+    db.commit()
+    return user
+
+
+def counted(db, user_id):
+    """Stats computed the old way, one COUNT per figure."""
+    swiped = db.query(UserSwipe).filter(UserSwipe.user_id == user_id)
+    applied = db.query(Application).filter(Application.user_id == user_id)
+    swipe_stats = {
+        "likes": swiped.filter(UserSwipe.action == "like").count(),
+        "dislikes": swiped.filter(UserSwipe.action == "dislike").count(),
+        "saves": swiped.filter(UserSwipe.action == "save").count(),
+    }
+    swipe_stats["total"] = sum(swipe_stats.values())
+    application_stats = {"total": applied.count()}
+    application_stats.update({s: applied.filter(Application.status == s).count() for s in APPLICATION_STATUSES})
+    used_today = swiped.filter(UserSwipe.swipe_date == date.today()).count()
+    return swipe_stats, application_stats, used_today
+
+
+def capture(db):
+    """SQL statements issued while the block runs."""
+    issued = []
+
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        issued.append(statement)
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", _capture)
+    return issued, lambda: event.remove(engine, "before_cursor_execute", _capture)
+
+
+def drop_counters(db, user):
+    """The user as it was before the table existed."""
+    db.query(UserCounters).delete()
+    db.commit()
+    db.refresh(user)
+
+
+def served(db, user):
+    return (
+        swipes.get_swipe_stats(current_user=user, db=db),
+        applications.get_application_stats(current_user=user, db=db),
+        swipes.check_daily_swipe_limit(user, db)[1],
+    )
+
+
+def random_operation(db, user, rng):
+    """One write through the endpoints; rejected requests are part of the mix."""
+    opportunity_id = rng.randint(1, 12)
+    owned_swipes = db.query(UserSwipe).filter(UserSwipe.user_id == user.id).all()
+    owned_applications = db.query(Application).filter(Application.user_id == user.id).all()
+    operation = rng.choice(["swipe", "swipe", "delete", "approve", "apply", "status", "submit", "withdraw"])
+    try:
+        if operation == "swipe":
+            action = rng.choice(list(SwipeAction))
+            swipes.record_swipe(SwipeCreate(opportunity_id=opportunity_id, action=action), user, db)
+        elif operation == "delete" and owned_swipes:
+            swipes.delete_swipe(rng.choice(owned_swipes).id, user, db)
+        elif operation == "approve" and owned_swipes:
+            swipes.approve_swipe(rng.choice(owned_swipes).id, user, db)
+        elif operation == "apply":
+            applications.create_application(ApplicationCreate(opportunity_id=opportunity_id), user, db)
+        elif operation == "status" and owned_applications:
+            payload = ApplicationUpdate(status=rng.choice(list(ApplicationStatus)))
+            applications.update_application(rng.choice(owned_applications).id, payload, user, db)
+        elif operation == "submit" and owned_applications:
+            applications.submit_application(rng.choice(owned_applications).id, user, db)
+        elif operation == "withdraw" and owned_applications:
+            applications.withdraw_application(rng.choice(owned_applications).id, user, db)
+    except HTTPException:
+        db.rollback()
+
+
+class TestCountersMatchRows:
+    """Every write path keeps the counters equal to the COUNT queries."""
+
+    @pytest.mark.parametrize("legacy", [False, True])
+    def test_random_operations(self, db, user, legacy):
+        rng = random.Random(7)
+        if legacy:
+            drop_counters(db, user)
+        for step in range(300):
+            random_operation(db, user, rng)
+            if step % 25 == 24:
+                assert served(db, user) == counted(db, user.id), step
+
+        assert served(db, user) == counted(db, user.id)
+        if legacy:
+            # Writes leave a missing row alone; the rebuild creates it
+            assert db.query(UserCounters).count() == 0
+            rebuild_user_counters(db)
+            db.commit()
+            assert served(db, user) == counted(db, user.id)
+        assert db.query(UserCounters).count() == 1
+
+    def test_row_created_with_user(self, db):
+        user = User(email="new@example.com", hashed_password="x", name="New")
+        opportunity = Opportunity(title="Role")
+        db.add_all([
+            user,
+            UserSwipe(user=user, opportunity=opportunity, action="like"),
+            Application(user=user, opportunity=opportunity, status="submitted"),
+        ])
+        db.commit()
+
+        counters = db.get(UserCounters, user.id)
+        assert (counters.likes, counters.swipes_date, counters.swipes_today) == (1, date.today(), 1)
+        assert (counters.applications_total, counters.applications_submitted) == (1, 1)
+        assert served(db, user) == counted(db, user.id)
+
+    def test_swipe_action_change(self, db, user):
+        swipes.record_swipe(SwipeCreate(opportunity_id=1, action=SwipeAction.LIKE), user, db)
+        swipes.record_swipe(SwipeCreate(opportunity_id=1, action=SwipeAction.SAVE), user, db)
+
+        stats, _, used_today = served(db, user)
+        assert stats == {"likes": 0, "dislikes": 0, "saves": 1, "total": 1}
+        # Changing the action is not a new swipe
+        assert used_today == 1
+
+    def test_rollback_discards_deltas(self, db, user):
+        db.add(UserSwipe(user_id=user.id, opportunity_id=1, action="like"))
+        db.flush()
+        db.rollback()
+
+        assert served(db, user) == counted(db, user.id)
+        assert served(db, user)[0]["total"] == 0
+
+
+class TestBackfill:
+    """Users from before the table are read from the aggregate until rebuilt."""
+
+    def test_read_without_write(self, db, user):
+        yesterday = date.today() - timedelta(days=1)
+        db.add_all([
+            UserSwipe(user_id=user.id, opportunity_id=1, action="like", swipe_date=yesterday),
+            UserSwipe(user_id=user.id, opportunity_id=2, action="save"),
+            Application(user_id=user.id, opportunity_id=1, status="interview"),
+        ])
+        db.commit()
+        drop_counters(db, user)
+
+        issued, stop = capture(db)
+        try:
+            assert served(db, user) == counted(db, user.id)
+        finally:
+            stop()
+        assert all(statement.lstrip().upper().startswith("SELECT") for statement in issued)
+        assert db.get(UserCounters, user.id) is None
+
+        assert rebuild_user_counters(db) == 1
+        db.commit()
+        db.expire_all()
+        counters = db.get(UserCounters, user.id)
+        assert (counters.likes, counters.saves, counters.swipes_today) == (1, 1, 1)
+        assert counters.applications_interview == 1
+
+    def test_migration_rebuilds(self, tmp_path, monkeypatch):
+        path = tmp_path / "existing.db"
+        engine = create_engine(f"sqlite:///{path}")
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as connection:
+            connection.execute(text("INSERT INTO users (id, email, hashed_password, name) VALUES (1, 'a@b.c', 'x', 'A')"))
+            connection.execute(text("INSERT INTO opportunities (id, title) VALUES (1, 'Role')"))
+            connection.execute(text(
+                "INSERT INTO user_swipes (user_id, opportunity_id, action, swipe_date) VALUES (1, 1, 'save', :today)"
+            ), {"today": date.today()})
+            connection.execute(text("DROP TABLE user_counters"))
+
+        monkeypatch.setattr(migrate_db, "DB_PATH", path)
+        migrate_db.migrate()
+
+        with engine.connect() as connection:
+            row = connection.execute(text("SELECT saves, swipes_today FROM user_counters WHERE user_id = 1")).one()
+        assert tuple(row) == (1, 1)
+        engine.dispose()
+
+
+class TestRegistration:
+    """Any model import keeps the counters in sync, without app.main or the service."""
+
+    def test_listener_registered_by_models(self):
+        code = (
+            "from sqlalchemy import event; from sqlalchemy.orm import Session; "
+            "import app.models.swipe, sys; "
+            "from app.models.user_counters import _counters_on_flush; "
+            "assert 'app.services.user_counters' not in sys.modules; "
+            "assert event.contains(Session, 'before_flush', _counters_on_flush)"
+        )
+        subprocess.run([sys.executable, "-c", code], check=True, cwd=Path(__file__).resolve().parents[1])
+
+
+class TestDailyCount:
+    """The daily limit counts the current day only."""
+
+    def test_new_day_resets(self, db, user):
+        counters = db.get(UserCounters, user.id)
+        counters.likes, counters.swipes_date, counters.swipes_today = 3, date.today() - timedelta(days=1), 3
+        db.commit()
+        assert swipes.check_daily_swipe_limit(user, db)[1] == 0
+
+        swipes.record_swipe(SwipeCreate(opportunity_id=1, action=SwipeAction.DISLIKE), user, db)
+
+        counters = db.get(UserCounters, user.id)
+        assert (counters.swipes_date, counters.swipes_today) == (date.today(), 1)
+        assert counters.likes == 3 and counters.dislikes == 1
+
+    def test_limit_enforced(self, db, user):
+        user.daily_swipe_limit = 2
+        db.commit()
+        for opportunity_id in (1, 2):
+            swipes.record_swipe(SwipeCreate(opportunity_id=opportunity_id, action=SwipeAction.DISLIKE), user, db)
+
+        with pytest.raises(HTTPException) as exc:
+            swipes.record_swipe(SwipeCreate(opportunity_id=3, action=SwipeAction.DISLIKE), user, db)
+        assert exc.value.status_code == 429
+
+
+class TestSingleLookup:
+    """Stats endpoints read one row by primary key."""
+
+    def test_one_select(self, db, user):
+        db.expire_all()
+        db.refresh(user)
+
+        issued, stop = capture(db)
+        try:
+            swipes.get_swipe_stats(current_user=user, db=db)
+        finally:
+            stop()
+
+        assert len(issued) == 1
+        assert "FROM user_counters" in issued[0] and "user_counters.user_id = ?" in issued[0]
@@ -0,0 +1,132 @@
+"""
+Tests for the quantized, memory-mapped embedding matrix
+
+Run with: pytest tests/test_vector_matrix.py -v
+"""
+import os
+
+import numpy as np
+import pytest
+from unittest.mock import patch
+
+from app.services import embedding_store, vector_matrix
+from app.services.embedding import build_opportunity_text
+from app.services.embedding_store import hash_text, opportunity_similarities
+from app.services.vector_matrix import EmbeddingMatrix, write_embedding_matrix
+
+
+def exact_cosine(vectors, query):
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    return unit @ (query / np.linalg.norm(query))
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    ids = rng.permutation(np.arange(1, 501))  # unsorted on purpose
+    vectors = rng.standard_normal((500, 384)).astype(np.float32)
+    hashes = [hash_text(str(i)) for i in ids]
+    return ids, vectors, hashes
+
+
+class TestEmbeddingMatrix:
+    """Round-trip and kernel accuracy per storage dtype."""
+
+    @pytest.mark.parametrize("dtype,tolerance", [("float32", 1e-5), ("float16", 2e-3), ("int8", 2e-2)])
+    def test_dot_matches_exact_cosine(self, tmp_path, data, dtype, tolerance):
+        ids, vectors, hashes = data
+        path = str(tmp_path / "vectors")
+        write_embedding_matrix(path, ids, vectors, hashes, dtype=dtype)
+
+        matrix = EmbeddingMatrix(path)
+        assert matrix.dtype == dtype
+        query = vectors[10] + 0.1
+        rows = matrix.rows_for(ids)
+
+        np.testing.assert_allclose(matrix.dot(query, rows), exact_cosine(vectors, query), atol=tolerance)
+
+    def test_rows_are_sorted_and_lookup_handles_missing(self, tmp_path, data):
+        ids, vectors, hashes = data
+        path = str(tmp_path / "vectors")
+        write_embedding_matrix(path, ids, vectors, hashes)
+
+        matrix = EmbeddingMatrix(path)
+        assert list(matrix.ids) == sorted(ids.tolist())
+        rows = matrix.rows_for([ids[0], 99999, 0])
+        assert matrix.ids[rows[0]] == ids[0]
+        assert rows[1] == -1 and rows[2] == -1
+
+    def test_full_scan_equals_gathered_rows(self, tmp_path, data):
+        ids, vectors, hashes = data
+        path = str(tmp_path / "vectors")
+        write_embedding_matrix(path, ids, vectors, hashes, dtype="int8")
+
+        matrix = EmbeddingMatrix(path)
+        np.testing.assert_array_equal(matrix.dot(vectors[0]), matrix.dot(vectors[0], np.arange(len(matrix))))
+
+    def test_memory_mapped_read_only(self, tmp_path, data):
+        ids, vectors, hashes = data
+        path = str(tmp_path / "vectors")
+        write_embedding_matrix(path, ids, vectors, hashes, dtype="int8")
+
+        matrix = EmbeddingMatrix(path)
+        assert isinstance(matrix.vectors, np.memmap)
+        assert not matrix.vectors.flags.writeable
+        # int8 rows take one byte per dimension (+ header)
+        assert os.path.getsize(os.path.join(matrix.directory, "vectors.npy")) < 500 * 384 + 1024
+
+    def test_rebuild_swaps_whole_version(self, tmp_path, data):
+        ids, vectors, hashes = data
+        path = str(tmp_path / "vectors")
+        write_embedding_matrix(path, ids, vectors, hashes, dtype="int8")
+        old = vector_matrix.get_embedding_matrix(path)
+
+        write_embedding_matrix(path, ids[:10], vectors[:10], hashes[:10], dtype="float32")
+        new = vector_matrix.get_embedding_matrix(path)
+        assert new is not old
+        assert (len(new), new.dtype, new.scales) == (10, "float32", None)
+        # Readers still holding the previous version keep a complete file set
+        assert len(old) == 500 and old.scales is not None
+        np.testing.assert_allclose(old.dot(vectors[0])[old.rows_for([ids[0]])], [1.0], atol=2e-2)
+
+        write_embedding_matrix(path, ids, vectors, hashes)
+        versions = [entry for entry in os.listdir(path) if entry != "CURRENT"]
+        assert len(versions) == 1 + vector_matrix.KEPT_VERSIONS
+        assert vector_matrix.get_embedding_matrix(path) is not new
+
+    def test_rejects_unknown_dtype(self, tmp_path, data):
+        ids, vectors, hashes = data
+        with pytest.raises(ValueError):
+            write_embedding_matrix(str(tmp_path / "v"), ids, vectors, hashes, dtype="int4")
+
+
+class TestOpportunitySimilarities:
+    """The feed's semantic scores read from the matrix when it is fresh."""
+
+    def test_fresh_rows_skip_database(self, tmp_path):
+        opps = [{"id": 1, "title": "Python Developer"}, {"id": 2, "title": "Data Analyst"}]
+        vectors = np.random.default_rng(1).standard_normal((2, 384)).astype(np.float32)
+        path = str(tmp_path / "vectors")
+        write_embedding_matrix(
+            path, [1, 2], vectors, [hash_text(build_opportunity_text(o)) for o in opps], dtype="float16"
+        )
+
+        with patch.object(embedding_store, "get_embedding_matrix", lambda: vector_matrix.get_embedding_matrix(path)), \
+                patch.object(embedding_store, "load_opportunity_embeddings") as load:
+            scores = opportunity_similarities(None, vectors[0], opps)
+
+        load.assert_not_called()
+        assert scores[0] == pytest.approx(1.0, abs=1e-3)
+
+    def test_outdated_rows_fall_back_to_store(self, tmp_path):
+        opps = [{"id": 1, "title": "Python Developer"}]
+        vectors = np.ones((1, 384), dtype=np.float32)
+        path = str(tmp_path / "vectors")
+        write_embedding_matrix(path, [1], vectors, [hash_text("old text")])
+
+        with patch.object(embedding_store, "get_embedding_matrix", lambda: vector_matrix.get_embedding_matrix(path)), \
+                patch.object(embedding_store, "load_opportunity_embeddings", return_value=-vectors) as load:
+            scores = opportunity_similarities(None, vectors[0], opps)
+
+        load.assert_called_once()
+        assert scores[0] == pytest.approx(-1.0, abs=1e-5)